@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { FileText, User, Settings, Shield } from 'lucide-react';
 import { useThemeTokens } from '../hooks/useThemeTokens';
@@ -11,6 +11,8 @@ const ActivityLogs = () => {
   const [loading, setLoading] = useState(true);
   const [page, setPage] = useState(1);
   const [totalPages, setTotalPages] = useState(1);
+  // cursors[n] starts page n + 1 (keyset paging; page 1 needs none)
+  const cursors = useRef([null]);
 
   useEffect(() => {
     fetchLogs();
@@ -19,9 +21,10 @@ const ActivityLogs = () => {
   const fetchLogs = async () => {
     setLoading(true);
     try {
-      const response = await axios.get(`${API_URL}/api/admin/logs`, {
-        params: { page, limit: 50 },
-      });
+      const params = { page, limit: 50 };
+      if (cursors.current[page - 1]) params.cursor = cursors.current[page - 1];
+      const response = await axios.get(`${API_URL}/api/admin/logs`, { params });
+      cursors.current[page] = response.data.next_cursor;
       setLogs(response.data.logs);
       setTotalPages(Math.ceil(response.data.total / 50));
     } catch (error) {
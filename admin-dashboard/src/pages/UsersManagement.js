@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Search, Filter, MoreVertical, Edit, Ban, Trash2, Eye } from 'lucide-react';
 import { useThemeTokens } from '../hooks/useThemeTokens';
@@ -15,6 +15,12 @@ const UsersManagement = () => {
   const [showCancellingOnly, setShowCancellingOnly] = useState(false);
   const [page, setPage] = useState(1);
   const [totalPages, setTotalPages] = useState(1);
+  // cursors[n] starts page n + 1 (keyset paging; page 1 needs none)
+  const cursors = useRef([null]);
+
+  useEffect(() => {
+    cursors.current = [null];
+  }, [tierFilter, statusFilter, search]);
 
   useEffect(() => {
     fetchUsers();
@@ -30,8 +36,10 @@ const UsersManagement = () => {
       if (tierFilter !== 'all') params.tier = tierFilter;
       if (statusFilter !== 'all') params.status = statusFilter;
       if (search) params.search = search;
+      if (cursors.current[page - 1]) params.cursor = cursors.current[page - 1];
 
       const response = await axios.get(`${API_URL}/api/admin/users`, { params });
+      cursors.current[page] = response.data.next_cursor;
       setUsers(response.data.users);
       setTotalPages(response.data.pages);
     } catch (error) {
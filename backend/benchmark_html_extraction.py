@@ -0,0 +1,119 @@
+"""
+Benchmark for homepage extraction in brand discovery
+
+Compares the previous BeautifulSoup path (one html.parser parse, then a
+find_all/select call per attribute, a re-parsed header and per-selector
+structured text) against the single-pass lxml engine in
+linkedpilot.utils.html_extract, on saved real-world pages.
+
+Usage: python benchmark_html_extraction.py [page.html ...]
+       (defaults to the HTML pages stored in the HTTP cache directory)
+"""
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bs4 import BeautifulSoup
+
+from linkedpilot.utils.html_extract import (
+    COLOR_PATTERN,
+    FONT_PATTERN,
+    HERO_SELECTORS,
+    extract_page,
+)
+
+BASE_URL = "https://example.com/"
+ITERATIONS = 5
+
+
+def extract_with_soup(html):
+    """The BeautifulSoup calls _extract_brand_attributes made per homepage"""
+    soup = BeautifulSoup(html, "html.parser")
+    colors = COLOR_PATTERN.findall(html)
+    fonts = FONT_PATTERN.findall(html)
+    for element in soup.find_all(attrs={"style": True}):
+        colors.extend(COLOR_PATTERN.findall(element.get("style", "")))
+    for block in soup.find_all("style"):
+        content = block.get_text() or ""
+        colors.extend(COLOR_PATTERN.findall(content))
+        fonts.extend(FONT_PATTERN.findall(content))
+    stylesheets = [link.get("href") for link in soup.find_all("link") if "stylesheet" in (link.get("rel") or [])]
+    soup.find("meta", property="og:image")
+    soup.find("meta", attrs={"name": "twitter:image"})
+    hero = [img.get("src") for selector in HERO_SELECTORS for img in soup.select(selector)[:2]]
+    images = [img.get("src") or img.get("data-src") for img in soup.find_all("img")]
+    for img in soup.find_all("img"):
+        img.find_parent("picture")
+    for element in soup.find_all(attrs={"style": True}):
+        re.search(r'background-image:\s*url\(["\']?([^"\']+)["\']?\)', element.get("style", ""), re.IGNORECASE)
+    header = soup.find("header")
+    if header:
+        header_copy = BeautifulSoup(str(header), "html.parser")
+        for nav in header_copy.find_all("nav"):
+            nav.decompose()
+        header_copy.get_text(separator=" ", strip=True)
+    footer = soup.find("footer")
+    if footer:
+        footer.get_text(separator=" ", strip=True)
+        [link.get_text(strip=True) for link in footer.find_all("a", href=True)]
+    main = soup.find("main") or soup.find("article") or soup.find("body")
+    text = main.get_text(separator=" ", strip=True) if main else soup.get_text(separator=" ", strip=True)
+    for selector in ['h1', 'h2', 'h3', 'h4', 'p', 'li', 'div[class*="content"]', 'div[class*="text"]', 'section', 'article']:
+        [elem.get_text(strip=True) for elem in soup.select(selector)[:200]]
+    nav = soup.find("nav")
+    if nav:
+        [link.get_text(strip=True) for link in nav.find_all("a", href=True)]
+    return len(colors), len(fonts), len(stylesheets), len(hero), len(images), len(text)
+
+
+def extract_with_engine(html):
+    page = extract_page(html, BASE_URL)
+    page.text("header")
+    page.text("footer")
+    text = page.main_text(" ")
+    page.structured_parts()
+    page.internal_links(BASE_URL)
+    return len(page.colors), len(page.fonts), len(page.stylesheets), len(page.hero_images), len(page.images), len(text)
+
+
+def cached_pages():
+    from linkedpilot.utils.http_cache import HTTP_CACHE_DIR
+    for meta_path in sorted(Path(HTTP_CACHE_DIR).glob("*/*.json")):
+        body_path = meta_path.with_suffix(".body")
+        if body_path.exists() and "text/html" in meta_path.read_text().lower():
+            yield body_path
+
+
+def time_extract(extract, html):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        extract(html)
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+def main():
+    paths = [Path(arg) for arg in sys.argv[1:]] or list(cached_pages())
+    if not paths:
+        print("No pages given and no HTML pages in the HTTP cache")
+        return
+
+    print(f"\n=== HTML EXTRACTION BENCHMARK ({ITERATIONS} iterations) ===\n")
+    print(f"{'page':<40}  {'KB':>6}  {'soup ms':>9}  {'lxml ms':>9}  {'speedup':>8}")
+    soup_total = engine_total = 0.0
+    for path in paths:
+        html = path.read_bytes().decode("utf-8", errors="replace")
+        soup_ms = time_extract(extract_with_soup, html)
+        engine_ms = time_extract(extract_with_engine, html)
+        soup_total += soup_ms
+        engine_total += engine_ms
+        print(f"{path.name[:40]:<40}  {len(html) / 1024:>6.0f}  {soup_ms:>9.2f}  {engine_ms:>9.2f}  {soup_ms / engine_ms:>7.1f}x")
+    print(f"{'total':<40}  {'':>6}  {soup_total:>9.2f}  {engine_total:>9.2f}  {soup_total / engine_total:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Micro-benchmark for text overlay stroke rendering
+
+Compares the old per-offset outline loop ((2w+1)^2 draw.text calls) against the
+single-rasterization mask path used by add_text_overlay_to_image, for stroke
+widths 0-8.
+
+Usage: python benchmark_text_overlay.py [font_path]
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image, ImageDraw, ImageFont
+
+from linkedpilot.utils.image_text_overlay import _rasterize_text_masks
+
+TEXT = "Grow your pipeline with LinkedIn"
+FONT_SIZE = 64
+ITERATIONS = 20
+
+
+def load_font(font_path=None):
+    if not font_path:
+        font_path = Path(__file__).parent / "linkedpilot" / "utils" / "fonts_cache" / "Roboto_regular.ttf"
+    try:
+        return ImageFont.truetype(str(font_path), FONT_SIZE)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def render_offset_loop(img, font_obj, stroke_width):
+    draw = ImageDraw.Draw(img)
+    for adj in range(-stroke_width, stroke_width + 1):
+        for adj2 in range(-stroke_width, stroke_width + 1):
+            draw.text((100 + adj, 100 + adj2), TEXT, font=font_obj, fill=(0, 0, 0, 255))
+    draw.text((100, 100), TEXT, font=font_obj, fill=(255, 255, 255, 255))
+
+
+def render_masks(img, font_obj, stroke_width):
+    # Same tight-mask layout as the simple branch of add_text_overlay_to_image
+    bbox = ImageDraw.Draw(img).textbbox((0, 0), TEXT, font=font_obj)
+    margin = stroke_width + 2
+    origin = (margin - min(bbox[0], 0), margin - min(bbox[1], 0))
+    size = (origin[0] + bbox[2] + margin, origin[1] + bbox[3] + margin)
+    fill_mask, outline_mask = _rasterize_text_masks(size, origin, TEXT, font_obj, stroke_width)
+    box = (100 - origin[0], 100 - origin[1], 100 - origin[0] + size[0], 100 - origin[1] + size[1])
+    if outline_mask is not None:
+        img.paste((0, 0, 0, 255), box, outline_mask)
+    img.paste((255, 255, 255, 255), box, fill_mask)
+
+
+def time_render(render, font_obj, stroke_width):
+    img = Image.new('RGBA', (1200, 628), (40, 80, 120, 255))
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        render(img, font_obj, stroke_width)
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+def main():
+    font_obj = load_font(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"\n=== STROKE RENDERING BENCHMARK ({ITERATIONS} iterations, {FONT_SIZE}px) ===\n")
+    print(f"{'width':>5}  {'draws':>5}  {'loop ms':>9}  {'mask ms':>9}  {'speedup':>8}")
+    for stroke_width in range(0, 9):
+        loop_ms = time_render(render_offset_loop, font_obj, stroke_width)
+        mask_ms = time_render(render_masks, font_obj, stroke_width)
+        draws = (2 * stroke_width + 1) ** 2 + 1
+        print(f"{stroke_width:>5}  {draws:>5}  {loop_ms:>9.2f}  {mask_ms:>9.2f}  {loop_ms / mask_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,20 @@ Note: DALL-E is deprecated - use Google AI Studio (Gemini 3 Pro Image Preview) i
 
 import os
 import asyncio
-from typing import Optional, List
+from typing import AsyncIterator, Dict, Optional, List
 import httpx
 
+
+# Concurrent image requests allowed per provider, shared by all adapters
+IMAGE_PROVIDER_CONCURRENCY = int(os.getenv('IMAGE_PROVIDER_CONCURRENCY', '4'))
+
+# Attempts per carousel slide, with exponential backoff between them
+CAROUSEL_SLIDE_ATTEMPTS = 3
+CAROUSEL_RETRY_BASE_DELAY = 2.0
+
+_provider_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
 class ImageAdapter:
     """Adapter for image generation using Google AI Studio (Gemini 3 Pro Image Preview)"""
     
@@ -372,33 +383,85 @@ Square format (1080x1080 pixels), optimized for mobile viewing."""
             traceback.print_exc()
             raise
     
+    def _provider_semaphore(self) -> asyncio.Semaphore:
+        """Shared cap on in-flight requests to this adapter's provider"""
+        semaphore = _provider_semaphores.get(self.provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(IMAGE_PROVIDER_CONCURRENCY)
+            _provider_semaphores[self.provider] = semaphore
+        return semaphore
+    
+    async def generate_carousel_slide(self, slide: dict, index: int, total: int,
+                                      style: str = "professional", size: str = "1024x1024") -> dict:
+        """
+        Generate the image for one carousel slide, retrying on its own if it fails
+        
+        Args:
+            slide: Slide with 'title' and 'content'
+            index: Zero-based slide position
+            total: Number of slides in the carousel
+        
+        Returns:
+            Dict with 'slide_number' and the generate_image result
+        """
+        from linkedpilot.utils.cinematic_image_prompts import generate_carousel_slide_prompt
+        enhanced_prompt = generate_carousel_slide_prompt(
+            slide.get('title', ''),
+            slide.get('content', ''),
+            index + 1,
+            total
+        )
+        
+        # A missing API key won't fix itself, so don't retry it
+        attempts = 1 if self.provider != "mock" and self.mock_mode else CAROUSEL_SLIDE_ATTEMPTS
+        for attempt in range(attempts):
+            try:
+                async with self._provider_semaphore():
+                    image = await self.generate_image(enhanced_prompt, style, size)
+                return {"slide_number": index + 1, **image}
+            except Exception as e:
+                if attempt + 1 >= attempts:
+                    raise
+                delay = CAROUSEL_RETRY_BASE_DELAY * (2 ** attempt)
+                print(f"[IMAGE] Slide {index + 1} failed ({e}), retrying in {delay:.0f}s...")
+                await asyncio.sleep(delay)
+    
+    async def iter_carousel_images(self, slides: List[dict], style: str = "professional",
+                                   size: str = "1024x1024") -> AsyncIterator[dict]:
+        """
+        Generate all slide images concurrently, yielding each as it finishes
+        
+        Slides that still fail after their retries are yielded as
+        {'slide_number', 'error'} instead of failing the whole carousel.
+        """
+        async def run(index: int, slide: dict) -> dict:
+            try:
+                return await self.generate_carousel_slide(slide, index, len(slides), style, size)
+            except Exception as e:
+                print(f"[ERROR] Slide {index + 1} image failed: {e}")
+                return {"slide_number": index + 1, "error": str(e)}
+        
+        tasks = [asyncio.create_task(run(i, slide)) for i, slide in enumerate(slides)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Client went away mid-stream - don't keep generating for nobody
+            for task in tasks:
+                task.cancel()
+    
     async def generate_carousel_images(self, slides: List[dict], style: str = "professional") -> List[dict]:
-        """Generate multiple images for carousel"""
-        images = []
-        for i, slide in enumerate(slides):
-            # Generate cinematic carousel prompt
-            from linkedpilot.utils.cinematic_image_prompts import generate_carousel_slide_prompt
-            enhanced_prompt = generate_carousel_slide_prompt(
-                slide.get('title', ''), 
-                slide.get('content', ''), 
-                i + 1, 
-                len(slides)
-            )
-            image = await self.generate_image(enhanced_prompt, style, "1024x1024")
-            images.append({
-                "slide_number": i + 1,
-                **image
-            })
-        return images
+        """Generate multiple images for carousel (concurrently, returned in slide order)"""
+        images = [image async for image in self.iter_carousel_images(slides, style, "1024x1024")]
+        return sorted(images, key=lambda image: image["slide_number"])
     
     def _generate_mock_image(self, prompt: str, style: str, size: str) -> dict:
         """Generate a professional mock image based on the model type"""
-        import base64
-        import io
         import random
         
         try:
             from PIL import Image, ImageDraw, ImageFont
+            from ..utils.image_encoding import encode_image
         except ImportError:
             # Fallback SVG if PIL not available
             return self._generate_svg_fallback(prompt, style, size)
@@ -468,17 +531,16 @@ Square format (1080x1080 pixels), optimized for mobile viewing."""
             # Composite overlay
             img = Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
         
-        # Convert to base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG', quality=95)
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
+        # Convert to base64 (mock images get published like real ones, so no WebP)
+        encoded = encode_image(img, allow_webp=False)
+        img_base64 = encoded.to_base64()
         
         print(f"[SUCCESS] Mock image generated successfully!")
         print(f"   Model: {model_display}")
-        print(f"   Size: {len(img_base64)} bytes")
+        print(f"   Size: {len(img_base64)} bytes ({encoded.format})")
         
         return {
-            "url": f"data:image/png;base64,{img_base64}",
+            "url": encoded.to_data_url(),
             "image_base64": img_base64,
             "prompt": prompt,
             "revised_prompt": f"{model_display}: {prompt}",
@@ -10,6 +10,8 @@ import os
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
+from linkedpilot.utils.pagination import with_sort_keys
+
 security = HTTPBearer()
 
 # Use separate JWT secret for admin tokens for added security
@@ -108,7 +110,7 @@ async def log_admin_activity(
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.admin_activity_logs.insert_one(log_entry)
+    await db.admin_activity_logs.insert_one(with_sort_keys("admin_activity_logs", log_entry))
 
 
 
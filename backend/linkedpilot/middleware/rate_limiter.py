@@ -7,6 +7,8 @@ from datetime import datetime, timezone
 from typing import Literal
 import uuid
 
+from linkedpilot.utils.metrics import record_usage
+
 
 async def check_usage_limits(
     user_id: str,
@@ -104,6 +106,7 @@ async def track_usage(
     }
     
     await db.usage_tracking.insert_one(usage_entry)
+    await record_usage(db, resource_type, tokens_used, usage_entry["cost"])
     
     # Update user counters
     if resource_type in ['ai_generation', 'image_generation']:
@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from typing import Optional, Literal
+
+class CalendarItem(BaseModel):
+    """One entry of the calendar feed: a scheduled post or an approved AI post, normalized"""
+    id: str
+    source: Literal["scheduled", "ai"]
+    scheduled_for: Optional[str] = None  # ISO 8601 UTC ("...Z")
+    status: Optional[str] = None
+    is_posted: bool = False
+    title: Optional[str] = None
+    content: str = ""
+    thumbnail_url: Optional[str] = None
+    image_url: Optional[str] = None  # Linked images only; embedded ones come from the detail endpoints
+    mode: Optional[str] = None
+    draft_id: Optional[str] = None
+    campaign_id: Optional[str] = None
+    profile_type: Optional[str] = None
+    linkedin_author_id: Optional[str] = None
+    author_name: Optional[str] = None
+    platform_url: Optional[str] = None
+    posted_at: Optional[str] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": "post_123",
+                "source": "scheduled",
+                "scheduled_for": "2025-10-27T09:00:00.000Z",
+                "status": "scheduled",
+                "content": "Exciting news! We're launching...",
+                "thumbnail_url": "/api/drafts/draft_123/thumbnail?v=2025-10-20T12%3A00%3A00"
+            }
+        }
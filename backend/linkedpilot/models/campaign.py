@@ -163,6 +163,23 @@ class AIGeneratedPost(BaseModel):
             }
         }
 
+class AIGeneratedPostSummary(BaseModel):
+    """List-view projection of an AI-generated post (full document: GET /ai-content/posts/{id}/detail)"""
+    id: str
+    campaign_id: Optional[str] = None
+    campaign_name: Optional[str] = None
+    org_id: Optional[str] = None
+    status: Optional[str] = None
+    content_pillar: Optional[str] = None
+    content_type: Optional[str] = None
+    profile_type: Optional[str] = None
+    author_name: Optional[str] = None
+    excerpt: str = ""  # Start of the post text
+    thumbnail_url: Optional[str] = None
+    scheduled_for: Optional[datetime] = None
+    posted_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
 # Campaign Analytics Model
 class CampaignAnalytics(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
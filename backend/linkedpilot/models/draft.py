@@ -40,4 +40,19 @@ class Draft(BaseModel):
                     "hashtags": ["#innovation", "#tech"]
                 }
             }
-        }
\ No newline at end of file
+        }
+
+
+class DraftSummary(BaseModel):
+    """List-view projection of a draft (full document: GET /drafts/{id})"""
+    id: str
+    org_id: str
+    campaign_id: Optional[str] = None
+    mode: Optional[str] = None
+    status: Optional[str] = None
+    title: Optional[str] = None
+    excerpt: str = ""  # Start of the post body
+    thumbnail_url: Optional[str] = None
+    asset_count: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
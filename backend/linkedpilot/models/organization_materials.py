@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 import uuid
@@ -31,6 +31,10 @@ class OrganizationMaterial(BaseModel):
     # Metadata
     file_size: Optional[int] = None
     mime_type: Optional[str] = None
+    content_hash: Optional[str] = None  # For uploaded files; identical uploads per org are deduplicated
+    
+    # Last extraction: {"source_hash", "extractor_version", "content_digest", "extracted_at"}
+    extraction: Optional[Dict[str, Any]] = None
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -75,6 +79,7 @@ class BrandAnalysis(BaseModel):
     # Analysis Metadata
     confidence_score: float = 0.0  # 0-1 confidence in analysis
     materials_analyzed: List[str] = []  # IDs of materials used
+    inputs_hash: Optional[str] = None  # Digest of the extracted content and brand DNA the analysis was built from
     analyzed_at: datetime = Field(default_factory=datetime.utcnow)
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -26,4 +26,19 @@ class Post(BaseModel):
                 "impressions": 1500,
                 "reactions": 45
             }
-        }
\ No newline at end of file
+        }
+
+
+class PostSummary(BaseModel):
+    """List-view projection of a published post (full document: GET /posts/{id})"""
+    id: str
+    org_id: Optional[str] = None
+    posted_at: Optional[datetime] = None
+    platform_url: Optional[str] = None
+    excerpt: str = ""  # Imported posts carry their text
+    source: Optional[str] = None
+    impressions: Optional[int] = 0
+    reactions: Optional[int] = 0
+    comments: Optional[int] = 0
+    shares: Optional[int] = 0
+    clicks: Optional[int] = 0
@@ -36,4 +36,20 @@ class ScheduledPost(BaseModel):
                 "publish_time": "2025-10-27T09:00:00Z",
                 "timezone": "America/New_York"
             }
-        }
\ No newline at end of file
+        }
+
+
+class ScheduledPostSummary(BaseModel):
+    """List-view projection of a scheduled post and its draft (full document: GET /scheduled-posts/{id})"""
+    id: str
+    draft_id: Optional[str] = None
+    org_id: Optional[str] = None
+    publish_time: Optional[datetime] = None
+    timezone: Optional[str] = "UTC"
+    status: Optional[str] = None  # PostStatus value, or "deleted"
+    mode: Optional[str] = None
+    title: Optional[str] = None
+    excerpt: str = ""
+    thumbnail_url: Optional[str] = None
+    platform_url: Optional[str] = None
+    error_message: Optional[str] = None
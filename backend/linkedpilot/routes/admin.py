@@ -6,6 +6,7 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Literal, Dict
 from datetime import datetime, timezone, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 from linkedpilot.middleware.admin_auth import (
     get_current_admin_user,
@@ -13,6 +14,17 @@ from linkedpilot.middleware.admin_auth import (
     log_admin_activity,
     create_admin_token
 )
+from linkedpilot.utils.metrics import (
+    PRO_MONTHLY_PRICE,
+    count_gauges,
+    day_key,
+    gauges_on,
+    load_days,
+    schedule_subscription_refresh,
+    sum_days,
+    usage_by_type as rollup_usage_by_type
+)
+from linkedpilot.utils.pagination import paginate
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -89,9 +101,13 @@ async def get_all_users(
     tier: Optional[Literal['free', 'pro']] = None,
     status: Optional[Literal['active', 'suspended', 'deleted']] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
     admin_user: dict = Depends(get_current_admin_user)
 ):
-    """Get all users with pagination and filters"""
+    """Get all users with pagination and filters
+    
+    Pass the previous response's next_cursor to page forward in constant time;
+    `page` alone falls back to an offset."""
     db = get_db()
     
     # Build query
@@ -110,11 +126,13 @@ async def get_all_users(
     total = await db.users.count_documents(query)
     
     # Get paginated users
-    skip = (page - 1) * limit
-    users = await db.users.find(
-        query,
-        {"_id": 0, "hashed_password": 0}
-    ).skip(skip).limit(limit).sort("created_at", -1).to_list(length=limit)
+    result = await paginate(
+        db.users, query, "created_at",
+        limit=limit, cursor=cursor,
+        projection={"_id": 0, "hashed_password": 0},
+        skip=0 if cursor else (page - 1) * limit
+    )
+    users = result.items
     
     # Enrich users with Stripe cancellation status
     import stripe
@@ -138,7 +156,8 @@ async def get_all_users(
         "total": total,
         "page": page,
         "limit": limit,
-        "pages": (total + limit - 1) // limit
+        "pages": (total + limit - 1) // limit,
+        "next_cursor": result.next_cursor
     }
 
 
@@ -228,6 +247,8 @@ async def update_user(
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    if 'subscription_tier' in update_dict:
+        schedule_subscription_refresh(db)
     
     # Log activity
     client_ip = request.client.host if request.client else None
@@ -307,34 +328,24 @@ async def delete_user(
 
 @router.get("/billing/overview")
 async def get_billing_overview(admin_user: dict = Depends(get_current_admin_user)):
-    """Get billing overview metrics"""
+    """Get billing overview metrics (from the metrics_daily rollups)"""
     db = get_db()
     
-    # Count active subscriptions
-    active_pro_users = await db.users.count_documents({
-        "subscription_tier": "pro",
-        "subscription_status": "active"
-    })
+    now = datetime.now(timezone.utc)
+    month_start = day_key(now.replace(day=1))
+    days = await load_days(db, month_start)
+    gauges = gauges_on(days, day_key(now)) or await count_gauges(db)
     
     # Calculate MRR (Monthly Recurring Revenue)
-    # Assuming $30/month for Pro tier
-    mrr = active_pro_users * 30
-    
-    # Get total users
-    total_users = await db.users.count_documents({})
-    free_users = await db.users.count_documents({"subscription_tier": "free"})
+    active_pro_users = gauges["pro_active"]
+    mrr = active_pro_users * PRO_MONTHLY_PRICE
     
-    # Get new signups this month
-    first_day_of_month = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    new_signups_this_month = await db.users.count_documents({
-        "created_at": {"$gte": first_day_of_month.isoformat()}
-    })
+    total_users = gauges["users_total"]
+    free_users = gauges["users_free"]
+    new_signups_this_month = sum_days(days, "signups", month_start)
     
-    # Calculate churn (users who cancelled this month)
-    churned_this_month = await db.users.count_documents({
-        "subscription_status": "cancelled",
-        "cancelled_at": {"$gte": first_day_of_month.isoformat()}
-    })
+    # Churn (users whose subscription ended this month)
+    churned_this_month = sum_days(days, "churned", month_start)
     
     churn_rate = (churned_this_month / active_pro_users * 100) if active_pro_users > 0 else 0
     
@@ -381,7 +392,12 @@ async def get_usage_analytics(
     end_date: Optional[str] = None,
     admin_user: dict = Depends(get_current_admin_user)
 ):
-    """Get usage analytics"""
+    """Get usage analytics
+    
+    Totals per resource type come from the metrics_daily rollups (whole days:
+    start_date/end_date are read as the days they fall on); the top users are
+    counted live, concurrently with the rollup read.
+    """
     db = get_db()
     
     # Build date filter
@@ -392,38 +408,33 @@ async def get_usage_analytics(
         date_filter['$lte'] = end_date
     
     match_stage = {"timestamp": date_filter} if date_filter else {}
+    start_day = start_date[:10] if start_date else None
+    end_day = end_date[:10] if end_date else None
+    
+    days, top_users = await asyncio.gather(
+        load_days(db, start_day or ""),
+        db.usage_tracking.aggregate([
+            {"$match": match_stage},
+            {"$group": {
+                "_id": "$user_id",
+                "total_tokens": {"$sum": "$tokens_used"},
+                "total_cost": {"$sum": "$cost"}
+            }},
+            {"$sort": {"total_tokens": -1}},
+            {"$limit": 10}
+        ]).to_list(length=10)
+    )
+    usage_by_type = rollup_usage_by_type(days, start_day, end_day)
     
-    # Aggregate usage by resource type
-    usage_by_type = await db.usage_tracking.aggregate([
-        {"$match": match_stage},
-        {"$group": {
-            "_id": "$resource_type",
-            "total_tokens": {"$sum": "$tokens_used"},
-            "total_cost": {"$sum": "$cost"},
-            "count": {"$sum": 1}
-        }}
-    ]).to_list(length=100)
-    
-    # Get top users by usage
-    top_users = await db.usage_tracking.aggregate([
-        {"$match": match_stage},
-        {"$group": {
-            "_id": "$user_id",
-            "total_tokens": {"$sum": "$tokens_used"},
-            "total_cost": {"$sum": "$cost"}
-        }},
-        {"$sort": {"total_tokens": -1}},
-        {"$limit": 10}
-    ]).to_list(length=10)
-    
-    # Enrich with user details
+    # Enrich with user details (one query for all of them)
+    users = await db.users.find(
+        {"id": {"$in": [user_data['_id'] for user_data in top_users]}},
+        {"_id": 0, "id": 1, "email": 1, "full_name": 1}
+    ).to_list(length=len(top_users))
+    users_by_id = {user.pop('id'): user for user in users}
     for user_data in top_users:
-        user = await db.users.find_one(
-            {"id": user_data['_id']},
-            {"_id": 0, "email": 1, "full_name": 1}
-        )
-        if user:
-            user_data['user'] = user
+        if user_data['_id'] in users_by_id:
+            user_data['user'] = users_by_id[user_data['_id']]
     
     return {
         "usage_by_type": usage_by_type,
@@ -468,9 +479,10 @@ async def get_activity_logs(
     limit: int = Query(100, ge=1, le=500),
     admin_id: Optional[str] = None,
     action: Optional[str] = None,
+    cursor: Optional[str] = None,
     admin_user: dict = Depends(get_current_admin_user)
 ):
-    """Get admin activity logs"""
+    """Get admin activity logs, newest first (next_cursor pages forward, as for /users)"""
     db = get_db()
     
     # Build query
@@ -484,11 +496,12 @@ async def get_activity_logs(
     total = await db.admin_activity_logs.count_documents(query)
     
     # Get paginated logs
-    skip = (page - 1) * limit
-    logs = await db.admin_activity_logs.find(
-        query,
-        {"_id": 0}
-    ).skip(skip).limit(limit).sort("timestamp", -1).to_list(length=limit)
+    result = await paginate(
+        db.admin_activity_logs, query, "timestamp",
+        limit=limit, cursor=cursor, projection={"_id": 0},
+        skip=0 if cursor else (page - 1) * limit
+    )
+    logs = result.items
     
     # Enrich with admin details
     for log in logs:
@@ -503,7 +516,8 @@ async def get_activity_logs(
         "logs": logs,
         "total": total,
         "page": page,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": result.next_cursor
     }
 
 
@@ -583,80 +597,63 @@ async def update_system_settings(
 
 @router.get("/dashboard/stats")
 async def get_dashboard_stats(admin_user: dict = Depends(get_current_admin_user)):
-    """Get dashboard overview statistics"""
+    """Get dashboard overview statistics
+    
+    Read from the metrics_daily rollups in one query: day counters for the
+    flows (signups, tokens, posts, cancellations) and end-of-day gauges for
+    the user and subscription counts. Windows are whole UTC days.
+    """
     db = get_db()
     
     now = datetime.now(timezone.utc)
+    today = day_key(now)
     first_day_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    thirty_days_ago = now - timedelta(days=30)
-    last_month_start = (first_day_of_month - timedelta(days=1)).replace(day=1)
+    month_start = day_key(first_day_of_month)
+    last_month_start = day_key((first_day_of_month - timedelta(days=1)).replace(day=1))
+    thirty_days_ago = day_key(now - timedelta(days=30))
+    sixty_days_ago = day_key(now - timedelta(days=60))
+    
+    days = await load_days(db, min(sixty_days_ago, last_month_start))
+    gauges = gauges_on(days, today) or await count_gauges(db)
+    gauges_last_month = gauges_on(
+        days, day_key(first_day_of_month - timedelta(days=1)), ("users_total", "pro_active")
+    )
     
     # Total users
-    total_users = await db.users.count_documents({})
-    total_users_last_month = await db.users.count_documents({
-        "created_at": {"$lt": first_day_of_month.isoformat()}
-    })
+    total_users = gauges["users_total"]
+    total_users_last_month = (
+        gauges_last_month["users_total"] if gauges_last_month
+        else total_users - sum_days(days, "signups", month_start)
+    )
     
     # Active subscriptions (including those marked for cancellation)
-    active_pro = await db.users.count_documents({
-        "subscription_tier": "pro",
-        "subscription_status": "active"
-    })
-    active_pro_last_month = await db.users.count_documents({
-        "subscription_tier": "pro",
-        "subscription_status": "active",
-        "subscription_start_date": {"$lt": first_day_of_month.isoformat()}
-    })
+    active_pro = gauges["pro_active"]
+    active_pro_last_month = gauges_last_month["pro_active"] if gauges_last_month else active_pro
     
     # Cancelling subscriptions (Pro + Active + cancel_at_period_end)
-    cancelling_subs = await db.users.count_documents({
-        "subscription_tier": "pro",
-        "subscription_status": "active",
-        "cancel_at_period_end": True
-    })
+    cancelling_subs = gauges["pro_cancelling"]
     
     # Recent cancellations (last 30 days)
-    recent_cancellations = await db.users.count_documents({
-        "cancelled_at": {"$gte": thirty_days_ago.isoformat()}
-    })
+    recent_cancellations = sum_days(days, "cancellations", thirty_days_ago)
     
     # MRR (current active subscriptions)
-    mrr = active_pro * 30
-    mrr_last_month = active_pro_last_month * 30
+    mrr = active_pro * PRO_MONTHLY_PRICE
+    mrr_last_month = active_pro_last_month * PRO_MONTHLY_PRICE
     
     # At Risk MRR (subscriptions that will cancel)
-    at_risk_mrr = cancelling_subs * 30
+    at_risk_mrr = cancelling_subs * PRO_MONTHLY_PRICE
     
     # AI tokens used this month
-    tokens_pipeline = [
-        {"$match": {"timestamp": {"$gte": first_day_of_month}}},
-        {"$group": {"_id": None, "total": {"$sum": "$tokens_used"}}}
-    ]
-    tokens_result = await db.usage_tracking.aggregate(tokens_pipeline).to_list(length=1)
-    total_tokens = tokens_result[0]['total'] if tokens_result else 0
-    
-    tokens_pipeline_last = [
-        {"$match": {"timestamp": {"$gte": last_month_start, "$lt": first_day_of_month}}},
-        {"$group": {"_id": None, "total": {"$sum": "$tokens_used"}}}
-    ]
-    tokens_result_last = await db.usage_tracking.aggregate(tokens_pipeline_last).to_list(length=1)
-    total_tokens_last = tokens_result_last[0]['total'] if tokens_result_last else 0
+    total_tokens = sum_days(days, "tokens_used", month_start)
+    total_tokens_last = sum_days(days, "tokens_used", last_month_start, month_start)
     
     # Posts created this month
-    posts_this_month = await db.ai_generated_posts.count_documents({
-        "created_at": {"$gte": first_day_of_month.isoformat()}
-    })
-    posts_last_month = await db.ai_generated_posts.count_documents({
-        "created_at": {"$gte": last_month_start.isoformat(), "$lt": first_day_of_month.isoformat()}
-    })
+    posts_this_month = sum_days(days, "posts_created", month_start)
+    posts_last_month = sum_days(days, "posts_created", last_month_start, month_start)
     
     # User growth (last 30 days)
-    new_users_30d = await db.users.count_documents({
-        "created_at": {"$gte": thirty_days_ago.isoformat()}
-    })
-    new_users_prev_30d = await db.users.count_documents({
-        "created_at": {"$gte": (thirty_days_ago - timedelta(days=30)).isoformat(), "$lt": thirty_days_ago.isoformat()}
-    })
+    new_users_30d = sum_days(days, "signups", thirty_days_ago)
+    new_users_prev_30d = sum_days(days, "signups", sixty_days_ago, thirty_days_ago)
     
     # Calculate percentage changes
     def calc_change(current, previous):
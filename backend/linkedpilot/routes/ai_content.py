@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import Literal, Optional
 from datetime import datetime
 import os
 import random
@@ -7,6 +7,10 @@ import random
 from ..adapters.ai_content_generator import AIContentGenerator
 from ..adapters.llm_adapter import LLMAdapter
 from ..models.campaign import AIGeneratedPost, AIGeneratedPostStatus
+from ..utils.image_encoding import data_url_for_base64
+from ..utils.metrics import record_post_created
+from ..utils.pagination import MAX_PAGE_SIZE, page_response, paginate, with_sort_keys
+from ..utils.summaries import AI_POST_SUMMARY_PROJECTION, ai_post_summary, data_url_thumbnail
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/ai-content", tags=["ai-content"])
@@ -365,7 +369,7 @@ National Geographic quality. ABSOLUTELY NO TEXT OR WORDS. Pure imagery only.""".
                             # Fallback to base64 if URL doesn't exist or is empty
                             elif image_result and image_result.get('image_base64'):
                                 # Handle base64 images by creating a data URL
-                                image_url = f"data:image/png;base64,{image_result['image_base64']}"
+                                image_url = data_url_for_base64(image_result['image_base64'])
                                 print(f"   [IMAGE] ✓ Generated successfully with {default_img_model} (base64)!")
                                 print(f"   [IMAGE] Base64 image length: {len(image_result['image_base64'])}")
                             else:
@@ -385,7 +389,7 @@ National Geographic quality. ABSOLUTELY NO TEXT OR WORDS. Pure imagery only.""".
                                     if image_result and image_result.get('url'):
                                         image_url = image_result['url']
                                     elif image_result and image_result.get('image_base64'):
-                                        image_url = f"data:image/png;base64,{image_result['image_base64']}"
+                                        image_url = data_url_for_base64(image_result['image_base64'])
                         else:
                             print(f"   [IMAGE] No API key available, skipping AI image generation")
                     except Exception as ai_error:
@@ -442,7 +446,8 @@ National Geographic quality. ABSOLUTELY NO TEXT OR WORDS. Pure imagery only.""".
         post_dict = ai_post.model_dump()
         post_dict['created_at'] = datetime.utcnow()
         post_dict['updated_at'] = datetime.utcnow()
-        await db.ai_generated_posts.insert_one(post_dict)
+        await db.ai_generated_posts.insert_one(with_sort_keys("ai_generated_posts", post_dict))
+        await record_post_created(db)
         
         # If auto_post is enabled, automatically schedule the post
         if auto_post:
@@ -598,7 +603,7 @@ National Geographic quality. ABSOLUTELY NO TEXT OR WORDS. Pure imagery only.""".
                 draft_dict = draft.model_dump()
                 draft_dict['created_at'] = datetime.utcnow()
                 draft_dict['updated_at'] = datetime.utcnow()
-                await db.drafts.insert_one(draft_dict)
+                await db.drafts.insert_one(with_sort_keys("drafts", draft_dict))
                 
                 # Create scheduled post
                 scheduled_post = ScheduledPost(
@@ -616,12 +621,12 @@ National Geographic quality. ABSOLUTELY NO TEXT OR WORDS. Pure imagery only.""".
                 scheduled_dict = scheduled_post.model_dump()
                 scheduled_dict['created_at'] = datetime.utcnow()
                 scheduled_dict['updated_at'] = datetime.utcnow()
-                await db.scheduled_posts.insert_one(scheduled_dict)
+                await db.scheduled_posts.insert_one(with_sort_keys("scheduled_posts", scheduled_dict))
                 
                 # Update AI post with scheduled time
                 await db.ai_generated_posts.update_one(
                     {"id": ai_post.id},
-                    {"$set": {"scheduled_for": next_slot_time.isoformat()}}
+                    {"$set": with_sort_keys("ai_generated_posts", {"scheduled_for": next_slot_time.isoformat()})}
                 )
                 
                 print(f"🚀 Auto-post enabled: Post automatically scheduled for {next_slot_time.isoformat()}")
@@ -674,17 +679,68 @@ async def validate_content(request: ContentValidationRequest):
     validation = await generator.validate_post_quality(request.content)
     return validation
 
+async def _attach_campaign_names(db, posts: list) -> None:
+    """Set campaign_name on each post dict, with one campaigns query for the batch"""
+    campaign_ids = list({post.get("campaign_id") for post in posts if post.get("campaign_id")})
+    if not campaign_ids:
+        return
+    campaigns = await db.campaigns.find(
+        {"id": {"$in": campaign_ids}},
+        {"_id": 0, "id": 1, "name": 1}
+    ).to_list(length=None)
+    names = {campaign["id"]: campaign.get("name") for campaign in campaigns}
+    for post in posts:
+        if post.get("campaign_id") in names:
+            post['campaign_name'] = names[post["campaign_id"]]
+
 @router.get("/posts/{campaign_id}")
-async def list_generated_posts(campaign_id: str, status: Optional[str] = None):
-    """List AI-generated posts for a campaign"""
+async def list_generated_posts(
+    campaign_id: str,
+    response: Response,
+    status: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full"
+):
+    """List AI-generated posts for a campaign, newest first
+    
+    Pass `limit` and/or `cursor` for {"items", "next_cursor"} pages; without
+    them the latest 100 posts are returned as a list. view=summary returns
+    AIGeneratedPostSummary rows (excerpt and thumbnail URL instead of the
+    post text and embedded image)."""
     db = get_db()
     
     query = {"campaign_id": campaign_id}
     if status:
         query["status"] = status
     
-    posts = await db.ai_generated_posts.find(query, {"_id": 0}).sort("created_at", -1).to_list(length=100)
-    return posts
+    page = await paginate(
+        db.ai_generated_posts, query, "created_at",
+        limit=limit or 100, cursor=cursor,
+        projection=AI_POST_SUMMARY_PROJECTION if view == "summary" else {"_id": 0}
+    )
+    if view == "summary":
+        page.items = [ai_post_summary(post) for post in page.items]
+    return page_response(page, response, paginated=limit is not None or cursor is not None)
+
+@router.get("/posts/{post_id}/detail")
+async def get_generated_post(post_id: str):
+    """Full AI-generated post (summary rows leave out the text and image)"""
+    db = get_db()
+    post = await db.ai_generated_posts.find_one({"id": post_id}, {"_id": 0})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    await _attach_campaign_names(db, [post])
+    return post
+
+@router.get("/posts/{post_id}/thumbnail")
+async def get_generated_post_thumbnail(post_id: str, request: Request, size: str = "thumb"):
+    """WebP thumbnail of an AI-generated post's image (what summary rows link to)"""
+    db = get_db()
+    post = await db.ai_generated_posts.find_one({"id": post_id}, {"_id": 0, "image_url": 1})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return await data_url_thumbnail(post.get("image_url"), size, request)
 
 @router.patch("/posts/{post_id}/status")
 async def update_post_status(post_id: str, status: AIGeneratedPostStatus):
@@ -716,29 +772,34 @@ async def delete_generated_post(post_id: str):
     return {"success": True}
 
 @router.get("/review-queue")
-async def get_review_queue(org_id: str):
-    """Get all AI-generated posts pending review for an organization"""
+async def get_review_queue(org_id: str, view: Literal["full", "summary"] = "full"):
+    """Get all AI-generated posts pending review for an organization
+    
+    view=summary returns AIGeneratedPostSummary rows."""
     db = get_db()
     
     posts = await db.ai_generated_posts.find(
         {"org_id": org_id, "status": AIGeneratedPostStatus.PENDING_REVIEW},
-        {"_id": 0}
+        AI_POST_SUMMARY_PROJECTION if view == "summary" else {"_id": 0}
     ).sort("created_at", -1).to_list(length=100)
     
     # Enrich with campaign names
-    for post in posts:
-        campaign = await db.campaigns.find_one({"id": post.get("campaign_id")}, {"_id": 0, "name": 1})
-        if campaign:
-            post['campaign_name'] = campaign.get('name')
+    await _attach_campaign_names(db, posts)
     
+    if view == "summary":
+        return [ai_post_summary(post) for post in posts]
     return posts
 
 @router.get("/approved-posts")
 async def get_approved_posts(
     org_id: str, 
+    response: Response,
     include_posted: bool = True,
     range_start: Optional[str] = None,
-    range_end: Optional[str] = None
+    range_end: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full"
 ):
     """Get all approved/posted AI-generated posts
     
@@ -747,6 +808,10 @@ async def get_approved_posts(
         include_posted: If True, also return POSTED posts (default: True for calendar view)
         range_start: Optional ISO date string to filter posts scheduled after this date
         range_end: Optional ISO date string to filter posts scheduled before this date
+        limit: Page size; with `limit` or `cursor` the response is {"items", "next_cursor"}
+            (otherwise a list of up to 200 posts)
+        cursor: next_cursor of the previous page
+        view: "summary" for AIGeneratedPostSummary rows (excerpt and thumbnail URL)
     """
     db = get_db()
     
@@ -776,18 +841,18 @@ async def get_approved_posts(
         # Combine date conditions with OR
         query["$or"] = date_conditions
     
-    posts = await db.ai_generated_posts.find(
-        query,
-        {"_id": 0}
-    ).sort("scheduled_for", 1).to_list(length=200)
+    page = await paginate(
+        db.ai_generated_posts, query, "scheduled_for", direction=1,
+        limit=limit or 200, cursor=cursor,
+        projection=AI_POST_SUMMARY_PROJECTION if view == "summary" else {"_id": 0}
+    )
     
     # Enrich with campaign names
-    for post in posts:
-        campaign = await db.campaigns.find_one({"id": post.get("campaign_id")}, {"_id": 0, "name": 1})
-        if campaign:
-            post['campaign_name'] = campaign.get('name')
+    await _attach_campaign_names(db, page.items)
     
-    return posts
+    if view == "summary":
+        page.items = [ai_post_summary(post) for post in page.items]
+    return page_response(page, response, paginated=limit is not None or cursor is not None)
 
 class PostUpdateRequest(BaseModel):
     content: str
@@ -811,10 +876,10 @@ async def update_post_schedule(post_id: str, request: PostScheduleUpdateRequest)
     await db.ai_generated_posts.update_one(
         {"id": post_id},
         {
-            "$set": {
+            "$set": with_sort_keys("ai_generated_posts", {
                 "scheduled_for": scheduled_time.replace(tzinfo=None),
                 "updated_at": datetime.utcnow()
-            }
+            })
         }
     )
     
@@ -10,6 +10,8 @@ import os
 import uuid
 from cryptography.fernet import Fernet
 
+from ..utils.metrics import record_usage, schedule_subscription_refresh
+
 router = APIRouter(prefix="/billing", tags=["billing"])
 
 # Encryption - load key from environment when needed (not at module level)
@@ -414,6 +416,7 @@ async def complete_subscription(request: Request, data: CompleteSubscriptionRequ
             "currency": "usd",
             "created_at": datetime.now(timezone.utc).isoformat()
         })
+        schedule_subscription_refresh(db)
         
         return {
             "success": True,
@@ -460,6 +463,7 @@ async def cancel_subscription(request: Request, immediate: bool = False):
                     "post_limit_per_month": 50
                 }}
             )
+            schedule_subscription_refresh(db)
             
             return {"message": "Subscription cancelled immediately", "immediate": True}
         else:
@@ -488,6 +492,7 @@ async def cancel_subscription(request: Request, immediate: bool = False):
                 }},
                 upsert=False
             )
+            schedule_subscription_refresh(db)
             
             return {"message": "Subscription will be cancelled at the end of the billing period"}
         
@@ -538,6 +543,7 @@ async def reactivate_subscription(request: Request):
             }},
             upsert=False
         )
+        schedule_subscription_refresh(db)
         
         return {"message": "Subscription reactivated successfully"}
         
@@ -604,6 +610,7 @@ async def get_subscription_status(request: Request):
                             "subscription_status": "inactive"
                         }}
                     )
+                    schedule_subscription_refresh(db)
     
     return {
         "user_subscription": user_data,
@@ -696,6 +703,9 @@ async def stripe_webhook(request: Request):
     elif event['type'] == 'invoice.payment_succeeded':
         await handle_payment_succeeded(event['data']['object'], db)
     
+    # Every handled event may change a subscription
+    schedule_subscription_refresh(db)
+    
     return {"status": "success"}
 
 
@@ -848,6 +858,7 @@ async def handle_payment_succeeded(invoice, db):
         "invoice_id": invoice['id'],
         "timestamp": datetime.now(timezone.utc).isoformat()
     })
+    await record_usage(db, "payment")
     
     print(f"[OK] [WEBHOOK] User {user['email']} upgraded successfully")
 
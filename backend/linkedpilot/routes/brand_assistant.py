@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import re
 import uuid
 import sys
@@ -20,8 +21,8 @@ if sys.platform == 'win32':
     os.environ['PYTHONIOENCODING'] = 'utf-8'
 
 import aiohttp
-from bs4 import BeautifulSoup
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field, field_validator
 
 from ..models.campaign import Campaign
@@ -29,6 +30,18 @@ from ..models.organization_materials import BrandAnalysis
 from ..routes.settings import decrypt_value
 from ..services.campaign_generator import CampaignGenerator
 from ..utils.api_key_helper import get_api_key_and_provider
+from ..utils.crawler import SiteCrawler
+from ..utils.html_extract import (
+    BACKGROUND_IMAGE_PATTERN,
+    COLOR_PATTERN,
+    CSS_VAR_COLOR_PATTERN,
+    FONT_PATTERN,
+    extract_page,
+    extract_page_text,
+)
+from ..utils.http_cache import ASSET_TTL, PAGE_TTL, StreamedResponse, cached_get, cached_stream
+from ..utils.pagination import MAX_PAGE_SIZE, page_response, paginate, with_sort_keys
+from ..utils.singleflight import coalesce, request_key
 
 router = APIRouter(prefix="/brand", tags=["brand"])
 
@@ -226,13 +239,26 @@ def _fallback_campaign_previews(
     return CampaignPreviewResponse(campaigns=fallback[:safe_count])
 
 
+def _streamed_image_response(upstream: StreamedResponse, request: Request, media_type: str, headers: Dict[str, str]):
+    """Stream an upstream body to the client, answering If-None-Match with a 304"""
+    headers = dict(headers)
+    etag = upstream.etag
+    if etag:
+        headers['ETag'] = etag
+        if request.headers.get('if-none-match') == etag:
+            upstream.close()
+            return Response(status_code=304, headers=headers)
+    if upstream.content_length is not None:
+        headers['Content-Length'] = str(upstream.content_length)
+    return StreamingResponse(upstream.body(), media_type=media_type, headers=headers)
+
+
 @router.get("/screenshot")
-async def get_website_screenshot(url: str):
+async def get_website_screenshot(url: str, request: Request):
     """Proxy website screenshot to avoid CORS issues"""
-    import aiohttp
-    from fastapi.responses import Response
     from urllib.parse import unquote
     
+    upstream = None
     try:
         # Decode URL if it's already encoded
         decoded_url = unquote(url)
@@ -267,59 +293,66 @@ async def get_website_screenshot(url: str):
         # Construct URL per official docs
         screenshot_url = f"https://shot.screenshotapi.net/screenshot?token={screenshot_api_key}&url={encoded_url}&output=image&file_type=png"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(screenshot_url, timeout=30) as response:
-                if response.status == 200:
-                    image_data = await response.read()
-                    content_type = response.headers.get('Content-Type', 'image/png')
-                    
-                    # Check if it's actually an image (screenshotapi returns error pages as GIFs sometimes)
-                    # Error pages are usually small GIFs (< 10KB) with error messages
-                    if content_type == 'image/gif' and len(image_data) < 10000:
-                        # Likely an error page - try to read the error message
-                        try:
-                            error_text = image_data.decode('utf-8', errors='ignore')
-                            _safe_print(f"[ERROR] Screenshot API returned GIF (likely error): {len(image_data)} bytes")
-                            _safe_print(f"[ERROR] Content preview: {error_text[:500]}")
-                            
-                            # Check for common error messages
-                            if 'invalid' in error_text.lower() or 'api key' in error_text.lower():
-                                raise HTTPException(status_code=400, detail="Invalid screenshot API key. Please check your API key in the screenshotapi.net dashboard.")
-                            elif 'limit' in error_text.lower() or 'quota' in error_text.lower():
-                                raise HTTPException(status_code=429, detail="Screenshot API quota exceeded. Please upgrade your plan.")
-                            elif 'error' in error_text.lower():
-                                raise HTTPException(status_code=400, detail=f"Screenshot API error: {error_text[:150]}")
-                            else:
-                                # Unknown error, but it's a small GIF so likely an error
-                                raise HTTPException(status_code=400, detail="Screenshot API returned an error. Check your API key and account status.")
-                        except HTTPException:
-                            raise
-                        except Exception as e:
-                            _safe_print(f"[ERROR] Could not parse error: {e}")
-                            raise HTTPException(status_code=400, detail="Screenshot API returned invalid response. Check your API key.")
-                    
-                    # Validate it's actually image data (not HTML/error page)
-                    if len(image_data) < 1000:
-                        _safe_print(f"[WARNING] Screenshot response too small ({len(image_data)} bytes), might be error page")
-                        raise HTTPException(status_code=404, detail="Screenshot service unavailable")
-                    
-                    # Check if it's actually an image by checking magic bytes
-                    is_image = (
-                        image_data.startswith(b'\x89PNG') or  # PNG
-                        image_data.startswith(b'\xff\xd8\xff') or  # JPEG
-                        image_data.startswith(b'GIF')  # GIF (but only if large enough)
-                    )
-                    
-                    if not is_image and len(image_data) < 50000:
-                        _safe_print(f"[WARNING] Response doesn't appear to be an image")
-                        raise HTTPException(status_code=404, detail="Screenshot service returned invalid response")
+        # Same URL, same screenshot: repeat and concurrent requests share one paid
+        # capture, streamed to the client while it is written to the HTTP cache
+        upstream = await cached_stream(screenshot_url, timeout=30, force_ttl=ASSET_TTL, max_bytes=PROXY_MAX_BYTES)
+        if upstream.cache_status == "rejected":
+            raise HTTPException(status_code=502, detail="Screenshot too large")
+        if upstream.status == 200:
+            content_type = upstream.headers.get('Content-Type', 'image/png')
+            # Enough of the body to tell an image from an error page; shorter means this is all of it
+            image_data = await upstream.peek(50000)
+            
+            # Check if it's actually an image (screenshotapi returns error pages as GIFs sometimes)
+            # Error pages are usually small GIFs (< 10KB) with error messages
+            if content_type == 'image/gif' and len(image_data) < 10000:
+                # Likely an error page - try to read the error message
+                try:
+                    error_text = image_data.decode('utf-8', errors='ignore')
+                    _safe_print(f"[ERROR] Screenshot API returned GIF (likely error): {len(image_data)} bytes")
+                    _safe_print(f"[ERROR] Content preview: {error_text[:500]}")
                     
-                    return Response(content=image_data, media_type=content_type)
-                else:
-                    error_text = await response.text(encoding='utf-8', errors='replace') if response.content_type == 'text/html' else f"HTTP {response.status}"
-                    _safe_print(f"[ERROR] Screenshot service returned {response.status}: {error_text[:200]}")
-                    raise HTTPException(status_code=404, detail=f"Screenshot not available: {error_text[:100]}")
+                    # Check for common error messages
+                    if 'invalid' in error_text.lower() or 'api key' in error_text.lower():
+                        raise HTTPException(status_code=400, detail="Invalid screenshot API key. Please check your API key in the screenshotapi.net dashboard.")
+                    elif 'limit' in error_text.lower() or 'quota' in error_text.lower():
+                        raise HTTPException(status_code=429, detail="Screenshot API quota exceeded. Please upgrade your plan.")
+                    elif 'error' in error_text.lower():
+                        raise HTTPException(status_code=400, detail=f"Screenshot API error: {error_text[:150]}")
+                    else:
+                        # Unknown error, but it's a small GIF so likely an error
+                        raise HTTPException(status_code=400, detail="Screenshot API returned an error. Check your API key and account status.")
+                except HTTPException:
+                    raise
+                except Exception as e:
+                    _safe_print(f"[ERROR] Could not parse error: {e}")
+                    raise HTTPException(status_code=400, detail="Screenshot API returned invalid response. Check your API key.")
+            
+            # Validate it's actually image data (not HTML/error page)
+            if len(image_data) < 1000:
+                _safe_print(f"[WARNING] Screenshot response too small ({len(image_data)} bytes), might be error page")
+                raise HTTPException(status_code=404, detail="Screenshot service unavailable")
+            
+            # Check if it's actually an image by checking magic bytes
+            is_image = (
+                image_data.startswith(b'\x89PNG') or  # PNG
+                image_data.startswith(b'\xff\xd8\xff') or  # JPEG
+                image_data.startswith(b'GIF')  # GIF (but only if large enough)
+            )
+            
+            if not is_image and len(image_data) < 50000:
+                _safe_print(f"[WARNING] Response doesn't appear to be an image")
+                raise HTTPException(status_code=404, detail="Screenshot service returned invalid response")
+            
+            return _streamed_image_response(upstream, request, content_type, {'Cache-Control': 'public, max-age=86400'})
+        else:
+            error_text = upstream.error_body.decode('utf-8', errors='replace') if upstream.content_type == 'text/html' else f"HTTP {upstream.status}"
+            _safe_print(f"[ERROR] Screenshot service returned {upstream.status}: {error_text[:200]}")
+            raise HTTPException(status_code=404, detail=f"Screenshot not available: {error_text[:100]}")
     except HTTPException:
+        # A 200 that failed validation is an error image; keep it out of the cache
+        if upstream is not None and upstream.status == 200:
+            await upstream.discard()
         raise
     except Exception as e:
         _safe_print(f"[ERROR] Screenshot proxy failed: {e}")
@@ -331,10 +364,15 @@ async def get_website_screenshot(url: str):
 
 
 @router.get("/images/{filename}")
-async def serve_brand_image(filename: str):
-    """Serve stored brand images from local storage"""
+async def serve_brand_image(filename: str, request: Request, size: Optional[str] = None):
+    """Serve stored brand images from local storage
+    
+    Pass size=thumb|small|medium for a WebP derivative (generated on first request).
+    Responses carry an ETag and answer If-None-Match with 304.
+    """
     from pathlib import Path
-    from fastapi.responses import FileResponse
+    from fastapi.responses import FileResponse, Response
+    from ..utils.derivatives import THUMBNAIL_SIZES, get_derivative
     import os
     
     try:
@@ -349,25 +387,40 @@ async def serve_brand_image(filename: str):
         if not filepath.exists() or not filepath.is_file():
             raise HTTPException(status_code=404, detail="Image not found")
         
-        # Determine content type from extension
-        ext = filename.split('.')[-1].lower()
-        content_type_map = {
-            'jpg': 'image/jpeg',
-            'jpeg': 'image/jpeg',
-            'png': 'image/png',
-            'gif': 'image/gif',
-            'webp': 'image/webp'
+        if size:
+            if size not in THUMBNAIL_SIZES:
+                raise HTTPException(status_code=400, detail=f"Invalid size. Use one of: {', '.join(THUMBNAIL_SIZES)}")
+            # Derivatives are content-addressed, so they never change under a given ETag
+            filepath, etag = await get_derivative(filepath, size)
+            content_type = 'image/webp'
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            stat = filepath.stat()
+            etag = f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            
+            # Determine content type from extension
+            ext = filename.split('.')[-1].lower()
+            content_type_map = {
+                'jpg': 'image/jpeg',
+                'jpeg': 'image/jpeg',
+                'png': 'image/png',
+                'gif': 'image/gif',
+                'webp': 'image/webp'
+            }
+            content_type = content_type_map.get(ext, 'image/jpeg')
+            cache_control = 'public, max-age=31536000'  # Cache for 1 year
+        
+        headers = {
+            'Cache-Control': cache_control,
+            'ETag': etag,
+            'Access-Control-Allow-Origin': '*'
         }
-        content_type = content_type_map.get(ext, 'image/jpeg')
         
-        return FileResponse(
-            filepath,
-            media_type=content_type,
-            headers={
-                'Cache-Control': 'public, max-age=31536000',  # Cache for 1 year
-                'Access-Control-Allow-Origin': '*'
-            }
-        )
+        if_none_match = request.headers.get('if-none-match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return Response(status_code=304, headers=headers)
+        
+        return FileResponse(filepath, media_type=content_type, headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -380,9 +433,19 @@ async def serve_brand_image(filename: str):
 
 
 @router.get("/media-library")
-async def get_media_library(org_id: Optional[str] = None, user_id: Optional[str] = None):
-    """Get all scraped images for media library"""
+async def get_media_library(
+    response: Response,
+    org_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """Get scraped images for the media library, newest first
+    
+    Pass `limit` and/or `cursor` for {"items", "next_cursor"} pages; without
+    them up to 500 images are returned as a list."""
     db = get_db()
+    paginated = limit is not None or cursor is not None
     
     query = {}
     if org_id:
@@ -399,12 +462,13 @@ async def get_media_library(org_id: Optional[str] = None, user_id: Optional[str]
             {"user_id": user_id}
         ]
     else:
-        return []
+        return {"items": [], "next_cursor": None} if paginated else []
     
-    images = await db.user_images.find(
-        query,
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(length=500)
+    page = await paginate(
+        db.user_images, query, "created_at",
+        limit=limit or 500, cursor=cursor, projection={"_id": 0}
+    )
+    images = page.items
     
     # Convert backend URLs to full URLs
     import os
@@ -424,31 +488,37 @@ async def get_media_library(org_id: Optional[str] = None, user_id: Optional[str]
             # Fallback: try to construct URL from filename
             if img.get("filename"):
                 img["url"] = f"{base_url}/api/brand/images/{img['filename']}"
+        
+        # Grid views load WebP derivatives instead of the originals
+        if (img.get("url") or "").startswith(f"{base_url}/api/brand/images/"):
+            img["thumbnail_url"] = f"{img['url']}?size=thumb"
+            img["preview_url"] = f"{img['url']}?size=medium"
+        else:
+            img["thumbnail_url"] = img.get("url")
+            img["preview_url"] = img.get("url")
     
-    return images
+    return page_response(page, response, paginated)
 
 
 @router.get("/proxy-image")
-async def proxy_image(image_url: str):
+async def proxy_image(image_url: str, request: Request):
     """Proxy external images to avoid CORS issues (fallback for non-stored images)"""
-    import aiohttp
-    from fastapi.responses import Response
-    
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(image_url, timeout=15, allow_redirects=True) as response:
-                if response.status == 200:
-                    image_data = await response.read()
-                    content_type = response.headers.get('Content-Type', 'image/jpeg')
-                    # Set CORS headers
-                    headers = {
-                        'Access-Control-Allow-Origin': '*',
-                        'Access-Control-Allow-Methods': 'GET',
-                        'Cache-Control': 'public, max-age=3600'
-                    }
-                    return Response(content=image_data, media_type=content_type, headers=headers)
-                else:
-                    raise HTTPException(status_code=404, detail="Image not found")
+        # Streamed through the HTTP cache; concurrent requests for one image share a download
+        upstream = await cached_stream(image_url, timeout=15, default_ttl=ASSET_TTL, max_bytes=PROXY_MAX_BYTES)
+        if upstream.cache_status == "rejected":
+            raise HTTPException(status_code=413, detail="Image too large")
+        if upstream.status != 200:
+            raise HTTPException(status_code=404, detail="Image not found")
+        # Set CORS headers
+        headers = {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'GET',
+            'Cache-Control': 'public, max-age=3600'
+        }
+        return _streamed_image_response(upstream, request, upstream.headers.get('Content-Type', 'image/jpeg'), headers)
+    except HTTPException:
+        raise
     except Exception as e:
         _safe_print(f"[ERROR] Image proxy failed for {image_url}: {e}")
         try:
@@ -563,24 +633,23 @@ class PostPreviewResponse(BaseModel):
     posts: List[str]
 
 
-# Enhanced color patterns - matches hex, rgb, rgba, hsl, hsla, and named colors
-COLOR_PATTERN = re.compile(
-    r"(?:#(?:[0-9a-fA-F]{3}){1,2}|"
-    r"rgb\s*\(\s*\d+\s*,\s*\d+\s*,\s*\d+\s*\)|"
-    r"rgba\s*\(\s*\d+\s*,\s*\d+\s*,\s*\d+\s*,\s*[\d.]+\s*\)|"
-    r"hsl\s*\(\s*\d+\s*,\s*\d+%\s*,\s*\d+%\s*\)|"
-    r"hsla\s*\(\s*\d+\s*,\s*\d+%\s*,\s*\d+%\s*,\s*[\d.]+\s*\)|"
-    r"\b(?:red|green|blue|yellow|orange|purple|pink|brown|black|white|gray|grey|cyan|magenta|lime|navy|teal|olive|maroon|silver|gold|indigo|violet|turquoise|aqua|fuchsia|coral|salmon|khaki|plum|tan|beige|ivory|azure|lavender|mint|peach|rose|amber|emerald|ruby|sapphire|topaz|jade|amber|bronze|copper|slate|charcoal|burgundy|mustard|lavender|mauve|periwinkle|cerulean|crimson|forest|ocean|sunset|sunrise|midnight|dawn|dusk)\b)",
-    re.IGNORECASE
-)
+# Brand DNA analysis reads this much website text; the subpage crawl stops once it has it
+BRAND_DNA_TEXT_LIMIT = 20000
+
+# Seconds allowed for the homepage fetch, and again for the subpage crawl
+CRAWL_TIME_BUDGET = 20.0
+
+# Largest body /proxy-image and /screenshot will relay
+PROXY_MAX_BYTES = 15 * 1024 * 1024
+
+# Brand images downloaded per discovery, how many at once, and the largest accepted
+IMAGE_DOWNLOAD_LIMIT = 6
+IMAGE_DOWNLOAD_CONCURRENCY = 4
+IMAGE_MAX_BYTES = 10 * 1024 * 1024
+
+# PNG, JPEG, GIF, WebP (RIFF), ICO
+IMAGE_SIGNATURES = (b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'RIFF', b'\x00\x00\x01\x00')
 
-# Enhanced font pattern - matches font-family declarations, @font-face, and Google Fonts
-FONT_PATTERN = re.compile(
-    r"(?:font-family\s*:\s*([^;\"']+)|"
-    r"@font-face\s*\{[^}]*font-family\s*:\s*['\"]?([^;\"']+)['\"]?|"
-    r"fonts\.googleapis\.com/css\?family=([^&\"']+))",
-    re.IGNORECASE
-)
 SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
 WORD_PATTERN = re.compile(r"\b[a-zA-Z]{4,}\b")
 STOPWORDS = {
@@ -633,8 +702,8 @@ def _safe_print(message: str) -> None:
             print("[BRAND] [Message contains Unicode characters that cannot be displayed]")
 
 
-async def _fetch_text(session: aiohttp.ClientSession, url: str) -> str:
-    """Fetch HTML content from a URL with proper headers and error handling"""
+async def _fetch_text(session: aiohttp.ClientSession, url: str, default_ttl: float = PAGE_TTL) -> str:
+    """Fetch HTML content from a URL (through the HTTP cache) with proper headers and error handling"""
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -645,51 +714,51 @@ async def _fetch_text(session: aiohttp.ClientSession, url: str) -> str:
     }
     
     try:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=30), headers=headers, allow_redirects=True) as response:
-            if response.status != 200:
-                # Log detailed error information for debugging
-                status_code = response.status
-                status_reason = getattr(response, 'reason', 'Unknown')
-                _safe_print(f"[BRAND] Failed to fetch {url}: HTTP {status_code} {status_reason}")
-                
-                # Provide more detailed error information
-                status_text = f"HTTP {status_code}"
-                if status_code == 403:
-                    status_text += " (Forbidden - website may be blocking automated requests)"
-                elif status_code == 404:
-                    status_text += " (Not Found - page may not exist)"
-                elif status_code == 429:
-                    status_text += " (Too Many Requests - rate limited)"
-                elif status_code >= 500:
-                    status_text += " (Server Error - website may be temporarily unavailable)"
-                
-                try:
-                    error_body = await response.text(encoding='utf-8', errors='ignore')
-                    if len(error_body) > 200:
-                        error_body = error_body[:200] + "..."
-                    if error_body.strip():
-                        status_text += f": {error_body}"
-                except:
-                    pass
-                
-                # Ensure status_text is safely encoded
-                try:
-                    safe_status_text = status_text.encode('utf-8', errors='replace').decode('utf-8')
-                except:
-                    safe_status_text = f"HTTP {status_code}"
-                
-                safe_url = url
-                try:
-                    safe_url = url.encode('utf-8', errors='replace').decode('utf-8')
-                except:
-                    pass
-                
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Unable to fetch content from {safe_url}. Server returned {safe_status_text}. Please verify the URL is correct and accessible."
-                )
-            # Explicitly use UTF-8 encoding to avoid charmap codec errors on Windows
-            return await response.text(encoding='utf-8', errors='replace')
+        response = await cached_get(session, url, headers=headers, timeout=30, default_ttl=default_ttl)
+        if response.status != 200:
+            # Log detailed error information for debugging
+            status_code = response.status
+            status_reason = getattr(response, 'reason', 'Unknown')
+            _safe_print(f"[BRAND] Failed to fetch {url}: HTTP {status_code} {status_reason}")
+            
+            # Provide more detailed error information
+            status_text = f"HTTP {status_code}"
+            if status_code == 403:
+                status_text += " (Forbidden - website may be blocking automated requests)"
+            elif status_code == 404:
+                status_text += " (Not Found - page may not exist)"
+            elif status_code == 429:
+                status_text += " (Too Many Requests - rate limited)"
+            elif status_code >= 500:
+                status_text += " (Server Error - website may be temporarily unavailable)"
+            
+            try:
+                error_body = response.text(errors='ignore')
+                if len(error_body) > 200:
+                    error_body = error_body[:200] + "..."
+                if error_body.strip():
+                    status_text += f": {error_body}"
+            except:
+                pass
+            
+            # Ensure status_text is safely encoded
+            try:
+                safe_status_text = status_text.encode('utf-8', errors='replace').decode('utf-8')
+            except:
+                safe_status_text = f"HTTP {status_code}"
+            
+            safe_url = url
+            try:
+                safe_url = url.encode('utf-8', errors='replace').decode('utf-8')
+            except:
+                pass
+            
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Unable to fetch content from {safe_url}. Server returned {safe_status_text}. Please verify the URL is correct and accessible."
+            )
+        # Explicitly use UTF-8 encoding to avoid charmap codec errors on Windows
+        return response.text()
     except aiohttp.ClientError as e:
         # Safely get error message
         try:
@@ -723,22 +792,72 @@ def _deduplicate_preserve_order(items: List[str]) -> List[str]:
     return ordered
 
 
+def _palette_from_stored_images(stored_urls: List[str], n_colors: int = 5) -> List[str]:
+    """Dominant colors of stored brand images (backend URLs), most dominant first, as hex"""
+    from pathlib import Path
+    from ..utils.palette import palette_from_bytes, rgb_to_hex
+
+    images_dir = Path(__file__).parent.parent.parent.parent / "uploads" / "brand-images"
+    counts: Counter = Counter()
+    for backend_url in stored_urls:
+        filepath = images_dir / backend_url.rsplit('/', 1)[-1]
+        try:
+            palette = palette_from_bytes(filepath.read_bytes(), n_colors=n_colors)
+        except Exception as e:
+            _safe_print(f"[BRAND] [WARNING] Could not extract palette from {filepath.name}: {e}")
+            continue
+        # Earlier (more dominant) colors count for more
+        for rank, color in enumerate(palette):
+            counts[rgb_to_hex(color)] += n_colors - rank
+
+    return [color for color, _ in counts.most_common(n_colors)]
+
+
+def _is_image_download(first_bytes: bytes, headers) -> bool:
+    """Image by content type or by magic bytes"""
+    return headers.get('Content-Type', '').startswith('image/') or first_bytes.startswith(IMAGE_SIGNATURES)
+
+
+def _image_extension(content_type: str) -> str:
+    if 'png' in content_type:
+        return 'png'
+    if 'gif' in content_type:
+        return 'gif'
+    if 'webp' in content_type:
+        return 'webp'
+    return 'jpg'
+
+
+def _write_image_file(filepath, image_data: bytes) -> bool:
+    """Write an image atomically; False if an identical file is already stored"""
+    if filepath.exists():
+        return False
+    # Unique temp name: the same image can be downloaded by concurrent crawls
+    tmp_file = filepath.with_name(f"{filepath.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_file.write_bytes(image_data)
+        os.replace(tmp_file, filepath)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+    return True
+
+
 async def _download_and_store_images(session: aiohttp.ClientSession, image_urls: List[str], source_url: str, org_id: Optional[str] = None, user_id: Optional[str] = None) -> List[str]:
-    """Download images and store them locally, save metadata to database, return backend URLs"""
-    import os
-    import hashlib
+    """
+    Download images concurrently and store them locally by content hash, save
+    metadata to database in one batch, return backend URLs in input order
+    """
     from pathlib import Path
-    from urllib.parse import urlparse
     from datetime import datetime
+    from ..utils.compute_pool import run_in_compute_pool
+    from ..utils.derivatives import content_hash, schedule_derivatives
     
     # Create brand-images directory if it doesn't exist
     base_dir = Path(__file__).parent.parent.parent.parent  # Go up to backend/
     images_dir = base_dir / "uploads" / "brand-images"
     images_dir.mkdir(parents=True, exist_ok=True)
     
-    stored_urls = []
-    domain = urlparse(source_url).netloc.replace('.', '_')
-    
     # Get database connection for saving image metadata
     db = None
     if org_id or user_id:
@@ -749,100 +868,105 @@ async def _download_and_store_images(session: aiohttp.ClientSession, image_urls:
             if org:
                 user_id = org.get("created_by")
     
-    _safe_print(f"[IMAGE] Starting download of {len(image_urls)} images to {images_dir}")
+    # Skip data URIs and invalid URLs
+    candidates = [
+        img_url for img_url in dict.fromkeys(image_urls)
+        if not img_url.startswith("data:") and img_url.startswith(("http://", "https://"))
+    ][:IMAGE_DOWNLOAD_LIMIT]
+    
+    _safe_print(f"[IMAGE] Starting download of {len(candidates)} images to {images_dir}")
     if org_id:
         _safe_print(f"[IMAGE] Associating images with org_id: {org_id}, user_id: {user_id}")
     
-    for idx, img_url in enumerate(image_urls[:6]):  # Limit to 6 images
+    semaphore = asyncio.Semaphore(IMAGE_DOWNLOAD_CONCURRENCY)
+    
+    async def download(img_url: str) -> Optional[Dict]:
         try:
-            _safe_print(f"[IMAGE] Processing image {idx + 1}/{min(len(image_urls), 6)}: {img_url[:80]}...")
+            async with semaphore:
+                # Streamed with a size cap; non-images are dropped on their first bytes
+                response = await cached_get(
+                    session, img_url, timeout=10, default_ttl=ASSET_TTL,
+                    max_bytes=IMAGE_MAX_BYTES, accept=_is_image_download,
+                    headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+                )
+            if response.status != 200:
+                _safe_print(f"[IMAGE] Failed to download {img_url[:80]}: HTTP {response.status}")
+                return None
+            if response.cache_status == "rejected":
+                _safe_print(f"[IMAGE] Skipping {img_url[:80]}: not an image or over {IMAGE_MAX_BYTES} bytes")
+                return None
             
-            # Skip data URIs and invalid URLs
-            if img_url.startswith("data:") or not img_url.startswith(("http://", "https://")):
-                _safe_print(f"[IMAGE] Skipping invalid URL (data URI or not http/https): {img_url[:50]}")
-                continue
+            image_data = response.body
+            # A cached body may predate the streaming checks
+            if not _is_image_download(image_data[:16], response.headers):
+                _safe_print(f"[IMAGE] Not an image: {response.headers.get('Content-Type', '')}, magic bytes: {image_data[:10]}")
+                return None
             
-            # Download image
-            async with session.get(img_url, timeout=10, allow_redirects=True, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }) as response:
-                if response.status != 200:
-                    _safe_print(f"[IMAGE] Failed to download {img_url}: HTTP {response.status}")
-                    continue
-                
-                # Read image data first
-                image_data = await response.read()
-                
-                # Check if it's actually an image by content type and magic bytes
-                content_type = response.headers.get('Content-Type', '')
-                is_image_by_type = content_type.startswith('image/')
-                
-                # Check magic bytes
-                is_image_by_bytes = (
-                    image_data.startswith(b'\x89PNG') or  # PNG
-                    image_data.startswith(b'\xff\xd8\xff') or  # JPEG
-                    image_data.startswith(b'GIF8') or  # GIF
-                    image_data.startswith(b'RIFF') or  # WebP
-                    image_data.startswith(b'\x00\x00\x01\x00')  # ICO
-                )
-                
-                if not is_image_by_type and not is_image_by_bytes:
-                    _safe_print(f"[IMAGE] Not an image: {content_type}, magic bytes: {image_data[:10]}")
-                    continue
-                
-                # Validate it's actually image data (at least 500 bytes to avoid tiny icons)
-                if len(image_data) < 500:
-                    _safe_print(f"[IMAGE] Image too small: {len(image_data)} bytes")
-                    continue
-                
-                # Generate filename from URL hash + index
-                url_hash = hashlib.md5(img_url.encode()).hexdigest()[:8]
-                ext = 'jpg'  # Default
-                if 'png' in content_type:
-                    ext = 'png'
-                elif 'gif' in content_type:
-                    ext = 'gif'
-                elif 'webp' in content_type:
-                    ext = 'webp'
-                
-                filename = f"{domain}_{url_hash}_{idx}.{ext}"
-                filepath = images_dir / filename
-                
-                # Save image
-                with open(filepath, 'wb') as f:
-                    f.write(image_data)
-                
-                # Return backend URL
-                backend_url = f"/api/brand/images/{filename}"
-                stored_urls.append(backend_url)
-                _safe_print(f"[IMAGE] SUCCESS: Stored {filename} ({len(image_data)} bytes) -> {backend_url}")
-                
-                # Save image metadata to database if org_id/user_id available
-                if db and (org_id or user_id):
-                    image_metadata = {
-                        "id": str(uuid.uuid4()),
-                        "filename": filename,
-                        "file_path": str(filepath),
-                        "backend_url": backend_url,
-                        "original_url": img_url,
-                        "source_url": source_url,
-                        "org_id": org_id,
-                        "user_id": user_id,
-                        "file_size": len(image_data),
-                        "content_type": content_type,
-                        "created_at": datetime.utcnow().isoformat(),
-                        "updated_at": datetime.utcnow().isoformat()
-                    }
-                    await db.user_images.insert_one(image_metadata)
-                    _safe_print(f"[IMAGE] Saved metadata to database for {filename}")
-                
+            # Validate it's actually image data (at least 500 bytes to avoid tiny icons)
+            if len(image_data) < 500:
+                _safe_print(f"[IMAGE] Image too small: {len(image_data)} bytes")
+                return None
+            
+            content_type = response.headers.get('Content-Type', '')
+            source_hash = content_hash(image_data)
+            filename = f"{source_hash}.{_image_extension(content_type)}"
+            filepath = images_dir / filename
+            
+            # Identical images (at any URL) share one file
+            if await run_in_compute_pool(_write_image_file, filepath, image_data):
+                # Thumbnails for the media library, generated off the request path
+                schedule_derivatives(image_data)
+            
+            return {
+                "filename": filename,
+                "filepath": filepath,
+                "img_url": img_url,
+                "content_type": content_type,
+                "file_size": len(image_data),
+            }
         except Exception as e:
             _safe_print(f"[IMAGE] ERROR downloading {img_url[:80]}: {e}")
-            import traceback
-            _safe_print(f"[IMAGE] Traceback: {traceback.format_exc()}")
-            continue
+            return None
+    
+    downloads = await asyncio.gather(*[download(img_url) for img_url in candidates])
+    
+    stored = []
+    seen_files = set()
+    for item in downloads:
+        if item and item["filename"] not in seen_files:
+            seen_files.add(item["filename"])
+            stored.append(item)
+    stored_urls = [f"/api/brand/images/{item['filename']}" for item in stored]
     
-    _safe_print(f"[IMAGE] Download complete: {len(stored_urls)}/{len(image_urls)} images stored successfully")
+    # Save image metadata to database if org_id/user_id available, skipping images already recorded
+    if db is not None and stored:
+        owner = {"org_id": org_id} if org_id else {"user_id": user_id}
+        existing = await db.user_images.distinct(
+            "filename", {**owner, "filename": {"$in": list(seen_files)}}
+        )
+        now = datetime.utcnow().isoformat()
+        new_images = [
+            {
+                "id": str(uuid.uuid4()),
+                "filename": item["filename"],
+                "file_path": str(item["filepath"]),
+                "backend_url": f"/api/brand/images/{item['filename']}",
+                "original_url": item["img_url"],
+                "source_url": source_url,
+                "org_id": org_id,
+                "user_id": user_id,
+                "file_size": item["file_size"],
+                "content_type": item["content_type"],
+                "created_at": now,
+                "updated_at": now
+            }
+            for item in stored if item["filename"] not in existing
+        ]
+        if new_images:
+            await db.user_images.insert_many([with_sort_keys("user_images", image) for image in new_images])
+            _safe_print(f"[IMAGE] Saved metadata for {len(new_images)} images to database")
+    
+    _safe_print(f"[IMAGE] Download complete: {len(stored_urls)}/{len(candidates)} images stored successfully")
     return stored_urls
 
 
@@ -854,97 +978,47 @@ async def _extract_brand_attributes(url: str, org_id: Optional[str] = None) -> B
 
     # Try to fetch website content, but continue even if it fails
     html = None
-    soup = None
+    page = None
     fetch_failed = False
 
-    async with aiohttp.ClientSession() as session:
+    from ..utils.compute_pool import run_in_compute_pool
+
+    # One pooled session for the homepage, stylesheets, images and subpages
+    async with SiteCrawler(time_budget=CRAWL_TIME_BUDGET) as crawler:
+        session = crawler.session
         try:
             html = await _fetch_text(session, normalized_url)
-            soup = BeautifulSoup(html, "html.parser")
+            # One lxml pass collects text, links, images, colors and fonts
+            page = await run_in_compute_pool(extract_page, html, base_url)
         except HTTPException as e:
             # Website fetch failed - log but continue with minimal data
             fetch_failed = True
             _safe_print(f"[BRAND] [WARNING] Website fetch failed: {e.detail}")
             _safe_print(f"[BRAND] Continuing with minimal brand analysis using URL and domain only")
-            # Create empty soup for safety
-            soup = BeautifulSoup("", "html.parser")
         except Exception as e:
             fetch_failed = True
             _safe_print(f"[BRAND] [WARNING] Unexpected error fetching website: {e}")
-            soup = BeautifulSoup("", "html.parser")
+        if page is None:
+            # Empty extract for safety
+            page = extract_page("", base_url)
 
-        # Gather inline colors/fonts from HTML (only if fetch succeeded)
-        colors = []
-        fonts = []
+        # Colors/fonts from the HTML, inline styles, style blocks, Google Fonts links and @font-face
+        colors = list(page.colors)
+        fonts = list(page.fonts)
         if html and not fetch_failed:
-            colors = COLOR_PATTERN.findall(html)
-            fonts = FONT_PATTERN.findall(html)
             _safe_print(f"[BRAND] Initial extraction: {len(colors)} colors, {len(fonts)} fonts from HTML")
+            _safe_print(f"[BRAND] Found {len(page.style_blocks)} style blocks")
         else:
             _safe_print(f"[BRAND] No HTML content available - using minimal brand analysis")
-        
-        # CSS variable patterns for color extraction
-        css_var_color_pattern = re.compile(r"--(?:color|primary|secondary|accent|background|text|border|brand|theme)[a-zA-Z0-9-]*\s*:\s*([^;]+)", re.IGNORECASE)
-        
-        # Extract colors from inline style attributes
-        inline_styled = soup.find_all(attrs={"style": True})
-        for element in inline_styled:
-            style_content = element.get("style", "")
-            colors.extend(COLOR_PATTERN.findall(style_content))
-            fonts.extend(FONT_PATTERN.findall(style_content))
-            
-            # Extract CSS variables from inline styles (especially color-related ones)
-            css_vars = css_var_color_pattern.findall(style_content)
-            for var_value in css_vars:
-                # Check if the CSS variable value is a color
-                colors.extend(COLOR_PATTERN.findall(var_value))
-
-        # Pull inline styles
-        style_blocks = soup.find_all("style")
-        _safe_print(f"[BRAND] Found {len(style_blocks)} style blocks")
-        for block in style_blocks:
-            content = block.get_text() or ""
-            block_colors = COLOR_PATTERN.findall(content)
-            block_fonts = FONT_PATTERN.findall(content)
-            colors.extend(block_colors)
-            fonts.extend(block_fonts)
-            _safe_print(f"[BRAND] Style block: {len(block_colors)} colors, {len(block_fonts)} fonts")
-            
-            # Extract CSS variables from style blocks (especially color-related ones)
-            css_vars = css_var_color_pattern.findall(content)
-            for var_value in css_vars:
-                colors.extend(COLOR_PATTERN.findall(var_value))
-        
-        # Extract fonts from Google Fonts links
-        for link_tag in soup.find_all("link"):
-            href = link_tag.get("href", "")
-            if "fonts.googleapis.com" in href or "fonts.gstatic.com" in href:
-                # Extract font family from URL
-                font_match = re.search(r"family=([^&:]+)", href)
-                if font_match:
-                    font_name = font_match.group(1).replace("+", " ")
-                    fonts.append(font_name)
-        
-        # Extract fonts from @font-face declarations
-        for style_block in style_blocks:
-            content = style_block.get_text() or ""
-            fontface_matches = re.findall(r"@font-face\s*\{[^}]*font-family\s*:\s*['\"]?([^;\"']+)['\"]?", content, re.IGNORECASE)
-            fonts.extend(fontface_matches)
 
         # Attempt to fetch first two external stylesheets for richer data (only if fetch succeeded)
         stylesheet_links = []
         if html and not fetch_failed:
-            for link_tag in soup.find_all("link"):
-                rel = link_tag.get("rel") or []
-                if any("stylesheet" in rel_value.lower() for rel_value in rel):
-                    href = link_tag.get("href")
-                    if href:
-                        stylesheet_links.append(urljoin(base_url, href))
-            stylesheet_links = stylesheet_links[:2]
+            stylesheet_links = page.stylesheets[:2]
 
         async def fetch_stylesheet(sheet_url: str) -> str:
             try:
-                return await _fetch_text(session, sheet_url)
+                return await _fetch_text(session, sheet_url, default_ttl=ASSET_TTL)
             except Exception:
                 return ""
 
@@ -962,7 +1036,7 @@ async def _extract_brand_attributes(url: str, org_id: Optional[str] = None) -> B
                     _safe_print(f"[BRAND] Stylesheet {i+1}: {len(sheet_colors)} colors, {len(sheet_fonts)} fonts")
                     
                     # Extract CSS variables from stylesheets
-                    css_vars = css_var_color_pattern.findall(sheet_content)
+                    css_vars = CSS_VAR_COLOR_PATTERN.findall(sheet_content)
                     for var_value in css_vars:
                         colors.extend(COLOR_PATTERN.findall(var_value))
 
@@ -1046,127 +1120,33 @@ async def _extract_brand_attributes(url: str, org_id: Optional[str] = None) -> B
         imagery = []
         
         # 1. Open Graph image (highest priority)
-        og_image = soup.find("meta", property="og:image")
-        if og_image and og_image.get("content"):
-            og_url = urljoin(base_url, og_image["content"])
+        if page.meta.get("og:image"):
+            og_url = urljoin(base_url, page.meta["og:image"])
             if og_url not in imagery:
                 imagery.append(og_url)
         
         # 2. Twitter Card image
-        twitter_image = soup.find("meta", attrs={"name": "twitter:image"})
-        if twitter_image and twitter_image.get("content"):
-            twitter_url = urljoin(base_url, twitter_image["content"])
+        if page.meta.get("twitter:image"):
+            twitter_url = urljoin(base_url, page.meta["twitter:image"])
             if twitter_url not in imagery:
                 imagery.append(twitter_url)
         
-        # 3. Find hero images (in header, hero sections, or with hero-related classes)
-        hero_selectors = [
-            "header img",
-            ".hero img",
-            ".banner img",
-            "[class*='hero'] img",
-            "[class*='Hero'] img",
-            "[class*='banner'] img",
-            "[class*='Banner'] img",
-            "[id*='hero'] img",
-            "[id*='Hero'] img",
-            "section:first-of-type img",
-            "main img:first-of-type",
-        ]
-        
+        # 3. Hero images (in header, hero sections, or with hero-related classes), in selector order
         hero_images = []
-        for selector in hero_selectors:
-            hero_imgs = soup.select(selector)
-            for img_tag in hero_imgs[:2]:  # Limit to first 2 per selector
-                # Check multiple src attributes for lazy loading
-                src = (
-                    img_tag.get("src") or
-                    img_tag.get("data-src") or
-                    img_tag.get("data-lazy-src") or
-                    img_tag.get("data-original") or
-                    img_tag.get("data-srcset", "").split(",")[0].strip().split(" ")[0] if img_tag.get("data-srcset") else None
-                )
-                if src:
-                    # Handle srcset
-                    if not src.startswith("http") and img_tag.get("srcset"):
-                        srcset = img_tag.get("srcset")
-                        # Get the largest image from srcset
-                        srcset_parts = [s.strip().split() for s in srcset.split(",")]
-                        if srcset_parts:
-                            # Sort by width descriptor and take largest
-                            try:
-                                srcset_parts.sort(key=lambda x: int(x[1].replace("w", "")) if len(x) > 1 and x[1].replace("w", "").isdigit() else 0, reverse=True)
-                                src = srcset_parts[0][0]
-                            except:
-                                pass
-                    
-                    image_url = urljoin(base_url, src)
-                    if image_url not in hero_images and image_url not in imagery:
-                        hero_images.append(image_url)
+        for image_url in page.hero_images:
+            if image_url not in hero_images and image_url not in imagery:
+                hero_images.append(image_url)
         
         # Add hero images first
         imagery.extend(hero_images[:3])
         
-        # 4. Find other images, prioritizing larger ones
+        # 4. Other images (largest srcset/picture source), prioritizing larger ones
         all_images = []
-        for img_tag in soup.find_all("img"):
-            # Check multiple src attributes for lazy loading
-            src = (
-                img_tag.get("src") or
-                img_tag.get("data-src") or
-                img_tag.get("data-lazy-src") or
-                img_tag.get("data-original") or
-                img_tag.get("data-srcset", "").split(",")[0].strip().split(" ")[0] if img_tag.get("data-srcset") else None
-            )
-            
-            if not src:
-                continue
-            
-            # Handle srcset - get the largest image
-            if img_tag.get("srcset"):
-                srcset = img_tag.get("srcset")
-                srcset_parts = [s.strip().split() for s in srcset.split(",")]
-                if srcset_parts:
-                    try:
-                        # Sort by width descriptor and take largest
-                        srcset_parts.sort(key=lambda x: int(x[1].replace("w", "")) if len(x) > 1 and x[1].replace("w", "").isdigit() else 0, reverse=True)
-                        src = srcset_parts[0][0]
-                    except:
-                        pass
-            
-            image_url = urljoin(base_url, src)
-            
-            # Skip data URIs, SVGs, and very small images
-            if image_url.startswith("data:") or image_url.endswith(".svg"):
+        for image in page.images:
+            # Skip data URIs and SVGs
+            if image.url.startswith("data:") or image.url.endswith(".svg"):
                 continue
-            
-            # Get image dimensions if available
-            width = img_tag.get("width")
-            height = img_tag.get("height")
-            size_score = 0
-            if width and height:
-                try:
-                    size_score = int(width) * int(height)
-                except:
-                    pass
-            
-            # Also check for picture/source elements (responsive images)
-            parent = img_tag.find_parent("picture")
-            if parent:
-                for source in parent.find_all("source"):
-                    srcset = source.get("srcset")
-                    if srcset:
-                        srcset_parts = [s.strip().split() for s in srcset.split(",")]
-                        if srcset_parts:
-                            try:
-                                srcset_parts.sort(key=lambda x: int(x[1].replace("w", "")) if len(x) > 1 and x[1].replace("w", "").isdigit() else 0, reverse=True)
-                                larger_src = srcset_parts[0][0]
-                                image_url = urljoin(base_url, larger_src)
-                            except:
-                                pass
-            
-            if image_url not in imagery and image_url not in all_images:
-                all_images.append((image_url, size_score))
+            all_images.append((image.url, image.size_score))
         
         # Sort by size (largest first) and add to imagery
         all_images.sort(key=lambda x: x[1], reverse=True)
@@ -1176,33 +1156,18 @@ async def _extract_brand_attributes(url: str, org_id: Optional[str] = None) -> B
             if len(imagery) >= 12:  # Increased limit to get more images
                 break
         
-        # 5. Check for background images in inline styles
-        for element in soup.find_all(attrs={"style": True}):
-            style = element.get("style", "")
-            bg_image_match = re.search(r'background-image:\s*url\(["\']?([^"\']+)["\']?\)', style, re.IGNORECASE)
-            if bg_image_match:
-                bg_url = urljoin(base_url, bg_image_match.group(1))
-                if bg_url not in imagery and not bg_url.startswith("data:") and not bg_url.endswith(".svg"):
-                    imagery.append(bg_url)
-                if len(imagery) >= 15:
-                    break
-        
-        # 6. Check for background images in style blocks
-        for style_block in style_blocks:
-            content = style_block.get_text() or ""
-            bg_matches = re.findall(r'background-image:\s*url\(["\']?([^"\']+)["\']?\)', content, re.IGNORECASE)
-            for bg_match in bg_matches:
-                bg_url = urljoin(base_url, bg_match)
-                if bg_url not in imagery and not bg_url.startswith("data:") and not bg_url.endswith(".svg"):
-                    imagery.append(bg_url)
-                if len(imagery) >= 15:
-                    break
+        # 5-6. Background images from inline styles, then style blocks
+        for bg_url in page.background_images:
+            if bg_url not in imagery and not bg_url.startswith("data:") and not bg_url.endswith(".svg"):
+                imagery.append(bg_url)
+            if len(imagery) >= 15:
+                break
         
         # 7. Check for images in CSS files (from stylesheets we fetched)
         if stylesheet_links:
             for sheet_content in stylesheet_contents:
                 if sheet_content:
-                    bg_matches = re.findall(r'background-image:\s*url\(["\']?([^"\']+)["\']?\)', sheet_content, re.IGNORECASE)
+                    bg_matches = BACKGROUND_IMAGE_PATTERN.findall(sheet_content)
                     for bg_match in bg_matches:
                         bg_url = urljoin(base_url, bg_match)
                         if bg_url not in imagery and not bg_url.startswith("data:") and not bg_url.endswith(".svg"):
@@ -1221,21 +1186,20 @@ async def _extract_brand_attributes(url: str, org_id: Optional[str] = None) -> B
         else:
             _safe_print(f"[BRAND] WARNING: No images found! Debugging HTML structure...")
             # Debug: Check if there are any img tags at all
-            all_img_tags = soup.find_all("img")
-            _safe_print(f"[BRAND]   Total <img> tags in HTML: {len(all_img_tags)}")
-            if all_img_tags:
+            _safe_print(f"[BRAND]   Total <img> tags in HTML: {page.img_count}")
+            if page.images:
                 _safe_print(f"[BRAND]   Sample img tags (first 3):")
-                for i, img in enumerate(all_img_tags[:3], 1):
+                for i, image in enumerate(page.images[:3], 1):
                     try:
-                        src_val = str(img.get('src', 'NONE'))[:60]
-                        data_src_val = str(img.get('data-src', 'NONE'))[:60]
-                        classes_val = str(img.get('class', []))
+                        src_val = str(image.attrs.get('src', 'NONE'))[:60]
+                        data_src_val = str(image.attrs.get('data-src', 'NONE'))[:60]
+                        classes_val = str(image.attrs.get('class', '').split())
                         _safe_print(f"[BRAND]     {i}. src={src_val}")
                         _safe_print(f"[BRAND]        data-src={data_src_val}")
                         _safe_print(f"[BRAND]        classes={classes_val}")
                     except:
                         _safe_print(f"[BRAND]     {i}. [Image tag contains Unicode]")
-            else:
+            elif not page.img_count:
                 _safe_print(f"[BRAND]   No <img> tags found in HTML at all!")
         
         # NEW APPROACH: Download and store images, return our backend URLs (only if fetch succeeded)
@@ -1264,9 +1228,16 @@ async def _extract_brand_attributes(url: str, org_id: Optional[str] = None) -> B
         final_imagery = stored_imagery if stored_imagery else (imagery[:6] if imagery else [])
         _safe_print(f"[BRAND] Returning {len(final_imagery)} images in response")
 
+        # Sites with little CSS color: fill the palette from the brand imagery itself
+        if stored_imagery and len(color_palette) < 3:
+            image_colors = await asyncio.to_thread(_palette_from_stored_images, stored_imagery)
+            if image_colors:
+                _safe_print(f"[BRAND] Colors from imagery: {image_colors}")
+                color_palette = _deduplicate_preserve_order(color_palette + image_colors)[:10]
+
         # Safely extract title, handling Unicode encoding issues
         try:
-            title = soup.title.string.strip() if soup.title and soup.title.string else None
+            title = page.title.strip() if page.title else None
             # Ensure title is a valid string that can be encoded
             if title:
                 title = title.encode('utf-8', errors='replace').decode('utf-8')
@@ -1279,13 +1250,7 @@ async def _extract_brand_attributes(url: str, org_id: Optional[str] = None) -> B
 
         # Safely extract description, handling Unicode encoding issues
         try:
-            description_tag = soup.find("meta", attrs={"name": "description"})
-            og_description = soup.find("meta", property="og:description")
-            description = (
-                (description_tag.get("content") if description_tag else None)
-                or (og_description.get("content") if og_description else None)
-                or None
-            )
+            description = page.meta.get("description") or page.meta.get("og:description") or None
             # Ensure description is a valid string that can be encoded
             if description:
                 description = description.encode('utf-8', errors='replace').decode('utf-8')
@@ -1304,38 +1269,21 @@ async def _extract_brand_attributes(url: str, org_id: Optional[str] = None) -> B
         
         if html and not fetch_failed:
             # Extract header content (excluding navigation)
-            header = soup.find("header")
-            if header:
-                header_copy = BeautifulSoup(str(header), 'html.parser')
-                for nav in header_copy.find_all("nav"):
-                    nav.decompose()
-                header_text = header_copy.get_text(separator=" ", strip=True)
-                if header_text and len(header_text) > 10:
-                    header_content = header_text
+            header_text = page.text("header")
+            if header_text and len(header_text) > 10:
+                header_content = header_text
             
             # Extract footer content
-            footer = soup.find("footer")
-            if footer:
-                footer_text = footer.get_text(separator=" ", strip=True)
-                if footer_text and len(footer_text) > 10:
-                    footer_content = footer_text
+            footer_text = page.text("footer")
+            if footer_text and len(footer_text) > 10:
+                footer_content = footer_text
             
             # Extract main content - try multiple strategies to get ALL text
-            main = soup.find("main") or soup.find("article") or soup.find("body")
-            if main:
-                text_content = main.get_text(separator=" ", strip=True)
-            else:
-                text_content = soup.get_text(separator=" ", strip=True)
+            text_content = page.main_text(" ")
             
             # If content is short, also try getting structured content from all elements
             if len(text_content) < 2000:
-                structured_parts = []
-                for selector in ['h1', 'h2', 'h3', 'h4', 'p', 'li', 'div[class*="content"]', 'div[class*="text"]', 'section', 'article']:
-                    elements = soup.select(selector)
-                    for elem in elements[:200]:  # Increase limit
-                        elem_text = elem.get_text(strip=True)
-                        if elem_text and len(elem_text) > 5:  # Lower threshold to get more content
-                            structured_parts.append(elem_text)
+                structured_parts = page.structured_parts()
                 
                 if structured_parts:
                     structured_text = " ".join(structured_parts)
@@ -1360,52 +1308,9 @@ async def _extract_brand_attributes(url: str, org_id: Optional[str] = None) -> B
             except Exception:
                 # If encoding fails, try to clean it
                 text_content = text_content.encode('ascii', errors='ignore').decode('ascii')
-            
-            # Also try to extract footer pages content
-            footer_links = []
-            if footer:
-                for link in footer.find_all("a", href=True):
-                    href = link.get("href")
-                    if href:
-                        full_url = urljoin(base_url, href)
-                        parsed_link = urlparse(full_url)
-                        parsed_base = urlparse(base_url)
-                        # Only include same-domain links
-                        if parsed_link.netloc == parsed_base.netloc:
-                            link_text = link.get_text(strip=True)
-                            if link_text and len(link_text) > 2:
-                                footer_links.append({
-                                    "url": full_url,
-                                    "text": link_text
-                                })
         
-            # Extract content from multiple pages (up to 10 pages)
-            all_internal_links = []
-            
-            # Get footer links
-            if footer_links:
-                all_internal_links.extend(footer_links)
-            
-            # Also get navigation links from header/nav
-            nav = soup.find("nav")
-            if nav:
-                for link in nav.find_all("a", href=True):
-                    href = link.get("href")
-                    if href:
-                        full_url = urljoin(base_url, href)
-                        parsed_link = urlparse(full_url)
-                        parsed_base = urlparse(base_url)
-                        # Only include same-domain links
-                        if parsed_link.netloc == parsed_base.netloc:
-                            link_text = link.get_text(strip=True)
-                            if link_text and len(link_text) > 2:
-                                link_info = {
-                                    "url": full_url,
-                                    "text": link_text
-                                }
-                                # Avoid duplicates
-                                if not any(existing['url'] == full_url for existing in all_internal_links):
-                                    all_internal_links.append(link_info)
+            # Extract content from multiple pages (up to 10 pages): same-domain footer links, then nav links
+            all_internal_links = page.internal_links(base_url)
             
             # Extract content from up to 10 pages
             pages_text = []
@@ -1428,76 +1333,17 @@ async def _extract_brand_attributes(url: str, org_id: Optional[str] = None) -> B
                 # Combine: important first, then others, limit to 10 total
                 links_to_extract = (prioritized_links + other_links)[:10]
                 
-                # Extract content from selected pages
-                for link_info in links_to_extract:
-                    try:
-                        page_url = link_info['url']
-                        # Safely print link text (may contain Unicode)
-                        try:
-                            link_text = link_info['text'].encode('utf-8', errors='replace').decode('utf-8')
-                        except:
-                            link_text = str(link_info['text'])[:50]
-                        _safe_print(f"[BRAND] Analyzing page {len(pages_text) + 1}/10: {link_text} ({page_url})")
-                        
-                        # Use same headers as main request
-                        headers = {
-                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                            'Accept-Language': 'en-US,en;q=0.5',
-                        }
-                        async with session.get(page_url, timeout=aiohttp.ClientTimeout(total=15), headers=headers, allow_redirects=True) as page_response:
-                            if page_response.status == 200:
-                                page_html = await page_response.text(encoding='utf-8', errors='replace')
-                                page_soup = BeautifulSoup(page_html, "html.parser")
-                                
-                                # Remove scripts/styles
-                                for script in page_soup(["script", "style"]):
-                                    script.decompose()
-                                
-                                # Extract content - try multiple strategies to get ALL text
-                                page_content = page_soup.find("main") or page_soup.find("article") or page_soup.find("body")
-                                
-                                if page_content:
-                                    # Get all text from the page content
-                                    page_text = page_content.get_text(separator=" ", strip=True)
-                                    
-                                    # If main content is short, also try getting structured content
-                                    if len(page_text) < 1000:
-                                        # Try to get more structured content
-                                        structured_parts = []
-                                        for selector in ['h1', 'h2', 'h3', 'h4', 'p', 'li', 'div[class*="content"]', 'div[class*="text"]']:
-                                            elements = page_soup.select(selector)
-                                            for elem in elements[:100]:  # Increase limit
-                                                elem_text = elem.get_text(strip=True)
-                                                if elem_text and len(elem_text) > 5:  # Lower threshold
-                                                    structured_parts.append(elem_text)
-                                        
-                                        if structured_parts:
-                                            structured_text = " ".join(structured_parts)
-                                            if len(structured_text) > len(page_text):
-                                                page_text = structured_text
-                                    
-                                    # Use more text per page (increased from 2000 to 8000)
-                                    if page_text and len(page_text) > 20:  # Lower threshold from 50
-                                        # Ensure page_text is safely encoded
-                                        try:
-                                            page_text = page_text.encode('utf-8', errors='replace').decode('utf-8')
-                                        except:
-                                            pass
-                                        pages_text.append(page_text[:8000])  # Increased from 2000 to 8000 chars per page
-                                        # Safely print link text
-                                        try:
-                                            link_text = link_info['text'].encode('utf-8', errors='replace').decode('utf-8')
-                                        except:
-                                            link_text = str(link_info['text'])[:50]
-                                        _safe_print(f"[BRAND] Extracted {len(page_text)} chars from {link_text} (using {min(len(page_text), 8000)} chars)")
-                                    
-                                    # Stop if we've extracted from 10 pages
-                                    if len(pages_text) >= 10:
-                                        break
-                    except Exception as e:
-                        _safe_print(f"[BRAND] Failed to extract page {link_info['url']}: {e}")
-                        continue
+                # Fetch the selected pages concurrently, stopping once Brand DNA has enough text
+                crawled = await crawler.crawl(
+                    [link_info['url'] for link_info in links_to_extract],
+                    functools.partial(extract_page_text, separator=" "),
+                    max_pages=10,
+                    min_chars=max(0, BRAND_DNA_TEXT_LIMIT - len(text_content)) or 1,
+                    time_budget=CRAWL_TIME_BUDGET
+                )
+                for page_url, page_text in crawled:
+                    pages_text.append(page_text)
+                    _safe_print(f"[BRAND] Extracted {len(page_text)} chars from {page_url}")
             
             if pages_text:
                 # Ensure all page texts are safely encoded before joining
@@ -2064,6 +1910,11 @@ async def _try_generate_with_fallback(
 
 
 @router.post("/discover", response_model=BrandDiscoveryResponse)
+@coalesce(
+    "brand-discover",
+    key=lambda request: request_key({"url": request.url.strip().lower().rstrip("/"), "org_id": request.org_id}),
+    result_ttl=30.0
+)
 async def discover_brand(request: BrandDiscoveryRequest):
     """Brand discovery endpoint with comprehensive error handling"""
     try:
@@ -2124,6 +1975,7 @@ async def discover_brand(request: BrandDiscoveryRequest):
 
 
 @router.post("/campaign-previews", response_model=CampaignPreviewResponse)
+@coalesce("brand-campaign-previews")
 async def generate_campaign_previews(request: CampaignPreviewRequest):
     db = get_db()
     org_id = request.org_id
@@ -2343,6 +2195,7 @@ async def generate_campaign_previews(request: CampaignPreviewRequest):
 
 
 @router.post("/post-previews", response_model=PostPreviewResponse)
+@coalesce("brand-post-previews")
 async def generate_post_previews(request: PostPreviewRequest):
     db = get_db()
     campaign_doc = await db.campaigns.find_one({"id": request.campaign_id}, {"_id": 0})
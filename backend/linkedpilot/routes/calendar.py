@@ -0,0 +1,263 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from typing import Any, Dict, List
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+
+from ..models.calendar import CalendarItem
+from ..models.campaign import AIGeneratedPostStatus
+from ..models.scheduled_post import PostStatus
+from ..utils.summaries import first_asset_url_expr, image_ref_expr, thumbnail_url
+
+router = APIRouter(prefix="/calendar", tags=["calendar"])
+
+def get_db():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return client[os.environ['DB_NAME']]
+
+# Window matches on the stored time fields, and the lookups the feed joins on
+CALENDAR_INDEXES = {
+    "scheduled_posts": [[("org_id", 1), ("publish_time", 1)]],
+    "ai_generated_posts": [[("org_id", 1), ("scheduled_for", 1)]],
+    "drafts": [[("id", 1)]],
+    "posts": [[("scheduled_post_id", 1)]],
+}
+
+# Feed entries for one window at most
+CALENDAR_FEED_LIMIT = 1000
+
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%S.%LZ"
+
+
+async def ensure_calendar_indexes(db) -> None:
+    for collection_name, indexes in CALENDAR_INDEXES.items():
+        for keys in indexes:
+            try:
+                await db[collection_name].create_index(keys)
+            except Exception as e:
+                print(f"[CALENDAR] WARNING: could not create index {keys} on {collection_name}: {e}")
+
+
+def _to_date(expr: Any) -> Dict[str, Any]:
+    """
+    Expression: a stored time as a date
+
+    Times are stored both as datetimes and as ISO strings (naive or with a
+    UTC offset, with or without fractions). Strings are parsed whole, so an
+    offset is applied and naive strings are read as UTC; fractions are kept
+    to the millisecond. Anything unparseable becomes null.
+    """
+    return {"$switch": {
+        "branches": [
+            {"case": {"$eq": [{"$type": expr}, "date"]}, "then": expr},
+            {"case": {"$eq": [{"$type": expr}, "string"]}, "then": {"$dateFromString": {
+                "dateString": expr,
+                "onError": None
+            }}},
+        ],
+        "default": None
+    }}
+
+
+def _iso(expr: Any) -> Dict[str, Any]:
+    return {"$dateToString": {"date": expr, "format": ISO_FORMAT, "onNull": None}}
+
+
+def _parse_bound(value: str, name: str) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid {name}: expected an ISO 8601 date")
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _range_match(field: str, range_start: str, range_end: str) -> Dict[str, Any]:
+    """Window on a time field stored as either strings or dates (both halves use the same index)"""
+    start, end = _parse_bound(range_start, "range_start"), _parse_bound(range_end, "range_end")
+    return {"$or": [
+        {field: {"$gte": range_start, "$lte": range_end}},
+        {field: {"$gte": start, "$lte": end}},
+    ]}
+
+
+def _scheduled_match(org_id: str, range_start: str, range_end: str, include_cancelled: bool) -> Dict[str, Any]:
+    match = {"org_id": org_id, **_range_match("publish_time", range_start, range_end)}
+    if not include_cancelled:
+        match["status"] = {"$nin": [PostStatus.CANCELLED.value, "deleted"]}
+    return match
+
+
+def _ai_match(org_id: str, range_start: str, range_end: str) -> Dict[str, Any]:
+    return {
+        "org_id": org_id,
+        "status": {"$in": [AIGeneratedPostStatus.APPROVED.value, AIGeneratedPostStatus.POSTED.value]},
+        **_range_match("scheduled_for", range_start, range_end)
+    }
+
+
+def _draft_lookup(project: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"$lookup": {
+            "from": "drafts",
+            "localField": "draft_id",
+            "foreignField": "id",
+            "as": "draft",
+            "pipeline": [{"$project": {"_id": 0, **project}}, {"$limit": 1}]
+        }},
+        {"$set": {"draft": {"$first": "$draft"}}},
+    ]
+
+
+def _validator_pipeline(scheduled_match: Dict[str, Any], ai_match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Just enough of every entry to tell whether the window changed: id, status, time, latest updated_at"""
+    return [
+        {"$match": scheduled_match},
+        *_draft_lookup({"updated_at": 1}),
+        {"$project": {
+            "_id": 0, "id": 1, "status": 1, "t": "$publish_time",
+            "u": {"$max": [_to_date("$updated_at"), _to_date("$draft.updated_at")]},
+        }},
+        {"$unionWith": {"coll": "ai_generated_posts", "pipeline": [
+            {"$match": ai_match},
+            {"$project": {"_id": 0, "id": 1, "status": 1, "t": "$scheduled_for", "u": _to_date("$updated_at")}},
+        ]}},
+    ]
+
+
+def _feed_pipeline(scheduled_match: Dict[str, Any], ai_match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Both collections normalized into CalendarItem fields and sorted by time, in one aggregation"""
+    scheduled = [
+        {"$match": scheduled_match},
+        *_draft_lookup({
+            "org_id": 1, "mode": 1, "campaign_id": 1, "updated_at": 1,
+            "linkedin_author_type": 1, "linkedin_author_id": 1,
+            "title": "$content.title",
+            "body": "$content.body",
+            "image_ref": image_ref_expr({"$ifNull": [first_asset_url_expr(), "$content.image_url"]}),
+        }),
+        {"$lookup": {
+            "from": "posts",
+            "localField": "id",
+            "foreignField": "scheduled_post_id",
+            "as": "published",
+            "pipeline": [{"$project": {"_id": 0, "platform_url": 1, "posted_at": 1}}, {"$limit": 1}]
+        }},
+        {"$set": {"published": {"$first": "$published"}}},
+        # Drafts of another org are never shown (the list endpoint checks this too)
+        {"$set": {"draft": {"$cond": [{"$eq": ["$draft.org_id", "$org_id"]}, "$draft", None]}}},
+        {"$project": {
+            "_id": 0,
+            "id": 1,
+            "source": {"$literal": "scheduled"},
+            "time": _to_date("$publish_time"),
+            "status": 1,
+            "is_posted": {"$or": [
+                {"$eq": ["$status", PostStatus.POSTED.value]},
+                {"$ne": [{"$type": "$published"}, "missing"]},
+            ]},
+            "title": "$draft.title",
+            "content": {"$ifNull": ["$draft.body", ""]},
+            "image_ref": "$draft.image_ref",
+            "version": "$draft.updated_at",
+            "mode": "$draft.mode",
+            "draft_id": 1,
+            "campaign_id": "$draft.campaign_id",
+            "profile_type": {"$ifNull": ["$draft.linkedin_author_type", "personal"]},
+            "linkedin_author_id": "$draft.linkedin_author_id",
+            "platform_url": {"$ifNull": ["$platform_url", "$published.platform_url"]},
+            "posted_at": _iso(_to_date("$published.posted_at")),
+        }},
+    ]
+    ai = [
+        {"$match": ai_match},
+        {"$project": {
+            "_id": 0,
+            "id": 1,
+            "source": {"$literal": "ai"},
+            "time": _to_date("$scheduled_for"),
+            "status": 1,
+            "is_posted": {"$eq": ["$status", AIGeneratedPostStatus.POSTED.value]},
+            "content": {"$ifNull": ["$content", ""]},
+            "image_ref": image_ref_expr("$image_url"),
+            "version": "$updated_at",
+            "campaign_id": 1,
+            "profile_type": 1,
+            "author_name": 1,
+            "platform_url": 1,
+            "posted_at": _iso(_to_date("$posted_at")),
+        }},
+    ]
+    return [
+        *scheduled,
+        {"$unionWith": {"coll": "ai_generated_posts", "pipeline": ai}},
+        {"$sort": {"time": 1, "id": 1}},
+        {"$limit": CALENDAR_FEED_LIMIT},
+        {"$set": {"scheduled_for": _iso("$time")}},
+        {"$unset": "time"},
+    ]
+
+
+def _feed_etag(org_id: str, params: List[Any], entries: List[Dict[str, Any]]) -> str:
+    latest = max((entry["u"] for entry in entries if entry.get("u")), default=None)
+    fingerprint = sorted((entry.get("id") or "", str(entry.get("status")), str(entry.get("t"))) for entry in entries)
+    digest = hashlib.blake2b(
+        json.dumps([org_id, params, str(latest), fingerprint], separators=(",", ":")).encode("utf-8"),
+        digest_size=16
+    )
+    return f'W/"{digest.hexdigest()}"'
+
+
+@router.get(
+    "/feed",
+    response_model=None,
+    responses={200: {"model": List[CalendarItem]}, 304: {"description": "Window unchanged since the ETag"}}
+)
+async def get_calendar_feed(
+    org_id: str,
+    range_start: str,
+    range_end: str,
+    request: Request,
+    include_cancelled: bool = False
+):
+    """Scheduled posts and approved AI posts in a date window, as one time-sorted stream
+
+    Replaces separate /scheduled-posts and /ai-content/approved-posts calls for
+    the calendar. Entries carry a thumbnail URL rather than the image itself.
+    The ETag reflects the latest updated_at and the id/status/time of every
+    entry in the window, so an unchanged week answers If-None-Match with 304.
+    """
+    db = get_db()
+    scheduled_match = _scheduled_match(org_id, range_start, range_end, include_cancelled)
+    ai_match = _ai_match(org_id, range_start, range_end)
+
+    validators = await db.scheduled_posts.aggregate(
+        _validator_pipeline(scheduled_match, ai_match)
+    ).to_list(length=None)
+    etag = _feed_etag(org_id, [range_start, range_end, include_cancelled], validators)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    if_none_match = request.headers.get('if-none-match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=304, headers=headers)
+
+    items = await db.scheduled_posts.aggregate(
+        _feed_pipeline(scheduled_match, ai_match)
+    ).to_list(length=None)
+
+    for item in items:
+        embedded_url = (
+            f"/api/drafts/{item.get('draft_id')}/thumbnail" if item["source"] == "scheduled"
+            else f"/api/ai-content/posts/{item['id']}/thumbnail"
+        )
+        image_ref = item.pop("image_ref", None)
+        version = item.pop("version", None)
+        item["thumbnail_url"] = thumbnail_url(image_ref, embedded_url, version)
+        item["image_url"] = image_ref if image_ref and not image_ref.startswith("data:") else None
+
+    print(f"[CALENDAR] Feed for org {org_id}: {len(items)} entries ({range_start} to {range_end})")
+    return JSONResponse(content=items, headers=headers)
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from typing import List, Dict, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Literal, Optional
 from datetime import datetime
 import os
 import base64
+import asyncio
 import hashlib
+import json
 
 from ..models.draft import Draft, DraftMode, DraftStatus
 from ..models.prompt_history import PromptHistory, PromptType, PromptAction
 from ..adapters.llm_adapter import LLMAdapter
 from ..adapters.image_adapter import ImageAdapter
+from ..utils.pagination import MAX_PAGE_SIZE, page_response, paginate, with_sort_keys
+from ..utils.singleflight import coalesce, request_key
+from ..utils.summaries import DRAFT_SUMMARY_PROJECTION, data_url_thumbnail, draft_summary, first_asset_url_expr
 import base64
 import io
 from PIL import Image, ImageDraw
@@ -40,6 +46,15 @@ class DraftChatRequest(PydanticBaseModel):
     user_id: str
     generate_with_image: Optional[bool] = True  # Flag to trigger image generation (default: always generate)
 
+class RatioExportRequest(PydanticBaseModel):
+    image_url: str  # data URL or http(s) URL of the base image (without overlays)
+    elements: List[Dict] = []  # Overlay elements as returned by the advanced overlay system
+    ratios: List[str] = ["1:1", "4:5", "1.91:1"]  # width:height
+    output_format: str = "auto"  # auto, PNG, JPEG or WEBP
+
+# Aspect ratios rendered per export request at most
+MAX_EXPORT_RATIOS = 6
+
 
 router = APIRouter(prefix="/drafts", tags=["drafts"])
 # Force reload for chat endpoint
@@ -314,7 +329,7 @@ async def create_draft(draft: Draft):
     draft_dict['created_at'] = datetime.utcnow().isoformat()
     draft_dict['updated_at'] = datetime.utcnow().isoformat()
     
-    await db.drafts.insert_one(draft_dict)
+    await db.drafts.insert_one(with_sort_keys("drafts", draft_dict))
     return draft
 
 @router.post("/generate")
@@ -553,6 +568,13 @@ async def fetch_stock_image(request: ImageGenerateRequest):
         )
 
 @router.post("/generate-image")
+@coalesce(
+    "drafts-generate-image",
+    # Retries may come from a new progress session; the image is the same request
+    key=lambda request: request_key(request, exclude={"session_id"}),
+    result_ttl=5.0,
+    lease_ttl=180.0
+)
 async def generate_image_for_draft(request: ImageGenerateRequest):
     """
     Generate image for a draft with Gemini 3 Pro Image Preview as default and Stock as fallback:
@@ -1127,11 +1149,10 @@ async def _generate_fallback_overlay(request: AIOverlayRequest):
         "template_id": "fallback-overlay-left-side"
     }
 
-@router.post("/generate-carousel")
-async def generate_carousel_draft(request: DraftGenerateRequest):
-    """Generate carousel draft with AI content and images"""
+async def _prepare_carousel(request: DraftGenerateRequest, endpoint: str):
+    """Generate carousel text content and the image adapter for its slides"""
     print(f"\n{'='*60}")
-    print(f"🎠 /api/drafts/generate-carousel called")
+    print(f"🎠 /api/drafts/{endpoint} called")
     print(f"   User ID: {request.created_by}")
     print(f"   Topic: {request.topic}")
     
@@ -1159,26 +1180,32 @@ async def generate_carousel_draft(request: DraftGenerateRequest):
     carousel_data = await llm.generate_carousel_content(context)
     
     print(f"✅ Carousel content generated: {len(carousel_data.get('slides', []))} slides")
+    return image_adapter, carousel_data
+
+
+def _carousel_slide(slide: dict, image: dict) -> dict:
+    result = {
+        "title": slide['title'],
+        "content": slide['content'],
+        "image_url": image.get('url')
+    }
+    if image.get('error'):
+        result["error"] = image['error']
+    return result
+
+
+@router.post("/generate-carousel")
+async def generate_carousel_draft(request: DraftGenerateRequest):
+    """Generate carousel draft with AI content and images
     
-    # Generate images for each slide
-    slides_with_images = []
-    for i, slide in enumerate(carousel_data.get('slides', [])):
-        print(f"   Generating image for slide {i+1}...")
-        # Generate cinematic carousel slide prompt
-        from linkedpilot.utils.cinematic_image_prompts import generate_carousel_slide_prompt
-        enhanced_image_prompt = generate_carousel_slide_prompt(
-            slide['title'], 
-            slide['content'], 
-            i + 1, 
-            len(carousel_data.get('slides', []))
-        )
-        image_data = await image_adapter.generate_image(enhanced_image_prompt, request.tone)
-        
-        slides_with_images.append({
-            "title": slide['title'],
-            "content": slide['content'],
-            "image_url": image_data.get('url')
-        })
+    Slide images are generated concurrently (capped per provider), so the
+    wait is roughly the slowest slide rather than the sum of all of them."""
+    image_adapter, carousel_data = await _prepare_carousel(request, "generate-carousel")
+    slides = carousel_data.get('slides', [])
+    
+    print(f"   Generating images for {len(slides)} slides concurrently...")
+    images = await image_adapter.generate_carousel_images(slides, request.tone)
+    slides_with_images = [_carousel_slide(slide, image) for slide, image in zip(slides, images)]
     
     print(f"{'='*60}\n")
     
@@ -1190,6 +1217,44 @@ async def generate_carousel_draft(request: DraftGenerateRequest):
         "type": "carousel"
     }
 
+
+@router.post("/generate-carousel/stream")
+async def stream_carousel_draft(request: DraftGenerateRequest):
+    """Generate a carousel draft, streaming progress as newline-delimited JSON
+    
+    Events, one JSON object per line:
+    - {"event": "content", ...}: caption, hashtags and slide text, before any image
+    - {"event": "slide", "index", "slide"}: each slide as soon as its image is ready
+    - {"event": "done", ...}: the complete draft, same shape as /generate-carousel"""
+    image_adapter, carousel_data = await _prepare_carousel(request, "generate-carousel/stream")
+    slides = carousel_data.get('slides', [])
+    
+    async def events():
+        yield json.dumps({
+            "event": "content",
+            "caption": carousel_data.get('caption'),
+            "hashtags": carousel_data.get('hashtags', []),
+            "slides": [{"title": s['title'], "content": s['content']} for s in slides]
+        }) + "\n"
+        
+        slides_with_images = [None] * len(slides)
+        async for image in image_adapter.iter_carousel_images(slides, request.tone):
+            index = image["slide_number"] - 1
+            slides_with_images[index] = _carousel_slide(slides[index], image)
+            yield json.dumps({"event": "slide", "index": index, "slide": slides_with_images[index]}) + "\n"
+        
+        print(f"{'='*60}\n")
+        yield json.dumps({
+            "event": "done",
+            "caption": carousel_data.get('caption'),
+            "slides": slides_with_images,
+            "hashtags": carousel_data.get('hashtags', []),
+            "org_id": request.org_id,
+            "type": "carousel"
+        }) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @router.post("/generate-full")
 async def generate_full_draft(org_id: str, campaign_id: str, mode: str, author_id: str, context: Dict = {}):
     """Generate draft content using AI"""
@@ -1210,27 +1275,52 @@ async def generate_full_draft(org_id: str, campaign_id: str, mode: str, author_i
     draft_dict['created_at'] = datetime.utcnow().isoformat()
     draft_dict['updated_at'] = datetime.utcnow().isoformat()
     
-    await db.drafts.insert_one(draft_dict)
+    await db.drafts.insert_one(with_sort_keys("drafts", draft_dict))
     return draft
 
-@router.get("", response_model=List[Draft])
-async def list_drafts(org_id: str):
-    """List all drafts for an organization"""
+@router.get("")
+async def list_drafts(
+    org_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full"
+):
+    """List drafts for an organization, newest first
+    
+    Pass `limit` and/or `cursor` for {"items", "next_cursor"} pages; without
+    them the first 100 drafts are returned as a list (X-Next-Cursor header
+    when there are more). view=summary returns DraftSummary rows (title,
+    excerpt, thumbnail URL) instead of whole drafts."""
     db = get_db()
-    drafts = await db.drafts.find({"org_id": org_id}).to_list(length=100)
+    paginated = limit is not None or cursor is not None
     
-    for d in drafts:
+    if view == "summary":
+        page = await paginate(
+            db.drafts, {"org_id": org_id}, "created_at",
+            limit=limit or 100, cursor=cursor, projection=DRAFT_SUMMARY_PROJECTION
+        )
+        page.items = [draft_summary(d) for d in page.items]
+        return page_response(page, response, paginated)
+    
+    page = await paginate(
+        db.drafts, {"org_id": org_id}, "created_at",
+        limit=limit or 100, cursor=cursor, projection={"_id": 0}
+    )
+    
+    for d in page.items:
         if isinstance(d.get('created_at'), str):
             d['created_at'] = datetime.fromisoformat(d['created_at'])
         if isinstance(d.get('updated_at'), str):
             d['updated_at'] = datetime.fromisoformat(d['updated_at'])
+    page.items = [Draft(**d) for d in page.items]
     
-    return [Draft(**d) for d in drafts]
+    return page_response(page, response, paginated)
 
 @router.get("/google-fonts")
 async def get_google_fonts():
     """Get list of available Google Fonts"""
-    from linkedpilot.utils.image_text_overlay import get_google_fonts_list
+    from linkedpilot.utils.font_store import get_google_fonts_list
     fonts = get_google_fonts_list()
     return {"fonts": fonts}
 
@@ -1254,20 +1344,12 @@ async def generate_ai_text_overlay(request: Dict):
     image_description = request_data.get('imageDescription', '')
     image_url = request_data.get('imageUrl', '')  # Image URL or base64 data URL
     
-    # Get image as base64
-    image_base64 = None
+    # Load the image once; every later stage shares this decoded context
+    from linkedpilot.utils.image_context import ImageContext
+    image_context = None
     if image_url:
         try:
-            import httpx
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                if image_url.startswith('data:image'):
-                    # Extract base64 from data URL
-                    header, encoded = image_url.split(',', 1)
-                    image_base64 = encoded
-                else:
-                    # Fetch image and convert to base64
-                    response = await client.get(image_url)
-                    image_base64 = base64.b64encode(response.content).decode()
+            image_context = await ImageContext.fetch(image_url)
         except Exception as e:
             print(f"[WARNING] Failed to fetch image: {e}")
             raise HTTPException(status_code=400, detail=f"Failed to load image: {str(e)}")
@@ -1319,16 +1401,20 @@ async def generate_ai_text_overlay(request: Dict):
             preferred_composition = template_map[preferred_template]
             print(f"[ADVANCED SYSTEM] Using preferred template: {preferred_template}")
     
+    # Optional cap on the layout search, in milliseconds
+    layout_time_budget_ms = request_data.get('layout_time_budget_ms')
+    
     try:
         # Use advanced AI system
         print(f"[ADVANCED SYSTEM] Generating with {len(text_elements)} text elements")
         candidates = await generate_ai_text_overlay(
-            image_base64=image_base64,
+            image_base64=image_context,
             text_elements=text_elements,
             top_n=1,  # Return best candidate
             use_template=True,
             use_cache=True,
-            preferred_composition=preferred_composition  # Pass preferred template
+            preferred_composition=preferred_composition,  # Pass preferred template
+            layout_time_budget_ms=layout_time_budget_ms
         )
         
         if not candidates:
@@ -1337,9 +1423,7 @@ async def generate_ai_text_overlay(request: Dict):
         # Convert to frontend format (percentages)
         # The advanced system returns a list of candidate dictionaries
         result = []
-        img_data = base64.b64decode(image_base64)
-        img = Image.open(io.BytesIO(img_data))
-        img_width, img_height = img.size
+        img_width, img_height = image_context.size
         
         # Validate image dimensions to prevent ZeroDivisionError
         if img_width == 0 or img_height == 0:
@@ -1481,9 +1565,7 @@ Return JSON format:
             llm_data = json.loads(response_text.strip())
             
             # Convert to frontend format
-            img_data = base64.b64decode(image_base64)
-            img = Image.open(io.BytesIO(img_data))
-            img_width, img_height = img.size
+            img_width, img_height = image_context.size
             
             # Validate image dimensions (even though we use hardcoded percentages, validate for safety)
             if img_width == 0 or img_height == 0:
@@ -1594,6 +1676,18 @@ async def get_draft(draft_id: str):
     
     return Draft(**draft)
 
+@router.get("/{draft_id}/thumbnail")
+async def get_draft_thumbnail(draft_id: str, request: Request, size: str = "thumb"):
+    """WebP thumbnail of a draft's first image (what summary rows link to)"""
+    db = get_db()
+    draft = await db.drafts.find_one(
+        {"id": draft_id},
+        {"_id": 0, "url": first_asset_url_expr()}
+    )
+    if not draft:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    return await data_url_thumbnail(draft.get("url"), size, request)
+
 @router.put("/{draft_id}", response_model=Draft)
 async def update_draft(draft_id: str, draft: Draft):
     """Update an existing draft"""
@@ -1615,7 +1709,7 @@ async def update_draft(draft_id: str, draft: Draft):
     # Update draft in database
     result = await db.drafts.update_one(
         {"id": draft_id},
-        {"$set": update_data}
+        {"$set": with_sort_keys("drafts", update_data)}
     )
     
     if result.modified_count == 0:
@@ -1743,6 +1837,7 @@ async def add_text_overlay(request: dict):
     
     try:
         from linkedpilot.utils.image_text_overlay import add_text_overlay_to_image
+        from linkedpilot.utils.image_encoding import data_url_for_base64
         
         image_base64 = request.get('image_base64')
         text = request.get('text', '')
@@ -1768,10 +1863,21 @@ async def add_text_overlay(request: dict):
         rotation = request.get('rotation', 0)
         width = request.get('width', 300)
         height = request.get('height', 100)
+        output_format = request.get('output_format', 'auto')
+        target_bytes = request.get('target_bytes')
         
         if not image_base64:
             raise HTTPException(status_code=400, detail="image_base64 is required")
         
+        # Byte budget for the encoder: a positive int, or omitted for no budget
+        if target_bytes is not None:
+            try:
+                target_bytes = int(target_bytes)
+            except (TypeError, ValueError):
+                target_bytes = 0
+            if target_bytes <= 0:
+                raise HTTPException(status_code=422, detail="Invalid target_bytes: expected a positive integer")
+        
         # Convert position to tuple
         position_tuple = (int(position[0]), int(position[1]))
         
@@ -1800,7 +1906,9 @@ async def add_text_overlay(request: dict):
             line_height=line_height,
             rotation=rotation,
             width=width,
-            height=height
+            height=height,
+            output_format=output_format,
+            target_bytes=target_bytes
         )
         
         print(f"[SUCCESS] Text overlay added successfully!")
@@ -1809,9 +1917,11 @@ async def add_text_overlay(request: dict):
         return {
             "success": True,
             "image_base64": result_image,
-            "url": f"data:image/png;base64,{result_image}"
+            "url": data_url_for_base64(result_image)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] Text overlay failed: {e}")
         print(f"{'='*60}\n")
@@ -1819,6 +1929,51 @@ async def add_text_overlay(request: dict):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Text overlay failed: {str(e)}")
 
+def _parse_ratio(value: str):
+    """'4:5' -> (4, 5); whole numbers stay ints so the response keys read as sent"""
+    try:
+        parts = [float(part) for part in value.split(':')]
+    except ValueError:
+        parts = []
+    if len(parts) != 2 or not all(0 < part < 100 for part in parts):
+        raise HTTPException(status_code=422, detail=f"Invalid ratio '{value}': expected width:height, e.g. 4:5")
+    return tuple(int(part) if part.is_integer() else part for part in parts)
+
+
+@router.post("/export-ratios")
+async def export_ratios(request: RatioExportRequest):
+    """Export an image with its overlay in several aspect ratios (content-aware crops, overlays re-fit per ratio)"""
+    from linkedpilot.utils.ai_text_overlay_advanced import export_multi_ratio_async, overlay_element_from_dict
+    from linkedpilot.utils.image_context import ImageContext
+    from linkedpilot.utils.image_encoding import MIME_TYPES, data_url_for_base64
+
+    if not request.ratios or len(request.ratios) > MAX_EXPORT_RATIOS:
+        raise HTTPException(status_code=422, detail=f"Between 1 and {MAX_EXPORT_RATIOS} ratios are required")
+    ratios = [_parse_ratio(ratio) for ratio in request.ratios]
+    output_format = request.output_format.upper()
+    if output_format != "AUTO" and output_format not in MIME_TYPES:
+        raise HTTPException(status_code=422, detail=f"Unsupported output_format: {request.output_format}")
+    try:
+        elements = [overlay_element_from_dict(element) for element in request.elements]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        image_context = await ImageContext.fetch(request.image_url)
+        base_image = image_context.rgb
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to load image: {str(e)}")
+
+    print(f"[EXPORT] Rendering {len(ratios)} ratios with {len(elements)} overlay elements")
+    exports = await export_multi_ratio_async(base_image, elements, ratios, output_format)
+
+    result = {}
+    for ratio_str, data in exports.items():
+        image_base64 = base64.b64encode(data).decode()
+        result[ratio_str] = {"image_base64": image_base64, "url": data_url_for_base64(image_base64)}
+    return {"success": True, "exports": result}
+
+
 @router.post("/auto-detect-text-position")
 async def auto_detect_text_position(request: dict):
     """AI suggests optimal text overlay position and styling"""
@@ -2004,30 +2159,6 @@ async def chat_draft(request: DraftChatRequest):
                                         print(f"   [WARNING] Could not get image dimensions: {dim_error}")
                                         img_width, img_height = 1200, 627
                                     
-                                    # Use Tesseract OCR for precise text coordinate extraction
-                                    try:
-                                        from ..utils.tesseract_extractor import extract_text_with_tesseract
-                                        
-                                        print(f"   [TEXT EXTRACTION] Using Tesseract OCR for precise text coordinates...")
-                                        
-                                        # Extract text with Tesseract
-                                        tesseract_results = extract_text_with_tesseract(image_base64)
-                                        
-                                        # Store Tesseract results for coordinate merging, but always use Gemini Vision for font detection
-                                        if tesseract_results and len(tesseract_results) > 0:
-                                            print(f"   [TESSERACT] Found {len(tesseract_results)} text elements with coordinates")
-                                            for i, elem in enumerate(tesseract_results):
-                                                print(f"   [TESSERACT] Element {i+1}: '{elem.get('text', '')[:50]}' at ({elem.get('bbox', {}).get('x', 0)}, {elem.get('bbox', {}).get('y', 0)})")
-                                            tesseract_elements = tesseract_results
-                                            print(f"   [TEXT EXTRACTION] Will use Gemini Vision for font/styling detection and merge with Tesseract coordinates...")
-                                        else:
-                                            print(f"   [TESSERACT] No text found (or empty result), using Gemini Vision only...")
-                                    except Exception as tesseract_error:
-                                        print(f"   [WARNING] Tesseract extraction failed: {tesseract_error}")
-                                        import traceback
-                                        traceback.print_exc()
-                                        tesseract_elements = None
-                                    
                                     # Always use Gemini Vision for font/styling detection (even if Tesseract found text)
                                     # Gemini Vision provides better font detection than Tesseract
                                     # Use Gemini Vision to extract text from image
@@ -2150,11 +2281,40 @@ Return as JSON array:
   }}
 ]"""
                                     
-                                    vision_response = await vision_llm.generate_completion_with_image(
-                                        prompt=extraction_prompt,
-                                        image_base64=image_base64,
-                                        temperature=0.1
-                                    )
+                                    # Tesseract OCR (precise coordinates) runs alongside the Gemini Vision
+                                    # extraction; it is only needed once both are done, for merging
+                                    from ..utils.tesseract_extractor import extract_text_with_tesseract_async
+                                    print(f"   [TEXT EXTRACTION] Using Tesseract OCR for precise text coordinates...")
+                                    tesseract_task = asyncio.create_task(extract_text_with_tesseract_async(image_base64))
+                                    
+                                    try:
+                                        vision_response = await vision_llm.generate_completion_with_image(
+                                            prompt=extraction_prompt,
+                                            image_base64=image_base64,
+                                            temperature=0.1
+                                        )
+                                    except BaseException:
+                                        # Gemini failed: don't leave the OCR running with its result unretrieved
+                                        tesseract_task.cancel()
+                                        raise
+                                    
+                                    try:
+                                        tesseract_results = await tesseract_task
+                                        
+                                        # Store Tesseract results for coordinate merging, but always use Gemini Vision for font detection
+                                        if tesseract_results and len(tesseract_results) > 0:
+                                            print(f"   [TESSERACT] Found {len(tesseract_results)} text elements with coordinates")
+                                            for i, elem in enumerate(tesseract_results):
+                                                print(f"   [TESSERACT] Element {i+1}: '{elem.get('text', '')[:50]}' at ({elem.get('bbox', {}).get('x', 0)}, {elem.get('bbox', {}).get('y', 0)})")
+                                            tesseract_elements = tesseract_results
+                                            print(f"   [TEXT EXTRACTION] Merging with Gemini Vision font/styling detection...")
+                                        else:
+                                            print(f"   [TESSERACT] No text found (or empty result), using Gemini Vision only...")
+                                    except Exception as tesseract_error:
+                                        print(f"   [WARNING] Tesseract extraction failed: {tesseract_error}")
+                                        import traceback
+                                        traceback.print_exc()
+                                        tesseract_elements = None
                                     
                                     # Parse extracted text elements
                                     import json
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional, Set
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import json
 import os
 import uuid
-import aiofiles
 from pathlib import Path
 
 from ..models.organization_materials import (
@@ -19,6 +21,10 @@ from ..adapters.llm_adapter import LLMAdapter
 from ..services.content_extractor import ContentExtractor
 from ..services.campaign_generator import CampaignGenerator
 from ..routes.settings import decrypt_value
+from ..utils.compute_pool import run_in_compute_pool
+from ..utils.document_text import file_hash
+from ..utils.pagination import with_sort_keys
+from ..utils.uploads import stream_upload
 
 router = APIRouter(prefix="/organization-materials", tags=["organization-materials"])
 
@@ -31,49 +37,126 @@ def get_db():
 UPLOAD_DIR = Path("uploads/materials")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Largest upload per subscription tier
+MATERIAL_UPLOAD_LIMITS = {
+    "free": 25 * 1024 * 1024,
+    "pro": 100 * 1024 * 1024,
+}
+
+# Record creation is serialized per org, so concurrent identical uploads dedupe
+_ingest_locks: Dict[str, asyncio.Lock] = {}
+
+# Strong references to in-flight background extractions
+_background_tasks: Set[asyncio.Task] = set()
+
+# Bump when extraction output changes, so stored extractions are redone
+EXTRACTOR_VERSION = 2
+
+# Websites/blogs are re-crawled once their extraction is older than this
+URL_EXTRACTION_TTL = timedelta(hours=24)
+
+# Materials extracted at once during an analysis
+MATERIAL_EXTRACT_CONCURRENCY = 4
+
+
+def _digest(value) -> str:
+    return hashlib.blake2b(json.dumps(value, sort_keys=True, default=str).encode('utf-8'), digest_size=16).hexdigest()
+
+
+async def _source_hash(material: dict) -> Optional[str]:
+    """What a material's extraction depends on: its file's content hash, or its URL"""
+    if material['type'] in [MaterialType.WEBSITE, MaterialType.BLOG]:
+        return _digest(material.get('url'))
+    if material.get('content_hash'):
+        return material['content_hash']
+    if material.get('file_path') and Path(material['file_path']).exists():
+        # Uploads from before content hashing
+        return await run_in_compute_pool(file_hash, material['file_path'])
+    return None
+
+
+def _extraction_is_current(material: dict, source_hash: Optional[str]) -> bool:
+    """True when the stored content came from this source with the current extractor"""
+    extraction = material.get('extraction') or {}
+    if not material.get('content') or not source_hash:
+        return False
+    if extraction.get('extractor_version') != EXTRACTOR_VERSION or extraction.get('source_hash') != source_hash:
+        return False
+    if material['type'] in [MaterialType.WEBSITE, MaterialType.BLOG]:
+        extracted_at = extraction.get('extracted_at')
+        return bool(extracted_at) and datetime.utcnow() - extracted_at < URL_EXTRACTION_TTL
+    return True
+
+
+async def _upload_limit(db, org_id: str) -> int:
+    """Upload size limit for the org owner's subscription tier"""
+    tier = "free"
+    org = await db.organizations.find_one({"id": org_id}, {"_id": 0, "created_by": 1})
+    if org and org.get("created_by"):
+        user = await db.users.find_one({"id": org["created_by"]}, {"_id": 0, "subscription_tier": 1})
+        if user:
+            tier = user.get("subscription_tier") or "free"
+    return MATERIAL_UPLOAD_LIMITS.get(tier, MATERIAL_UPLOAD_LIMITS["free"])
+
+
 @router.post("/upload")
 async def upload_material(
     org_id: str = Form(...),
     file: UploadFile = File(...)
 ):
-    """Upload a material file (PDF, image, document)"""
+    """Upload a material file (PDF, image, document); text extraction starts in the background"""
     db = get_db()
     
     try:
-        # Determine material type
-        content_type = file.content_type or ""
-        if "pdf" in content_type:
-            material_type = MaterialType.PDF
-        elif "image" in content_type:
-            material_type = MaterialType.IMAGE
-        else:
-            material_type = MaterialType.DOCUMENT
-        
-        # Generate unique filename
-        file_ext = Path(file.filename).suffix
-        unique_filename = f"{org_id}_{datetime.utcnow().timestamp()}{file_ext}"
-        file_path = UPLOAD_DIR / unique_filename
-        
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        # Create material record
-        material = OrganizationMaterial(
-            org_id=org_id,
-            type=material_type,
-            name=file.filename,
-            file_path=str(file_path),
-            file_size=len(content),
-            mime_type=content_type,
-            status=MaterialStatus.PENDING
-        )
+        # Copy to disk in chunks, hashing and sniffing the type on the way
+        stored = await stream_upload(file, UPLOAD_DIR, await _upload_limit(db, org_id))
+        
+        async with _ingest_locks.setdefault(org_id, asyncio.Lock()):
+            # Same file already uploaded to this org: keep the existing material
+            existing = await db.organization_materials.find_one(
+                {"org_id": org_id, "content_hash": stored.content_hash},
+                {"_id": 0}
+            )
+            if existing:
+                stored.path.unlink(missing_ok=True)
+                return existing
+            
+            # Determine material type (sniffed bytes first, then the declared type)
+            content_type = stored.mime_type or file.content_type or ""
+            if "pdf" in content_type:
+                material_type = MaterialType.PDF
+            elif "image" in content_type:
+                material_type = MaterialType.IMAGE
+            else:
+                material_type = MaterialType.DOCUMENT
+            
+            # Content-addressed filename
+            file_ext = Path(file.filename or "").suffix
+            file_path = UPLOAD_DIR / f"{org_id}_{stored.content_hash}{file_ext}"
+            os.replace(stored.path, file_path)
+            
+            # Create material record
+            material = OrganizationMaterial(
+                org_id=org_id,
+                type=material_type,
+                name=file.filename,
+                file_path=str(file_path),
+                file_size=stored.size,
+                mime_type=content_type,
+                content_hash=stored.content_hash,
+                status=MaterialStatus.PENDING
+            )
+            
+            await db.organization_materials.insert_one(material.model_dump())
         
-        await db.organization_materials.insert_one(material.model_dump())
+        # Text extraction doesn't need an API key; images wait for an explicit analysis
+        if material_type != MaterialType.IMAGE:
+            _schedule_extraction(material.model_dump())
         
         return material
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
@@ -190,6 +273,81 @@ async def delete_material(material_id: str):
     
     return {"success": True}
 
+async def _extract_material(db, material: dict, api_key: Optional[str] = None) -> Dict:
+    """Extract a material's content and record the result (status, content, extraction) on it"""
+    material_id = material['id']
+    source_hash = await _source_hash(material)
+    
+    # Update status
+    await db.organization_materials.update_one(
+        {"id": material_id},
+        {"$set": {"status": MaterialStatus.ANALYZING.value}}
+    )
+    
+    extractor = ContentExtractor()
+    extracted = {}
+    
+    # Extract based on type
+    if material['type'] in [MaterialType.WEBSITE, MaterialType.BLOG]:
+        extracted = await extractor.extract_from_url(material['url'])
+    elif material['type'] == MaterialType.PDF:
+        extracted = await extractor.extract_from_pdf(material['file_path'])
+    elif material['type'] == MaterialType.IMAGE:
+        # Get API key
+        if not api_key:
+            settings = await db.user_settings.find_one({"org_id": material['org_id']}, {"_id": 0})
+            api_key = settings.get('openai_api_key') if settings else None
+        if api_key:
+            extracted = await extractor.extract_from_image(material['file_path'], api_key)
+        else:
+            extracted = {"error": "No API key for image analysis"}
+    else:
+        extracted = await extractor.extract_from_document(material['file_path'])
+    
+    # Save extracted content
+    if 'error' not in extracted:
+        content = extracted.get('content', '')
+        update = {
+            "content": content,
+            "status": MaterialStatus.ANALYZED.value,
+            "extraction": {
+                "source_hash": source_hash,
+                "extractor_version": EXTRACTOR_VERSION,
+                "content_digest": _digest(content),
+                "extracted_at": datetime.utcnow()
+            },
+            "updated_at": datetime.utcnow()
+        }
+        if 'images' in extracted:
+            update["images"] = extracted['images']
+        await db.organization_materials.update_one({"id": material_id}, {"$set": update})
+        material.update(update)
+    else:
+        await db.organization_materials.update_one(
+            {"id": material_id},
+            {"$set": {"status": MaterialStatus.FAILED.value}}
+        )
+    return extracted
+
+
+async def _run_extraction(material: dict) -> None:
+    try:
+        extracted = await _extract_material(get_db(), material)
+        if 'error' in extracted:
+            print(f"[MATERIALS] Extraction failed for {material['name']}: {extracted['error']}")
+        else:
+            print(f"[MATERIALS] Extracted {len(extracted.get('content', ''))} chars from {material['name']}")
+    except Exception as e:
+        print(f"[MATERIALS] Extraction failed for {material['name']}: {e}")
+
+
+def _schedule_extraction(material: dict) -> None:
+    """Extract an uploaded material in the background (the upload itself doesn't wait)"""
+    task = asyncio.create_task(_run_extraction(material))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
 @router.post("/extract-content/{material_id}")
 async def extract_material_content(material_id: str):
     """Extract content from a specific material"""
@@ -200,47 +358,10 @@ async def extract_material_content(material_id: str):
         if not material:
             raise HTTPException(status_code=404, detail="Material not found")
         
-        # Update status
-        await db.organization_materials.update_one(
-            {"id": material_id},
-            {"$set": {"status": MaterialStatus.ANALYZING.value}}
-        )
-        
-        extractor = ContentExtractor()
-        extracted = {}
-        
-        # Extract based on type
-        if material['type'] in [MaterialType.WEBSITE, MaterialType.BLOG]:
-            extracted = await extractor.extract_from_url(material['url'])
-        elif material['type'] == MaterialType.PDF:
-            extracted = await extractor.extract_from_pdf(material['file_path'])
-        elif material['type'] == MaterialType.IMAGE:
-            # Get API key
-            settings = await db.user_settings.find_one({"org_id": material['org_id']}, {"_id": 0})
-            api_key = settings.get('openai_api_key') if settings else None
-            if api_key:
-                extracted = await extractor.extract_from_image(material['file_path'], api_key)
-            else:
-                extracted = {"error": "No API key for image analysis"}
-        else:
-            extracted = await extractor.extract_from_document(material['file_path'])
-        
-        # Save extracted content
+        extracted = await _extract_material(db, material)
         if 'error' not in extracted:
-            await db.organization_materials.update_one(
-                {"id": material_id},
-                {"$set": {
-                    "content": extracted.get('content', ''),
-                    "status": MaterialStatus.ANALYZED.value,
-                    "updated_at": datetime.utcnow()
-                }}
-            )
             return {"success": True, "content_length": len(extracted.get('content', ''))}
         else:
-            await db.organization_materials.update_one(
-                {"id": material_id},
-                {"$set": {"status": MaterialStatus.FAILED.value}}
-            )
             raise HTTPException(status_code=500, detail=extracted['error'])
             
     except Exception as e:
@@ -345,90 +466,59 @@ async def analyze_materials(org_id: str):
         print(f"   [OK] Using provider: {provider}")
         print(f"   [OK] API key starts with: {api_key[:15] if api_key else 'None'}...")
         
-        # Extract content from all materials
-        extractor = ContentExtractor()
-        all_content = []
-        all_images = []
-        material_ids = []
+        # Extract only new or changed materials; the rest reuse their stored extraction
+        material_ids = [material['id'] for material in materials]
+        semaphore = asyncio.Semaphore(MATERIAL_EXTRACT_CONCURRENCY)
         
-        for material in materials:
-            material_ids.append(material['id'])
-            
-            # Always extract content to ensure we have fresh data
-            # Even if content exists, re-extract for websites to get latest content
-            should_extract = (
-                not material.get('content') or 
-                material['type'] in [MaterialType.WEBSITE.value, MaterialType.BLOG.value]
-            )
-            
-            if should_extract:
+        async def refresh(material: dict) -> None:
+            if _extraction_is_current(material, await _source_hash(material)):
+                return
+            async with semaphore:
                 print(f"   Extracting: {material['name']} (type: {material['type']})")
-                extracted = {}
-                
                 try:
-                    if material['type'] in [MaterialType.WEBSITE.value, MaterialType.BLOG.value]:
-                        print(f"   [EXTRACT] Extracting from URL: {material.get('url')}")
-                        extracted = await extractor.extract_from_url(material['url'])
-                        print(f"   [EXTRACT] Extracted {len(extracted.get('content', ''))} characters")
-                    elif material['type'] == MaterialType.PDF.value:
-                        extracted = await extractor.extract_from_pdf(material['file_path'])
-                    elif material['type'] == MaterialType.IMAGE.value:
-                        extracted = await extractor.extract_from_image(material['file_path'], api_key)
-                    else:
-                        extracted = await extractor.extract_from_document(material['file_path'])
+                    extracted = await _extract_material(db, material, api_key)
+                    if 'error' in extracted:
+                        print(f"   [WARNING] Extraction failed: {extracted['error']}")
+                        return
                     
-                    if 'error' not in extracted:
-                        content = extracted.get('content', '')
-                        images = extracted.get('images', [])
-                        
-                        if not content or len(content.strip()) < 10:
-                            print(f"   [WARNING] Extracted content is very short or empty for {material['name']}")
-                        else:
-                            print(f"   [SUCCESS] Extracted {len(content)} characters from {material['name']}")
-                        
-                        # Save extracted images to user_images collection
-                        if images:
-                            org = await db.organizations.find_one({"id": material['org_id']}, {"_id": 0})
-                            user_id = org.get("created_by") if org else None
-                            
-                            for img_url in images:
-                                if img_url and img_url.startswith(("http://", "https://")):
-                                    image_metadata = {
-                                        "id": str(uuid.uuid4()),
-                                        "original_url": img_url,
-                                        "source_url": material.get('url', ''),
-                                        "org_id": material['org_id'],
-                                        "user_id": user_id,
-                                        "material_id": material['id'],
-                                        "material_type": material['type'],
-                                        "created_at": datetime.utcnow().isoformat(),
-                                        "updated_at": datetime.utcnow().isoformat()
-                                    }
-                                    await db.user_images.update_one(
-                                        {"original_url": img_url, "org_id": material['org_id']},
-                                        {"$set": image_metadata},
-                                        upsert=True
-                                    )
-                        
-                        # Save extracted content
-                        await db.organization_materials.update_one(
-                            {"id": material['id']},
-                            {"$set": {
-                                "content": content, 
-                                "images": images,
-                                "status": MaterialStatus.ANALYZED.value
-                            }}
-                        )
-                        all_content.append(content)
-                        all_images.extend(images)
+                    content = extracted.get('content', '')
+                    images = extracted.get('images', [])
+                    if not content or len(content.strip()) < 10:
+                        print(f"   [WARNING] Extracted content is very short or empty for {material['name']}")
                     else:
-                        print(f"   [WARNING] Extraction failed: {extracted['error']}")
+                        print(f"   [SUCCESS] Extracted {len(content)} characters from {material['name']}")
+                    
+                    # Save extracted images to user_images collection
+                    for img_url in images:
+                        if img_url and img_url.startswith(("http://", "https://")):
+                            image_metadata = {
+                                "id": str(uuid.uuid4()),
+                                "original_url": img_url,
+                                "source_url": material.get('url', ''),
+                                "org_id": material['org_id'],
+                                "user_id": user_id,
+                                "material_id": material['id'],
+                                "material_type": material['type'],
+                                "created_at": datetime.utcnow().isoformat(),
+                                "updated_at": datetime.utcnow().isoformat()
+                            }
+                            await db.user_images.update_one(
+                                {"original_url": img_url, "org_id": material['org_id']},
+                                {"$set": with_sort_keys("user_images", image_metadata)},
+                                upsert=True
+                            )
                 except Exception as e:
                     print(f"   [WARNING] Extraction error: {e}")
-            else:
+        
+        await asyncio.gather(*[refresh(material) for material in materials])
+        
+        # Materials without usable content (failed extractions) are left out, in upload order
+        all_content = []
+        all_images = []
+        for material in materials:
+            if material.get('content'):
                 all_content.append(material['content'])
-                if material.get('images'):
-                    all_images.extend(material['images'])
+                all_images.extend(material.get('images') or [])
         
         combined_content = "\n\n---\n\n".join(all_content)
         print(f"   Total content length: {len(combined_content)} characters")
@@ -441,6 +531,23 @@ async def analyze_materials(org_id: str):
         # Check for brand DNA from discovery (should be saved earlier)
         brand_dna_data = await db.brand_dna.find_one({"org_id": org_id}, {"_id": 0})
         
+        # Nothing changed since the last analysis: return it without another LLM pass
+        inputs_hash = _digest({
+            "materials": [
+                [material['id'], (material.get('extraction') or {}).get('content_digest') or _digest(material.get('content') or ''), material.get('images') or []]
+                for material in materials
+            ],
+            "brand_dna": brand_dna_data,
+        })
+        previous = await db.brand_analysis.find_one({"org_id": org_id}, {"_id": 0})
+        if previous and previous.get('inputs_hash') == inputs_hash:
+            await db.organization_materials.update_many(
+                {"org_id": org_id},
+                {"$set": {"status": MaterialStatus.ANALYZED.value}}
+            )
+            print(f"[OK] Materials and brand DNA unchanged - reusing the previous analysis")
+            return BrandAnalysis(**previous)
+        
         # Only use fallback if we truly have NO content AND no brand DNA
         if not combined_content or len(combined_content.strip()) < 10:
             print(f"   [WARNING] Very little content extracted ({len(combined_content)} chars)")
@@ -508,6 +615,7 @@ async def analyze_materials(org_id: str):
                 suggested_campaigns=analysis_data.get('suggested_campaigns', []),
                 confidence_score=0.5,
                 materials_analyzed=material_ids,
+                inputs_hash=inputs_hash,
                 brand_images=list(set(all_images))[:12],
                 # Merge brand DNA data if available
                 brand_story=brand_dna_data.get('brand_story') if brand_dna_data else None,
@@ -671,6 +779,7 @@ Return ONLY valid JSON, no markdown:
             suggested_campaigns=analysis_data.get('suggested_campaigns', []),
             confidence_score=0.85,
             materials_analyzed=material_ids,
+            inputs_hash=inputs_hash,
             brand_images=list(set(all_images))[:12],  # Deduplicate and limit to 12 images
             # Merge brand DNA data if available
             brand_story=brand_dna_data.get('brand_story') if brand_dna_data else None,
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import List, Literal, Optional
 from datetime import datetime
 import os
 
 from ..models.post import Post
 from ..adapters.linkedin_adapter import LinkedInAdapter
+from ..utils.pagination import MAX_PAGE_SIZE, page_response, paginate, with_sort_keys
+from ..utils.summaries import POST_SUMMARY_PROJECTION, post_summary
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
@@ -110,7 +112,7 @@ async def publish_post(post: Post):
         post_dict['created_at'] = datetime.utcnow().isoformat()
         post_dict['updated_at'] = datetime.utcnow().isoformat()
         
-        await db.posts.insert_one(post_dict)
+        await db.posts.insert_one(with_sort_keys("posts", post_dict))
         
         return {"message": "Post published successfully", "post_id": post.id, "linkedin_post_id": result.get('id')}
         
@@ -119,15 +121,31 @@ async def publish_post(post: Post):
         raise HTTPException(status_code=500, detail=f"Failed to publish post: {str(e)}")
 
 @router.get("")
-async def list_posts(org_id: str):
-    """List all published posts for an organization"""
+async def list_posts(
+    org_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full"
+):
+    """List published posts for an organization, most recent first
+    
+    Pass `limit` and/or `cursor` for {"items", "next_cursor"} pages; without
+    them the latest 100 posts are returned as a list. view=summary returns
+    PostSummary rows (metrics and an excerpt, without the LinkedIn response)."""
     db = get_db()
-    posts = await db.posts.find({"org_id": org_id}, {"_id": 0}).sort("posted_at", -1).to_list(length=100)
+    page = await paginate(
+        db.posts, {"org_id": org_id}, "posted_at",
+        limit=limit or 100, cursor=cursor,
+        projection=POST_SUMMARY_PROJECTION if view == "summary" else {"_id": 0}
+    )
+    if view == "summary":
+        page.items = [post_summary(p) for p in page.items]
     
     print(f"[POSTS] Fetching posts for org: {org_id}")
-    print(f"   Found {len(posts)} posts")
+    print(f"   Found {len(page.items)} posts")
     
-    return posts
+    return page_response(page, response, paginated=limit is not None or cursor is not None)
 
 @router.get("/{post_id}")
 async def get_post(post_id: str):
@@ -401,7 +419,7 @@ async def import_posts_from_linkedin(org_id: str):
                 # Upsert post
                 await db.posts.update_one(
                     {"linkedin_post_id": post_id},
-                    {"$set": post_data},
+                    {"$set": with_sort_keys("posts", post_data)},
                     upsert=True
                 )
                 
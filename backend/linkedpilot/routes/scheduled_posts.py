@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import List, Literal, Optional
 from datetime import datetime, timedelta
 import os
 
 from ..models.scheduled_post import ScheduledPost, PostStatus
 from ..adapters.linkedin_adapter import LinkedInAdapter
+from ..utils.pagination import MAX_PAGE_SIZE, page_response, paginate, with_sort_keys
+from ..utils.summaries import (
+    DRAFT_SUMMARY_PROJECTION,
+    SCHEDULED_POST_SUMMARY_PROJECTION,
+    draft_summary,
+    scheduled_post_summary,
+)
 
 router = APIRouter(prefix="/scheduled-posts", tags=["scheduled_posts"])
 
@@ -67,7 +74,7 @@ async def create_scheduled_post(scheduled_post: ScheduledPost):
     post_dict['publish_time'] = publish_dt.isoformat()
     
     try:
-        await db.scheduled_posts.insert_one(post_dict)
+        await db.scheduled_posts.insert_one(with_sort_keys("scheduled_posts", post_dict))
     except Exception as e:
         print(f"[SCHEDULED POSTS] Error inserting post: {e}")
         import traceback
@@ -80,13 +87,23 @@ async def create_scheduled_post(scheduled_post: ScheduledPost):
 
 @router.get("")
 async def list_scheduled_posts(
+    response: Response,
     org_id: Optional[str] = None, 
     range_start: Optional[str] = None, 
     range_end: Optional[str] = None,
-    include_cancelled: Optional[bool] = False
+    include_cancelled: Optional[bool] = False,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full"
 ):
-    """List scheduled posts with optional date range"""
+    """List scheduled posts with optional date range, in publish order
+    
+    Pass `limit` and/or `cursor` for {"items", "next_cursor"} pages; without
+    them up to 500 posts are returned as a list. view=summary returns
+    ScheduledPostSummary rows (time, status, title, excerpt, thumbnail URL)
+    instead of posts with their full draft attached."""
     db = get_db()
+    projection = SCHEDULED_POST_SUMMARY_PROJECTION if view == "summary" else {"_id": 0}  # EXCLUDE _id
     
     # Build query - if org_id provided, filter by it; otherwise return all (for admin)
     query = {}
@@ -122,7 +139,11 @@ async def list_scheduled_posts(
     else:
         print(f"[SCHEDULED POSTS] Querying ALL posts for org_id={org_id} (no date range)")
     
-    posts = await db.scheduled_posts.find(query, {"_id": 0}).to_list(length=500)  # EXCLUDE _id
+    page = await paginate(
+        db.scheduled_posts, query, "publish_time", direction=1,
+        limit=limit or 500, cursor=cursor, projection=projection
+    )
+    posts = page.items
     
     # #region agent log
     try:
@@ -140,7 +161,7 @@ async def list_scheduled_posts(
     if posts:
         for i, post in enumerate(posts[:5], 1):  # Show first 5
             print(f"  Post {i}: id={post.get('id')}, publish_time={post.get('publish_time')}, status={post.get('status')}")
-    elif range_start and range_end:
+    elif range_start and range_end and not cursor:
         # If no posts found with date range, check if posts exist outside range
         query_without_range = {"org_id": org_id}
         if not include_cancelled:
@@ -165,11 +186,33 @@ async def list_scheduled_posts(
                     "$gte": range_start,
                     "$lte": extended_end
                 }
-                posts = await db.scheduled_posts.find(query, {"_id": 0}).to_list(length=500)
+                page = await paginate(
+                    db.scheduled_posts, query, "publish_time", direction=1,
+                    limit=limit or 500, projection=projection
+                )
+                posts = page.items
                 print(f"[SCHEDULED POSTS] After extending range: Found {len(posts)} posts")
             except Exception as e:
                 print(f"[SCHEDULED POSTS] Error extending date range: {e}")
     
+    if view == "summary":
+        # One query for every post's draft, projected down to what a row shows
+        drafts = await db.drafts.find(
+            {"id": {"$in": list({post['draft_id'] for post in posts if post.get('draft_id')})}},
+            DRAFT_SUMMARY_PROJECTION
+        ).to_list(length=None)
+        summaries = {draft['id']: draft_summary(draft) for draft in drafts}
+        
+        rows = []
+        for post in posts:
+            draft = summaries.get(post.get('draft_id'))
+            # Ensure drafts match the post's org_id to prevent cross-account access
+            if draft and post.get('org_id') and draft.org_id != post['org_id']:
+                draft = None
+            rows.append(scheduled_post_summary(post, draft))
+        page.items = rows
+        return page_response(page, response, paginated=limit is not None or cursor is not None)
+    
     # Get draft data for each post (always fetch fresh to get latest assets)
     # Ensure drafts match the post's org_id to prevent cross-account access
     for post in posts:
@@ -197,7 +240,7 @@ async def list_scheduled_posts(
         else:
             print(f"[SCHEDULED POSTS] WARNING: Draft {post.get('draft_id')} not found for post {post.get('id')}")
     
-    return posts
+    return page_response(page, response, paginated=limit is not None or cursor is not None)
 
 @router.get("/{post_id}")
 async def get_scheduled_post(post_id: str):
@@ -231,7 +274,7 @@ async def update_scheduled_post(post_id: str, publish_time: Optional[str] = None
     
     result = await db.scheduled_posts.update_one(
         {"id": post_id},
-        {"$set": update_data}
+        {"$set": with_sort_keys("scheduled_posts", update_data)}
     )
     
     if result.modified_count == 0:
@@ -308,7 +351,7 @@ async def update_scheduled_post_full(post_id: str, update_data: dict):
     
     result = await db.scheduled_posts.update_one(
         {"id": post_id},
-        {"$set": update_fields}
+        {"$set": with_sort_keys("scheduled_posts", update_fields)}
     )
     
     if result.modified_count == 0:
@@ -502,13 +545,13 @@ async def publish_now(post_id: str):
         # Update scheduled post status
         await db.scheduled_posts.update_one(
             {"id": post_id},
-            {"$set": {
+            {"$set": with_sort_keys("scheduled_posts", {
                 "status": PostStatus.POSTED.value,
                 "publish_time": datetime.utcnow().isoformat(),
                 "updated_at": datetime.utcnow().isoformat(),
                 "linkedin_post_id": result.get('id'),
                 "platform_url": result.get('url')
-            }}
+            })}
         )
         
         print(f"[SUCCESS] Updated scheduled post status to POSTED")
@@ -524,7 +567,7 @@ async def publish_now(post_id: str):
             "created_at": datetime.utcnow().isoformat(),
             "updated_at": datetime.utcnow().isoformat()
         }
-        await db.posts.insert_one(post_record)
+        await db.posts.insert_one(with_sort_keys("posts", post_record))
         
         print(f"[SUCCESS] Created post record in database")
         print(f"{'='*60}\n")
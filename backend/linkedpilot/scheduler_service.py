@@ -18,6 +18,9 @@ from linkedpilot.adapters.image_adapter import ImageAdapter
 from linkedpilot.models.campaign import AIGeneratedPostStatus, CampaignStatus, Campaign
 from linkedpilot.services.campaign_generator import CampaignGenerator
 from linkedpilot.models.organization_materials import BrandAnalysis
+from linkedpilot.utils.image_encoding import data_url_for_base64
+from linkedpilot.utils.metrics import record_post_created
+from linkedpilot.utils.pagination import with_sort_keys
 
 # Global scheduler instance
 scheduler = None
@@ -452,7 +455,7 @@ National Geographic quality. ABSOLUTELY NO TEXT OR WORDS. Pure imagery only.""".
                                         # Fallback to base64 if URL is missing or empty
                                         elif image_result and 'image_base64' in image_result and image_result['image_base64']:
                                             # Handle base64 images by creating a data URL
-                                            image_url = f"data:image/png;base64,{image_result['image_base64']}"
+                                            image_url = data_url_for_base64(image_result['image_base64'])
                                             print(f"   [IMAGE] ✓ Generated successfully with {default_img_model} (base64 fallback)!")
                                             print(f"   [IMAGE] Base64 image length: {len(image_result['image_base64'])}")
                                         else:
@@ -472,7 +475,7 @@ National Geographic quality. ABSOLUTELY NO TEXT OR WORDS. Pure imagery only.""".
                                                 if image_result and 'url' in image_result and image_result['url']:
                                                     image_url = image_result['url']
                                                 elif image_result and 'image_base64' in image_result and image_result['image_base64']:
-                                                    image_url = f"data:image/png;base64,{image_result['image_base64']}"
+                                                    image_url = data_url_for_base64(image_result['image_base64'])
                                     else:
                                         print(f"   [IMAGE] No API key available, skipping AI image generation")
                                 except Exception as ai_error:
@@ -596,7 +599,8 @@ National Geographic quality. ABSOLUTELY NO TEXT OR WORDS. Pure imagery only.""".
                     
                     # Save to database
                     try:
-                        await db.ai_generated_posts.insert_one(ai_post)
+                        await db.ai_generated_posts.insert_one(with_sort_keys("ai_generated_posts", ai_post))
+                        await record_post_created(db)
                         print(f"   [DB] Post saved successfully! ID: {ai_post['id']}")
                     except Exception as db_error:
                         print(f"   [ERROR] Failed to save post to database: {db_error}")
@@ -884,7 +888,7 @@ async def auto_schedule_approved_posts():
                     # Update post with scheduled time
                     await db.ai_generated_posts.update_one(
                         {"id": post.get('id')},
-                        {"$set": {"scheduled_for": scheduled_time, "updated_at": datetime.utcnow()}}
+                        {"$set": with_sort_keys("ai_generated_posts", {"scheduled_for": scheduled_time, "updated_at": datetime.utcnow()})}
                     )
                     print(f"   [SCHEDULED] Post for campaign '{campaign.get('name')}' at {scheduled_time.strftime('%Y-%m-%d %H:%M UTC')}")
                     
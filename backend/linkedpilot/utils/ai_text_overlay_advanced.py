@@ -5,14 +5,25 @@ Phase 1: Foundations and Guardrails
 """
 
 import os
-import base64
-import io
-from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass, field
+import asyncio
+import hashlib
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple, Any, Union
+from dataclasses import dataclass, field, replace
 from enum import Enum
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
 import numpy as np
 
+from .compute_pool import get_compute_pool, run_in_compute_pool
+from .font_store import load_font, variant_for_weight
+from .image_context import ImageContext
+from .image_encoding import encode_image
+from .integral_images import IntegralImages, box_filter_mean, contrast_ratios
+from .palette import extract_palette
+
 
 class OverlayRole(Enum):
     """Role of text element in hierarchy"""
@@ -166,6 +177,32 @@ class ScoringMetric:
             Score from 0.0 (poor) to 1.0 (excellent)
         """
         raise NotImplementedError
+    
+    def score_batch(self, elements: List[OverlayElement], image: Image.Image, context: Dict) -> np.ndarray:
+        """
+        Score many elements at once (0.0 to 1.0 each)
+        
+        Metrics that read pixels override this to use the summed-area tables in
+        context['integral_images']; the default scores elements one by one.
+        """
+        return np.array([self.score(element, image, context) for element in elements], dtype=np.float64)
+
+
+def _element_pixel_boxes(elements: List[OverlayElement], image: Image.Image) -> np.ndarray:
+    """Pixel corners (x0, y0, x1, y1) of each element's box, shape (N, 4)"""
+    boxes = np.empty((len(elements), 4), dtype=np.int64)
+    for i, element in enumerate(elements):
+        box = element.box
+        if box.use_percentage:
+            boxes[i] = (
+                int((box.x / 100) * image.width),
+                int((box.y / 100) * image.height),
+                int(((box.x + box.width) / 100) * image.width),
+                int(((box.y + box.height) / 100) * image.height)
+            )
+        else:
+            boxes[i] = (int(box.x), int(box.y), int(box.x + box.width), int(box.y + box.height))
+    return boxes
 
 
 class ContrastScore(ScoringMetric):
@@ -173,6 +210,9 @@ class ContrastScore(ScoringMetric):
     
     def score(self, element: OverlayElement, image: Image.Image, context: Dict) -> float:
         """Calculate contrast score"""
+        if context.get('integral_images') is not None:
+            return float(self.score_batch([element], image, context)[0])
+        
         # Sample background color at element position
         box = element.box
         if box.use_percentage:
@@ -203,6 +243,28 @@ class ContrastScore(ScoringMetric):
         
         # Normalize to 0-1 (target: 4.5+ for WCAG AA)
         return min(1.0, contrast / 7.0)  # 7.0 is excellent contrast
+    
+    def score_batch(self, elements: List[OverlayElement], image: Image.Image, context: Dict) -> np.ndarray:
+        """Calculate contrast scores for all elements from the summed-area tables"""
+        integral = context.get('integral_images')
+        if integral is None or not elements:
+            return super().score_batch(elements, image, context)
+        
+        # Same 50px sample square around each element's origin as score()
+        sample_size = 50
+        origins = _element_pixel_boxes(elements, image)[:, :2]
+        samples = np.stack([
+            np.maximum(0, origins[:, 0] - sample_size // 2),
+            np.maximum(0, origins[:, 1] - sample_size // 2),
+            np.minimum(image.width, origins[:, 0] + sample_size // 2),
+            np.minimum(image.height, origins[:, 1] + sample_size // 2)
+        ], axis=1)
+        valid = (samples[:, 2] > samples[:, 0]) & (samples[:, 3] > samples[:, 1])
+        
+        avg_colors = integral.mean_rgb(samples)
+        text_colors = np.array([_hex_to_rgb(element.color) for element in elements], dtype=np.float64)
+        scores = np.minimum(1.0, contrast_ratios(text_colors, avg_colors) / 7.0)
+        return np.where(valid, scores, 0.0)
 
 
 class GridAlignmentScore(ScoringMetric):
@@ -293,6 +355,14 @@ class CompositeScorer:
             total_score += metric_score * weight
         
         return total_score
+    
+    def score_batch(self, elements: List[OverlayElement], image: Image.Image, context: Dict) -> np.ndarray:
+        """Calculate composite scores for all elements, one vectorized pass per metric"""
+        total_scores = np.zeros(len(elements), dtype=np.float64)
+        for metric, weight in self.weights:
+            total_scores += metric.score_batch(elements, image, context) * weight
+        
+        return total_scores
 
 
 def _hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
@@ -380,42 +450,25 @@ def compute_saliency_map(image: Image.Image) -> np.ndarray:
     
     img_array = np.array(gray, dtype=np.float32)
     
-    # Compute gradients (Sobel operator approximation)
-    # Horizontal gradient
-    sobel_x = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]])
-    # Vertical gradient
-    sobel_y = np.array([[-1, -2, -1], [0, 0, 0], [1, 2, 1]])
-    
-    # Pad image for convolution
+    # Compute gradients (Sobel operator approximation) as shifted slices of the padded image
     padded = np.pad(img_array, 1, mode='edge')
+    h, w = img_array.shape
     
-    # Compute gradients
-    grad_x = np.zeros_like(img_array)
-    grad_y = np.zeros_like(img_array)
+    def shifted(dy: int, dx: int) -> np.ndarray:
+        return padded[dy:dy + h, dx:dx + w]
     
-    h, w = img_array.shape
-    for i in range(h):
-        for j in range(w):
-            region = padded[i:i+3, j:j+3]
-            grad_x[i, j] = np.sum(region * sobel_x)
-            grad_y[i, j] = np.sum(region * sobel_y)
+    # Horizontal gradient: [[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]]
+    grad_x = (shifted(0, 2) + 2 * shifted(1, 2) + shifted(2, 2)) - (shifted(0, 0) + 2 * shifted(1, 0) + shifted(2, 0))
+    # Vertical gradient: [[-1, -2, -1], [0, 0, 0], [1, 2, 1]]
+    grad_y = (shifted(2, 0) + 2 * shifted(2, 1) + shifted(2, 2)) - (shifted(0, 0) + 2 * shifted(0, 1) + shifted(0, 2))
     
     # Gradient magnitude
     gradient_magnitude = np.sqrt(grad_x**2 + grad_y**2)
     
-    # Local variance (texture/busyness indicator)
+    # Local variance (texture/busyness indicator): E[x^2] - E[x]^2 over a 5x5 window
     kernel_size = 5
-    kernel = np.ones((kernel_size, kernel_size)) / (kernel_size * kernel_size)
-    padded_var = np.pad(img_array, kernel_size//2, mode='edge')
-    
-    local_mean = np.zeros_like(img_array)
-    local_variance = np.zeros_like(img_array)
-    
-    for i in range(h):
-        for j in range(w):
-            region = padded_var[i:i+kernel_size, j:j+kernel_size]
-            local_mean[i, j] = np.mean(region)
-            local_variance[i, j] = np.var(region)
+    local_mean = box_filter_mean(img_array, kernel_size)
+    local_variance = np.maximum(box_filter_mean(img_array.astype(np.float64) ** 2, kernel_size) - local_mean ** 2, 0.0).astype(np.float32)
     
     # Combine gradient and variance
     # Normalize both to 0-1
@@ -501,6 +554,25 @@ def generate_candidate_boxes(
     return candidates
 
 
+def _background_sample_region(image: Image.Image, box: Box, padding: int = 20) -> Tuple[int, int, int, int]:
+    """Pixel region sampled for a box's background, expanded slightly for better sampling"""
+    # Convert box percentages to pixels
+    if box.use_percentage:
+        x = int((box.x / 100) * image.width)
+        y = int((box.y / 100) * image.height)
+        width = int((box.width / 100) * image.width)
+        height = int((box.height / 100) * image.height)
+    else:
+        x, y = int(box.x), int(box.y)
+        width, height = int(box.width), int(box.height)
+    
+    x_min = max(0, x - padding)
+    y_min = max(0, y - padding)
+    x_max = min(image.width, x + width + padding)
+    y_max = min(image.height, y + height + padding)
+    return x_min, y_min, x_max, y_max
+
+
 def sample_local_background(
     image: Image.Image,
     box: Box
@@ -519,22 +591,7 @@ def sample_local_background(
         - busyness: Variance/contrast in region (0-1)
         - texture: Texture complexity estimate
     """
-    # Convert box percentages to pixels
-    if box.use_percentage:
-        x = int((box.x / 100) * image.width)
-        y = int((box.y / 100) * image.height)
-        width = int((box.width / 100) * image.width)
-        height = int((box.height / 100) * image.height)
-    else:
-        x, y = int(box.x), int(box.y)
-        width, height = int(box.width), int(box.height)
-    
-    # Expand region slightly for better sampling
-    padding = 20
-    x_min = max(0, x - padding)
-    y_min = max(0, y - padding)
-    x_max = min(image.width, x + width + padding)
-    y_max = min(image.height, y + height + padding)
+    x_min, y_min, x_max, y_max = _background_sample_region(image, box)
     
     # Crop region
     region = image.crop((x_min, y_min, x_max, y_max))
@@ -694,12 +751,8 @@ def fit_text_to_box(
     # Start with role-based size
     font_size = typographic_scale.get_size_for_role(role)
     
-    # Try to load font to measure text
-    try:
-        # Try to get font path (simplified - would need actual font loading)
-        font_obj = ImageFont.load_default()
-    except:
-        font_obj = ImageFont.load_default()
+    # Fonts come from the shared face cache, so each probed size is loaded at most once
+    variant = variant_for_weight(typography.font_weight)
     
     # Binary search for optimal font size
     min_size = min_font_size
@@ -712,17 +765,7 @@ def fit_text_to_box(
         if test_size < min_font_size:
             test_size = min_font_size
         
-        # Try to load font at this size
-        try:
-            test_font = ImageFont.truetype("arial.ttf", test_size)
-        except:
-            try:
-                test_font = ImageFont.load_default()
-            except:
-                test_font = None
-        
-        if test_font is None:
-            break
+        test_font = load_font(typography.font_name, test_size, variant)
         
         # Wrap text to fit width
         wrapped_lines = _wrap_text_to_width(text, box_width, test_font)
@@ -915,6 +958,10 @@ class SaliencyScore(ScoringMetric):
     
     def score(self, element: OverlayElement, image: Image.Image, context: Dict) -> float:
         """Calculate saliency avoidance score"""
+        integral = context.get('integral_images')
+        if integral is not None and integral.saliency is not None:
+            return float(self.score_batch([element], image, context)[0])
+        
         saliency_map = context.get('saliency_map')
         if saliency_map is None:
             return 0.5  # Neutral if no saliency map
@@ -944,6 +991,22 @@ class SaliencyScore(ScoringMetric):
         
         # Lower saliency = better score (we want to avoid busy regions)
         return 1.0 - avg_saliency
+    
+    def score_batch(self, elements: List[OverlayElement], image: Image.Image, context: Dict) -> np.ndarray:
+        """Calculate saliency avoidance scores for all elements from the summed-area tables"""
+        integral = context.get('integral_images')
+        if integral is None or integral.saliency is None or not elements:
+            return super().score_batch(elements, image, context)
+        
+        boxes = _element_pixel_boxes(elements, image)
+        map_height, map_width = integral.height, integral.width
+        boxes[:, 0] = np.clip(boxes[:, 0], 0, map_width - 1)
+        boxes[:, 1] = np.clip(boxes[:, 1], 0, map_height - 1)
+        boxes[:, 2] = np.clip(boxes[:, 2], 0, map_width)
+        boxes[:, 3] = np.clip(boxes[:, 3], 0, map_height)
+        valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+        
+        return np.where(valid, 1.0 - integral.mean_saliency(boxes), 0.5)
 
 
 class HierarchyScore(ScoringMetric):
@@ -987,7 +1050,8 @@ def generate_overlay_candidates(
     safe_zone: SafeZone,
     typographic_scale: TypographicScale,
     brand_kit: BrandKit,
-    max_candidates_per_element: int = 5
+    max_candidates_per_element: int = 5,
+    integral_images: Optional[IntegralImages] = None
 ) -> List[OverlayElement]:
     """
     Generate multiple candidate overlay elements for each text
@@ -1000,12 +1064,14 @@ def generate_overlay_candidates(
         typographic_scale: Typographic scale
         brand_kit: Brand kit
         max_candidates_per_element: Maximum candidates per text element
+        integral_images: Precomputed summed-area tables (built from image if omitted)
     
     Returns:
         List of candidate OverlayElement objects
     """
-    # Compute saliency map once
-    saliency_map = compute_saliency_map(image)
+    # Summed-area tables let every candidate box be sampled in O(1)
+    if integral_images is None:
+        integral_images = IntegralImages(image)
     
     # Detect faces/logos to avoid
     avoid_regions = detect_faces_and_logos_lightweight(image)
@@ -1043,10 +1109,13 @@ def generate_overlay_candidates(
         # Limit candidates
         filtered_boxes = filtered_boxes[:max_candidates_per_element]
         
+        # Sample backgrounds for all boxes in one vectorized pass
+        background_samples = integral_images.sample_backgrounds(
+            np.array([_background_sample_region(image, box) for box in filtered_boxes], dtype=np.int64)
+        )
+        
         # Create overlay elements for each candidate box
-        for box in filtered_boxes:
-            # Sample background
-            background_sample = sample_local_background(image, box)
+        for box, background_sample in zip(filtered_boxes, background_samples):
             
             # Determine adaptive contrast
             contrast_settings = determine_adaptive_contrast(
@@ -1119,17 +1188,40 @@ def _boxes_overlap(box1: Box, box2: Box) -> bool:
     return not (x1_max < x2_min or x2_max < x1_min or y1_max < y2_min or y2_max < y1_min)
 
 
+def create_candidate_scorer(
+    grid: GridSystem,
+    safe_zone: SafeZone,
+    typographic_scale: TypographicScale
+) -> CompositeScorer:
+    """Create the enhanced composite scorer used to rank overlay candidates"""
+    enhanced_metrics = [
+        (ContrastScore(), 0.25),
+        (GridAlignmentScore(grid), 0.15),
+        (SafeZoneScore(safe_zone), 0.15),
+        (SaliencyScore(), 0.25),
+        (HierarchyScore(typographic_scale), 0.15),
+        (OverflowScore(), 0.05),
+    ]
+    return CompositeScorer(enhanced_metrics)
+
+
 def score_candidates(
     candidates: List[OverlayElement],
     image: Image.Image,
     grid: GridSystem,
     safe_zone: SafeZone,
     typographic_scale: TypographicScale,
-    brand_kit: BrandKit
+    brand_kit: BrandKit,
+    saliency_map: Optional[np.ndarray] = None,
+    integral_images: Optional[IntegralImages] = None
 ) -> List[Tuple[OverlayElement, float]]:
     """
     Score all candidates using composite scoring
     
+    Pixel metrics are evaluated for every candidate at once from summed-area
+    tables, so scoring cost is dominated by building the tables, not by the
+    number of candidates.
+    
     Args:
         candidates: List of candidate elements
         image: Base image
@@ -1137,39 +1229,23 @@ def score_candidates(
         safe_zone: Safe zone
         typographic_scale: Typographic scale
         brand_kit: Brand kit
+        saliency_map: Precomputed saliency map (computed if omitted)
+        integral_images: Precomputed summed-area tables (built if omitted)
     
     Returns:
         List of (element, score) tuples, sorted by score (highest first)
     """
-    # Compute saliency map
-    saliency_map = compute_saliency_map(image)
-    
-    # Create composite scorer with all metrics
-    base_scorer = create_default_scorer(safe_zone, grid)
-    
-    # Add additional metrics
-    saliency_metric = SaliencyScore()
-    hierarchy_metric = HierarchyScore(typographic_scale)
-    overflow_metric = OverflowScore()
-    
-    # Create enhanced composite scorer
-    enhanced_metrics = [
-        (ContrastScore(), 0.25),
-        (GridAlignmentScore(grid), 0.15),
-        (SafeZoneScore(safe_zone), 0.15),
-        (saliency_metric, 0.25),
-        (hierarchy_metric, 0.15),
-        (overflow_metric, 0.05),
-    ]
-    scorer = CompositeScorer(enhanced_metrics)
+    if integral_images is None or integral_images.saliency is None:
+        if saliency_map is None:
+            saliency_map = compute_saliency_map(image)
+        integral_images = IntegralImages(image, saliency_map)
     
-    # Score each candidate
-    scored_candidates = []
-    context = {'saliency_map': saliency_map}
+    scorer = create_candidate_scorer(grid, safe_zone, typographic_scale)
+    context = {'saliency_map': saliency_map, 'integral_images': integral_images}
     
-    for candidate in candidates:
-        score = scorer.score(candidate, image, context)
-        scored_candidates.append((candidate, score))
+    # Score all candidates in one vectorized pass
+    scores = scorer.score_batch(candidates, image, context)
+    scored_candidates = [(candidate, float(score)) for candidate, score in zip(candidates, scores)]
     
     # Sort by score (highest first)
     scored_candidates.sort(key=lambda x: x[1], reverse=True)
@@ -1177,10 +1253,154 @@ def score_candidates(
     return scored_candidates
 
 
+# Layout search places the most important roles first
+_ROLE_PRIORITY = {
+    OverlayRole.HEADLINE: 0,
+    OverlayRole.SUBHEAD: 1,
+    OverlayRole.BODY: 2,
+    OverlayRole.CTA: 3,
+    OverlayRole.TAGLINE: 4,
+    OverlayRole.CAPTION: 5,
+    OverlayRole.HASHTAG: 6,
+}
+
+
+class _PartialLayout(NamedTuple):
+    """A beam entry: chosen candidate indices, running score and overlap bitmask"""
+    elements: Tuple[int, ...]
+    score: float
+    blocked: int  # Bit i set = candidate i overlaps an element already placed
+
+
+def _overlap_masks(boxes: List[Box]) -> List[int]:
+    """
+    Bitmask per box of every other box it overlaps
+    
+    Sweeps the boxes in x order so each box is only tested against boxes whose
+    x interval can intersect it, with the y test vectorized. Overlap follows
+    _boxes_overlap: touching boxes overlap, pixel boxes never do.
+    """
+    n = len(boxes)
+    if n == 0:
+        return []
+    
+    coords = np.array([(b.x, b.y, b.x + b.width, b.y + b.height) for b in boxes], dtype=np.float64)
+    is_percentage = np.array([b.use_percentage for b in boxes])
+    
+    order = np.argsort(coords[:, 0], kind='stable')
+    sorted_coords = coords[order]
+    # Boxes starting at or before each box's right edge form its x-overlap window
+    window_ends = np.searchsorted(sorted_coords[:, 0], sorted_coords[:, 2], side='right')
+    
+    # Rows are built straight into int bitmasks; only the overlapping pairs are touched
+    masks = [0] * n
+    for i in range(n):
+        window = order[i + 1:window_ends[i]]
+        if window.size == 0 or not is_percentage[order[i]]:
+            continue
+        y_min, y_max = sorted_coords[i, 1], sorted_coords[i, 3]
+        hits = window[
+            is_percentage[window]
+            & (coords[window, 1] <= y_max)
+            & (coords[window, 3] >= y_min)
+        ]
+        box_index = int(order[i])
+        box_bit = 1 << box_index
+        for hit in hits.tolist():
+            masks[box_index] |= 1 << hit
+            masks[hit] |= box_bit
+    
+    return masks
+
+
+def search_layouts(
+    scored_candidates: List[Tuple[OverlayElement, float]],
+    beam_width: int = 10,
+    time_budget_ms: Optional[float] = None,
+    reading_order_penalty: float = 0.1
+) -> List[Tuple[List[OverlayElement], float]]:
+    """
+    Beam search over complete layouts (one candidate per text element)
+    
+    Candidates are grouped by text element and placed in role order (headline,
+    subhead, CTA, ...). Every partial layout in the beam is extended with each
+    non-overlapping candidate of the next group; overlap is a bitmask lookup
+    against precomputed conflicts. Layout scores are accumulated incrementally
+    from the candidates' batch scores, with a penalty when a less important
+    element sits above a more important one. A layout may leave an element out
+    when nothing fits.
+    
+    Args:
+        scored_candidates: List of (element, score) tuples from score_candidates
+        beam_width: Number of partial layouts kept per step
+        time_budget_ms: Optional search budget; once spent, remaining groups are
+            filled greedily with each layout's best non-overlapping candidate
+        reading_order_penalty: Score penalty per reading-order inversion
+    
+    Returns:
+        List of (elements, score) layouts, best first
+    """
+    if not scored_candidates:
+        return []
+    
+    deadline = time.perf_counter() + time_budget_ms / 1000 if time_budget_ms is not None else None
+    
+    candidates = [candidate for candidate, _ in scored_candidates]
+    scores = [float(score) for _, score in scored_candidates]
+    masks = _overlap_masks([candidate.box for candidate in candidates])
+    
+    # Group candidates by text element, best score first within each group
+    groups: Dict[Tuple[OverlayRole, str], List[int]] = {}
+    for index, candidate in enumerate(candidates):
+        groups.setdefault((candidate.role, candidate.text), []).append(index)
+    ordered_groups = sorted(groups.items(), key=lambda item: _ROLE_PRIORITY.get(item[0][0], len(_ROLE_PRIORITY)))
+    for _, indices in ordered_groups:
+        indices.sort(key=lambda index: scores[index], reverse=True)
+    
+    def order_penalty(layout: _PartialLayout, index: int) -> float:
+        box = candidates[index].box
+        if not box.use_percentage:
+            return 0.0
+        priority = _ROLE_PRIORITY.get(candidates[index].role, len(_ROLE_PRIORITY))
+        inversions = sum(
+            1 for placed in layout.elements
+            if candidates[placed].box.use_percentage
+            and _ROLE_PRIORITY.get(candidates[placed].role, len(_ROLE_PRIORITY)) < priority
+            and candidates[placed].box.y > box.y
+        )
+        return inversions * reading_order_penalty
+    
+    beam = [_PartialLayout((), 0.0, 0)]
+    for _, indices in ordered_groups:
+        expanded = []
+        for layout in beam:
+            exhaustive = deadline is None or time.perf_counter() < deadline
+            # Leaving the element out keeps layouts alive when nothing fits
+            expanded.append(layout)
+            for index in indices:
+                if (layout.blocked >> index) & 1:
+                    continue
+                expanded.append(_PartialLayout(
+                    layout.elements + (index,),
+                    layout.score + scores[index] - order_penalty(layout, index),
+                    layout.blocked | masks[index]
+                ))
+                if not exhaustive:
+                    break
+        beam = heapq.nlargest(beam_width, expanded, key=lambda layout: layout.score)
+    
+    return [
+        ([candidates[index] for index in layout.elements], layout.score)
+        for layout in beam
+        if layout.elements
+    ]
+
+
 def beam_search_top_candidates(
     scored_candidates: List[Tuple[OverlayElement, float]],
     top_n: int = 5,
-    beam_width: int = 10
+    beam_width: int = 10,
+    time_budget_ms: Optional[float] = None
 ) -> List[OverlayElement]:
     """
     Use beam search to find best combinations of candidates
@@ -1189,41 +1409,31 @@ def beam_search_top_candidates(
         scored_candidates: List of (element, score) tuples
         top_n: Number of top candidates to return
         beam_width: Beam width for search
+        time_budget_ms: Optional layout search budget in milliseconds
     
     Returns:
-        List of top N overlay elements
+        List of top N overlay elements, the best layout's elements first
     """
-    # For now, simple approach: just return top N by score
-    # In production, could implement more sophisticated beam search
-    # that considers element combinations and avoids overlaps
-    
-    # Sort by score
-    sorted_candidates = sorted(scored_candidates, key=lambda x: x[1], reverse=True)
+    layouts = search_layouts(scored_candidates, beam_width=beam_width, time_budget_ms=time_budget_ms)
     
-    # Filter to avoid overlaps (simple greedy)
+    # Take elements layout by layout, best layout first
     selected = []
-    for candidate, score in sorted_candidates:
-        if len(selected) >= top_n:
-            break
-        
-        # Check if overlaps with any selected
-        overlaps = False
-        for selected_elem in selected:
-            if _boxes_overlap(candidate.box, selected_elem.box):
-                overlaps = True
+    selected_ids = set()
+    for elements, _ in layouts:
+        for element in elements:
+            if len(selected) >= top_n:
                 break
-        
-        if not overlaps:
-            selected.append(candidate)
+            if id(element) not in selected_ids:
+                selected.append(element)
+                selected_ids.add(id(element))
     
-    # If we don't have enough non-overlapping, add best ones anyway
-    while len(selected) < top_n and len(selected) < len(sorted_candidates):
-        for candidate, score in sorted_candidates:
-            if candidate not in selected:
-                selected.append(candidate)
-                break
-        if len(selected) >= len(sorted_candidates):
+    # If the layouts don't cover top_n, add the best remaining candidates
+    for candidate, _ in sorted(scored_candidates, key=lambda x: x[1], reverse=True):
+        if len(selected) >= top_n:
             break
+        if id(candidate) not in selected_ids:
+            selected.append(candidate)
+            selected_ids.add(id(candidate))
     
     return selected[:top_n]
 
@@ -1233,7 +1443,7 @@ def beam_search_top_candidates(
 # ============================================================================
 
 async def generate_ai_text_overlay(
-    image_base64: str,
+    image_base64: Union[str, ImageContext],
     text_elements: List[Dict[str, Any]],
     brand_kit: Optional[BrandKit] = None,
     safe_zone: Optional[SafeZone] = None,
@@ -1242,14 +1452,15 @@ async def generate_ai_text_overlay(
     top_n: int = 3,
     use_template: bool = True,
     use_cache: bool = True,
-    preferred_composition: Optional[str] = None
+    preferred_composition: Optional[str] = None,
+    layout_time_budget_ms: Optional[float] = None
 ) -> List[Dict[str, Any]]:
     """
     High-level API to generate AI-optimized text overlay candidates
     Enhanced with templates, caching, and analytics (Phases 5-10)
     
     Args:
-        image_base64: Base64 encoded image
+        image_base64: Base64 encoded image, or an ImageContext already decoded by the caller
         text_elements: List of {text, role} dictionaries where role is OverlayRole enum value
         brand_kit: Optional brand kit (uses default if not provided)
         safe_zone: Optional safe zone (uses default if not provided)
@@ -1258,13 +1469,14 @@ async def generate_ai_text_overlay(
         top_n: Number of top candidates to return
         use_template: Whether to use template library (Phase 5)
         use_cache: Whether to use analysis cache (Phase 9)
+        layout_time_budget_ms: Optional time budget for the layout beam search
     
     Returns:
         List of candidate overlay configurations (as dictionaries)
     """
-    # Decode image
-    img_data = base64.b64decode(image_base64)
-    image = Image.open(io.BytesIO(img_data))
+    # Decode image (once per context - callers passing a context share the decode)
+    image_context = ImageContext.of(image_base64)
+    image = image_context.image
     
     # Use defaults if not provided
     if brand_kit is None:
@@ -1317,14 +1529,20 @@ async def generate_ai_text_overlay(
             )
     
     # Phase 9: Use cached analysis if available
-    saliency_map = None
-    if use_cache:
-        saliency_map = _analysis_cache.get_saliency_map(image_base64)
+    def saliency() -> np.ndarray:
+        saliency_map = _analysis_cache.get_saliency_map(image_context.digest) if use_cache else None
+        if saliency_map is None:
+            saliency_map = compute_saliency_map(image)
+            if use_cache:
+                _analysis_cache.set_saliency_map(image_context.digest, saliency_map)
+        return saliency_map
     
-    if saliency_map is None:
-        saliency_map = compute_saliency_map(image)
-        if use_cache:
-            _analysis_cache.set_saliency_map(image_base64, saliency_map)
+    saliency_map = image_context.derived("advanced:saliency", saliency)
+    
+    # Summed-area tables shared by candidate generation, scoring and analytics
+    integral_images = image_context.derived(
+        "advanced:integral_images", lambda: IntegralImages(image_context.rgb, saliency_map)
+    )
     
     # Generate candidates (use template elements if available, otherwise generate)
     if template_elements:
@@ -1332,32 +1550,34 @@ async def generate_ai_text_overlay(
     else:
         candidates = generate_overlay_candidates(
             image, processed_elements, grid, safe_zone,
-            typographic_scale, brand_kit
+            typographic_scale, brand_kit,
+            integral_images=integral_images
         )
     
     # Score candidates
     scored = score_candidates(
-        candidates, image, grid, safe_zone, typographic_scale, brand_kit
+        candidates, image, grid, safe_zone, typographic_scale, brand_kit,
+        saliency_map=saliency_map, integral_images=integral_images
     )
     
     # Get top N
-    top_candidates = beam_search_top_candidates(scored, top_n=top_n)
+    top_candidates = beam_search_top_candidates(scored, top_n=top_n, time_budget_ms=layout_time_budget_ms)
     
     # Phase 6: Extract palette and check WCAG
     palette = None
     if use_cache:
-        palette = _analysis_cache.get_palette(image_base64)
+        palette = _analysis_cache.get_palette(image_context.digest)
     
     if palette is None:
         brand_colors = [brand_kit.primary_color, brand_kit.secondary_color] if brand_kit else None
         palette = extract_color_palette(image, brand_override_colors=brand_colors)
         if use_cache:
-            _analysis_cache.set_palette(image_base64, palette)
+            _analysis_cache.set_palette(image_context.digest, palette)
     
     # Phase 10: Record analytics
     if top_candidates:
         best_candidate = top_candidates[0]
-        context = {'saliency_map': saliency_map}
+        context = {'saliency_map': saliency_map, 'integral_images': integral_images}
         
         # Calculate metrics
         contrast_metric = ContrastScore()
@@ -1427,6 +1647,44 @@ async def generate_ai_text_overlay(
     return result
 
 
+def overlay_element_from_dict(data: Dict[str, Any]) -> OverlayElement:
+    """
+    Rebuild an OverlayElement from the dictionary format generate_ai_text_overlay returns
+
+    Raises:
+        ValueError: Missing text/box or an unknown role, alignment or panel style
+    """
+    box = data.get('box')
+    if not data.get('text') or not isinstance(box, dict):
+        raise ValueError("Overlay elements need text and a box")
+    try:
+        return OverlayElement(
+            role=OverlayRole(data.get('role', OverlayRole.HEADLINE.value)),
+            text=str(data['text']),
+            box=Box(
+                x=float(box['x']), y=float(box['y']),
+                width=float(box['width']), height=float(box['height']),
+                use_percentage=bool(box.get('use_percentage', True))
+            ),
+            typography=Typography(**{
+                name: value for name, value in (data.get('typography') or {}).items()
+                if name in Typography.__dataclass_fields__
+            }),
+            effects=Effects(**{
+                name: value for name, value in (data.get('effects') or {}).items()
+                if name in Effects.__dataclass_fields__
+            }),
+            color=data.get('color', "#FFFFFF"),
+            text_align=TextAlign(data.get('text_align', TextAlign.LEFT.value)),
+            panel_style=PanelStyle(data.get('panel_style', PanelStyle.NONE.value)),
+            panel_color=data.get('panel_color', "#000000"),
+            panel_opacity=data.get('panel_opacity', 80),
+            rotation=data.get('rotation', 0)
+        )
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid overlay element: {e}") from None
+
+
 # ============================================================================
 # Phase 5: Templates and Hierarchy Consistency
 # ============================================================================
@@ -1651,7 +1909,7 @@ def extract_color_palette(
     brand_override_colors: Optional[List[str]] = None
 ) -> List[Tuple[int, int, int]]:
     """
-    Extract color palette from image using k-means clustering
+    Extract color palette from image using histogram k-means clustering
     Inspired by IMG.LY's color extraction
     
     Args:
@@ -1662,18 +1920,8 @@ def extract_color_palette(
     Returns:
         List of RGB tuples
     """
-    # Resize for faster processing
-    small_image = image.resize((150, 150), Image.Resampling.LANCZOS)
-    
-    # Convert to numpy array
-    img_array = np.array(small_image)
-    
-    # Reshape to 2D array of pixels
-    pixels = img_array.reshape(-1, 3)
-    
-    # Simple k-means (using basic implementation)
-    # For production, use sklearn.cluster.KMeans
-    centroids = _simple_kmeans(pixels, n_colors)
+    # Histogram k-means from the shared palette engine (memoized per image)
+    centroids = extract_palette(image, n_colors)
     
     # Sort by luminance (brightest first)
     centroids = sorted(centroids, key=lambda c: 0.299*c[0] + 0.587*c[1] + 0.114*c[2], reverse=True)
@@ -1686,29 +1934,6 @@ def extract_color_palette(
     return centroids[:n_colors]
 
 
-def _simple_kmeans(pixels: np.ndarray, k: int, max_iter: int = 10) -> List[Tuple[int, int, int]]:
-    """Simple k-means implementation"""
-    # Initialize centroids randomly
-    np.random.seed(42)
-    centroids = pixels[np.random.choice(pixels.shape[0], k, replace=False)]
-    
-    for _ in range(max_iter):
-        # Assign pixels to nearest centroid
-        distances = np.sqrt(((pixels - centroids[:, np.newaxis])**2).sum(axis=2))
-        labels = np.argmin(distances, axis=0)
-        
-        # Update centroids
-        new_centroids = np.array([pixels[labels == i].mean(axis=0) for i in range(k)])
-        
-        # Check convergence
-        if np.allclose(centroids, new_centroids):
-            break
-        
-        centroids = new_centroids
-    
-    return [tuple(map(int, c)) for c in centroids]
-
-
 def check_wcag_contrast(
     text_color: Tuple[int, int, int],
     background_color: Tuple[int, int, int]
@@ -1835,57 +2060,334 @@ def render_text_as_svg(
     return svg
 
 
+# Rendered exports keyed by (image hash, layout hash, ratio, format)
+EXPORT_CACHE_SIZE = 64
+_export_cache: "OrderedDict[Tuple[str, str, str, str], bytes]" = OrderedDict()
+# Exports are stored from compute-pool threads; the LRU bookkeeping isn't thread-safe on its own
+_export_cache_lock = threading.Lock()
+
+
+def saliency_crop_box(
+    saliency_map: np.ndarray,
+    target_ratio: float
+) -> Tuple[int, int, int, int]:
+    """
+    Largest crop of the given aspect ratio that keeps the most saliency
+    
+    The crop spans the full image along one axis and slides along the other;
+    window sums come from a 1-D cumulative sum, and ties go to the most
+    centered window.
+    
+    Args:
+        saliency_map: Saliency map (H, W) of the base image
+        target_ratio: Target width / height
+    
+    Returns:
+        (left, top, right, bottom) in pixels
+    """
+    height, width = saliency_map.shape
+    
+    if width / height > target_ratio:
+        crop_width, crop_height = max(1, round(height * target_ratio)), height
+        profile = saliency_map.sum(axis=0)
+        window = crop_width
+    else:
+        crop_width, crop_height = width, max(1, round(width / target_ratio))
+        profile = saliency_map.sum(axis=1)
+        window = crop_height
+    
+    cumulative = np.concatenate(([0.0], np.cumsum(profile, dtype=np.float64)))
+    window_sums = cumulative[window:] - cumulative[:-window]
+    offsets = np.flatnonzero(window_sums >= window_sums.max() - 1e-9)
+    center = (len(profile) - window) / 2
+    offset = int(offsets[np.argmin(np.abs(offsets - center))])
+    
+    if window == crop_width:
+        return offset, 0, offset + crop_width, crop_height
+    return 0, offset, crop_width, offset + crop_height
+
+
+def refit_elements_for_crop(
+    elements: List[OverlayElement],
+    base_size: Tuple[int, int],
+    crop_box: Tuple[int, int, int, int],
+    cropped_image: Image.Image,
+    safe_zone: Optional[SafeZone] = None,
+    typographic_scale: Optional[TypographicScale] = None
+) -> List[OverlayElement]:
+    """
+    Move overlay elements into a crop and re-fit their typography
+    
+    Boxes keep their pixel size where possible, are pulled inside the crop's
+    safe zone, and are pushed clear of already placed elements (most important
+    role first). Font sizes are re-fit to the new boxes.
+    
+    Returns:
+        New elements with percentage boxes relative to the crop
+    """
+    if safe_zone is None:
+        safe_zone = create_default_safe_zone()
+    if typographic_scale is None:
+        typographic_scale = create_default_typographic_scale()
+    
+    base_width, base_height = base_size
+    left, top, right, bottom = crop_box
+    crop_width, crop_height = right - left, bottom - top
+    
+    # Safe area in crop pixels
+    min_x = crop_width * safe_zone.left_margin / 100
+    max_x = crop_width * (1 - safe_zone.right_margin / 100)
+    min_y = crop_height * safe_zone.top_margin / 100
+    max_y = crop_height * (1 - safe_zone.bottom_margin / 100)
+    
+    ordered = sorted(elements, key=lambda e: _ROLE_PRIORITY.get(e.role, len(_ROLE_PRIORITY)))
+    placed: List[Box] = []
+    refit = []
+    
+    for element in ordered:
+        box = element.box
+        if box.use_percentage:
+            x, y = box.x / 100 * base_width, box.y / 100 * base_height
+            w, h = box.width / 100 * base_width, box.height / 100 * base_height
+        else:
+            x, y, w, h = box.x, box.y, box.width, box.height
+        
+        # Into crop coordinates, shrunk to the safe area if needed
+        w, h = min(w, max_x - min_x), min(h, max_y - min_y)
+        x = min(max(x - left, min_x), max_x - w)
+        y = min(max(y - top, min_y), max_y - h)
+        
+        new_box = Box(x=x / crop_width * 100, y=y / crop_height * 100,
+                      width=w / crop_width * 100, height=h / crop_height * 100)
+        
+        # Push below (or else above) anything already placed
+        for other in placed:
+            if not _boxes_overlap(new_box, other):
+                continue
+            below = other.y + other.height + 1
+            above = other.y - new_box.height - 1
+            if below + new_box.height <= max_y / crop_height * 100:
+                new_box.y = below
+            elif above >= min_y / crop_height * 100:
+                new_box.y = above
+        placed.append(new_box)
+        
+        typography, _ = fit_text_to_box(
+            element.text, new_box, cropped_image, element.typography,
+            typographic_scale, element.role
+        )
+        refit.append(replace(element, box=new_box, typography=typography))
+    
+    return refit
+
+
+def render_overlay_elements(image: Image.Image, elements: List[OverlayElement]) -> Image.Image:
+    """
+    Rasterize overlay elements (panel, shadow, stroke and wrapped text) onto an image
+    
+    Returns:
+        New RGBA image
+    """
+    canvas = image.convert('RGBA') if image.mode != 'RGBA' else image.copy()
+    
+    for element in elements:
+        box = element.box
+        if box.use_percentage:
+            x0, y0 = int(box.x / 100 * canvas.width), int(box.y / 100 * canvas.height)
+            bw, bh = int(box.width / 100 * canvas.width), int(box.height / 100 * canvas.height)
+        else:
+            x0, y0, bw, bh = int(box.x), int(box.y), int(box.width), int(box.height)
+        if bw <= 0 or bh <= 0:
+            continue
+        
+        typography = element.typography
+        font = load_font(typography.font_name, typography.font_size, variant_for_weight(typography.font_weight))
+        lines = _wrap_text_to_width(element.text, bw, font)
+        line_height_px = int(typography.font_size * typography.line_height)
+        alpha = int(255 * element.effects.opacity / 100)
+        
+        layer = Image.new('RGBA', canvas.size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        
+        if element.panel_style == PanelStyle.BLUR:
+            region = canvas.crop((x0, y0, x0 + bw, y0 + bh)).filter(ImageFilter.GaussianBlur(radius=12))
+            canvas.paste(region, (x0, y0))
+        if element.panel_style != PanelStyle.NONE:
+            draw.rounded_rectangle(
+                (x0, y0, x0 + bw, y0 + bh), radius=4,
+                fill=_hex_to_rgb(element.panel_color) + (int(element.panel_opacity),)
+            )
+        
+        # Text block is vertically centered in the box
+        text_mask = Image.new('L', canvas.size, 0)
+        mask_draw = ImageDraw.Draw(text_mask)
+        stroke_width = element.effects.stroke_width
+        y = y0 + max(0, (bh - line_height_px * len(lines)) // 2)
+        positions = []
+        for line in lines:
+            line_width = draw.textlength(line, font=font)
+            if element.text_align == TextAlign.CENTER:
+                x = x0 + (bw - line_width) / 2
+            elif element.text_align == TextAlign.RIGHT:
+                x = x0 + bw - line_width
+            else:
+                x = x0
+            positions.append((x, y, line))
+            mask_draw.text((x, y), line, font=font, fill=255, stroke_width=stroke_width)
+            y += line_height_px
+        
+        if element.effects.shadow_enabled:
+            effects = element.effects
+            shadow = text_mask.filter(ImageFilter.GaussianBlur(radius=effects.shadow_blur / 2))
+            # Offsets may arrive as floats (client layouts); paste boxes need whole pixels
+            dx, dy = int(round(effects.shadow_offset_x)), int(round(effects.shadow_offset_y))
+            layer.paste(
+                _hex_to_rgb(effects.shadow_color) + (alpha,),
+                (dx, dy, dx + canvas.width, dy + canvas.height),
+                shadow
+            )
+        
+        text_fill = _hex_to_rgb(element.color) + (alpha,)
+        stroke_fill = _hex_to_rgb(element.effects.stroke_color) + (alpha,)
+        for x, y, line in positions:
+            draw.text((x, y), line, font=font, fill=text_fill,
+                      stroke_width=stroke_width, stroke_fill=stroke_fill)
+        
+        if element.rotation:
+            center = (x0 + bw / 2, y0 + bh / 2)
+            layer = layer.rotate(-element.rotation, center=center, resample=Image.Resampling.BICUBIC)
+        
+        canvas = Image.alpha_composite(canvas, layer)
+    
+    return canvas
+
+
+def _ratio_key(ratio: Tuple[float, float]) -> str:
+    return f"{ratio[0]}:{ratio[1]}"
+
+
+def _render_ratio(
+    base_image: Image.Image,
+    saliency_map: np.ndarray,
+    elements: List[OverlayElement],
+    ratio: Tuple[float, float],
+    output_format: str
+) -> bytes:
+    """Crop, re-lay out, render and encode one ratio (runs in the compute pool)"""
+    crop_box = saliency_crop_box(saliency_map, ratio[0] / ratio[1])
+    cropped = base_image.crop(crop_box)
+    
+    if elements:
+        fitted = refit_elements_for_crop(elements, base_image.size, crop_box, cropped)
+        cropped = render_overlay_elements(cropped, fitted)
+    
+    return encode_image(cropped, output_format).data
+
+
+def _export_cache_keys(
+    base_image: Image.Image,
+    elements: List[OverlayElement],
+    ratios: List[Tuple[float, float]],
+    output_format: str
+) -> Dict[str, Tuple[str, str, str, str]]:
+    image_hash = hashlib.blake2b(base_image.tobytes(), digest_size=16).hexdigest()
+    layout_hash = hashlib.blake2b(repr(elements).encode(), digest_size=16).hexdigest()
+    return {
+        _ratio_key(ratio): (image_hash, layout_hash, _ratio_key(ratio), output_format.upper())
+        for ratio in ratios
+    }
+
+
+def _cached_exports(keys: Dict[str, Tuple[str, str, str, str]]) -> Dict[str, bytes]:
+    with _export_cache_lock:
+        results = {}
+        for ratio_str, key in keys.items():
+            data = _export_cache.get(key)
+            if data is not None:
+                _export_cache.move_to_end(key)
+                results[ratio_str] = data
+        return results
+
+
+def _store_export(key: Tuple[str, str, str, str], data: bytes):
+    with _export_cache_lock:
+        _export_cache[key] = data
+        _export_cache.move_to_end(key)
+        while len(_export_cache) > EXPORT_CACHE_SIZE:
+            _export_cache.popitem(last=False)
+
+
 def export_multi_ratio(
     base_image: Image.Image,
     elements: List[OverlayElement],
     ratios: List[Tuple[float, float]],
-    output_format: str = "PNG"
+    output_format: str = "PNG",
+    saliency_map: Optional[np.ndarray] = None
 ) -> Dict[str, bytes]:
     """
     Export image with text overlays in multiple aspect ratios
     
+    Each ratio is a content-aware crop (the window keeping the most saliency),
+    with the overlay elements re-fit into it. Ratios render in parallel in the
+    compute pool and results are cached per (image, layout, ratio).
+    
     Args:
-        base_image: Base image
+        base_image: Base image (decoded once and shared by every ratio)
         elements: List of overlay elements
         ratios: List of (width, height) ratios
-        output_format: Output format (PNG, JPEG, PDF)
+        output_format: Output format (PNG, JPEG, WEBP, or "auto" to pick per image)
+        saliency_map: Optional precomputed saliency map of base_image
     
     Returns:
         Dictionary mapping ratio strings to image bytes
     """
-    results = {}
+    keys = _export_cache_keys(base_image, elements, ratios, output_format)
+    results = _cached_exports(keys)
+    pending = [ratio for ratio in ratios if _ratio_key(ratio) not in results]
     
-    for ratio in ratios:
-        ratio_str = f"{ratio[0]}:{ratio[1]}"
-        
-        # Calculate target size maintaining aspect ratio
-        base_width, base_height = base_image.size
-        base_ratio = base_width / base_height
-        target_ratio = ratio[0] / ratio[1]
-        
-        if target_ratio > base_ratio:
-            # Target is wider, fit to height
-            new_height = base_height
-            new_width = int(new_height * target_ratio)
-        else:
-            # Target is taller, fit to width
-            new_width = base_width
-            new_height = int(new_width / target_ratio)
-        
-        # Resize image
-        resized_image = base_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    if pending:
+        base_image.load()
+        if saliency_map is None:
+            saliency_map = compute_saliency_map(base_image)
         
-        # Reposition elements proportionally
-        scale_x = new_width / base_width
-        scale_y = new_height / base_height
+        pool = get_compute_pool()
+        futures = {
+            _ratio_key(ratio): pool.submit(_render_ratio, base_image, saliency_map, elements, ratio, output_format)
+            for ratio in pending
+        }
+        for ratio_str, future in futures.items():
+            results[ratio_str] = future.result()
+            _store_export(keys[ratio_str], results[ratio_str])
+    
+    return {_ratio_key(ratio): results[_ratio_key(ratio)] for ratio in ratios}
+
+
+async def export_multi_ratio_async(
+    base_image: Image.Image,
+    elements: List[OverlayElement],
+    ratios: List[Tuple[float, float]],
+    output_format: str = "PNG",
+    saliency_map: Optional[np.ndarray] = None
+) -> Dict[str, bytes]:
+    """export_multi_ratio for async callers: all ratios render concurrently in the compute pool"""
+    keys = _export_cache_keys(base_image, elements, ratios, output_format)
+    results = _cached_exports(keys)
+    pending = [ratio for ratio in ratios if _ratio_key(ratio) not in results]
+    
+    if pending:
+        base_image.load()
+        if saliency_map is None:
+            saliency_map = await run_in_compute_pool(compute_saliency_map, base_image)
         
-        # For now, render to PNG (vector export would use SVG)
-        # In production, would use SVG flattening
-        output = io.BytesIO()
-        resized_image.save(output, format=output_format)
-        results[ratio_str] = output.getvalue()
+        rendered = await asyncio.gather(*(
+            run_in_compute_pool(_render_ratio, base_image, saliency_map, elements, ratio, output_format)
+            for ratio in pending
+        ))
+        for ratio, data in zip(pending, rendered):
+            results[_ratio_key(ratio)] = data
+            _store_export(keys[_ratio_key(ratio)], data)
     
-    return results
+    return {_ratio_key(ratio): results[_ratio_key(ratio)] for ratio in ratios}
 
 
 # ============================================================================
@@ -1900,22 +2402,22 @@ class ImageAnalysisCache:
         self.max_size = max_size
         self.access_order: List[str] = []
     
-    def _get_cache_key(self, image_base64: str) -> str:
-        """Generate cache key from image"""
+    def _get_cache_key(self, image_key: str) -> str:
+        """Generate cache key from an image's content digest (or its base64)"""
         import hashlib
-        return hashlib.md5(image_base64.encode()).hexdigest()
+        return hashlib.md5(image_key.encode()).hexdigest()
     
-    def get_saliency_map(self, image_base64: str) -> Optional[np.ndarray]:
+    def get_saliency_map(self, image_key: str) -> Optional[np.ndarray]:
         """Get cached saliency map"""
-        key = self._get_cache_key(image_base64)
+        key = self._get_cache_key(image_key)
         if key in self.cache:
             self._update_access(key)
             return self.cache[key].get('saliency_map')
         return None
     
-    def set_saliency_map(self, image_base64: str, saliency_map: np.ndarray):
+    def set_saliency_map(self, image_key: str, saliency_map: np.ndarray):
         """Cache saliency map"""
-        key = self._get_cache_key(image_base64)
+        key = self._get_cache_key(image_key)
         if len(self.cache) >= self.max_size:
             # Remove oldest
             oldest_key = self.access_order.pop(0)
@@ -1927,17 +2429,17 @@ class ImageAnalysisCache:
         self.cache[key]['saliency_map'] = saliency_map
         self._update_access(key)
     
-    def get_palette(self, image_base64: str) -> Optional[List[Tuple[int, int, int]]]:
+    def get_palette(self, image_key: str) -> Optional[List[Tuple[int, int, int]]]:
         """Get cached palette"""
-        key = self._get_cache_key(image_base64)
+        key = self._get_cache_key(image_key)
         if key in self.cache:
             self._update_access(key)
             return self.cache[key].get('palette')
         return None
     
-    def set_palette(self, image_base64: str, palette: List[Tuple[int, int, int]]):
+    def set_palette(self, image_key: str, palette: List[Tuple[int, int, int]]):
         """Cache palette"""
-        key = self._get_cache_key(image_base64)
+        key = self._get_cache_key(image_key)
         if len(self.cache) >= self.max_size:
             oldest_key = self.access_order.pop(0)
             del self.cache[oldest_key]
@@ -0,0 +1,72 @@
+"""
+Compute Pool
+Shared worker pools for CPU-bound work kept off the event loop: threads for
+image work (cropping, rendering, encoding), processes for GIL-bound jobs (OCR)
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+# Pillow and numpy release the GIL in resampling, filtering and encoding, so
+# threads give real parallelism for image work without pickling images
+COMPUTE_POOL_WORKERS = int(os.environ.get("COMPUTE_POOL_WORKERS", min(8, (os.cpu_count() or 1) + 1)))
+
+PROCESS_POOL_WORKERS = int(os.environ.get("PROCESS_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Workers must not be forked from the server: a fork copies the running event
+# loop, Motor's client and any lock another thread holds at that moment
+PROCESS_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_compute_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_compute_pool() -> ThreadPoolExecutor:
+    """Get (creating on first use) the shared compute pool"""
+    global _compute_pool
+    if _compute_pool is None:
+        _compute_pool = ThreadPoolExecutor(max_workers=COMPUTE_POOL_WORKERS, thread_name_prefix="compute")
+    return _compute_pool
+
+
+async def run_in_compute_pool(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking function in the compute pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_compute_pool(), functools.partial(func, *args, **kwargs))
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Get (creating on first use) the shared process pool
+
+    Jobs must be module-level functions with picklable arguments. Workers are
+    started with PROCESS_START_METHOD, so they import job modules fresh.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PROCESS_POOL_WORKERS,
+            mp_context=multiprocessing.get_context(PROCESS_START_METHOD)
+        )
+    return _process_pool
+
+
+async def run_in_process_pool(func: Callable[..., Any], *args) -> Any:
+    """Run a module-level function in the process pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), func, *args)
+
+
+def shutdown_compute_pool() -> None:
+    """Shut the pools down (server shutdown); later calls to the getters start new ones"""
+    global _compute_pool, _process_pool
+    if _compute_pool is not None:
+        _compute_pool.shutdown(wait=False, cancel_futures=True)
+        _compute_pool = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
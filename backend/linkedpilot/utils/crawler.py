@@ -0,0 +1,236 @@
+"""
+Site Crawler
+Concurrent same-site page fetching over one connection-pooled aiohttp session,
+with per-host limits, robots.txt crawl delays, a global time budget and an
+early stop once enough text has been collected
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+from .compute_pool import run_in_compute_pool
+from .http_cache import PAGE_TTL, cached_get
+
+
+# Browser-like headers; some sites refuse obvious bot user agents
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+# Concurrent requests per host and overall
+PER_HOST_LIMIT = 4
+TOTAL_LIMIT = 16
+
+DEFAULT_TIME_BUDGET = 20.0
+PAGE_TIMEOUT = 15.0
+
+# Longest robots.txt Crawl-delay honored; sites asking for more are skipped
+MAX_CRAWL_DELAY = 5.0
+
+ROBOTS_TTL = 3600.0
+ROBOTS_TIMEOUT = 5.0
+
+# host -> (expires_at, parser or None when robots.txt is unavailable)
+_robots_cache: Dict[str, Tuple[float, Optional[RobotFileParser]]] = {}
+
+
+class SiteCrawler:
+    """
+    Fetches pages through one pooled session under a shared deadline
+
+    Usage:
+        async with SiteCrawler(time_budget=20) as crawler:
+            html = await crawler.fetch(url)
+            pages = await crawler.crawl(urls, extract, max_pages=10, min_chars=20000)
+
+    `crawler.session` is the pooled session itself, for callers that need
+    other requests (stylesheets, images) to share its connections.
+    """
+
+    def __init__(
+        self,
+        time_budget: float = DEFAULT_TIME_BUDGET,
+        per_host_limit: int = PER_HOST_LIMIT,
+        total_limit: int = TOTAL_LIMIT,
+        page_timeout: float = PAGE_TIMEOUT,
+        respect_robots: bool = True,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        self.time_budget = time_budget
+        self.per_host_limit = per_host_limit
+        self.total_limit = total_limit
+        self.page_timeout = page_timeout
+        self.respect_robots = respect_robots
+        self.headers = headers or DEFAULT_HEADERS
+        self.session: Optional[aiohttp.ClientSession] = None
+
+        self._deadline = time.monotonic() + time_budget
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._robots_locks: Dict[str, asyncio.Lock] = {}
+        self._host_pacing: Dict[str, asyncio.Lock] = {}
+        self._next_request_at: Dict[str, float] = {}
+
+    async def __aenter__(self) -> "SiteCrawler":
+        connector = aiohttp.TCPConnector(
+            limit=self.total_limit,
+            limit_per_host=self.per_host_limit,
+            ttl_dns_cache=300
+        )
+        self.session = aiohttp.ClientSession(connector=connector, headers=self.headers)
+        self._deadline = time.monotonic() + self.time_budget
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @property
+    def remaining(self) -> float:
+        """Seconds left in the crawl's time budget"""
+        return max(0.0, self._deadline - time.monotonic())
+
+    async def _robots(self, url: str) -> Optional[RobotFileParser]:
+        parsed = urlparse(url)
+        host = f"{parsed.scheme}://{parsed.netloc}"
+        # One robots.txt request per host even when many pages start at once
+        async with self._robots_locks.setdefault(host, asyncio.Lock()):
+            cached = _robots_cache.get(host)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            return await self._fetch_robots(host)
+
+    async def _fetch_robots(self, host: str) -> Optional[RobotFileParser]:
+        parser = None
+        try:
+            timeout = aiohttp.ClientTimeout(total=min(ROBOTS_TIMEOUT, self.remaining or ROBOTS_TIMEOUT))
+            async with self.session.get(f"{host}/robots.txt", timeout=timeout, allow_redirects=True) as response:
+                if response.status == 200:
+                    parser = RobotFileParser()
+                    parser.parse((await response.text(errors='replace')).splitlines())
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+
+        _robots_cache[host] = (time.monotonic() + ROBOTS_TTL, parser)
+        return parser
+
+    async def _wait_for_turn(self, host: str, delay: float) -> bool:
+        """Space requests to a host by its crawl delay; False if that would overrun the budget"""
+        lock = self._host_pacing.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._next_request_at.get(host, 0.0) - time.monotonic()
+            if wait > self.remaining:
+                return False
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_request_at[host] = time.monotonic() + delay
+        return True
+
+    async def fetch(self, url: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Fetch one page as text
+
+        Returns:
+            The body, or None when the page is disallowed, non-200, fails, or
+            the time budget runs out
+        """
+        if self.session is None:
+            raise RuntimeError("SiteCrawler must be used as an async context manager")
+        if self.remaining <= 0:
+            return None
+
+        host = urlparse(url).netloc
+        if self.respect_robots:
+            robots = await self._robots(url)
+            if robots is not None:
+                user_agent = self.headers.get('User-Agent', '*')
+                if not robots.can_fetch(user_agent, url):
+                    print(f"[CRAWLER] Skipping {url} (disallowed by robots.txt)")
+                    return None
+                delay = robots.crawl_delay(user_agent) or 0
+                if delay > MAX_CRAWL_DELAY:
+                    print(f"[CRAWLER] Skipping {url} (robots.txt crawl delay {delay}s)")
+                    return None
+                if delay and not await self._wait_for_turn(host, float(delay)):
+                    return None
+
+        semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        async with semaphore:
+            budget = min(timeout or self.page_timeout, self.remaining)
+            if budget <= 0:
+                return None
+            try:
+                response = await cached_get(self.session, url, timeout=budget, default_ttl=PAGE_TTL)
+                if response.status != 200:
+                    print(f"[CRAWLER] {url}: HTTP {response.status}")
+                    return None
+                return response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"[CRAWLER] Failed to fetch {url}: {str(e) or type(e).__name__}")
+                return None
+
+    async def crawl(
+        self,
+        urls: List[str],
+        extract: Callable[[str, str], Optional[str]],
+        max_pages: int = 10,
+        min_chars: Optional[int] = None,
+        time_budget: Optional[float] = None
+    ) -> List[Tuple[str, str]]:
+        """
+        Fetch pages concurrently and extract their text
+
+        Args:
+            urls: Pages in priority order
+            extract: (url, html) -> text or None; runs in the compute pool
+            max_pages: Stop after this many pages yielded text
+            min_chars: Stop early once this much text has been collected
+            time_budget: Restart the deadline with this many seconds (for a
+                crawl that follows other work on the same session)
+
+        Returns:
+            (url, text) pairs in the order of `urls`
+        """
+        async def fetch_and_extract(index: int, url: str) -> Tuple[int, str, Optional[str]]:
+            html = await self.fetch(url)
+            if not html:
+                return index, url, None
+            try:
+                return index, url, await run_in_compute_pool(extract, url, html)
+            except Exception as e:
+                print(f"[CRAWLER] Failed to extract {url}: {e}")
+                return index, url, None
+
+        if time_budget is not None:
+            self._deadline = time.monotonic() + time_budget
+
+        tasks = [asyncio.create_task(fetch_and_extract(i, url)) for i, url in enumerate(urls)]
+        results: List[Tuple[int, str, str]] = []
+        collected = 0
+        started = time.monotonic()
+
+        try:
+            for finished in asyncio.as_completed(tasks, timeout=self.remaining or None):
+                index, url, text = await finished
+                if not text:
+                    continue
+                results.append((index, url, text))
+                collected += len(text)
+                if len(results) >= max_pages or (min_chars and collected >= min_chars):
+                    break
+        except asyncio.TimeoutError:
+            print(f"[CRAWLER] Time budget exhausted after {len(results)} pages")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        print(f"[CRAWLER] {len(results)}/{len(urls)} pages, {collected} chars in {time.monotonic() - started:.1f}s")
+        results.sort()
+        return [(url, text) for _, url, text in results]
@@ -0,0 +1,168 @@
+"""
+Image Derivatives
+Fixed-size WebP thumbnails, stored content-addressed (by hash of the source
+bytes) and generated on upload or lazily on first request
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from PIL import Image, ImageOps
+
+from .compute_pool import run_in_compute_pool
+from .image_encoding import encode_image
+
+
+# Longest edge in pixels per derivative size
+THUMBNAIL_SIZES = {
+    "thumb": 160,
+    "small": 320,
+    "medium": 640,
+}
+
+DERIVATIVE_QUALITY = 80
+
+DERIVATIVES_DIR = Path(__file__).parent.parent.parent.parent / "uploads" / "derivatives"
+
+# Source hash per (path, mtime, size), so repeat requests don't re-read the original
+SOURCE_HASH_CACHE_SIZE = 4096
+_source_hashes: Dict[Tuple[str, float, int], str] = {}
+# One lock per derivative being generated; dropped once it's written
+_generation_locks: Dict[str, asyncio.Lock] = {}
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def derivative_path(source_hash: str, size: str) -> Path:
+    """Content-addressed location of a derivative: <dir>/<ab>/<hash>_<size>.webp"""
+    return DERIVATIVES_DIR / source_hash[:2] / f"{source_hash}_{size}.webp"
+
+
+def derivative_etag(source_hash: str, size: str) -> str:
+    return f'"{source_hash}-{size}"'
+
+
+def _render_derivative(image_data: bytes, size: str, target: Path) -> None:
+    """Decode, downscale and write one WebP derivative (runs in the compute pool)"""
+    edge = THUMBNAIL_SIZES[size]
+    image = Image.open(io.BytesIO(image_data))
+    # JPEG can decode straight at a reduced scale
+    image.draft('RGB', (edge, edge))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    encoded = encode_image(image, "WEBP", quality=DERIVATIVE_QUALITY)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Write atomically so concurrent readers never see a partial file; the temp
+    # name is unique so writers in other workers never share one
+    tmp_file = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_file.write_bytes(encoded.data)
+        os.replace(tmp_file, target)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+
+def _source_hash_for(path: Path) -> str:
+    stat = path.stat()
+    key = (str(path), stat.st_mtime, stat.st_size)
+    source_hash = _source_hashes.get(key)
+    if source_hash is None:
+        source_hash = content_hash(path.read_bytes())
+        if len(_source_hashes) >= SOURCE_HASH_CACHE_SIZE:
+            _source_hashes.clear()
+        _source_hashes[key] = source_hash
+    return source_hash
+
+
+async def _generate(source_hash: str, size: str, load: Callable[[], Awaitable[bytes]]) -> Path:
+    """Write a derivative unless it exists, one generation per (source, size) at a time"""
+    target = derivative_path(source_hash, size)
+    if target.exists():
+        return target
+
+    key = f"{source_hash}_{size}"
+    lock = _generation_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            if not target.exists():
+                await run_in_compute_pool(_render_derivative, await load(), size, target)
+    finally:
+        # Waiters keep their reference and find the file written; later callers see it before locking
+        if _generation_locks.get(key) is lock:
+            del _generation_locks[key]
+    return target
+
+
+async def create_derivatives(image_data: bytes, sizes: Optional[Tuple[str, ...]] = None) -> Dict[str, Path]:
+    """
+    Generate derivatives for freshly uploaded image bytes
+
+    Returns:
+        Map of size name to derivative path (sizes that failed are left out)
+    """
+    source_hash = content_hash(image_data)
+    results = {}
+
+    async def load() -> bytes:
+        return image_data
+
+    for size in sizes or tuple(THUMBNAIL_SIZES):
+        try:
+            results[size] = await _generate(source_hash, size, load)
+        except Exception as e:
+            print(f"[DERIVATIVES] [WARNING] Could not create {size} derivative: {e}")
+
+    return results
+
+
+async def get_derivative(source_path: Path, size: str) -> Tuple[Path, str]:
+    """
+    Derivative of a stored image, generated on first request
+
+    Args:
+        source_path: Original image file
+        size: One of THUMBNAIL_SIZES
+
+    Returns:
+        (derivative path, ETag)
+    """
+    if size not in THUMBNAIL_SIZES:
+        raise ValueError(f"Unknown derivative size: {size}")
+
+    source_hash = await asyncio.to_thread(_source_hash_for, source_path)
+    target = await _generate(source_hash, size, lambda: asyncio.to_thread(source_path.read_bytes))
+    return target, derivative_etag(source_hash, size)
+
+
+async def get_data_derivative(image_data: bytes, size: str) -> Tuple[Path, str]:
+    """Derivative of image bytes that aren't stored as a file (embedded data URLs), generated on first request"""
+    if size not in THUMBNAIL_SIZES:
+        raise ValueError(f"Unknown derivative size: {size}")
+
+    source_hash = await asyncio.to_thread(content_hash, image_data)
+
+    async def load() -> bytes:
+        return image_data
+
+    target = await _generate(source_hash, size, load)
+    return target, derivative_etag(source_hash, size)
+
+
+# Strong references to in-flight background generations
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def schedule_derivatives(image_data: bytes) -> None:
+    """Generate derivatives for an upload in the background (the upload itself doesn't wait)"""
+    task = asyncio.create_task(create_derivatives(image_data))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
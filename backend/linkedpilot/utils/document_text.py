@@ -0,0 +1,213 @@
+"""
+Document Text
+Incremental text extraction for uploaded PDFs, Word documents and text files:
+pages and paragraphs are read lazily and extraction stops once the character
+budget is met. Results are stored content-addressed (by hash of the file
+bytes), so re-analyzing the same upload doesn't parse it again
+"""
+
+import hashlib
+import json
+import os
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from .compute_pool import run_in_process_pool
+
+
+# Characters kept per document (what material analysis reads)
+DOCUMENT_TEXT_LIMIT = 15000
+
+# Pages read at most per PDF, even when they hold little text
+PDF_MAX_PAGES = 50
+
+DOCUMENT_TEXT_DIR = Path(__file__).parent.parent.parent.parent / "uploads" / "document-text"
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Text equivalents of run content other than w:t and w:br (as python-docx reads them)
+WORD_RUN_CHARACTERS = {
+    f"{WORD_NAMESPACE}tab": "\t",
+    f"{WORD_NAMESPACE}ptab": "\t",
+    f"{WORD_NAMESPACE}cr": "\n",
+    f"{WORD_NAMESPACE}noBreakHyphen": "-",
+}
+
+
+def file_hash(file_path: str) -> str:
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(source_hash: str, kind: str, limit: int) -> Path:
+    return DOCUMENT_TEXT_DIR / source_hash[:2] / f"{source_hash}_{kind}_{limit}.json"
+
+
+def _read_cached(path: Path) -> Optional[Dict]:
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cached(path: Path, result: Dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write atomically; workers in other processes may be reading
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(result), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def _collect(parts: Iterator[str], limit: int, separator: str = "\n") -> Tuple[str, bool]:
+    """Join parts until `limit` characters are collected; also reports whether it stopped early"""
+    collected = []
+    size = 0
+    for part in parts:
+        collected.append(part)
+        size += len(part) + len(separator)
+        if size >= limit:
+            return separator.join(collected)[:limit], True
+    return separator.join(collected)[:limit], False
+
+
+def _pdf_pages(file_path: str, max_pages: int) -> Tuple[Iterator[str], int]:
+    """Lazy page texts and the page count (PyPDF2, falling back to pdfplumber)"""
+    try:
+        import PyPDF2
+        reader = PyPDF2.PdfReader(file_path)
+        pages = reader.pages
+        return (pages[i].extract_text() or "" for i in range(min(max_pages, len(pages)))), len(pages)
+    except ImportError:
+        import pdfplumber
+
+    pdf = pdfplumber.open(file_path)
+    page_count = len(pdf.pages)
+
+    def texts():
+        try:
+            for page in pdf.pages[:max_pages]:
+                yield page.extract_text() or ""
+                # pdfplumber keeps parsed layout objects per page otherwise
+                page.flush_cache()
+        finally:
+            pdf.close()
+
+    return texts(), page_count
+
+
+def _docx_run_text(run) -> str:
+    """Text of one w:r: tabs and line breaks become characters, page and column breaks vanish"""
+    parts = []
+    for child in run:
+        if child.tag == f"{WORD_NAMESPACE}t":
+            parts.append(child.text or "")
+        elif child.tag == f"{WORD_NAMESPACE}br":
+            if child.get(f"{WORD_NAMESPACE}type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        else:
+            parts.append(WORD_RUN_CHARACTERS.get(child.tag, ""))
+    return "".join(parts)
+
+
+def _docx_paragraph_text(paragraph) -> str:
+    """Text of one w:p from its runs and hyperlinked runs, like python-docx's Paragraph.text"""
+    run_tag = f"{WORD_NAMESPACE}r"
+    hyperlink_tag = f"{WORD_NAMESPACE}hyperlink"
+    parts = []
+    for child in paragraph:
+        if child.tag == run_tag:
+            parts.append(_docx_run_text(child))
+        elif child.tag == hyperlink_tag:
+            parts.extend(_docx_run_text(run) for run in child if run.tag == run_tag)
+    return "".join(parts)
+
+
+def _docx_paragraphs(file_path: str) -> Iterator[str]:
+    """
+    Body paragraph texts, streamed from word/document.xml
+
+    Same paragraphs as python-docx's Document.paragraphs, without loading the
+    whole document tree first.
+    """
+    from lxml import etree
+
+    paragraph_tag = f"{WORD_NAMESPACE}p"
+    body_tag = f"{WORD_NAMESPACE}body"
+    with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as document:
+        for _, element in etree.iterparse(document, events=("end",), tag=paragraph_tag):
+            parent = element.getparent()
+            if parent is None or parent.tag != body_tag:
+                # Paragraphs in tables and text boxes: python-docx skips them too
+                continue
+            yield _docx_paragraph_text(element)
+            # Drop parsed paragraphs so memory stays flat on long documents
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def _extract(file_path: str, kind: str, limit: int, max_pages: int) -> Dict:
+    if kind == "pdf":
+        try:
+            pages, page_count = _pdf_pages(file_path, max_pages)
+        except ImportError:
+            return {"error": "PDF extraction libraries not available. Install PyPDF2 or pdfplumber."}
+        text, truncated = _collect(pages, limit)
+        return {"content": text, "pages": page_count, "source": "pdf", "truncated": truncated}
+
+    if kind == "word_document":
+        text, truncated = _collect(_docx_paragraphs(file_path), limit)
+        return {"content": text, "source": kind, "truncated": truncated}
+
+    # Plain text: read no more than the budget
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        text = f.read(limit)
+        truncated = bool(f.read(1))
+    return {"content": text, "source": kind, "truncated": truncated}
+
+
+def extract_document_text(
+    file_path: str,
+    kind: str,
+    limit: int = DOCUMENT_TEXT_LIMIT,
+    max_pages: int = PDF_MAX_PAGES
+) -> Dict:
+    """
+    Extract up to `limit` characters of text from a document (runs in a worker)
+
+    Args:
+        file_path: Uploaded file
+        kind: "pdf", "word_document", "text_file" or "generic_text"
+        limit: Character budget; reading stops once it is met
+        max_pages: Most PDF pages read
+
+    Returns:
+        {"content", "source", "truncated"} (plus "pages" for PDFs), or {"error"}
+    """
+    source_hash = file_hash(file_path)
+    cache_path = _cache_path(source_hash, kind, limit)
+    cached = _read_cached(cache_path)
+    if cached is not None:
+        return cached
+
+    result = _extract(file_path, kind, limit, max_pages)
+    if "error" not in result:
+        _write_cached(cache_path, result)
+    return result
+
+
+async def extract_document_text_async(
+    file_path: str,
+    kind: str,
+    limit: int = DOCUMENT_TEXT_LIMIT,
+    max_pages: int = PDF_MAX_PAGES
+) -> Dict:
+    """extract_document_text in the process pool (PDF parsing holds the GIL)"""
+    return await run_in_process_pool(extract_document_text, file_path, kind, limit, max_pages)
@@ -0,0 +1,296 @@
+"""
+Font Store
+Local Google Fonts store and in-memory FreeType face cache shared by all overlay modules
+"""
+
+import asyncio
+import os
+import re
+import time
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from PIL import ImageFont
+import httpx
+
+
+FONTS_CACHE_DIR = Path(__file__).parent / "fonts_cache"
+
+# Faces kept open in memory, keyed by (family, variant, size)
+FONT_FACE_CACHE_SIZE = 256
+
+# Map common variants to Google Fonts API weights
+VARIANT_WEIGHTS = {
+    "regular": "400",
+    "bold": "700",
+    "italic": "400",
+    "bold-italic": "700"
+}
+
+SYSTEM_FONT_PATHS = [
+    "/System/Library/Fonts/{family}.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "C:/Windows/Fonts/{family}.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+
+# Seconds a failed download is remembered before the font is tried again, so
+# renders don't wait on the network for every request while it's unavailable
+FONT_RETRY_AFTER = int(os.environ.get("FONT_RETRY_AFTER", 600))
+
+# System/web-safe families that Google Fonts doesn't serve: resolved locally, never downloaded
+NON_GOOGLE_FONTS = {
+    "arial", "arial black", "helvetica", "helvetica neue", "times", "times new roman",
+    "georgia", "verdana", "tahoma", "trebuchet ms", "courier", "courier new",
+    "impact", "comic sans ms", "segoe ui", "calibri", "cambria", "garamond",
+    "sans-serif", "serif", "monospace", "system-ui",
+}
+
+# Fonts that failed to download, with the monotonic time of the failure
+_unavailable_fonts: Dict[Tuple[str, str], float] = {}
+# Families Google Fonts rejected as unknown (HTTP 400) - never asked for again
+_unknown_families: Set[str] = set()
+_download_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+
+def get_google_fonts_list() -> List[Dict[str, str]]:
+    """
+    Get list of popular Google Fonts
+    Returns a curated list of commonly used Google Fonts
+    """
+    return [
+        {"family": "Roboto", "display": "Roboto"},
+        {"family": "Open Sans", "display": "Open Sans"},
+        {"family": "Lato", "display": "Lato"},
+        {"family": "Montserrat", "display": "Montserrat"},
+        {"family": "Raleway", "display": "Raleway"},
+        {"family": "Poppins", "display": "Poppins"},
+        {"family": "Source Sans Pro", "display": "Source Sans Pro"},
+        {"family": "Oswald", "display": "Oswald"},
+        {"family": "Playfair Display", "display": "Playfair Display"},
+        {"family": "Merriweather", "display": "Merriweather"},
+        {"family": "PT Sans", "display": "PT Sans"},
+        {"family": "Lora", "display": "Lora"},
+        {"family": "Inter", "display": "Inter"},
+        {"family": "Ubuntu", "display": "Ubuntu"},
+        {"family": "Crimson Text", "display": "Crimson Text"},
+        {"family": "Dancing Script", "display": "Dancing Script"},
+        {"family": "Bebas Neue", "display": "Bebas Neue"},
+        {"family": "Pacifico", "display": "Pacifico"},
+        {"family": "Righteous", "display": "Righteous"},
+        {"family": "Abril Fatface", "display": "Abril Fatface"},
+        {"family": "Josefin Sans", "display": "Josefin Sans"},
+        {"family": "Fjalla One", "display": "Fjalla One"},
+        {"family": "Anton", "display": "Anton"},
+        {"family": "Barlow", "display": "Barlow"},
+        {"family": "Comfortaa", "display": "Comfortaa"},
+        {"family": "Karla", "display": "Karla"},
+        {"family": "Libre Franklin", "display": "Libre Franklin"},
+        {"family": "PT Serif", "display": "PT Serif"},
+        {"family": "Domine", "display": "Domine"},
+        {"family": "Arvo", "display": "Arvo"}
+    ]
+
+
+def variant_for_weight(font_weight: int) -> str:
+    """Map a CSS font weight to a store variant"""
+    return "bold" if font_weight >= 600 else "regular"
+
+
+def _store_file(font_family: str, variant: str) -> Path:
+    return FONTS_CACHE_DIR / f"{font_family}_{variant}.ttf"
+
+
+@lru_cache(maxsize=512)
+def find_font_file(font_family: str, variant: str = "regular") -> Optional[str]:
+    """
+    Find a font file on disk without touching the network
+
+    Lookup order: exact variant in the local store, any variant of the family
+    in the store, then system fonts.
+
+    Returns:
+        Path to the font file, or None if nothing local matches
+    """
+    store_file = _store_file(font_family, variant)
+    if store_file.exists():
+        return str(store_file)
+
+    if FONTS_CACHE_DIR.exists():
+        for pattern in (f"{font_family}_*.ttf", f"{font_family.replace(' ', '_')}_*.ttf"):
+            for cached_font in sorted(FONTS_CACHE_DIR.glob(pattern)):
+                return str(cached_font)
+
+    for path in SYSTEM_FONT_PATHS:
+        path = path.format(family=font_family)
+        if os.path.exists(path):
+            return path
+
+    return None
+
+
+@lru_cache(maxsize=FONT_FACE_CACHE_SIZE)
+def load_font(font_family: str, size: int, variant: str = "regular") -> ImageFont.ImageFont:
+    """
+    Load a FreeType face from the local store (LRU cached by family, variant and size)
+
+    Never downloads; falls back to Pillow's default font when no file is found.
+    """
+    font_path = find_font_file(font_family, variant)
+    if font_path:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except Exception as e:
+            print(f"[FONT] [WARNING] Could not load {font_path}: {e}")
+
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 has no sized default font
+        return ImageFont.load_default()
+
+
+def _mark_unavailable(key: Tuple[str, str]) -> None:
+    _unavailable_fonts[key] = time.monotonic()
+
+
+def is_google_font(font_family: str) -> bool:
+    """False for families Google Fonts is known not to serve (system fonts, unknown names)"""
+    return font_family.lower() not in NON_GOOGLE_FONTS and font_family not in _unknown_families
+
+
+def _recently_failed(key: Tuple[str, str]) -> bool:
+    failed_at = _unavailable_fonts.get(key)
+    if failed_at is None:
+        return False
+    if time.monotonic() - failed_at < FONT_RETRY_AFTER:
+        return True
+    del _unavailable_fonts[key]
+    return False
+
+
+async def download_google_font(font_family: str, variant: str = "regular") -> Optional[str]:
+    """
+    Download a Google Font into the local store
+
+    Args:
+        font_family: Font family name (e.g., "Roboto", "Open Sans")
+        variant: Font variant (e.g., "regular", "bold", "italic", "700", etc.)
+
+    Returns:
+        Path to the stored font file, or None if download fails
+    """
+    cache_file = _store_file(font_family, variant)
+    if cache_file.exists():
+        return str(cache_file)
+
+    key = (font_family, variant)
+    if not is_google_font(font_family) or _recently_failed(key):
+        return None
+
+    lock = _download_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        if cache_file.exists():
+            return str(cache_file)
+        # A download that failed while this call waited isn't retried right away
+        if _recently_failed(key):
+            return None
+
+        print(f"[FONT] Downloading Google Font: {font_family} ({variant})")
+
+        try:
+            FONTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+            # Google Fonts CSS API
+            weight = VARIANT_WEIGHTS.get(variant.lower(), variant)
+            font_url = f"https://fonts.googleapis.com/css2?family={font_family.replace(' ', '+')}:wght@{weight}"
+
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                css_response = await client.get(font_url)
+
+                if css_response.status_code == 400:
+                    # The CSS API answers 400 for families it doesn't have; that won't change on retry
+                    print(f"[WARNING] {font_family} is not a Google Font")
+                    _unknown_families.add(font_family)
+                    return None
+                if css_response.status_code != 200:
+                    print(f"[WARNING] Failed to fetch font CSS: {css_response.status_code}")
+                    _mark_unavailable(key)
+                    return None
+
+                font_url_match = re.search(r'url\((https://[^)]+(\.ttf|\.woff2))\)', css_response.text)
+
+                if not font_url_match:
+                    print("[WARNING] Could not find font file URL in CSS")
+                    _mark_unavailable(key)
+                    return None
+
+                font_response = await client.get(font_url_match.group(1))
+
+                if font_response.status_code != 200:
+                    print(f"[WARNING] Failed to download font file: {font_response.status_code}")
+                    _mark_unavailable(key)
+                    return None
+
+                # Write atomically so concurrent readers never see a partial file; the
+                # temp name is unique so other workers downloading the same font don't collide
+                tmp_file = cache_file.with_name(f"{cache_file.name}.{uuid.uuid4().hex}.tmp")
+                try:
+                    tmp_file.write_bytes(font_response.content)
+                    os.replace(tmp_file, cache_file)
+                except BaseException:
+                    tmp_file.unlink(missing_ok=True)
+                    raise
+                print(f"[SUCCESS] Font cached: {cache_file}")
+        except Exception as e:
+            print(f"[WARNING] Error downloading Google Font: {e}")
+            _mark_unavailable(key)
+            return None
+
+    # A new file may change what local lookups resolve to
+    find_font_file.cache_clear()
+    load_font.cache_clear()
+    return str(cache_file)
+
+
+async def resolve_font(font_family: str, size: int, variant: str = "regular") -> ImageFont.ImageFont:
+    """
+    Resolve a font for rendering
+
+    Uses the local store and face cache; only a Google Fonts family missing
+    from the store triggers a download (after a failure, not again until
+    FONT_RETRY_AFTER). Other families resolve to local or system fonts.
+    """
+    if is_google_font(font_family) and not _store_file(font_family, variant).exists():
+        await download_google_font(font_family, variant)
+
+    return load_font(font_family, size, variant)
+
+
+async def prefetch_google_fonts(variants: Tuple[str, ...] = ("regular", "bold")) -> int:
+    """
+    Populate the local store with every font from get_google_fonts_list
+
+    Returns:
+        Number of font files available in the store afterwards
+    """
+    pending = [
+        (font["family"], variant)
+        for font in get_google_fonts_list()
+        for variant in variants
+        if not _store_file(font["family"], variant).exists()
+    ]
+
+    if pending:
+        print(f"[FONT] Prefetching {len(pending)} Google Fonts into {FONTS_CACHE_DIR}")
+        semaphore = asyncio.Semaphore(4)
+
+        async def fetch(family: str, variant: str):
+            async with semaphore:
+                await download_google_font(family, variant)
+
+        await asyncio.gather(*(fetch(family, variant) for family, variant in pending))
+
+    return len(list(FONTS_CACHE_DIR.glob("*.ttf"))) if FONTS_CACHE_DIR.exists() else 0
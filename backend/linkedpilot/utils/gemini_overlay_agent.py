@@ -4,14 +4,78 @@ Uses Research, Orchestra, Review, and Refinement agents for professional designs
 """
 
 import os
-import base64
-import io
+import asyncio
 import json
-from typing import Dict, List, Optional, Tuple
-from PIL import Image
-import httpx
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import numpy as np
 from linkedpilot.adapters.llm_adapter import LLMAdapter
+from linkedpilot.utils.compute_pool import run_in_compute_pool
+from linkedpilot.utils.image_context import ImageContext, ImageSource
+from linkedpilot.utils.integral_images import IntegralImages, box_filter_mean
+
+
+# Seconds each stage may take before it degrades to its fallback
+STAGE_TIME_BUDGETS = {
+    "research": 30.0,
+    "advanced_candidate": 15.0,
+    "candidates": 10.0,
+    "orchestra": 20.0,
+    "review": 25.0,
+    "refinement": 30.0,
+}
+
+# _score_design score at which the deterministic candidate is used as-is,
+# skipping the orchestra/review/refinement round-trips
+QUALITY_THRESHOLD = 0.85
+
+
+class StagePipeline:
+    """
+    Runs the agent graph's stages under per-stage time budgets
+
+    A stage that times out or fails degrades to its fallback instead of failing
+    the whole overlay (stages without a fallback re-raise). Wall time per stage
+    is recorded for the response.
+    """
+    
+    def __init__(self, budgets: Optional[Dict[str, float]] = None):
+        self.budgets = {**STAGE_TIME_BUDGETS, **(budgets or {})}
+        self.timings: Dict[str, float] = {}
+        self.degraded: List[str] = []
+        self.skipped: List[str] = []
+        self._started = time.perf_counter()
+    
+    async def run(self, name: str, awaitable: Awaitable, fallback: Optional[Callable[[], Any]] = None) -> Any:
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.budgets.get(name))
+        except asyncio.TimeoutError:
+            if fallback is None:
+                raise
+            print(f"[PIPELINE] {name} exceeded its {self.budgets.get(name)}s budget, using fallback")
+        except Exception as e:
+            if fallback is None:
+                raise
+            print(f"[PIPELINE] {name} failed ({e}), using fallback")
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 1)
+        
+        self.degraded.append(name)
+        return fallback()
+    
+    def skip(self, *names: str) -> None:
+        self.skipped.extend(names)
+    
+    def report(self) -> Dict:
+        total_ms = round((time.perf_counter() - self._started) * 1000, 1)
+        print(f"[PIPELINE] {total_ms:.0f}ms total: " + ", ".join(f"{k}={v:.0f}ms" for k, v in self.timings.items()))
+        return {
+            "stages_ms": dict(self.timings),
+            "total_ms": total_ms,
+            "degraded": list(self.degraded),
+            "skipped": list(self.skipped)
+        }
 
 
 class GeminiOverlayAgent:
@@ -20,8 +84,12 @@ class GeminiOverlayAgent:
     Agents: Research → Orchestra → Review → Refinement
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None,
+                 quality_threshold: float = QUALITY_THRESHOLD,
+                 stage_budgets: Optional[Dict[str, float]] = None):
         self.api_key = api_key or os.getenv('GOOGLE_AI_API_KEY')
+        self.quality_threshold = quality_threshold
+        self.stage_budgets = stage_budgets
         # Use Gemini 2.5 Flash for fast multimodal understanding and design grid knowledge
         # Note: gemini-3-pro doesn't exist, using gemini-2.5-flash instead
         self.llm = LLMAdapter(api_key=self.api_key, provider="google_ai_studio", model="gemini-2.5-flash")
@@ -105,15 +173,22 @@ class GeminiOverlayAgent:
             size = int(base_size * 0.035)
             return max(28, min(56, size))
     
-    def _analyze_background_contrast(self, image_data: bytes, x_percent: float, y_percent: float, 
-                                    width_percent: float, height_percent: float) -> Dict:
+    def _analyze_background_contrast(self, image_data: ImageSource, x_percent: float, y_percent: float, 
+                                    width_percent: float, height_percent: float,
+                                    integral: Optional[IntegralImages] = None) -> Dict:
         """
         Analyze background at text position to determine optimal text color
         Returns contrast settings for best readability
+        
+        When integral images are passed the region luminance is an O(1) lookup
+        instead of decoding and cropping the image.
         """
         try:
-            img = Image.open(io.BytesIO(image_data))
-            img_width, img_height = img.size
+            if integral is not None:
+                img_width, img_height = integral.width, integral.height
+            else:
+                img = ImageContext.of(image_data).rgb
+                img_width, img_height = img.size
             
             # Calculate pixel coordinates
             x_start = int((x_percent / 100) * img_width)
@@ -127,13 +202,16 @@ class GeminiOverlayAgent:
             x_end = max(x_start + 1, min(img_width, x_end))
             y_end = max(y_start + 1, min(img_height, y_end))
             
-            # Crop region
-            region = img.crop((x_start, y_start, x_end, y_end))
-            
-            # Convert to grayscale and calculate average luminance
-            gray = region.convert('L')
-            pixels = list(gray.getdata())
-            avg_luminance = sum(pixels) / len(pixels) if pixels else 128
+            if integral is not None:
+                avg_luminance = float(integral.luminance_stats(np.array([[x_start, y_start, x_end, y_end]]))[0][0])
+            else:
+                # Crop region
+                region = img.crop((x_start, y_start, x_end, y_end))
+                
+                # Convert to grayscale and calculate average luminance
+                gray = region.convert('L')
+                pixels = list(gray.getdata())
+                avg_luminance = sum(pixels) / len(pixels) if pixels else 128
             
             # Determine text color based on background brightness
             # Threshold: 128 (middle gray)
@@ -176,14 +254,13 @@ class GeminiOverlayAgent:
                 "stroke_color": "#000000"
             }
     
-    def _compute_saliency_map(self, image_data: bytes) -> np.ndarray:
+    def _compute_saliency_map(self, image_data: ImageSource) -> np.ndarray:
         """
         Compute saliency map using gradient and variance (lightweight, no GPU required)
         Identifies busy vs clear regions for optimal text placement
         """
         try:
-            img = Image.open(io.BytesIO(image_data)).convert('RGB')
-            img_array = np.array(img)
+            img_array = ImageContext.of(image_data).array
             
             # Convert to grayscale
             gray = np.mean(img_array, axis=2).astype(np.float32)
@@ -192,37 +269,11 @@ class GeminiOverlayAgent:
             grad_y, grad_x = np.gradient(gray)
             gradient_magnitude = np.sqrt(grad_x**2 + grad_y**2)
             
-            # Compute local variance using convolution-like approach
+            # Compute local variance over a 5x5 window from summed-area tables: E[x^2] - E[x]^2
             kernel_size = 5
-            h, w = gray.shape
-            
-            # Pad image for convolution
-            pad = kernel_size // 2
-            padded = np.pad(gray, pad, mode='edge')
-            
-            # Compute local mean using numpy (more efficient)
-            local_mean = np.zeros_like(gray)
-            for i in range(h):
-                for j in range(w):
-                    local_mean[i, j] = np.mean(padded[i:i+kernel_size, j:j+kernel_size])
-            
-            # Compute local variance
-            local_variance = np.zeros_like(gray)
-            for i in range(h):
-                for j in range(w):
-                    region = padded[i:i+kernel_size, j:j+kernel_size]
-                    local_variance[i, j] = np.var(region)
-            
-            # Alternative: Use scipy if available (much faster)
-            try:
-                from scipy import ndimage
-                kernel = np.ones((kernel_size, kernel_size)) / (kernel_size * kernel_size)
-                local_mean = ndimage.convolve(gray, kernel, mode='constant')
-                local_mean_sq = ndimage.convolve(gray**2, kernel, mode='constant')
-                local_variance = local_mean_sq - local_mean**2
-            except ImportError:
-                # Fallback to manual computation (already done above)
-                pass
+            local_mean = box_filter_mean(gray, kernel_size)
+            local_mean_sq = box_filter_mean(gray.astype(np.float64) ** 2, kernel_size)
+            local_variance = np.maximum(local_mean_sq - local_mean**2, 0.0).astype(np.float32)
             
             # Combine gradient and variance (normalize first)
             gradient_norm = gradient_magnitude / (gradient_magnitude.max() + 1e-10)
@@ -239,15 +290,19 @@ class GeminiOverlayAgent:
         except Exception as e:
             print(f"[WARNING] Saliency computation failed: {e}")
             # Return uniform map (no saliency information)
-            img = Image.open(io.BytesIO(image_data))
-            return np.ones((img.height, img.width), dtype=np.float32) * 0.5
+            img_width, img_height = ImageContext.of(image_data).size
+            return np.ones((img_height, img_width), dtype=np.float32) * 0.5
     
-    def _select_optimal_zone(self, image_data: bytes, saliency_map: np.ndarray,
-                            focal_points: List[Dict], img_width: int, img_height: int) -> Dict:
+    def _select_optimal_zone(self, image_data: ImageSource, saliency_map: np.ndarray,
+                            focal_points: List[Dict], img_width: int, img_height: int,
+                            integral: Optional[IntegralImages] = None) -> Dict:
         """
         Select best zone for text placement based on saliency and focal points
         Returns optimal zone configuration
         """
+        if integral is None or integral.saliency is None:
+            integral = IntegralImages(ImageContext.of(image_data).rgb, saliency_map)
+        
         zones = [
             {"name": "left_top", "x_range": (0.10, 0.20), "y_range": (0.15, 0.30), "width": 0.65, "suitability": "headline"},
             {"name": "left_middle", "x_range": (0.10, 0.20), "y_range": (0.40, 0.55), "width": 0.68, "suitability": "subtext"},
@@ -259,25 +314,20 @@ class GeminiOverlayAgent:
         best_zone = None
         best_score = -1
         
-        for zone in zones:
-            # Calculate pixel ranges
+        # Pixel boxes for all zones, clipped to bounds
+        zone_boxes = integral.clip_boxes(np.array([
+            [int(zone["x_range"][0] * img_width), int(zone["y_range"][0] * img_height),
+             int(zone["x_range"][1] * img_width), int(zone["y_range"][1] * img_height)]
+            for zone in zones
+        ]))
+        
+        # Average saliency of every zone in one lookup (lower is better)
+        zone_saliencies = integral.mean_saliency(zone_boxes)
+        
+        for zone, (x_start, y_start, x_end, y_end), zone_saliency in zip(zones, zone_boxes, zone_saliencies):
             x_start_pct, x_end_pct = zone["x_range"]
             y_start_pct, y_end_pct = zone["y_range"]
             
-            x_start = int(x_start_pct * img_width)
-            x_end = int(x_end_pct * img_width)
-            y_start = int(y_start_pct * img_height)
-            y_end = int(y_end_pct * img_height)
-            
-            # Ensure bounds
-            x_start = max(0, min(img_width - 1, x_start))
-            x_end = max(x_start + 1, min(img_width, x_end))
-            y_start = max(0, min(img_height - 1, y_start))
-            y_end = max(y_start + 1, min(img_height, y_end))
-            
-            # Calculate average saliency in zone (lower is better)
-            zone_saliency = saliency_map[y_start:y_end, x_start:x_end].mean()
-            
             # Check if zone avoids focal points
             avoids_focal = True
             for fp in focal_points:
@@ -310,15 +360,22 @@ class GeminiOverlayAgent:
         
         return best_zone
     
-    def _score_design(self, elements: List[Dict], image_data: bytes, 
-                     saliency_map: np.ndarray, img_width: int, img_height: int) -> float:
+    def _score_design(self, elements: List[Dict], image_data: ImageSource, 
+                     saliency_map: np.ndarray, img_width: int, img_height: int,
+                     integral: Optional[IntegralImages] = None) -> float:
         """
         Score design quality using multiple metrics
         Returns composite score 0-1 (higher is better)
+        
+        Region statistics come from summed-area tables; pass the integral images
+        built once per request to avoid rebuilding them for every candidate.
         """
         if not elements:
             return 0.0
         
+        if integral is None or integral.saliency is None:
+            integral = IntegralImages(ImageContext.of(image_data).rgb, saliency_map)
+        
         scores = {}
         
         # 1. Contrast Score (0-1)
@@ -329,7 +386,7 @@ class GeminiOverlayAgent:
             width_percent = (element.get('width', 400) / img_width) * 100
             
             contrast = self._analyze_background_contrast(
-                image_data, x_percent, y_percent, width_percent, 15
+                image_data, x_percent, y_percent, width_percent, 15, integral=integral
             )
             # High contrast = good score
             text_color = contrast.get('text_color', '#FFFFFF')
@@ -343,29 +400,21 @@ class GeminiOverlayAgent:
         scores["contrast"] = np.mean(contrast_scores) if contrast_scores else 0.7
         
         # 2. Saliency Avoidance Score (0-1) - lower saliency in text areas = better
-        saliency_scores = []
+        element_boxes = []
         for element in elements:
             x_percent = element.get('position', [50, 50])[0]
             y_percent = element.get('position', [50, 50])[1]
-            width_px = element.get('width', 400)
-            height_px = element.get('height', 100)
+            width_px = int(element.get('width', 400))
+            height_px = int(element.get('height', 100))
             
             x_start = int((x_percent / 100) * img_width) - width_px // 2
-            x_end = x_start + width_px
             y_start = int((y_percent / 100) * img_height) - height_px // 2
-            y_end = y_start + height_px
-            
-            x_start = max(0, min(img_width - 1, x_start))
-            x_end = max(x_start + 1, min(img_width, x_end))
-            y_start = max(0, min(img_height - 1, y_start))
-            y_end = max(y_start + 1, min(img_height, y_end))
-            
-            if x_end > x_start and y_end > y_start:
-                zone_saliency = saliency_map[y_start:y_end, x_start:x_end].mean()
-                # Lower saliency = better (1 - saliency)
-                saliency_scores.append(1 - zone_saliency)
+            element_boxes.append([x_start, y_start, x_start + width_px, y_start + height_px])
         
-        scores["saliency_avoidance"] = np.mean(saliency_scores) if saliency_scores else 0.5
+        # Lower saliency = better (1 - saliency), all elements in one lookup
+        saliency_scores = 1 - integral.mean_saliency(integral.clip_boxes(np.array(element_boxes)))
+        
+        scores["saliency_avoidance"] = float(np.mean(saliency_scores)) if len(saliency_scores) else 0.5
         
         # 3. Hierarchy Score (0-1) - proper size difference between headline and subtext
         if len(elements) >= 2:
@@ -420,13 +469,25 @@ class GeminiOverlayAgent:
         
         return float(composite)
     
-    async def _generate_candidate(self, strategy: str, image_data: bytes, img_width: int, 
+    async def _generate_candidate(self, strategy: str, image_data: ImageSource, img_width: int, 
                                  img_height: int, post_content: str, call_to_action: str,
                                  brand_info: str, saliency_map: np.ndarray, 
-                                 research_data: Dict) -> Dict:
+                                 research_data: Dict,
+                                 integral: Optional[IntegralImages] = None) -> Dict:
         """
         Generate a single design candidate with specified strategy
+        (built and scored in the compute pool, so candidates run in parallel)
         """
+        return await run_in_compute_pool(
+            self._build_candidate, strategy, image_data, img_width, img_height, post_content,
+            call_to_action, brand_info, saliency_map, research_data, integral
+        )
+    
+    def _build_candidate(self, strategy: str, image_data: ImageSource, img_width: int, 
+                         img_height: int, post_content: str, call_to_action: str,
+                         brand_info: str, saliency_map: np.ndarray, 
+                         research_data: Dict,
+                         integral: Optional[IntegralImages] = None) -> Dict:
         # Extract text
         headline_text = self._extract_compelling_text(post_content, "headline")
         subtext_text = self._extract_compelling_text(post_content, "subtext")
@@ -484,10 +545,10 @@ class GeminiOverlayAgent:
         
         # Analyze contrast dynamically (override with research recommendations if available)
         headline_contrast = self._analyze_background_contrast(
-            image_data, headline_pos[0], headline_pos[1], (headline_width/img_width)*100, 15
+            image_data, headline_pos[0], headline_pos[1], (headline_width/img_width)*100, 15, integral=integral
         )
         subtext_contrast = self._analyze_background_contrast(
-            image_data, subtext_pos[0], subtext_pos[1], (subtext_width/img_width)*100, 12
+            image_data, subtext_pos[0], subtext_pos[1], (subtext_width/img_width)*100, 12, integral=integral
         )
         
         # Use recommended colors from research if available (DYNAMIC)
@@ -560,7 +621,7 @@ class GeminiOverlayAgent:
         validated_elements = self._validate_positions(elements, img_width, img_height)
         
         # Score the design
-        score = self._score_design(validated_elements, image_data, saliency_map, img_width, img_height)
+        score = self._score_design(validated_elements, image_data, saliency_map, img_width, img_height, integral=integral)
         
         return {
             "elements": validated_elements,
@@ -620,11 +681,15 @@ class GeminiOverlayAgent:
                               top_n: int = 3) -> Dict:
         """
         Multi-Agent Expert Design Process with Multi-Candidate Generation:
-        1. Research Agent: Deep image and content analysis
-        2. Compute saliency map for content-aware placement
-        3. Generate multiple design candidates
-        4. Score and rank candidates
-        5. Return top-N candidates
+        1. Research Agent, saliency map and advanced-system candidate (concurrently)
+        2. Generate multiple design candidates (concurrently)
+        3. Score and rank candidates
+        4. Return top-N candidates
+        
+        In single-candidate mode the Orchestra/Review/Refinement agents only run
+        when the deterministic candidate scores below the quality threshold.
+        Every stage has a time budget and degrades to its fallback; per-stage
+        timings are returned under "stage_timings".
         
         Args:
             image_url: URL or base64 data URL of image
@@ -636,27 +701,55 @@ class GeminiOverlayAgent:
         """
         
         print(f"[GEMINI 3 PRO] Starting multi-agent expert design process with design grid knowledge")
+        pipeline = StagePipeline(self.stage_budgets)
         
         # Step 1: Load and analyze image
-        image_data, img_width, img_height = await self._load_and_analyze_image(image_url)
+        image_data, img_width, img_height = await pipeline.run("load", self._load_and_analyze_image(image_url))
         
         if img_width == 0 or img_height == 0:
             raise ValueError("Invalid image dimensions")
         
-        # Step 2: Compute saliency map for content-aware placement
+        # Step 2: Independent stages run together - saliency map + summed-area
+        # tables (compute pool), Research Agent (LLM) and the advanced-system
+        # candidate (local layout search)
         print(f"[SALIENCY] Computing saliency map...")
-        saliency_map = self._compute_saliency_map(image_data)
-        
-        # Step 3: Research Agent - Deep analysis
         print(f"[RESEARCH AGENT] Analyzing image and content...")
-        research_data = await self._research_agent(
-            image_data, img_width, img_height, post_content, call_to_action, brand_info
-        )
-        
-        # Step 4: Select template based on aspect ratio
+        stages = [
+            pipeline.run("saliency", run_in_compute_pool(self._analyze_saliency, image_data)),
+            pipeline.run(
+                "research",
+                self._research_agent(image_data, img_width, img_height, post_content, call_to_action, brand_info),
+                lambda: self._get_fallback_research(img_width, img_height, post_content)
+            ),
+        ]
+        if return_multiple:
+            stages.append(pipeline.run(
+                "advanced_candidate",
+                self._advanced_candidate_elements(image_data, post_content),
+                lambda: []
+            ))
+        results = await asyncio.gather(*stages)
+        saliency_map, integral = results[0]
+        research_data = results[1]
+        
+        # Step 3: Select template based on aspect ratio
         template = self._select_template(img_width, img_height)
         print(f"[TEMPLATE] Selected template: {template.get('layout', 'left_side')}")
         
+        def candidate(strategy: str) -> Awaitable[Dict]:
+            return self._generate_candidate(
+                strategy=strategy,
+                image_data=image_data,
+                img_width=img_width,
+                img_height=img_height,
+                post_content=post_content,
+                call_to_action=call_to_action,
+                brand_info=brand_info,
+                saliency_map=saliency_map,
+                research_data=research_data,
+                integral=integral
+            )
+        
         if return_multiple:
             # Generate multiple candidates with different strategies
             print(f"[MULTI-CANDIDATE] Generating {top_n + 2} design candidates...")
@@ -664,63 +757,37 @@ class GeminiOverlayAgent:
             
             candidates = []
             
-            # Optionally try advanced system integration as one candidate
-            try_advanced_system = True
-            if try_advanced_system:
-                try:
-                    from ..utils.ai_text_overlay_advanced import generate_ai_text_overlay
-                    image_base64 = base64.b64encode(image_data).decode()
-                    
-                    headline_text = self._extract_compelling_text(post_content, "headline")
-                    subtext_text = self._extract_compelling_text(post_content, "subtext")
-                    
-                    advanced_candidates = await generate_ai_text_overlay(
-                        image_base64=image_base64,
-                        text_elements=[
-                            {"text": headline_text, "role": "headline"},
-                            {"text": subtext_text, "role": "subtext"}
-                        ],
-                        top_n=1
-                    )
-                    
-                    if advanced_candidates and len(advanced_candidates) > 0:
-                        # Convert advanced system format to our format
-                        advanced_elements = advanced_candidates[0].get('elements', [])
-                        if advanced_elements:
-                            # Score the advanced candidate
-                            advanced_score = self._score_design(
-                                advanced_elements, image_data, saliency_map, img_width, img_height
-                            )
-                            candidates.append({
-                                "elements": advanced_elements,
-                                "strategy": "advanced_system",
-                                "score": advanced_score,
-                                "template_id": "advanced-system"
-                            })
-                            print(f"[CANDIDATE] Generated advanced_system candidate with score {advanced_score:.3f}")
-                except Exception as e:
-                    print(f"[WARNING] Advanced system integration failed: {e}")
-                    # Continue with regular candidates
-            
-            # Generate regular candidates
-            for strategy in strategies[:top_n + 1]:  # Generate one extra for selection
+            advanced_elements = results[2]
+            if advanced_elements:
+                # Score the advanced candidate
+                advanced_score = self._score_design(
+                    advanced_elements, image_data, saliency_map, img_width, img_height,
+                    integral=integral
+                )
+                candidates.append({
+                    "elements": advanced_elements,
+                    "strategy": "advanced_system",
+                    "score": advanced_score,
+                    "template_id": "advanced-system"
+                })
+                print(f"[CANDIDATE] Generated advanced_system candidate with score {advanced_score:.3f}")
+            
+            # Generate regular candidates (one extra for selection), all at once
+            async def safe_candidate(strategy: str) -> Optional[Dict]:
                 try:
-                    candidate = await self._generate_candidate(
-                        strategy=strategy,
-                        image_data=image_data,
-                        img_width=img_width,
-                        img_height=img_height,
-                        post_content=post_content,
-                        call_to_action=call_to_action,
-                        brand_info=brand_info,
-                        saliency_map=saliency_map,
-                        research_data=research_data
-                    )
-                    candidates.append(candidate)
-                    print(f"[CANDIDATE] Generated {strategy} candidate with score {candidate['score']:.3f}")
+                    result = await candidate(strategy)
+                    print(f"[CANDIDATE] Generated {strategy} candidate with score {result['score']:.3f}")
+                    return result
                 except Exception as e:
                     print(f"[WARNING] Failed to generate {strategy} candidate: {e}")
-                    continue
+                    return None
+            
+            regular = await pipeline.run(
+                "candidates",
+                asyncio.gather(*[safe_candidate(strategy) for strategy in strategies[:top_n + 1]]),
+                lambda: []
+            )
+            candidates.extend(c for c in regular if c)
             
             # Sort by score (highest first)
             candidates.sort(key=lambda x: x['score'], reverse=True)
@@ -740,34 +807,54 @@ class GeminiOverlayAgent:
                 "system": "gemini-2.5-pro-multi-agent-multi-candidate",
                 "research_insights": research_data.get('insights', {}),
                 "saliency_used": True,
-                "template_used": template.get('layout', 'left_side')
+                "template_used": template.get('layout', 'left_side'),
+                "stage_timings": pipeline.report()
             }
         else:
             # Single candidate mode (original behavior)
             print(f"[SINGLE-CANDIDATE] Generating single design...")
             
-            # Agent 2: Orchestra Agent - Design coordination
-            print(f"[ORCHESTRA AGENT] Coordinating design strategy...")
-            design_strategy = await self._orchestra_agent(research_data, img_width, img_height)
-            
-            # Agent 3: Review Agent - Quality validation
-            print(f"[REVIEW AGENT] Reviewing design quality...")
-            reviewed_design = await self._review_agent(
-                design_strategy, image_data, img_width, img_height, post_content
-            )
-            reviewed_design['post_content'] = post_content
-            
-            # Agent 4: Refinement Agent - Final polish (with research data for dynamic decisions)
-            print(f"[REFINEMENT AGENT] Refining final design...")
-            refined_elements = await self._refinement_agent(
-                reviewed_design, image_data, img_width, img_height, research_data
-            )
+            # Deterministic candidate for the template's layout; when it already
+            # clears the quality bar, the three LLM round-trips are skipped
+            baseline = await pipeline.run("candidates", candidate(template.get('layout', 'left_side')), lambda: None)
             
-            # Final validation
-            validated_elements = self._validate_positions(refined_elements, img_width, img_height)
-            
-            # Score the design
-            score = self._score_design(validated_elements, image_data, saliency_map, img_width, img_height)
+            if baseline and baseline['score'] >= self.quality_threshold:
+                print(f"[SINGLE-CANDIDATE] Candidate scored {baseline['score']:.3f} >= {self.quality_threshold}, skipping review/refinement")
+                pipeline.skip("orchestra", "review", "refinement")
+                design_strategy = {}
+                validated_elements = baseline['elements']
+                score = baseline['score']
+            else:
+                # Agent 2: Orchestra Agent - Design coordination
+                print(f"[ORCHESTRA AGENT] Coordinating design strategy...")
+                design_strategy = await pipeline.run(
+                    "orchestra",
+                    self._orchestra_agent(research_data, img_width, img_height),
+                    lambda: self._get_fallback_strategy(research_data)
+                )
+                
+                # Agent 3: Review Agent - Quality validation
+                print(f"[REVIEW AGENT] Reviewing design quality...")
+                reviewed_design = await pipeline.run(
+                    "review",
+                    self._review_agent(design_strategy, image_data, img_width, img_height, post_content),
+                    lambda: self._get_fallback_review(design_strategy, img_width, img_height)
+                )
+                reviewed_design['post_content'] = post_content
+                
+                # Agent 4: Refinement Agent - Final polish (with research data for dynamic decisions)
+                print(f"[REFINEMENT AGENT] Refining final design...")
+                refined_elements = await pipeline.run(
+                    "refinement",
+                    self._refinement_agent(reviewed_design, image_data, img_width, img_height, research_data),
+                    lambda: reviewed_design.get('validated_design', {}).get('elements', [])
+                )
+                
+                # Final validation
+                validated_elements = self._validate_positions(refined_elements, img_width, img_height)
+                
+                # Score the design
+                score = self._score_design(validated_elements, image_data, saliency_map, img_width, img_height, integral=integral)
             
             print(f"[SUCCESS] Single design generated with score {score:.3f}")
             
@@ -780,25 +867,51 @@ class GeminiOverlayAgent:
                 "research_insights": research_data.get('insights', {}),
                 "design_strategy": design_strategy.get('strategy', {}),
                 "saliency_used": True,
-                "template_used": template.get('layout', 'left_side')
+                "template_used": template.get('layout', 'left_side'),
+                "stage_timings": pipeline.report()
             }
     
-    async def _load_and_analyze_image(self, image_url: str) -> Tuple[bytes, int, int]:
-        """Step 1: Load image and get dimensions"""
+    def _analyze_saliency(self, image_data: ImageSource) -> Tuple[np.ndarray, IntegralImages]:
+        """Saliency map plus the summed-area tables shared by every candidate's scoring"""
+        context = ImageContext.of(image_data)
+        
+        def analyze() -> Tuple[np.ndarray, IntegralImages]:
+            saliency_map = self._compute_saliency_map(context)
+            return saliency_map, IntegralImages(context.rgb, saliency_map)
+        
+        return context.derived("gemini_agent:saliency", analyze)
+    
+    async def _advanced_candidate_elements(self, image_data: ImageSource, post_content: str) -> List[Dict]:
+        """Elements of the advanced overlay system's best layout, or [] if it has none"""
         try:
-            if image_url.startswith('data:image'):
-                # Extract base64 from data URL
-                header, encoded = image_url.split(',', 1)
-                image_data = base64.b64decode(encoded)
-            else:
-                # Fetch image
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.get(image_url)
-                    image_data = response.content
+            from ..utils.ai_text_overlay_advanced import generate_ai_text_overlay
+            
+            headline_text = self._extract_compelling_text(post_content, "headline")
+            subtext_text = self._extract_compelling_text(post_content, "subtext")
+            
+            # The shared context, so the advanced system reuses the decoded image
+            advanced_candidates = await generate_ai_text_overlay(
+                image_base64=ImageContext.of(image_data),
+                text_elements=[
+                    {"text": headline_text, "role": "headline"},
+                    {"text": subtext_text, "role": "subtext"}
+                ],
+                top_n=1
+            )
+            if advanced_candidates:
+                return advanced_candidates[0].get('elements', [])
+        except Exception as e:
+            print(f"[WARNING] Advanced system integration failed: {e}")
+            # Continue with regular candidates
+        return []
+    
+    async def _load_and_analyze_image(self, image_url: str) -> Tuple[ImageContext, int, int]:
+        """Step 1: Load image and get dimensions (one ImageContext shared by every later stage)"""
+        try:
+            image_data = await ImageContext.fetch(image_url)
             
-            # Get image dimensions
-            img = Image.open(io.BytesIO(image_data))
-            img_width, img_height = img.size
+            # Dimensions come from the header; pixels are decoded on first use
+            img_width, img_height = image_data.size
             
             print(f"[GEMINI AGENT] Image loaded: {img_width}x{img_height}")
             return image_data, img_width, img_height
@@ -808,7 +921,7 @@ class GeminiOverlayAgent:
             raise
     
     async def _research_agent(self,
-                             image_data: bytes,
+                             image_data: ImageSource,
                              img_width: int,
                              img_height: int,
                              post_content: str,
@@ -818,7 +931,7 @@ class GeminiOverlayAgent:
         Research Agent: Deep analysis of image, content, and design requirements
         Analyzes visual composition, content context, and optimal placement strategies
         """
-        image_base64 = base64.b64encode(image_data).decode()
+        image_base64 = ImageContext.of(image_data).base64
         
         prompt = f"""You are a Research Agent specializing in expert LinkedIn post design analysis using design grid principles and optimal typography placement.
 
@@ -1119,7 +1232,7 @@ Return orchestrated design strategy:
     
     async def _review_agent(self,
                            design_strategy: Dict,
-                           image_data: bytes,
+                           image_data: ImageSource,
                            img_width: int,
                            img_height: int,
                            post_content: str) -> Dict:
@@ -1127,7 +1240,7 @@ Return orchestrated design strategy:
         Review Agent: Validates design quality against high-performing LinkedIn post examples
         Ensures designs match professional standards seen in top-performing posts
         """
-        image_base64 = base64.b64encode(image_data).decode()
+        image_base64 = ImageContext.of(image_data).base64
         strategy_json = json.dumps(design_strategy, indent=2)
         
         prompt = f"""You are a Review Agent ensuring expert-grade LinkedIn post design quality.
@@ -1271,7 +1384,7 @@ Return review report with validated design:
     
     async def _refinement_agent(self,
                                reviewed_design: Dict,
-                               image_data: bytes,
+                               image_data: ImageSource,
                                img_width: int,
                                img_height: int,
                                research_data: Optional[Dict] = None) -> List[Dict]:
@@ -1279,7 +1392,7 @@ Return review report with validated design:
         Refinement Agent: Polishes final design using DYNAMIC analysis from Research Agent
         Uses research recommendations for fonts, colors, and positioning (NO HARDCODING)
         """
-        image_base64 = base64.b64encode(image_data).decode()
+        image_base64 = ImageContext.of(image_data).base64
         design_json = json.dumps(reviewed_design.get('validated_design', {}), indent=2)
         post_content = reviewed_design.get('post_content', '')
         
@@ -1676,14 +1789,14 @@ CRITICAL REQUIREMENTS:
         }
     
     async def _analyze_image_content(self, 
-                                    image_data: bytes,
+                                    image_data: ImageSource,
                                     img_width: int,
                                     img_height: int,
                                     post_content: str) -> Dict:
         """Step 2: Use Gemini to analyze image and identify safe zones"""
         
         # Convert image to base64 for Gemini
-        image_base64 = base64.b64encode(image_data).decode()
+        image_base64 = ImageContext.of(image_data).base64
         
         prompt = f"""You are an expert image analyst specializing in text overlay placement for social media images.
 
@@ -1785,7 +1898,7 @@ IMPORTANT:
             }
     
     async def _generate_text_overlays(self,
-                                     image_data: bytes,
+                                     image_data: ImageSource,
                                      img_width: int,
                                      img_height: int,
                                      post_content: str,
@@ -1794,7 +1907,7 @@ IMPORTANT:
                                      safe_zones: Dict) -> List[Dict]:
         """Step 3: Generate text overlays using Gemini with validated positions"""
         
-        image_base64 = base64.b64encode(image_data).decode()
+        image_base64 = ImageContext.of(image_data).base64
         safe_zones_json = json.dumps(safe_zones.get('safe_zones', []), indent=2)
         
         prompt = f"""You are an expert graphic designer specializing in text overlay design for social media images.
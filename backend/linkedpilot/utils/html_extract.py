@@ -0,0 +1,525 @@
+"""
+HTML Extraction
+Single-pass page extraction on lxml: one walk over the parsed tree collects
+text (main/article/body, header without nav, footer, per-element blocks),
+links, meta tags, images (src/srcset/picture/background-image), stylesheets
+and the colors and fonts declared in styles, instead of repeated find_all /
+select calls and re-parsed subtrees
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from lxml import etree, html as lxml_html
+
+
+# Enhanced color patterns - matches hex, rgb, rgba, hsl, hsla, and named colors
+COLOR_PATTERN = re.compile(
+    r"(?:#(?:[0-9a-fA-F]{3}){1,2}|"
+    r"rgb\s*\(\s*\d+\s*,\s*\d+\s*,\s*\d+\s*\)|"
+    r"rgba\s*\(\s*\d+\s*,\s*\d+\s*,\s*\d+\s*,\s*[\d.]+\s*\)|"
+    r"hsl\s*\(\s*\d+\s*,\s*\d+%\s*,\s*\d+%\s*\)|"
+    r"hsla\s*\(\s*\d+\s*,\s*\d+%\s*,\s*\d+%\s*,\s*[\d.]+\s*\)|"
+    r"\b(?:red|green|blue|yellow|orange|purple|pink|brown|black|white|gray|grey|cyan|magenta|lime|navy|teal|olive|maroon|silver|gold|indigo|violet|turquoise|aqua|fuchsia|coral|salmon|khaki|plum|tan|beige|ivory|azure|lavender|mint|peach|rose|amber|emerald|ruby|sapphire|topaz|jade|amber|bronze|copper|slate|charcoal|burgundy|mustard|lavender|mauve|periwinkle|cerulean|crimson|forest|ocean|sunset|sunrise|midnight|dawn|dusk)\b)",
+    re.IGNORECASE
+)
+
+# Enhanced font pattern - matches font-family declarations, @font-face, and Google Fonts
+FONT_PATTERN = re.compile(
+    r"(?:font-family\s*:\s*([^;\"']+)|"
+    r"@font-face\s*\{[^}]*font-family\s*:\s*['\"]?([^;\"']+)['\"]?|"
+    r"fonts\.googleapis\.com/css\?family=([^&\"']+))",
+    re.IGNORECASE
+)
+
+# CSS variable patterns for color extraction
+CSS_VAR_COLOR_PATTERN = re.compile(r"--(?:color|primary|secondary|accent|background|text|border|brand|theme)[a-zA-Z0-9-]*\s*:\s*([^;]+)", re.IGNORECASE)
+
+FONT_FACE_PATTERN = re.compile(r"@font-face\s*\{[^}]*font-family\s*:\s*['\"]?([^;\"']+)['\"]?", re.IGNORECASE)
+
+BACKGROUND_IMAGE_PATTERN = re.compile(r'background-image:\s*url\(["\']?([^"\']+)["\']?\)', re.IGNORECASE)
+
+GOOGLE_FONT_FAMILY_PATTERN = re.compile(r"family=([^&:]+)")
+
+# Per-element text blocks, in the order callers consume them
+BLOCK_GROUPS = ('h1', 'h2', 'h3', 'h4', 'p', 'li', 'div_content', 'div_text', 'section', 'article')
+BLOCK_LIMIT = 200
+
+# Hero image selectors, in priority order, mirroring the CSS selectors they replace
+HERO_SELECTORS = (
+    "header img",
+    ".hero img",
+    ".banner img",
+    "[class*='hero'] img",
+    "[class*='Hero'] img",
+    "[class*='banner'] img",
+    "[class*='Banner'] img",
+    "[id*='hero'] img",
+    "[id*='Hero'] img",
+    "section:first-of-type img",
+    "main img:first-of-type",
+)
+HERO_PER_SELECTOR = 2
+
+# Elements whose content is never text
+SKIPPED_TAGS = {'script', 'style', 'template'}
+
+# Containers whose first occurrence gets its own text buffer
+CONTENT_SECTION_CLASS = re.compile(r'content|main|body', re.I)
+CONTENT_DIV_CLASS = re.compile(r'content|main|body|post|entry', re.I)
+
+# Characters of readable text kept per crawled subpage
+PAGE_TEXT_LIMIT = 8000
+
+
+def largest_srcset_url(srcset: str) -> Optional[str]:
+    """URL of the widest candidate in a srcset (the first one when there are no width descriptors)"""
+    parts = [candidate.strip().split() for candidate in srcset.split(",")]
+    parts = [part for part in parts if part]
+    if not parts:
+        return None
+    parts.sort(key=lambda part: int(part[1][:-1]) if len(part) > 1 and part[1].endswith("w") and part[1][:-1].isdigit() else 0, reverse=True)
+    return parts[0][0]
+
+
+@dataclass
+class ImageRef:
+    """One <img>, with its best URL resolved"""
+    url: str
+    src: Optional[str]
+    size_score: int = 0
+    attrs: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class PageExtract:
+    """Everything the brand and content extractors read from one page"""
+    title: Optional[str] = None
+    meta: Dict[str, str] = field(default_factory=dict)
+    texts: Dict[str, List[str]] = field(default_factory=dict)
+    blocks: Dict[str, List[str]] = field(default_factory=dict)
+    footer_links: List[Dict[str, str]] = field(default_factory=list)
+    nav_links: List[Dict[str, str]] = field(default_factory=list)
+    images: List[ImageRef] = field(default_factory=list)
+    hero_images: List[str] = field(default_factory=list)
+    background_images: List[str] = field(default_factory=list)
+    stylesheets: List[str] = field(default_factory=list)
+    style_blocks: List[str] = field(default_factory=list)
+    colors: List[str] = field(default_factory=list)
+    fonts: List = field(default_factory=list)
+    img_count: int = 0
+
+    def has(self, container: str) -> bool:
+        return container in self.texts
+
+    def text(self, container: str, separator: str = " ") -> str:
+        """
+        Text of a container, like get_text(separator, strip=True)
+
+        Containers (first occurrence of each): "main", "article", "body",
+        "header" (without its nav), "footer", "content_section" (section with
+        a content/main/body class), "content_div" (div with a
+        content/main/body/post/entry class) and "document"
+        """
+        return separator.join(self.texts.get(container, ()))
+
+    def main_text(self, separator: str = " ", chain: Tuple[str, ...] = ("main", "article", "body")) -> str:
+        """Text of the first container in `chain` present on the page, else of the whole document"""
+        for container in chain:
+            if container in self.texts:
+                return self.text(container, separator)
+        return self.text("document", separator)
+
+    def structured_parts(self, groups: Tuple[str, ...] = BLOCK_GROUPS, limit: int = BLOCK_LIMIT, min_length: int = 5) -> List[str]:
+        """Texts of heading/paragraph/list/content blocks, grouped in `groups` order"""
+        parts = []
+        for group in groups:
+            for block in self.blocks.get(group, [])[:limit]:
+                if len(block) > min_length:
+                    parts.append(block)
+        return parts
+
+    @property
+    def headings(self) -> List[str]:
+        return [block for group in ('h1', 'h2', 'h3') for block in self.blocks.get(group, []) if block]
+
+    def internal_links(self, base_url: str) -> List[Dict[str, str]]:
+        """Same-site footer links, then nav links not already listed"""
+        host = urlparse(base_url).netloc
+        links = [link for link in self.footer_links if urlparse(link["url"]).netloc == host]
+        for link in self.nav_links:
+            if urlparse(link["url"]).netloc == host and not any(existing["url"] == link["url"] for existing in links):
+                links.append(link)
+        return links
+
+
+class _Walker:
+    """State for one walk; see extract_page"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.page = PageExtract()
+        self.page.blocks = {group: [] for group in BLOCK_GROUPS}
+        self.active: List[list] = []
+        self.header_buffer: Optional[list] = None
+        self.header_depth = 0
+        self.nav_in_header = 0
+        self.skip_depth = 0
+        self.footer_depth = 0
+        self.first_footer_done = False
+        self.nav_depth = 0
+        self.first_nav_done = False
+        self.main_depth = 0
+        self.picture_sources: List[List[str]] = []
+        # hero selector index -> matched URLs
+        self.hero: List[List[str]] = [[] for _ in HERO_SELECTORS]
+        # Ancestor matches for the hero selectors: counts of open elements
+        self.hero_context = [0] * 9
+        self.first_section_depth = 0
+        # Sibling bookkeeping for :first-of-type: per open element, tags seen among its children
+        self.child_tags: List[set] = [set()]
+
+    def add_text(self, value: Optional[str]) -> None:
+        if not value or self.skip_depth:
+            return
+        value = value.strip()
+        if not value:
+            return
+        for buffer in self.active:
+            buffer.append(value)
+        if self.header_buffer is not None and not self.nav_in_header:
+            self.header_buffer.append(value)
+
+    def _open(self, name: str, opened: list) -> list:
+        """Start a text buffer for `name` (first occurrence only) and activate it"""
+        buffer: list = []
+        self.page.texts[name] = buffer
+        self.active.append(buffer)
+        opened.append(buffer)
+        return buffer
+
+    def start(self, element) -> tuple:
+        """Handle an opening tag; returns what end() must undo"""
+        tag = element.tag if isinstance(element.tag, str) else ""
+        tag = tag.lower()
+        attrib = element.attrib
+        opened: list = []
+        flags = []
+
+        siblings = self.child_tags[-1]
+        first_of_type = tag not in siblings
+        siblings.add(tag)
+        self.child_tags.append(set())
+
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+            flags.append("skip")
+            if tag == 'style' and element.text:
+                self.page.style_blocks.append(element.text)
+            return opened, flags
+
+        if tag in ('main', 'article', 'body', 'footer') and tag not in self.page.texts:
+            self._open(tag, opened)
+        if tag == 'section' and 'content_section' not in self.page.texts and CONTENT_SECTION_CLASS.search(attrib.get('class', '')):
+            self._open('content_section', opened)
+        if tag == 'div' and 'content_div' not in self.page.texts and CONTENT_DIV_CLASS.search(attrib.get('class', '')):
+            self._open('content_div', opened)
+
+        if tag == 'header':
+            if self.header_buffer is None and 'header' not in self.page.texts:
+                self.header_buffer = []
+                self.page.texts['header'] = self.header_buffer
+                flags.append("header")
+            self.hero_context[0] += 1
+            flags.append("hero_header")
+        if tag == 'nav':
+            if self.header_buffer is not None:
+                self.nav_in_header += 1
+                flags.append("nav_in_header")
+            if not self.first_nav_done:
+                self.first_nav_done = True
+                self.nav_depth = 1
+                flags.append("nav")
+        if tag == 'footer' and not self.first_footer_done:
+            self.first_footer_done = True
+            self.footer_depth = 1
+            flags.append("footer")
+        if tag == 'main':
+            self.main_depth += 1
+            flags.append("main")
+
+        # Blocks: per-element text joined without a separator, like get_text(strip=True)
+        group = None
+        classes = attrib.get('class', '')
+        if tag in ('h1', 'h2', 'h3', 'h4', 'p', 'li', 'section', 'article'):
+            group = tag
+        if group and len(self.page.blocks[group]) < BLOCK_LIMIT:
+            buffer = []
+            self.active.append(buffer)
+            opened.append(buffer)
+            flags.append(("block", group, buffer))
+        if tag == 'div':
+            for name, needle in (('div_content', 'content'), ('div_text', 'text')):
+                if needle in classes and len(self.page.blocks[name]) < BLOCK_LIMIT:
+                    buffer = []
+                    self.active.append(buffer)
+                    opened.append(buffer)
+                    flags.append(("block", name, buffer))
+
+        if tag == 'a' and attrib.get('href') and (self.footer_depth or self.nav_depth):
+            buffer = []
+            self.active.append(buffer)
+            opened.append(buffer)
+            flags.append(("link", attrib['href'], buffer, bool(self.footer_depth), bool(self.nav_depth)))
+
+        # Hero selector ancestry
+        class_tokens = classes.split()
+        element_id = attrib.get('id', '')
+        hero_matches = (
+            None,  # header, tracked above
+            'hero' in class_tokens,
+            'banner' in class_tokens,
+            'hero' in classes,
+            'Hero' in classes,
+            'banner' in classes,
+            'Banner' in classes,
+            'hero' in element_id,
+            'Hero' in element_id,
+        )
+        for index, matched in enumerate(hero_matches):
+            if matched:
+                self.hero_context[index] += 1
+        flags.append(("hero", hero_matches))
+        if tag == 'section' and first_of_type:
+            self.first_section_depth += 1
+            flags.append("first_section")
+
+        if tag == 'picture':
+            self.picture_sources.append([])
+            flags.append("picture")
+        elif tag == 'source' and self.picture_sources and attrib.get('srcset'):
+            self.picture_sources[-1].append(attrib['srcset'])
+        elif tag == 'img':
+            self._image(attrib, first_of_type)
+        elif tag == 'meta':
+            key = attrib.get('property') or attrib.get('name')
+            if key and attrib.get('content') is not None:
+                self.page.meta.setdefault(key.lower(), attrib['content'])
+        elif tag == 'title' and self.page.title is None:
+            self.page.title = element.text or ""
+        elif tag == 'link':
+            self._link(attrib)
+
+        style = attrib.get('style')
+        if style:
+            self._inline_style(style)
+
+        return opened, flags
+
+    def end(self, element, state: tuple) -> None:
+        opened, flags = state
+        self.child_tags.pop()
+        if opened:
+            # Buffers nest with the elements, so this element's are the last ones
+            del self.active[-len(opened):]
+        for flag in flags:
+            if flag == "skip":
+                self.skip_depth -= 1
+            elif flag == "header":
+                self.header_buffer = None
+            elif flag == "hero_header":
+                self.hero_context[0] -= 1
+            elif flag == "nav_in_header":
+                self.nav_in_header -= 1
+            elif flag == "nav":
+                self.nav_depth = 0
+            elif flag == "footer":
+                self.footer_depth = 0
+            elif flag == "main":
+                self.main_depth -= 1
+            elif flag == "first_section":
+                self.first_section_depth -= 1
+            elif flag == "picture":
+                self.picture_sources.pop()
+            elif flag[0] == "block":
+                self.page.blocks[flag[1]].append("".join(flag[2]))
+            elif flag[0] == "link":
+                _, href, buffer, in_footer, in_nav = flag
+                text = "".join(buffer)
+                if len(text) > 2:
+                    link = {"url": urljoin(self.base_url, href), "text": text}
+                    if in_footer:
+                        self.page.footer_links.append(link)
+                    if in_nav:
+                        self.page.nav_links.append(link)
+            elif flag[0] == "hero":
+                for index, matched in enumerate(flag[1]):
+                    if matched:
+                        self.hero_context[index] -= 1
+
+    def _image(self, attrib, first_of_type: bool) -> None:
+        page = self.page
+        page.img_count += 1
+        data_srcset = attrib.get('data-srcset')
+        src = (
+            attrib.get('src')
+            or attrib.get('data-src')
+            or attrib.get('data-lazy-src')
+            or attrib.get('data-original')
+            or (data_srcset.split(",")[0].strip().split(" ")[0] if data_srcset else None)
+        )
+        if not src:
+            return
+
+        # Hero selectors (first matches per selector)
+        hero_url = src
+        if not src.startswith("http") and attrib.get('srcset'):
+            hero_url = largest_srcset_url(attrib['srcset']) or src
+        hero_url = urljoin(self.base_url, hero_url)
+        matches = [count > 0 for count in self.hero_context]
+        matches.append(self.first_section_depth > 0)
+        matches.append(self.main_depth > 0 and first_of_type)
+        for index, matched in enumerate(matches):
+            if matched and len(self.hero[index]) < HERO_PER_SELECTOR:
+                self.hero[index].append(hero_url)
+
+        best = src
+        if attrib.get('srcset'):
+            best = largest_srcset_url(attrib['srcset']) or src
+        image_url = urljoin(self.base_url, best)
+        if self.picture_sources:
+            for srcset in self.picture_sources[-1]:
+                larger = largest_srcset_url(srcset)
+                if larger:
+                    image_url = urljoin(self.base_url, larger)
+
+        size_score = 0
+        try:
+            if attrib.get('width') and attrib.get('height'):
+                size_score = int(attrib['width']) * int(attrib['height'])
+        except ValueError:
+            pass
+        page.images.append(ImageRef(url=image_url, src=attrib.get('src'), size_score=size_score, attrs=dict(attrib)))
+
+    def _link(self, attrib) -> None:
+        href = attrib.get('href', '')
+        if "fonts.googleapis.com" in href or "fonts.gstatic.com" in href:
+            font_match = GOOGLE_FONT_FAMILY_PATTERN.search(href)
+            if font_match:
+                self.google_fonts.append(font_match.group(1).replace("+", " "))
+        rel = attrib.get('rel', '')
+        if href and any("stylesheet" in rel_value.lower() for rel_value in rel.split()):
+            self.page.stylesheets.append(urljoin(self.base_url, href))
+
+    def _inline_style(self, style: str) -> None:
+        self.inline_colors.extend(COLOR_PATTERN.findall(style))
+        self.inline_fonts.extend(FONT_PATTERN.findall(style))
+        for var_value in CSS_VAR_COLOR_PATTERN.findall(style):
+            self.inline_colors.extend(COLOR_PATTERN.findall(var_value))
+        bg_match = BACKGROUND_IMAGE_PATTERN.search(style)
+        if bg_match:
+            self.page.background_images.append(urljoin(self.base_url, bg_match.group(1)))
+
+    def walk(self, root) -> PageExtract:
+        self.google_fonts: List[str] = []
+        self.inline_colors: List[str] = []
+        self.inline_fonts: List = []
+        document: list = []
+        self.page.texts["document"] = document
+        self.active.append(document)
+
+        states = []
+        for event, element in etree.iterwalk(root, events=("start", "end")):
+            if event == "start":
+                states.append(self.start(element))
+                if not isinstance(element.tag, str):
+                    # Comments and processing instructions: no text of their own
+                    continue
+                self.add_text(element.text)
+            else:
+                self.end(element, states.pop())
+                self.add_text(element.tail)
+
+        page = self.page
+        page.hero_images = [url for urls in self.hero for url in urls]
+        return page
+
+
+def _collect_styles(walker: _Walker, raw_html: str) -> None:
+    """Colors and fonts in the order the brand palette ranks them"""
+    page = walker.page
+    page.colors = COLOR_PATTERN.findall(raw_html) + walker.inline_colors
+    page.fonts = FONT_PATTERN.findall(raw_html) + walker.inline_fonts
+    for content in page.style_blocks:
+        page.colors.extend(COLOR_PATTERN.findall(content))
+        page.fonts.extend(FONT_PATTERN.findall(content))
+        for var_value in CSS_VAR_COLOR_PATTERN.findall(content):
+            page.colors.extend(COLOR_PATTERN.findall(var_value))
+    page.fonts.extend(walker.google_fonts)
+    for content in page.style_blocks:
+        page.fonts.extend(FONT_FACE_PATTERN.findall(content))
+    for content in page.style_blocks:
+        for bg_match in BACKGROUND_IMAGE_PATTERN.findall(content):
+            page.background_images.append(urljoin(walker.base_url, bg_match))
+
+
+def extract_page(raw_html: str, base_url: str, styles: bool = True) -> PageExtract:
+    """
+    Parse a page once with lxml and extract everything in one tree walk
+
+    Args:
+        raw_html: The page's HTML
+        base_url: Base for resolving links and image URLs
+        styles: Also collect colors and fonts (regex passes over the HTML
+            and style blocks); subpage text extraction doesn't need them
+
+    Returns:
+        PageExtract (empty for blank or unparseable input)
+    """
+    if not raw_html or not raw_html.strip():
+        return PageExtract(blocks={group: [] for group in BLOCK_GROUPS})
+    try:
+        parser = lxml_html.HTMLParser(encoding='utf-8', remove_comments=True)
+        root = lxml_html.document_fromstring(raw_html.encode('utf-8', errors='replace'), parser=parser)
+    except (etree.ParserError, ValueError):
+        return PageExtract(blocks={group: [] for group in BLOCK_GROUPS})
+
+    walker = _Walker(base_url)
+    walker.walk(root)
+    if styles:
+        _collect_styles(walker, raw_html)
+    return walker.page
+
+
+def extract_page_text(page_url: str, page_html: str, separator: str = "\n") -> Optional[str]:
+    """
+    Readable text of a crawled subpage (up to PAGE_TEXT_LIMIT chars), or None if it has almost none
+
+    The main/article/body text, or the heading/paragraph/list blocks when
+    those hold more; pieces are joined with `separator` and empty lines dropped.
+    """
+    page = extract_page(page_html, page_url, styles=False)
+
+    if not any(page.has(container) for container in ("main", "article", "body")):
+        return None
+
+    page_text = separator.join(
+        line.strip() for line in page.main_text(separator).split("\n") if line.strip()
+    )
+
+    # If main content is short, also try getting structured content
+    if len(page_text) < 1000:
+        structured_parts = page.structured_parts(
+            ('h1', 'h2', 'h3', 'h4', 'p', 'li', 'div_content', 'div_text'), limit=100
+        )
+        if structured_parts:
+            structured_text = separator.join(structured_parts)
+            if len(structured_text) > len(page_text):
+                page_text = structured_text
+
+    if not page_text or len(page_text) <= 20:
+        return None
+    # Lone surrogates from badly encoded pages would break JSON and prompts later
+    return page_text.encode('utf-8', errors='replace').decode('utf-8')[:PAGE_TEXT_LIMIT]
@@ -0,0 +1,713 @@
+"""
+HTTP Cache
+On-disk cache for outbound GET requests (scraped pages, stylesheets, images,
+screenshots): bodies are stored with their validators, served while fresh per
+Cache-Control/Expires, revalidated with If-None-Match/If-Modified-Since once
+stale, and evicted least-recently-used past a size bound
+
+get() returns whole bodies; stream() hands bodies out chunk by chunk while
+the download is written into the cache, with concurrent readers of one URL
+sharing a single upstream fetch
+"""
+
+import asyncio
+import email.utils
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Optional
+
+import aiohttp
+from multidict import CIMultiDict
+
+from .compute_pool import run_in_compute_pool
+
+
+HTTP_CACHE_DIR = Path(os.environ.get(
+    "HTTP_CACHE_DIR",
+    Path(__file__).parent.parent.parent.parent / "uploads" / "http-cache"
+))
+
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Larger bodies are passed through without being stored
+HTTP_CACHE_MAX_ENTRY_BYTES = 20 * 1024 * 1024
+
+# Freshness for responses that carry no Cache-Control/Expires: pages change,
+# assets (stylesheets, images, screenshots) mostly don't
+PAGE_TTL = 600
+ASSET_TTL = 24 * 3600
+
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Bytes handed to an `accept` check (enough for any file signature)
+SNIFF_BYTES = 16
+
+# Response headers kept with a cached body
+STORED_HEADERS = (
+    "Content-Type", "ETag", "Last-Modified", "Cache-Control", "Expires", "Date"
+)
+
+# Upstream headers describing the encoded body; aiohttp hands out the decoded one
+BODY_ENCODING_HEADERS = ("Content-Encoding", "Content-Length")
+
+
+class CachedResponse:
+    """A fully read response, from the network or from the cache"""
+
+    def __init__(self, url: str, status: int, headers: CIMultiDict, body: bytes, reason: str = "", cache_status: str = "miss"):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.reason = reason
+        # "hit" (fresh), "revalidated" (304), "miss" or "bypass" (not storable)
+        self.cache_status = cache_status
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+    def text(self, encoding: str = "utf-8", errors: str = "replace") -> str:
+        return self.body.decode(encoding, errors=errors)
+
+
+class _Fill:
+    """
+    One upstream download, appended to a temp file that its readers tail
+
+    A finished fill from the cache (hit or 304) is the same object with
+    done set and path pointing at the cached body.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.status = 0
+        self.headers: CIMultiDict = CIMultiDict()
+        self.error_body = b""
+        self.digest: Optional[str] = None
+        self.path: Optional[Path] = None
+        self.fd: Optional[int] = None
+        self.size = 0
+        # Upstream Content-Length, when it is the length of the decoded body
+        self.declared_size: Optional[int] = None
+        self.done = False
+        self.failed: Optional[str] = None
+        self.keep = True
+        self.cache_status = "miss"
+        self.ready = asyncio.Event()
+        self.progress = asyncio.Condition()
+
+    @classmethod
+    def finished(cls, key: str, path: Path, size: int, headers: CIMultiDict, digest: Optional[str], cache_status: str) -> "_Fill":
+        fill = cls(key)
+        fill.status = 200
+        fill.headers = headers
+        fill.digest = digest
+        fill.path = path
+        fill.size = size
+        fill.done = True
+        fill.cache_status = cache_status
+        fill.ready.set()
+        return fill
+
+    async def notify(self) -> None:
+        async with self.progress:
+            self.progress.notify_all()
+
+
+class StreamedResponse:
+    """
+    A response whose body is read incrementally, from the cache or from a
+    download still in progress
+
+    Iterate body() exactly once, or call close() if the body won't be sent.
+    """
+
+    def __init__(self, url: str, cache: "HTTPCache", fill: _Fill, cache_status: Optional[str] = None):
+        self.url = url
+        self.status = fill.status
+        self.headers = fill.headers
+        # "hit", "revalidated", "miss", "coalesced" (joined another request's
+        # download) or "rejected" (over max_bytes)
+        self.cache_status = cache_status or fill.cache_status
+        self._cache = cache
+        self._fill = fill
+        self._fd: Optional[int] = None
+        if fill.status == 200 and fill.cache_status != "rejected":
+            # Opened now so eviction or the temp file's rename can't pull the body away
+            self._fd = os.dup(fill.fd) if fill.fd is not None else os.open(fill.path, os.O_RDONLY)
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+    @property
+    def content_length(self) -> Optional[int]:
+        """
+        Body size when already known: cached, a finished download, or an
+        upstream Content-Length for a body that wasn't content-encoded
+        """
+        if self._fill.done and not self._fill.failed:
+            return self._fill.size
+        return self._fill.declared_size
+
+    @property
+    def etag(self) -> Optional[str]:
+        """Content digest for stored bodies, otherwise the upstream ETag"""
+        if self._fill.digest:
+            return f'"{self._fill.digest}"'
+        return self.headers.get("ETag")
+
+    @property
+    def error_body(self) -> bytes:
+        """Body of a non-200 upstream response (not streamed, not cached)"""
+        return self._fill.error_body
+
+    async def _wait_for(self, size: int) -> None:
+        fill = self._fill
+        async with fill.progress:
+            await fill.progress.wait_for(lambda: fill.size >= size or fill.done)
+
+    async def peek(self, size: int) -> bytes:
+        """The first `size` bytes (fewer if the body is shorter), once they have arrived"""
+        await self._wait_for(size)
+        length = min(size, self._fill.size)
+        return await run_in_compute_pool(os.pread, self._fd, length, 0) if self._fd is not None else b""
+
+    async def body(self) -> AsyncIterator[bytes]:
+        fill = self._fill
+        offset = 0
+        try:
+            while self._fd is not None:
+                if offset < fill.size:
+                    chunk = await run_in_compute_pool(os.pread, self._fd, min(STREAM_CHUNK_BYTES, fill.size - offset), offset)
+                    if not chunk:
+                        break
+                    offset += len(chunk)
+                    yield chunk
+                elif fill.done:
+                    if fill.failed:
+                        raise aiohttp.ClientPayloadError(f"Upstream body for {self.url[:80]} failed: {fill.failed}")
+                    break
+                else:
+                    await self._wait_for(offset + 1)
+        finally:
+            self.close()
+
+    async def discard(self) -> None:
+        """Keep this body out of the cache (e.g. an error image behind a 200)"""
+        self._fill.keep = False
+        if self._fill.done:
+            await self._cache.invalidate(self.url)
+        self.close()
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __del__(self):
+        self.close()
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Replace a file in one step; the temp name is unique so concurrent writers never share one"""
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _cache_key(url: str) -> str:
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+
+def _freshness(headers, default_ttl: float) -> Optional[float]:
+    """
+    Seconds the response stays fresh, or None when it must not be stored
+
+    Cache-Control max-age (or s-maxage) wins over Expires; responses without
+    either stay fresh for the caller's default_ttl.
+    """
+    directives = _parse_cache_control(headers.get("Cache-Control", ""))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name):
+            try:
+                return max(0.0, float(directives[name]))
+            except ValueError:
+                return 0.0
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            expires_at = email.utils.parsedate_to_datetime(expires).timestamp()
+            return max(0.0, expires_at - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    return default_ttl
+
+
+async def _read_limited(
+    response: aiohttp.ClientResponse,
+    max_bytes: Optional[int],
+    accept: Optional[Callable[[bytes, CIMultiDict], bool]]
+) -> Optional[bytes]:
+    """Read a body in chunks, or None as soon as it is too large or rejected by `accept`"""
+    if max_bytes and response.content_length and response.content_length > max_bytes:
+        return None
+
+    chunks = []
+    size = 0
+    sniffed = accept is None
+    async for chunk in response.content.iter_chunked(STREAM_CHUNK_BYTES):
+        chunks.append(chunk)
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            return None
+        if not sniffed and size >= SNIFF_BYTES:
+            if not accept(b"".join(chunks)[:SNIFF_BYTES], response.headers):
+                return None
+            sniffed = True
+
+    body = b"".join(chunks)
+    if not sniffed and not accept(body, response.headers):
+        return None
+    return body
+
+
+class HTTPCache:
+    """
+    LRU-bounded disk cache keyed by URL
+
+    The index (key -> body size, in recency order) is rebuilt from the
+    directory on first use, so the cache survives restarts.
+    """
+
+    def __init__(self, directory: Path = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Callers holding or waiting on each lock; a lock is dropped once none are left
+        self._lock_users: Dict[str, int] = {}
+        self._fills: Dict[str, _Fill] = {}
+
+    def _paths(self, key: str):
+        directory = self.directory / key[:2]
+        return directory / f"{key}.body", directory / f"{key}.json"
+
+    def _load_index(self) -> None:
+        entries = []
+        if self.directory.exists():
+            for body_path in self.directory.glob("*/*.body"):
+                try:
+                    stat = body_path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, body_path.stem, stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total = sum(self._index.values())
+
+    def _read(self, key: str):
+        body_path, meta_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text())
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        # mtime records recency for the index rebuilt after a restart
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        return meta, body
+
+    def _write(self, key: str, meta: dict, body: Optional[bytes]) -> None:
+        body_path, meta_path = self._paths(key)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write atomically so concurrent readers never see a partial entry; get()
+        # and a stream() fill of the same URL may write it at the same time
+        if body is not None:
+            _write_atomic(body_path, body)
+        _write_atomic(meta_path, json.dumps(meta).encode())
+
+    def _delete(self, key: str) -> None:
+        for path in self._paths(key):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _remember(self, key: str, size: int) -> None:
+        self._total -= self._index.pop(key, 0)
+        self._index[key] = size
+        self._total += size
+        while self._total > self.max_bytes and len(self._index) > 1:
+            evicted, evicted_size = self._index.popitem(last=False)
+            self._total -= evicted_size
+            self._delete(evicted)
+
+    def _entry_headers(self, meta: dict) -> CIMultiDict:
+        return CIMultiDict(meta["headers"])
+
+    def _meta_for(self, headers, ttl: float, digest: Optional[str] = None) -> dict:
+        meta = {
+            "headers": {name: headers[name] for name in STORED_HEADERS if name in headers},
+            "expires_at": time.time() + ttl,
+        }
+        if digest:
+            meta["digest"] = digest
+        return meta
+
+    async def _evict_entry(self, key: str) -> None:
+        self._total -= self._index.pop(key, 0)
+        await run_in_compute_pool(self._delete, key)
+
+    async def invalidate(self, url: str) -> None:
+        """Drop a cached URL (e.g. a body that turned out to be an error page)"""
+        if self._index is None:
+            await run_in_compute_pool(self._load_index)
+        await self._evict_entry(_cache_key(url))
+
+    async def get(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        default_ttl: float = 0.0,
+        force_ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        accept: Optional[Callable[[bytes, CIMultiDict], bool]] = None,
+        allow_redirects: bool = True
+    ) -> CachedResponse:
+        """
+        GET a URL through the cache
+
+        Args:
+            session: Session used when the network is needed
+            headers: Extra request headers
+            timeout: Total timeout for the network request
+            default_ttl: Freshness for responses without Cache-Control/Expires;
+                0 means revalidate every time
+            force_ttl: Freshness regardless of the response's headers, for
+                responses that are expensive to regenerate (paid screenshots)
+            max_bytes: Abort downloads larger than this
+            accept: (first bytes, headers) -> bool, checked as soon as the
+                first bytes arrive; False aborts the download
+
+        A download aborted by max_bytes or accept comes back with
+        cache_status "rejected" and an empty body.
+
+        Raises:
+            aiohttp.ClientError / asyncio.TimeoutError from the network request
+        """
+        if self._index is None:
+            await run_in_compute_pool(self._load_index)
+
+        key = _cache_key(url)
+        # Concurrent requests for one URL share a single network fetch
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                return await self._get(
+                    session, url, key, headers, timeout, allow_redirects,
+                    default_ttl=default_ttl, force_ttl=force_ttl, max_bytes=max_bytes, accept=accept
+                )
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+    async def _get(self, session, url, key, headers, timeout, allow_redirects, *, default_ttl, force_ttl, max_bytes, accept) -> CachedResponse:
+        cached = await run_in_compute_pool(self._read, key) if key in self._index else None
+        if cached is not None:
+            meta, body = cached
+            self._index.move_to_end(key)
+            if meta["expires_at"] > time.time():
+                return CachedResponse(url, 200, CIMultiDict(meta["headers"]), body, cache_status="hit")
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if meta["headers"].get("ETag"):
+                request_headers["If-None-Match"] = meta["headers"]["ETag"]
+            if meta["headers"].get("Last-Modified"):
+                request_headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+
+        client_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        async with session.get(url, headers=request_headers, timeout=client_timeout, allow_redirects=allow_redirects) as response:
+            if response.status == 304 and cached is not None:
+                # Not modified: keep the body, refresh validators and freshness
+                for name in STORED_HEADERS:
+                    if name in response.headers:
+                        meta["headers"][name] = response.headers[name]
+                ttl = force_ttl if force_ttl is not None else _freshness(CIMultiDict(meta["headers"]), default_ttl)
+                meta["expires_at"] = time.time() + (ttl or 0.0)
+                await run_in_compute_pool(self._write, key, meta, None)
+                return CachedResponse(url, 200, CIMultiDict(meta["headers"]), body, cache_status="revalidated")
+
+            if response.status == 200 and (max_bytes or accept):
+                body = await _read_limited(response, max_bytes, accept)
+                if body is None:
+                    return CachedResponse(url, response.status, CIMultiDict(response.headers), b"", reason=response.reason or "", cache_status="rejected")
+            else:
+                body = await response.read()
+            result = CachedResponse(url, response.status, CIMultiDict(response.headers), body, reason=response.reason or "", cache_status="bypass")
+
+        if response.status != 200:
+            return result
+
+        ttl = force_ttl if force_ttl is not None else _freshness(response.headers, default_ttl)
+        if ttl is None or len(body) > HTTP_CACHE_MAX_ENTRY_BYTES:
+            if cached is not None:
+                await self._evict_entry(key)
+            return result
+
+        meta = self._meta_for(response.headers, ttl, hashlib.blake2b(body, digest_size=16).hexdigest())
+        try:
+            await run_in_compute_pool(self._write, key, meta, body)
+            self._remember(key, len(body))
+        except OSError as e:
+            print(f"[HTTP_CACHE] Failed to store {url[:80]}: {e}")
+        result.cache_status = "miss"
+        return result
+
+    async def stream(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        default_ttl: float = 0.0,
+        force_ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ) -> StreamedResponse:
+        """
+        GET a URL through the cache without buffering the body
+
+        Returns once the status and headers are known. A miss is downloaded
+        by a background task into a temp file that every concurrent reader of
+        the URL tails, and becomes the cache entry once complete; a body
+        larger than max_bytes fails the download (cache_status "rejected"
+        when Content-Length gives it away up front). Options as for get().
+
+        Raises:
+            aiohttp.ClientError / asyncio.TimeoutError when the request fails
+            before headers arrive
+        """
+        if self._index is None:
+            await run_in_compute_pool(self._load_index)
+
+        key = _cache_key(url)
+        fill = self._fills.get(key)
+        if fill is None:
+            cached = await run_in_compute_pool(self._read_meta, key) if key in self._index else None
+            if cached is not None and cached[0]["expires_at"] > time.time():
+                meta, path, size = cached
+                self._index.move_to_end(key)
+                fill = _Fill.finished(key, path, size, self._entry_headers(meta), meta.get("digest"), "hit")
+                try:
+                    return StreamedResponse(url, self, fill)
+                except FileNotFoundError:
+                    cached = None
+            # Another request may have started the download while the entry was read
+            fill = self._fills.get(key)
+
+        coalesced = fill is not None
+        if fill is None:
+            fill = _Fill(key)
+            self._fills[key] = fill
+            task = asyncio.create_task(self._run_fill(
+                fill, session, url, cached, headers, timeout, default_ttl, force_ttl, max_bytes
+            ))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        await fill.ready.wait()
+        if fill.failed and not fill.status:
+            raise aiohttp.ClientError(fill.failed)
+        try:
+            return StreamedResponse(url, self, fill, "coalesced" if coalesced and fill.cache_status == "miss" else None)
+        except FileNotFoundError:
+            # Finished and dropped (or evicted) between the wake-up and the open: fetch again
+            return await self.stream(
+                session, url, headers=headers, timeout=timeout,
+                default_ttl=default_ttl, force_ttl=force_ttl, max_bytes=max_bytes
+            )
+
+    def _read_meta(self, key: str):
+        body_path, meta_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text())
+            size = body_path.stat().st_size
+            os.utime(body_path)
+        except (OSError, ValueError):
+            return None
+        return meta, body_path, size
+
+    async def _run_fill(self, fill: _Fill, session, url, cached, headers, timeout, default_ttl, force_ttl, max_bytes) -> None:
+        """Download into the fill's temp file, then publish it as the cache entry"""
+        body_path, _ = self._paths(fill.key)
+        tmp_path = body_path.with_name(f"{body_path.stem}.{id(fill)}.part")
+        request_headers = dict(headers or {})
+        if cached is not None:
+            meta = cached[0]
+            if meta["headers"].get("ETag"):
+                request_headers["If-None-Match"] = meta["headers"]["ETag"]
+            if meta["headers"].get("Last-Modified"):
+                request_headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+
+        try:
+            client_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+            async with session.get(url, headers=request_headers, timeout=client_timeout, allow_redirects=True) as response:
+                if response.status == 304 and cached is not None:
+                    meta, path, size = cached
+                    for name in STORED_HEADERS:
+                        if name in response.headers:
+                            meta["headers"][name] = response.headers[name]
+                    ttl = force_ttl if force_ttl is not None else _freshness(self._entry_headers(meta), default_ttl)
+                    meta["expires_at"] = time.time() + (ttl or 0.0)
+                    await run_in_compute_pool(self._write, fill.key, meta, None)
+                    fill.status = 200
+                    fill.headers = self._entry_headers(meta)
+                    fill.digest = meta.get("digest")
+                    fill.path = path
+                    fill.size = size
+                    fill.cache_status = "revalidated"
+                    return
+
+                fill.status = response.status
+                fill.headers = CIMultiDict(response.headers)
+                length = fill.headers.get("Content-Length")
+                if "Content-Encoding" not in fill.headers and length and length.isdigit():
+                    fill.declared_size = int(length)
+                for name in BODY_ENCODING_HEADERS:
+                    fill.headers.popall(name, None)
+                if response.status != 200:
+                    fill.error_body = await response.content.read(STREAM_CHUNK_BYTES)
+                    fill.done = True
+                    fill.ready.set()
+                    return
+                if max_bytes and response.content_length and response.content_length > max_bytes:
+                    fill.cache_status = "rejected"
+                    fill.done = True
+                    fill.ready.set()
+                    return
+
+                body_path.parent.mkdir(parents=True, exist_ok=True)
+                fill.fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+                fill.path = tmp_path
+                fill.ready.set()
+
+                digest = hashlib.blake2b(digest_size=16)
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK_BYTES):
+                    if max_bytes and fill.size + len(chunk) > max_bytes:
+                        raise ValueError(f"body over {max_bytes} bytes")
+                    await run_in_compute_pool(_write_all, fill.fd, chunk)
+                    digest.update(chunk)
+                    fill.size += len(chunk)
+                    await fill.notify()
+                fill.digest = digest.hexdigest()
+
+            ttl = force_ttl if force_ttl is not None else _freshness(fill.headers, default_ttl)
+            if fill.keep and ttl is not None and fill.size <= HTTP_CACHE_MAX_ENTRY_BYTES:
+                await run_in_compute_pool(os.replace, tmp_path, body_path)
+                fill.path = body_path
+                await run_in_compute_pool(self._write, fill.key, self._meta_for(fill.headers, ttl, fill.digest), None)
+                self._remember(fill.key, fill.size)
+            elif cached is not None:
+                await self._evict_entry(fill.key)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as e:
+            fill.failed = str(e) or type(e).__name__
+            if not fill.ready.is_set():
+                fill.status = 0
+            print(f"[HTTP_CACHE] Download failed for {url[:80]}: {fill.failed}")
+        finally:
+            # Readers hold their own descriptors, so the temp file can go now
+            if fill.fd is not None:
+                os.close(fill.fd)
+                fill.fd = None
+            if fill.path == tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except FileNotFoundError:
+                    pass
+            fill.done = True
+            fill.ready.set()
+            if self._fills.get(fill.key) is fill:
+                del self._fills[fill.key]
+            await fill.notify()
+
+
+_http_cache: Optional[HTTPCache] = None
+_shared_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_http_cache() -> HTTPCache:
+    """Get (creating on first use) the shared HTTP cache"""
+    global _http_cache
+    if _http_cache is None:
+        _http_cache = HTTPCache()
+    return _http_cache
+
+
+async def cached_get(session: aiohttp.ClientSession, url: str, **kwargs) -> CachedResponse:
+    """HTTPCache.get on the shared cache"""
+    return await get_http_cache().get(session, url, **kwargs)
+
+
+async def cached_stream(url: str, **kwargs) -> StreamedResponse:
+    """HTTPCache.stream on the shared cache and session"""
+    return await get_http_cache().stream(get_shared_session(), url, **kwargs)
+
+
+def get_shared_session() -> aiohttp.ClientSession:
+    """
+    Get (creating on first use) a process-wide session for streamed fetches,
+    whose downloads outlive the request that started them
+    """
+    global _shared_session
+    if _shared_session is None or _shared_session.closed:
+        _shared_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=64, ttl_dns_cache=300)
+        )
+    return _shared_session
+
+
+async def close_shared_session() -> None:
+    """Close the shared session (server shutdown)"""
+    global _shared_session
+    if _shared_session is not None:
+        await _shared_session.close()
+        _shared_session = None
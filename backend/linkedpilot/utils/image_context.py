@@ -0,0 +1,150 @@
+"""
+Image Context
+One decoded image shared by every stage of an overlay request: the encoded
+bytes, a lazily decoded PIL/numpy view and memoized analyses (saliency maps,
+summed-area tables), so each request decodes its image once
+"""
+
+import base64
+import hashlib
+import io
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import httpx
+import numpy as np
+from PIL import Image
+
+
+class ImageContext:
+    """
+    Encoded image plus decoded views and derived analyses, built on first use
+
+    The decoded views are shared between stages and must be treated as
+    read-only; stages that draw on the image work on a copy.
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        self.data = memoryview(data).toreadonly()
+        self._image: Optional[Image.Image] = None
+        self._rgb: Optional[Image.Image] = None
+        self._size: Optional[Tuple[int, int]] = None
+        self._base64: Optional[str] = None
+        self._digest: Optional[str] = None
+        self._derived: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    @classmethod
+    def from_base64(cls, image_base64: str) -> "ImageContext":
+        """From base64 or a base64 data URL"""
+        if image_base64.startswith('data:'):
+            image_base64 = image_base64.split(',', 1)[1]
+        context = cls(base64.b64decode(image_base64))
+        context._base64 = image_base64
+        return context
+
+    @classmethod
+    async def fetch(cls, image_url: str, timeout: float = 30.0) -> "ImageContext":
+        """From a data URL or an http(s) URL"""
+        if image_url.startswith('data:'):
+            return cls.from_base64(image_url)
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.get(image_url)
+            response.raise_for_status()
+            return cls(response.content)
+
+    @classmethod
+    def of(cls, source: Union["ImageContext", bytes, bytearray, memoryview, str]) -> "ImageContext":
+        """Wrap raw bytes or base64 (pass-through for an existing context)"""
+        if isinstance(source, ImageContext):
+            return source
+        if isinstance(source, str):
+            return cls.from_base64(source)
+        return cls(source)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    @property
+    def digest(self) -> str:
+        """Content hash of the encoded bytes"""
+        if self._digest is None:
+            self._digest = hashlib.blake2b(self.data, digest_size=16).hexdigest()
+        return self._digest
+
+    @property
+    def base64(self) -> str:
+        """Base64 of the encoded bytes (for LLM calls), encoded once"""
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode()
+        return self._base64
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height), read from the header without decoding pixels"""
+        if self._size is None:
+            if self._image is not None:
+                self._size = self._image.size
+            else:
+                with Image.open(io.BytesIO(self.data)) as header:
+                    self._size = header.size
+        return self._size
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    @property
+    def image(self) -> Image.Image:
+        """Decoded image in its original mode"""
+        if self._image is None:
+            with self._lock:
+                if self._image is None:
+                    image = Image.open(io.BytesIO(self.data))
+                    image.load()
+                    self._image = image
+                    self._size = image.size
+        return self._image
+
+    @property
+    def rgb(self) -> Image.Image:
+        """Decoded image in RGB (the decoded image itself when already RGB)"""
+        if self._rgb is None:
+            image = self.image
+            self._rgb = image if image.mode == 'RGB' else image.convert('RGB')
+        return self._rgb
+
+    @property
+    def array(self) -> np.ndarray:
+        """Read-only (H, W, 3) uint8 view of the RGB image"""
+        return self.derived("array", lambda: np.asarray(self.rgb))
+
+    def derived(self, key: str, factory: Callable[[], Any]) -> Any:
+        """
+        Memoized analysis of this image
+
+        Computed once per key even when stages ask concurrently from different
+        threads; different keys compute in parallel.
+        """
+        if key in self._derived:
+            return self._derived[key]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._derived:
+                self._derived[key] = factory()
+        return self._derived[key]
+
+    def editable_copy(self, mode: str = 'RGBA') -> Image.Image:
+        """A private copy of the decoded image in the given mode, safe to draw on"""
+        image = self.image
+        return image.convert(mode) if image.mode != mode else image.copy()
+
+
+ImageSource = Union[ImageContext, bytes]
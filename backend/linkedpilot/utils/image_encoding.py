@@ -0,0 +1,172 @@
+"""
+Image Encoding
+Output encoding stage: picks a format per image (photo vs flat graphic), can
+search quality to hit a byte budget, strips metadata and reports bytes saved
+"""
+
+import base64
+import io
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image
+
+
+# Distinct colors (in a 64x64 sample) at or below which an image counts as a flat graphic
+GRAPHIC_MAX_COLORS = 256
+
+DEFAULT_QUALITY = 85
+MIN_QUALITY = 45
+
+MIME_TYPES = {
+    "WEBP": "image/webp",
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+}
+
+
+@dataclass
+class EncodedImage:
+    """Encoded image bytes plus what was chosen and how much it saved"""
+    data: bytes
+    format: str
+    quality: Optional[int] = None
+    source_bytes: Optional[int] = None
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES[self.format]
+
+    @property
+    def bytes_saved(self) -> int:
+        return max(0, self.source_bytes - len(self.data)) if self.source_bytes else 0
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.data).decode()
+
+    def to_data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.to_base64()}"
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+        extrema = image.getchannel('A').getextrema() if image.mode in ('RGBA', 'LA') else (0, 255)
+        return extrema[0] < 255
+    return False
+
+
+def is_flat_graphic(image: Image.Image) -> bool:
+    """True for logos, charts and text cards (few distinct colors), False for photos"""
+    sample = image.copy()
+    sample.thumbnail((64, 64), Image.Resampling.NEAREST)
+    return sample.convert('RGB').getcolors(GRAPHIC_MAX_COLORS) is not None
+
+
+def choose_format(image: Image.Image, allow_webp: bool = True) -> str:
+    """
+    Pick an output format for an image
+
+    Flat graphics stay lossless (PNG); photos go to WebP, or JPEG when WebP is
+    not allowed and there is no transparency to keep.
+    """
+    if is_flat_graphic(image):
+        return "PNG"
+    if allow_webp:
+        return "WEBP"
+    return "PNG" if _has_alpha(image) else "JPEG"
+
+
+def _encode(image: Image.Image, fmt: str, quality: int) -> bytes:
+    # Metadata is never copied: empty EXIF/XMP and no PNG text chunks (ICC stays so colors don't shift)
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        image.save(buffer, format="PNG", optimize=True, exif=b"")
+    elif fmt == "JPEG":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True, exif=b"", xmp=b"")
+    else:
+        image.save(buffer, format="WEBP", quality=quality, method=4, exif=b"", xmp=b"")
+    return buffer.getvalue()
+
+
+def encode_image(
+    image: Image.Image,
+    output_format: str = "auto",
+    quality: int = DEFAULT_QUALITY,
+    target_bytes: Optional[int] = None,
+    min_quality: int = MIN_QUALITY,
+    allow_webp: bool = True,
+    source_bytes: Optional[int] = None
+) -> EncodedImage:
+    """
+    Encode an image for delivery
+
+    Args:
+        image: PIL Image
+        output_format: "auto" (per image), "WEBP", "JPEG" or "PNG"
+        quality: Quality for lossy formats (the starting point when targeting a size)
+        target_bytes: Optional byte budget; lossy quality is binary searched
+            between min_quality and quality for the best quality that fits
+        min_quality: Lowest quality the size search may use
+        allow_webp: Whether "auto" may pick WebP
+        source_bytes: Size of the original encoding, for bytes-saved reporting
+
+    Returns:
+        EncodedImage
+    """
+    fmt = output_format.upper()
+    if fmt == "JPG":
+        fmt = "JPEG"
+    if fmt == "AUTO":
+        fmt = choose_format(image, allow_webp=allow_webp)
+    if fmt not in MIME_TYPES:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    if fmt == "JPEG" and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif fmt == "WEBP" and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+    elif fmt == "WEBP" and image.mode == 'RGBA' and not _has_alpha(image):
+        image = image.convert('RGB')
+
+    data = _encode(image, fmt, quality)
+    used_quality = quality if fmt != "PNG" else None
+
+    if target_bytes and fmt != "PNG" and len(data) > target_bytes:
+        # Highest quality that fits the budget; fall back to min_quality if nothing does
+        low, high = min_quality, quality - 1
+        best = None
+        while low <= high:
+            mid = (low + high) // 2
+            candidate = _encode(image, fmt, mid)
+            if len(candidate) <= target_bytes:
+                best, used_quality = candidate, mid
+                low = mid + 1
+            else:
+                high = mid - 1
+        if best is None:
+            used_quality = min_quality
+            best = _encode(image, fmt, min_quality)
+        data = best
+
+    encoded = EncodedImage(data=data, format=fmt, quality=used_quality, source_bytes=source_bytes)
+    if source_bytes:
+        print(f"[ENCODE] {fmt}{f' q={used_quality}' if used_quality else ''}: "
+              f"{len(data) / 1024:.0f} KB (saved {encoded.bytes_saved / 1024:.0f} KB of {source_bytes / 1024:.0f} KB)")
+    return encoded
+
+
+def sniff_mime_type(data: bytes) -> str:
+    """MIME type from magic bytes (defaults to PNG)"""
+    if data.startswith(b'\xff\xd8\xff'):
+        return "image/jpeg"
+    if data.startswith(b'RIFF') and data[8:12] == b'WEBP':
+        return "image/webp"
+    if data.startswith(b'GIF8'):
+        return "image/gif"
+    return "image/png"
+
+
+def data_url_for_base64(image_base64: str) -> str:
+    """Data URL with the MIME type sniffed from the base64 payload"""
+    head = base64.b64decode(image_base64[:24])
+    return f"data:{sniff_mime_type(head)};base64,{image_base64}"
@@ -3,17 +3,23 @@ Image Text Overlay Utility
 Supports manual text overlay editing and auto-detection using Pillow
 """
 
-import os
 import base64
 import io
-from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import httpx
 
+from .font_store import (
+    download_google_font,
+    resolve_font,
+    variant_for_weight,
+)
+from .image_context import ImageContext
+from .image_encoding import data_url_for_base64, encode_image
+
 
 async def add_text_overlay_to_image(
-    image_base64: str,
+    image_base64: Union[str, ImageContext],
     text: str,
     position: Tuple[int, int],
     font_name: str = "Arial",
@@ -37,13 +43,15 @@ async def add_text_overlay_to_image(
     rotation: int = 0,
     width: int = 300,
     height: int = 100,
-    auto_detect_best_position: bool = False
+    auto_detect_best_position: bool = False,
+    output_format: str = "auto",
+    target_bytes: Optional[int] = None
 ) -> str:
     """
     Add text overlay to image using Pillow
     
     Args:
-        image_base64: Base64 encoded image data
+        image_base64: Base64 encoded image data (or an already decoded ImageContext)
         text: Text to overlay
         position: (x, y) tuple for text position
         font_name: Font name (Arial, Times, etc.)
@@ -52,6 +60,8 @@ async def add_text_overlay_to_image(
         stroke_width: Outline width (0 = no outline)
         stroke_color: Outline color in hex format
         auto_detect_best_position: If True, AI will suggest best position
+        output_format: "auto" (JPEG for photos, PNG for flat graphics or transparency), "WEBP", "JPEG" or "PNG"
+        target_bytes: Optional byte budget for the encoded result
     
     Returns:
         Base64 encoded image with text overlay
@@ -63,181 +73,220 @@ async def add_text_overlay_to_image(
     print(f"   Color: {color}")
     
     try:
-        # Decode base64 image
-        img_data = base64.b64decode(image_base64)
-        img = Image.open(io.BytesIO(img_data))
+        # Decode once (shared context) and draw on a private RGBA copy
+        context = ImageContext.of(image_base64)
+        img = context.editable_copy('RGBA')
         
-        # Convert to RGBA if not already
-        if img.mode != 'RGBA':
-            img = img.convert('RGBA')
+        await _draw_text_overlay(
+            img, text, position,
+            font_name=font_name,
+            font_size=font_size,
+            font_weight=font_weight,
+            text_align=text_align,
+            color=color,
+            stroke_width=stroke_width,
+            stroke_color=stroke_color,
+            shadow_enabled=shadow_enabled,
+            shadow_color=shadow_color,
+            shadow_blur=shadow_blur,
+            shadow_offset_x=shadow_offset_x,
+            shadow_offset_y=shadow_offset_y,
+            background_color=background_color,
+            opacity=opacity,
+            rotation=rotation
+        )
         
-        # Create drawing context
-        draw = ImageDraw.Draw(img)
+        # Convert back to base64 (no WebP on "auto": the result is published to LinkedIn, which rejects it)
+        encoded = encode_image(
+            img, output_format, target_bytes=target_bytes, allow_webp=False, source_bytes=context.nbytes
+        )
+        img_base64 = encoded.to_base64()
         
-        # Load font
-        font_obj = None
-        try:
-            # First check if it's a Google Font
-            font_path = None
-            
-            # Check in fonts_cache directory for Google Fonts
-            cache_dir = Path(__file__).parent / "fonts_cache"
-            if cache_dir.exists():
-                # Look for font file in cache
-                for cached_font in cache_dir.glob(f"{font_name.replace(' ', '_')}_*.ttf"):
-                    font_path = cached_font
-                    print(f"   [FONT] Found cached Google Font: {font_path}")
-                    break
-            
-            # If not found, try to download from Google Fonts
-            if not font_path:
-                # Check if font_name looks like a Google Font (contains space or common Google Font name)
-                google_font = await get_google_font(font_name, "regular")
-                if google_font:
-                    font_path = google_font
-            
-            # If still not found, try system fonts
-            if not font_path:
-                font_paths = [
-                    f"/System/Library/Fonts/{font_name}.ttf",
-                    f"/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                    f"C:/Windows/Fonts/{font_name}.ttf",
-                    f"C:/Windows/Fonts/arial.ttf",
-                ]
-                
-                for path in font_paths:
-                    if os.path.exists(path):
-                        font_path = path
-                        break
-            
-            # Load the font
-            if font_path:
-                font_obj = ImageFont.truetype(font_path, font_size)
-                print(f"   [FONT] Loaded font: {font_path}")
-        except Exception as e:
-            print(f"   [WARNING] Could not load custom font: {e}")
+        print(f"[SUCCESS] Text overlay added successfully!")
+        print(f"   Final image size: {len(img_base64)} bytes ({encoded.format})")
         
-        # Fallback to default font
-        if not font_obj:
-            try:
-                font_obj = ImageFont.load_default()
-                print(f"   [FONT] Using default font")
-            except:
-                font_obj = ImageFont.load_default()
+        return img_base64
         
-        # Convert hex color to RGB
-        def hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
-            hex_color = hex_color.lstrip('#')
-            return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+    except Exception as e:
+        print(f"[ERROR] Failed to add text overlay: {e}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+
+async def _draw_text_overlay(
+    img: Image.Image,
+    text: str,
+    position: Tuple[int, int],
+    font_name: str = "Arial",
+    font_size: int = 48,
+    font_weight: int = 400,
+    text_align: str = "left",
+    color: str = "#FFFFFF",
+    stroke_width: int = 0,
+    stroke_color: str = "#000000",
+    shadow_enabled: bool = False,
+    shadow_color: str = "#000000",
+    shadow_blur: int = 10,
+    shadow_offset_x: int = 0,
+    shadow_offset_y: int = 0,
+    background_color: str = "transparent",
+    opacity: int = 100,
+    rotation: int = 0
+) -> None:
+    """Draw one text overlay onto an RGBA image in place"""
+    # Create drawing context
+    draw = ImageDraw.Draw(img)
+    
+    # Resolve font from the local store / face cache (downloads only on first use of a family)
+    font_obj = await resolve_font(font_name, font_size, variant_for_weight(font_weight))
+    print(f"   [FONT] Resolved font: {font_name}")
+    
+    # Convert hex color to RGB
+    def hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
+        hex_color = hex_color.lstrip('#')
+        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+    
+    text_color = hex_to_rgb(color)
+    stroke_col = hex_to_rgb(stroke_color) if stroke_width > 0 else None
+    
+    # Handle opacity
+    if opacity < 100:
+        # Create RGBA color with opacity
+        text_color = text_color + (int(255 * opacity / 100),)
+        if stroke_col:
+            stroke_col = stroke_col + (int(255 * opacity / 100),)
+    
+    # Get text bounding box for background and positioning
+    bbox = draw.textbbox((0, 0), text, font=font_obj)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+    
+    # Adjust position based on text alignment
+    x, y = position
+    if text_align == 'center':
+        x = x - text_width // 2
+    elif text_align == 'right':
+        x = x - text_width
+    
+    # Create a temporary image for text with shadow/background if needed
+    # This allows us to apply effects before rotating
+    text_img = None
+    if shadow_enabled or background_color != 'transparent' or rotation != 0:
+        # Create a larger canvas for effects
+        shadow_dx, shadow_dy = int(round(shadow_offset_x)), int(round(shadow_offset_y))
+        padding = int(round(max(shadow_blur, abs(shadow_dx), abs(shadow_dy), 50)))
+        text_canvas = Image.new('RGBA', (text_width + padding * 2, text_height + padding * 2), (0, 0, 0, 0))
+        text_draw = ImageDraw.Draw(text_canvas)
+        text_x, text_y = padding, padding
         
-        text_color = hex_to_rgb(color)
-        stroke_col = hex_to_rgb(stroke_color) if stroke_width > 0 else None
+        # Draw background if needed
+        if background_color != 'transparent':
+            bg_color = hex_to_rgb(background_color)
+            bg_alpha = int(255 * opacity / 100) if opacity < 100 else 255
+            text_draw.rectangle(
+                [(text_x - 5, text_y - 5), (text_x + text_width + 5, text_y + text_height + 5)],
+                fill=bg_color + (bg_alpha,)
+            )
         
-        # Handle opacity
-        if opacity < 100:
-            # Create RGBA color with opacity
-            text_color = text_color + (int(255 * opacity / 100),)
-            if stroke_col:
-                stroke_col = stroke_col + (int(255 * opacity / 100),)
+        # Rasterize the glyphs once; shadow, stroke and fill all reuse these masks
+        fill_mask, outline_mask = _rasterize_text_masks(
+            text_canvas.size, (text_x, text_y), text, font_obj, stroke_width if stroke_col else 0
+        )
         
-        # Get text bounding box for background and positioning
-        bbox = draw.textbbox((0, 0), text, font=font_obj)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
+        # Draw shadow if enabled
+        if shadow_enabled:
+            shadow_col = hex_to_rgb(shadow_color)
+            shadow_alpha = int(255 * opacity / 100) if opacity < 100 else 255
+            
+            # Blur the text silhouette and paste it at the shadow offset
+            shadow_mask = (outline_mask if outline_mask is not None else fill_mask).filter(ImageFilter.GaussianBlur(radius=shadow_blur / 2))
+            text_canvas.paste(
+                shadow_col + (shadow_alpha,),
+                (shadow_dx, shadow_dy, shadow_dx + text_canvas.width, shadow_dy + text_canvas.height),
+                shadow_mask
+            )
         
-        # Adjust position based on text alignment
-        x, y = position
-        if text_align == 'center':
-            x = x - text_width // 2
-        elif text_align == 'right':
-            x = x - text_width
+        # Draw stroke if needed
+        if outline_mask is not None:
+            text_canvas.paste(_with_alpha(stroke_col), (0, 0), outline_mask)
         
-        # Create a temporary image for text with shadow/background if needed
-        # This allows us to apply effects before rotating
-        text_img = None
-        if shadow_enabled or background_color != 'transparent' or rotation != 0:
-            # Create a larger canvas for effects
-            padding = max(shadow_blur, abs(shadow_offset_x), abs(shadow_offset_y), 50)
-            text_canvas = Image.new('RGBA', (text_width + padding * 2, text_height + padding * 2), (0, 0, 0, 0))
-            text_draw = ImageDraw.Draw(text_canvas)
-            text_x, text_y = padding, padding
-            
-            # Draw background if needed
-            if background_color != 'transparent':
-                bg_color = hex_to_rgb(background_color)
-                bg_alpha = int(255 * opacity / 100) if opacity < 100 else 255
-                text_draw.rectangle(
-                    [(text_x - 5, text_y - 5), (text_x + text_width + 5, text_y + text_height + 5)],
-                    fill=bg_color + (bg_alpha,)
-                )
-            
-            # Draw shadow if enabled
-            if shadow_enabled:
-                shadow_col = hex_to_rgb(shadow_color)
-                shadow_alpha = int(255 * opacity / 100) if opacity < 100 else 255
-                shadow_x = text_x + shadow_offset_x
-                shadow_y = text_y + shadow_offset_y
-                
-                # Draw blurred shadow
-                shadow_img = Image.new('RGBA', (text_width + shadow_blur * 2, text_height + shadow_blur * 2), (0, 0, 0, 0))
-                shadow_draw = ImageDraw.Draw(shadow_img)
-                shadow_draw.text((shadow_blur, shadow_blur), text, font=font_obj, fill=shadow_col + (shadow_alpha,))
-                shadow_img = shadow_img.filter(ImageFilter.GaussianBlur(radius=shadow_blur / 2))
-                text_canvas.paste(shadow_img, (int(shadow_x - shadow_blur), int(shadow_y - shadow_blur)), shadow_img)
-            
-            # Draw stroke if needed
-            if stroke_width > 0 and stroke_col:
-                for adj in range(-stroke_width, stroke_width + 1):
-                    for adj2 in range(-stroke_width, stroke_width + 1):
-                        text_draw.text(
-                            (text_x + adj, text_y + adj2),
-                            text,
-                            font=font_obj,
-                            fill=stroke_col if isinstance(stroke_col, tuple) and len(stroke_col) == 4 else stroke_col + (255,)
-                        )
-            
-            # Draw main text
-            text_draw.text((text_x, text_y), text, font=font_obj, fill=text_color if isinstance(text_color, tuple) and len(text_color) == 4 else text_color + (255,))
-            
-            # Rotate if needed
-            if rotation != 0:
-                text_canvas = text_canvas.rotate(rotation, expand=True, fillcolor=(0, 0, 0, 0))
-            
-            # Paste onto main image
-            paste_x = x - padding + (text_canvas.width - text_width - padding * 2) // 2
-            paste_y = y - padding + (text_canvas.height - text_height - padding * 2) // 2
-            img.paste(text_canvas, (int(paste_x), int(paste_y)), text_canvas)
-        else:
-            # Simple text drawing without effects
-            if stroke_width > 0 and stroke_col:
-                # Draw outline first
-                for adj in range(-stroke_width, stroke_width + 1):
-                    for adj2 in range(-stroke_width, stroke_width + 1):
-                        draw.text(
-                            (x + adj, y + adj2),
-                            text,
-                            font=font_obj,
-                            fill=stroke_col if isinstance(stroke_col, tuple) and len(stroke_col) == 4 else stroke_col + (255,)
-                        )
-            
-            # Draw main text
-            draw.text((x, y), text, font=font_obj, fill=text_color if isinstance(text_color, tuple) and len(text_color) == 4 else text_color + (255,))
+        # Draw main text
+        text_canvas.paste(_with_alpha(text_color), (0, 0), fill_mask)
         
-        # Convert back to base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG', quality=95)
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
+        # Rotate if needed
+        if rotation != 0:
+            text_canvas = text_canvas.rotate(rotation, expand=True, fillcolor=(0, 0, 0, 0))
         
-        print(f"[SUCCESS] Text overlay added successfully!")
-        print(f"   Final image size: {len(img_base64)} bytes")
+        # Paste onto main image
+        paste_x = x - padding + (text_canvas.width - text_width - padding * 2) // 2
+        paste_y = y - padding + (text_canvas.height - text_height - padding * 2) // 2
+        img.paste(text_canvas, (int(round(paste_x)), int(round(paste_y))), text_canvas)
+    else:
+        # Simple text drawing without effects
+        # Rasterize into a tight mask around the text (plus stroke margin) and paste it
+        margin = stroke_width + 2
+        origin = (margin - min(bbox[0], 0), margin - min(bbox[1], 0))
+        mask_size = (origin[0] + bbox[2] + margin, origin[1] + bbox[3] + margin)
+        fill_mask, outline_mask = _rasterize_text_masks(
+            mask_size, origin, text, font_obj, stroke_width if stroke_col else 0
+        )
+        left, top = int(round(x)) - origin[0], int(round(y)) - origin[1]
+        box = (left, top, left + mask_size[0], top + mask_size[1])
         
-        return img_base64
+        if outline_mask is not None:
+            # Draw outline first
+            img.paste(_with_alpha(stroke_col), box, outline_mask)
         
-    except Exception as e:
-        print(f"[ERROR] Failed to add text overlay: {e}")
-        import traceback
-        traceback.print_exc()
-        raise
+        # Draw main text
+        img.paste(_with_alpha(text_color), box, fill_mask)
+
+
+def _with_alpha(color: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+    """Return an RGBA tuple, adding full opacity to plain RGB colors"""
+    return color if len(color) == 4 else color + (255,)
+
+
+def _rasterize_text_masks(
+    size: Tuple[int, int],
+    origin: Tuple[int, int],
+    text: str,
+    font_obj,
+    stroke_width: int = 0
+) -> Tuple[Image.Image, Optional[Image.Image]]:
+    """
+    Rasterize text into 'L' coverage masks, one rasterization per layer
+    
+    The outline mask is the stroked silhouette. FreeType fonts use the native
+    stroker; bitmap fonts fall back to a single MaxFilter dilation of the fill
+    mask, which matches the old square offset loop pixel for pixel.
+    
+    Args:
+        size: Mask size (width, height)
+        origin: Text position inside the mask
+        text: Text to rasterize
+        font_obj: Loaded Pillow font
+        stroke_width: Outline width (0 = no outline mask)
+    
+    Returns:
+        (fill_mask, outline_mask) - outline_mask is None without stroke
+    """
+    fill_mask = Image.new('L', size, 0)
+    ImageDraw.Draw(fill_mask).text(origin, text, font=font_obj, fill=255)
+    
+    if stroke_width <= 0:
+        return fill_mask, None
+    
+    if isinstance(font_obj, ImageFont.FreeTypeFont):
+        outline_mask = Image.new('L', size, 0)
+        ImageDraw.Draw(outline_mask).text(
+            origin, text, font=font_obj, fill=255,
+            stroke_width=stroke_width, stroke_fill=255
+        )
+    else:
+        outline_mask = fill_mask.filter(ImageFilter.MaxFilter(stroke_width * 2 + 1))
+    
+    return fill_mask, outline_mask
 
 
 async def detect_text_in_image_ai(image_url: str, api_key: str) -> Optional[Dict]:
@@ -285,7 +334,7 @@ async def detect_text_in_image_ai(image_url: str, api_key: str) -> Optional[Dict
                                 {
                                     "type": "image_url",
                                     "image_url": {
-                                        "url": f"data:image/png;base64,{image_base64}"
+                                        "url": data_url_for_base64(image_base64)
                                     }
                                 }
                             ]
@@ -381,7 +430,7 @@ Return ONLY valid JSON:
                                 {
                                     "type": "image_url",
                                     "image_url": {
-                                        "url": f"data:image/png;base64,{image_base64}"
+                                        "url": data_url_for_base64(image_base64)
                                     }
                                 }
                             ]
@@ -452,7 +501,7 @@ def _parse_ai_suggestion(ai_text: str, img_width: int, img_height: int) -> Dict:
 
 
 async def apply_multiple_overlays(
-    image_base64: str,
+    image_base64: Union[str, ImageContext],
     overlays: List[Dict]
 ) -> str:
     """
@@ -467,12 +516,14 @@ async def apply_multiple_overlays(
     """
     print(f"[TEXT_OVERLAY] Applying {len(overlays)} text overlays")
     
-    current_image = image_base64
+    # Every overlay is drawn onto the same decoded image; it is encoded once at the end
+    context = ImageContext.of(image_base64)
+    img = context.editable_copy('RGBA')
     
     for i, overlay in enumerate(overlays):
         print(f"   Overlay {i+1}/{len(overlays)}: {overlay.get('text', 'N/A')[:30]}...")
-        current_image = await add_text_overlay_to_image(
-            image_base64=current_image,
+        await _draw_text_overlay(
+            img,
             text=overlay.get('text', ''),
             position=overlay.get('position', (50, 50)),
             font_name=overlay.get('font_name', 'Arial'),
@@ -482,8 +533,10 @@ async def apply_multiple_overlays(
             stroke_color=overlay.get('stroke_color', '#000000')
         )
     
+    encoded = encode_image(img, "auto", allow_webp=False, source_bytes=context.nbytes)
+    
     print(f"[SUCCESS] All overlays applied!")
-    return current_image
+    return encoded.to_base64()
 
 
 async def get_google_font(font_family: str, variant: str = "regular") -> Optional[str]:
@@ -497,112 +550,4 @@ async def get_google_font(font_family: str, variant: str = "regular") -> Optiona
     Returns:
         Path to downloaded font file, or None if download fails
     """
-    # Create cache directory
-    cache_dir = Path(__file__).parent / "fonts_cache"
-    cache_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Convert font family name to Google Fonts URL format
-    font_family_normalized = font_family.replace(" ", "+")
-    
-    # Map common variants to API values
-    variant_map = {
-        "regular": "400",
-        "bold": "700",
-        "italic": "400",
-        "bold-italic": "700"
-    }
-    variant_key = variant_map.get(variant.lower(), variant)
-    
-    # Cache file path
-    cache_file = cache_dir / f"{font_family}_{variant}.ttf"
-    
-    # Check if already cached
-    if cache_file.exists():
-        print(f"[FONT] Using cached font: {cache_file}")
-        return str(cache_file)
-    
-    # Download from Google Fonts API
-    print(f"[FONT] Downloading Google Font: {font_family} ({variant})")
-    
-    try:
-        # Google Fonts CSS API
-        font_url = f"https://fonts.googleapis.com/css2?family={font_family_normalized}:wght@{variant_key}"
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Get CSS that contains font URL
-            css_response = await client.get(font_url)
-            
-            if css_response.status_code != 200:
-                print(f"[WARNING] Failed to fetch font CSS: {css_response.status_code}")
-                return None
-            
-            # Extract font file URL from CSS
-            css_content = css_response.text
-            
-            # Parse CSS to find .ttf or .woff2 URL
-            import re
-            font_url_match = re.search(r'url\((https://[^)]+(\.ttf|\.woff2))\)', css_content)
-            
-            if not font_url_match:
-                print(f"[WARNING] Could not find font file URL in CSS")
-                return None
-            
-            font_file_url = font_url_match.group(1)
-            print(f"[FONT] Found font file URL: {font_file_url}")
-            
-            # Download the font file
-            font_response = await client.get(font_file_url)
-            
-            if font_response.status_code != 200:
-                print(f"[WARNING] Failed to download font file: {font_response.status_code}")
-                return None
-            
-            # Save to cache
-            cache_file.write_bytes(font_response.content)
-            print(f"[SUCCESS] Font cached: {cache_file}")
-            
-            return str(cache_file)
-            
-    except Exception as e:
-        print(f"[WARNING] Error downloading Google Font: {e}")
-        return None
-
-
-def get_google_fonts_list() -> List[Dict[str, str]]:
-    """
-    Get list of popular Google Fonts
-    Returns a curated list of commonly used Google Fonts
-    """
-    return [
-        {"family": "Roboto", "display": "Roboto"},
-        {"family": "Open Sans", "display": "Open Sans"},
-        {"family": "Lato", "display": "Lato"},
-        {"family": "Montserrat", "display": "Montserrat"},
-        {"family": "Raleway", "display": "Raleway"},
-        {"family": "Poppins", "display": "Poppins"},
-        {"family": "Source Sans Pro", "display": "Source Sans Pro"},
-        {"family": "Oswald", "display": "Oswald"},
-        {"family": "Playfair Display", "display": "Playfair Display"},
-        {"family": "Merriweather", "display": "Merriweather"},
-        {"family": "PT Sans", "display": "PT Sans"},
-        {"family": "Lora", "display": "Lora"},
-        {"family": "Inter", "display": "Inter"},
-        {"family": "Ubuntu", "display": "Ubuntu"},
-        {"family": "Crimson Text", "display": "Crimson Text"},
-        {"family": "Dancing Script", "display": "Dancing Script"},
-        {"family": "Bebas Neue", "display": "Bebas Neue"},
-        {"family": "Pacifico", "display": "Pacifico"},
-        {"family": "Righteous", "display": "Righteous"},
-        {"family": "Abril Fatface", "display": "Abril Fatface"},
-        {"family": "Josefin Sans", "display": "Josefin Sans"},
-        {"family": "Fjalla One", "display": "Fjalla One"},
-        {"family": "Anton", "display": "Anton"},
-        {"family": "Barlow", "display": "Barlow"},
-        {"family": "Comfortaa", "display": "Comfortaa"},
-        {"family": "Karla", "display": "Karla"},
-        {"family": "Libre Franklin", "display": "Libre Franklin"},
-        {"family": "PT Serif", "display": "PT Serif"},
-        {"family": "Domine", "display": "Domine"},
-        {"family": "Arvo", "display": "Arvo"}
-    ]
-
+    return await download_google_font(font_family, variant)
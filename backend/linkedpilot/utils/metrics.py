@@ -0,0 +1,391 @@
+"""
+Admin Metrics Rollups
+Materialized per-day counters for the admin dashboards: signups, posts and
+usage are incremented as they happen, subscription gauges are refreshed when
+a subscription changes, and a periodic job recomputes recent days from the
+source collections so any drift is corrected
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+
+
+METRICS_COLLECTION = "metrics_daily"
+
+# Days recomputed by the reconciliation job (covers this and last month, and
+# the two 30-day windows of the dashboard)
+RECONCILE_DAYS = 62
+
+# Seconds between reconciliation runs
+METRICS_RECONCILE_INTERVAL = int(os.environ.get('METRICS_RECONCILE_INTERVAL', '3600'))
+
+# Subscription changes arriving within this many seconds share one gauge refresh
+SUBSCRIPTION_REFRESH_DELAY = 5
+
+# Pro tier price per month, in USD
+PRO_MONTHLY_PRICE = 30
+
+# Point-in-time user counts stored on each day (as of the end of that day)
+GAUGE_QUERIES = {
+    "users_total": {},
+    "users_free": {"subscription_tier": "free"},
+    "pro_active": {"subscription_tier": "pro", "subscription_status": "active"},
+    "pro_cancelling": {"subscription_tier": "pro", "subscription_status": "active", "cancel_at_period_end": True},
+}
+
+# Range scans of the reconciliation job and the live top-users query
+METRICS_INDEXES = {
+    "usage_tracking": [[("timestamp", 1)]],
+    "ai_generated_posts": [[("created_at", 1)]],
+    "users": [[("cancelled_at", 1)]],
+}
+
+# Days whose document exists (skips the seeding lookup on every event)
+_known_days: Set[str] = set()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def day_key(moment: Optional[datetime] = None) -> str:
+    """UTC calendar day of a moment (now by default) as YYYY-MM-DD, the _id of its metrics document"""
+    moment = moment or datetime.now(timezone.utc)
+    if moment.tzinfo:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y-%m-%d")
+
+
+def _day_expr(field: str) -> Dict[str, Any]:
+    """
+    Expression: the UTC day of a time stored as a datetime or an ISO string
+
+    Strings are parsed before taking the day, so a UTC offset moves the time
+    to its UTC day (naive strings are read as UTC); unparseable times give null.
+    """
+    moment = {"$switch": {
+        "branches": [
+            {"case": {"$eq": [{"$type": field}, "date"]}, "then": field},
+            {"case": {"$eq": [{"$type": field}, "string"]}, "then": {"$dateFromString": {
+                "dateString": field,
+                "onError": None
+            }}},
+        ],
+        "default": None
+    }}
+    return {"$dateToString": {"date": moment, "format": "%Y-%m-%d", "onNull": None}}
+
+
+def _since_match(field: str, since: datetime) -> Dict[str, Any]:
+    """Times from `since` on, stored as either ISO strings or datetimes"""
+    return {"$or": [
+        {field: {"$gte": since.isoformat()}},
+        {field: {"$gte": since}},
+    ]}
+
+
+async def count_gauges(db) -> Dict[str, int]:
+    """Live GAUGE_QUERIES counts, run concurrently"""
+    counts = await asyncio.gather(*(
+        db.users.count_documents(query) for query in GAUGE_QUERIES.values()
+    ))
+    return dict(zip(GAUGE_QUERIES, counts))
+
+
+async def _ensure_day(db, day: str) -> None:
+    """Create a day's document, its gauges carried over from the latest earlier day"""
+    if day in _known_days:
+        return
+    collection = db[METRICS_COLLECTION]
+    if not await collection.find_one({"_id": day}, {"_id": 1}):
+        previous = await collection.find_one(
+            {"_id": {"$lt": day}, "gauges": {"$exists": True}},
+            {"gauges": 1},
+            sort=[("_id", -1)]
+        )
+        gauges = previous["gauges"] if previous else await count_gauges(db)
+        try:
+            await collection.update_one({"_id": day}, {"$setOnInsert": {"gauges": gauges}}, upsert=True)
+        except Exception:
+            # Another worker created it first
+            pass
+    _known_days.add(day)
+
+
+async def _increment(db, counters: Dict[str, Any]) -> None:
+    """$inc counters on today's document; never raises (metrics must not fail the event itself)"""
+    day = day_key()
+    try:
+        await _ensure_day(db, day)
+        await db[METRICS_COLLECTION].update_one(
+            {"_id": day},
+            {"$inc": counters, "$set": {"updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+    except Exception as e:
+        print(f"[METRICS] WARNING: could not record {list(counters)}: {e}")
+
+
+async def record_signup(db, subscription_tier: str = "free") -> None:
+    counters = {"signups": 1, "gauges.users_total": 1}
+    if subscription_tier == "free":
+        counters["gauges.users_free"] = 1
+    await _increment(db, counters)
+
+
+async def record_post_created(db, count: int = 1) -> None:
+    await _increment(db, {"posts_created": count})
+
+
+async def record_usage(db, resource_type: str, tokens_used: int = 0, cost: float = 0.0) -> None:
+    await _increment(db, {
+        "tokens_used": tokens_used or 0,
+        f"usage.{resource_type}.tokens": tokens_used or 0,
+        f"usage.{resource_type}.cost": cost or 0.0,
+        f"usage.{resource_type}.count": 1,
+    })
+
+
+async def _subscription_day_counts(db, since: datetime) -> List[Dict[str, Any]]:
+    """Cancellations (any cancelled_at) and churn (also status cancelled) per day"""
+    return await db.users.aggregate([
+        {"$match": _since_match("cancelled_at", since)},
+        {"$group": {
+            "_id": _day_expr("$cancelled_at"),
+            "cancellations": {"$sum": 1},
+            "churned": {"$sum": {"$cond": [{"$eq": ["$subscription_status", "cancelled"]}, 1, 0]}},
+        }},
+    ]).to_list(length=None)
+
+
+def _window(days: int) -> List[str]:
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return [day_key(today - timedelta(days=offset)) for offset in range(days, -1, -1)]
+
+
+def _window_start(days: int) -> datetime:
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days)
+
+
+async def refresh_subscription_metrics(db, days: int = RECONCILE_DAYS) -> None:
+    """Recount today's gauges and the per-day cancellation counters after a subscription change"""
+    gauges, cancellations = await asyncio.gather(
+        count_gauges(db),
+        _subscription_day_counts(db, _window_start(days))
+    )
+    by_day = {row["_id"]: row for row in cancellations}
+    window = _window(days)
+    today = window[-1]
+
+    operations = []
+    for day in window:
+        row = by_day.get(day, {})
+        update = {"cancellations": row.get("cancellations", 0), "churned": row.get("churned", 0)}
+        if day == today:
+            update.update({f"gauges.{name}": value for name, value in gauges.items()})
+        operations.append(UpdateOne({"_id": day}, {"$set": update}, upsert=True))
+    await db[METRICS_COLLECTION].bulk_write(operations, ordered=False)
+    _known_days.update(window)
+
+
+async def _delayed_subscription_refresh(db) -> None:
+    global _refresh_task
+    await asyncio.sleep(SUBSCRIPTION_REFRESH_DELAY)
+    _refresh_task = None
+    try:
+        await refresh_subscription_metrics(db)
+    except Exception as e:
+        print(f"[METRICS] WARNING: subscription refresh failed: {e}")
+
+
+def schedule_subscription_refresh(db) -> None:
+    """Refresh subscription metrics shortly, in the background (a burst of changes triggers one refresh)"""
+    global _refresh_task
+    if _refresh_task and not _refresh_task.done():
+        return
+    try:
+        _refresh_task = asyncio.get_running_loop().create_task(_delayed_subscription_refresh(db))
+    except RuntimeError:
+        print("[METRICS] WARNING: no event loop for the subscription refresh")
+
+
+async def reconcile_metrics(db, days: int = RECONCILE_DAYS) -> None:
+    """
+    Recompute the last `days` days (and today) from the source collections
+
+    Counters are overwritten with the recounted values. users_total and
+    pro_active of past days are derived from today's counts minus what was
+    added after each day; the other gauges are only known for today.
+    """
+    since = _window_start(days)
+    signups, pro_started, posts, usage, cancellations, gauges = await asyncio.gather(
+        db.users.aggregate([
+            {"$match": _since_match("created_at", since)},
+            {"$group": {"_id": _day_expr("$created_at"), "n": {"$sum": 1}}},
+        ]).to_list(length=None),
+        db.users.aggregate([
+            {"$match": {**GAUGE_QUERIES["pro_active"], **_since_match("subscription_start_date", since)}},
+            {"$group": {"_id": _day_expr("$subscription_start_date"), "n": {"$sum": 1}}},
+        ]).to_list(length=None),
+        db.ai_generated_posts.aggregate([
+            {"$match": _since_match("created_at", since)},
+            {"$group": {"_id": _day_expr("$created_at"), "n": {"$sum": 1}}},
+        ]).to_list(length=None),
+        db.usage_tracking.aggregate([
+            {"$match": _since_match("timestamp", since)},
+            {"$group": {
+                "_id": {"day": _day_expr("$timestamp"), "type": "$resource_type"},
+                "tokens": {"$sum": "$tokens_used"},
+                "cost": {"$sum": "$cost"},
+                "count": {"$sum": 1},
+            }},
+        ]).to_list(length=None),
+        _subscription_day_counts(db, since),
+        count_gauges(db),
+    )
+
+    signups_by_day = {row["_id"]: row["n"] for row in signups}
+    pro_started_by_day = {row["_id"]: row["n"] for row in pro_started}
+    posts_by_day = {row["_id"]: row["n"] for row in posts}
+    cancellations_by_day = {row["_id"]: row for row in cancellations}
+    usage_by_day: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for row in usage:
+        if row["_id"].get("type") is None:
+            continue
+        usage_by_day.setdefault(row["_id"]["day"], {})[row["_id"]["type"]] = {
+            "tokens": row["tokens"], "cost": row["cost"], "count": row["count"]
+        }
+
+    window = _window(days)
+    today = window[-1]
+    users_total, pro_active = gauges["users_total"], gauges["pro_active"]
+    operations = []
+    # Newest first, so each day's gauges are today's minus everything added after it
+    for day in reversed(window):
+        day_usage = usage_by_day.get(day, {})
+        day_cancellations = cancellations_by_day.get(day, {})
+        update = {
+            "signups": signups_by_day.get(day, 0),
+            "posts_created": posts_by_day.get(day, 0),
+            "tokens_used": sum(entry["tokens"] for entry in day_usage.values()),
+            "usage": day_usage,
+            "cancellations": day_cancellations.get("cancellations", 0),
+            "churned": day_cancellations.get("churned", 0),
+            "reconciled_at": datetime.now(timezone.utc),
+        }
+        if day == today:
+            update.update({f"gauges.{name}": value for name, value in gauges.items()})
+        else:
+            update["gauges.users_total"] = users_total
+            update["gauges.pro_active"] = pro_active
+        operations.append(UpdateOne({"_id": day}, {"$set": update}, upsert=True))
+        users_total -= signups_by_day.get(day, 0)
+        pro_active -= pro_started_by_day.get(day, 0)
+
+    await db[METRICS_COLLECTION].bulk_write(operations, ordered=False)
+    _known_days.update(window)
+    print(f"[METRICS] Reconciled {len(window)} days ({window[0]} to {today})")
+
+
+async def ensure_metrics_indexes(db) -> None:
+    for collection_name, indexes in METRICS_INDEXES.items():
+        for keys in indexes:
+            try:
+                await db[collection_name].create_index(keys)
+            except Exception as e:
+                print(f"[METRICS] WARNING: could not create index {keys} on {collection_name}: {e}")
+
+
+async def _oldest(db, collection_name: str, field: str) -> Optional[datetime]:
+    """Earliest value of a time field stored as ISO strings and/or datetimes"""
+    oldest = []
+    for bson_type in ("string", "date"):
+        doc = await db[collection_name].find_one(
+            {field: {"$type": bson_type}}, {"_id": 0, field: 1}, sort=[(field, 1)]
+        )
+        if not doc:
+            continue
+        value = doc[field]
+        try:
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            continue
+        oldest.append(value if value.tzinfo else value.replace(tzinfo=timezone.utc))
+    return min(oldest) if oldest else None
+
+
+async def _backfill_days(db) -> int:
+    """Days the first reconciliation covers: all recorded history while the rollups are new, else RECONCILE_DAYS"""
+    window_start = day_key(_window_start(RECONCILE_DAYS))
+    if await db[METRICS_COLLECTION].find_one({"_id": {"$lt": window_start}}, {"_id": 1}):
+        return RECONCILE_DAYS
+    oldest = [
+        moment for moment in await asyncio.gather(
+            _oldest(db, "users", "created_at"),
+            _oldest(db, "usage_tracking", "timestamp"),
+            _oldest(db, "ai_generated_posts", "created_at"),
+        ) if moment
+    ]
+    if not oldest:
+        return RECONCILE_DAYS
+    return max(RECONCILE_DAYS, (datetime.now(timezone.utc) - min(oldest)).days + 1)
+
+
+async def run_metrics_reconciliation(db) -> None:
+    """Reconcile at startup and then every METRICS_RECONCILE_INTERVAL seconds (runs until cancelled)"""
+    await ensure_metrics_indexes(db)
+    days = await _backfill_days(db)
+    while True:
+        try:
+            await reconcile_metrics(db, days)
+            days = RECONCILE_DAYS
+        except Exception as e:
+            print(f"[METRICS] WARNING: reconciliation failed: {e}")
+        await asyncio.sleep(METRICS_RECONCILE_INTERVAL)
+
+
+async def load_days(db, since_day: str) -> Dict[str, Dict[str, Any]]:
+    """Metrics documents from since_day through today, by day, in one query"""
+    docs = await db[METRICS_COLLECTION].find({"_id": {"$gte": since_day}}).to_list(length=None)
+    return {doc["_id"]: doc for doc in docs}
+
+
+def sum_days(days: Dict[str, Dict[str, Any]], field: str, start_day: str, end_day: Optional[str] = None) -> float:
+    """Total of a counter over [start_day, end_day) (through today without end_day)"""
+    return sum(
+        doc.get(field) or 0 for day, doc in days.items()
+        if day >= start_day and (end_day is None or day < end_day)
+    )
+
+
+def gauges_on(days: Dict[str, Dict[str, Any]], day: str,
+              names: Tuple[str, ...] = tuple(GAUGE_QUERIES)) -> Optional[Dict[str, int]]:
+    """
+    Gauges as of the end of `day`, from the latest document up to it that has
+    all of `names` (backfilled days only have users_total and pro_active), or None
+    """
+    for key in sorted(days, reverse=True):
+        gauges = days[key].get("gauges") or {}
+        if key <= day and all(name in gauges for name in names):
+            return gauges
+    return None
+
+
+def usage_by_type(days: Dict[str, Dict[str, Any]], start_day: Optional[str] = None,
+                  end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Per-resource-type usage totals over [start_day, end_day] (inclusive days)"""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for day, doc in days.items():
+        if (start_day and day < start_day) or (end_day and day > end_day):
+            continue
+        for resource_type, entry in (doc.get("usage") or {}).items():
+            total = totals.setdefault(resource_type, {
+                "_id": resource_type, "total_tokens": 0, "total_cost": 0, "count": 0
+            })
+            total["total_tokens"] += entry.get("tokens") or 0
+            total["total_cost"] += entry.get("cost") or 0
+            total["count"] += entry.get("count") or 0
+    return list(totals.values())
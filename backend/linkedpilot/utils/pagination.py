@@ -0,0 +1,278 @@
+"""
+Keyset Pagination
+Cursor-based paging for list endpoints: each page continues after the last
+(sort value, id) pair of the previous one, so a page costs the same index
+range scan at any depth instead of loading a fixed window or skipping an
+ever-growing offset
+
+Time fields are stored as ISO strings by some writers and as datetimes by
+others, and Mongo range operators only compare values of one type, so a
+cursor over such a field would skip every row of the other type. Listings
+sort on a date-typed copy of the field instead (its sort key), written
+through with_sort_keys and backfilled at startup.
+"""
+
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Time fields listings sort on, per collection; each has a sort key
+SORTED_TIME_FIELDS = {
+    "drafts": ("created_at",),
+    "posts": ("posted_at",),
+    "scheduled_posts": ("publish_time",),
+    "ai_generated_posts": ("created_at", "scheduled_for"),
+    "user_images": ("created_at",),
+    "users": ("created_at",),
+    "admin_activity_logs": ("timestamp",),
+}
+
+SORT_KEY_SUFFIX = "_sort"
+
+# Documents per bulk write when backfilling sort keys
+SORT_KEY_BATCH_SIZE = 1000
+
+
+def sort_key(field_name: str) -> str:
+    """Name of the date-typed copy of a sorted time field"""
+    return f"{field_name}{SORT_KEY_SUFFIX}"
+
+
+# Compound indexes backing each paginated listing: equality filter first, then
+# the sort key with `id` as tie-breaker (created at startup, idempotent)
+PAGINATION_INDEXES = {
+    "drafts": [
+        [("org_id", 1), (sort_key("created_at"), -1), ("id", -1)],
+    ],
+    "posts": [
+        [("org_id", 1), (sort_key("posted_at"), -1), ("id", -1)],
+    ],
+    "scheduled_posts": [
+        [("org_id", 1), (sort_key("publish_time"), 1), ("id", 1)],
+    ],
+    "ai_generated_posts": [
+        [("campaign_id", 1), (sort_key("created_at"), -1), ("id", -1)],
+        [("org_id", 1), (sort_key("scheduled_for"), 1), ("id", 1)],
+    ],
+    "user_images": [
+        [("org_id", 1), (sort_key("created_at"), -1), ("id", -1)],
+        [("user_id", 1), (sort_key("created_at"), -1), ("id", -1)],
+    ],
+    "users": [
+        [(sort_key("created_at"), -1), ("id", -1)],
+    ],
+    "admin_activity_logs": [
+        [(sort_key("timestamp"), -1), ("id", -1)],
+    ],
+}
+
+
+def as_sort_time(value: Any) -> Optional[datetime]:
+    """
+    Sort key value of a stored time: a naive UTC datetime at the millisecond
+    precision Mongo keeps, or None for missing/unparseable values
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def with_sort_keys(collection_name: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    `fields` (a document to insert or the body of a $set) plus the sort key of
+    every sorted time field it sets; all writes of those fields go through this
+    """
+    keyed = dict(fields)
+    for field_name in SORTED_TIME_FIELDS.get(collection_name, ()):
+        if field_name in fields:
+            keyed[sort_key(field_name)] = as_sort_time(fields[field_name])
+    return keyed
+
+
+@dataclass
+class Page:
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+    def envelope(self) -> Dict[str, Any]:
+        """Response body: the items plus the cursor for the next page (None on the last)"""
+        return {"items": self.items, "next_cursor": self.next_cursor}
+
+
+def encode_cursor(value: Any, item_id: str) -> str:
+    """Opaque cursor for the position right after (value, item_id)"""
+    if isinstance(value, datetime):
+        position = {"v": value.isoformat(), "t": "dt", "id": item_id}
+    else:
+        position = {"v": value, "id": item_id}
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """
+    (sort value, id) stored in a cursor
+
+    Raises:
+        HTTPException 400 for a cursor this module didn't produce
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+        value = position["v"]
+        if position.get("t") == "dt":
+            value = datetime.fromisoformat(value)
+        return value, str(position["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def keyset_filter(sort_field: str, direction: int, value: Any, item_id: str) -> Dict[str, Any]:
+    """
+    Filter for the documents after (value, item_id) in (sort_field, id) order
+
+    Missing/null sort values sort before everything ascending and after
+    everything descending, as Mongo orders them.
+    """
+    op = "$gt" if direction > 0 else "$lt"
+    if value is None:
+        same_value = {sort_field: None, "id": {op: item_id}}
+        if direction > 0:
+            return {"$or": [same_value, {sort_field: {"$ne": None}}]}
+        return same_value
+
+    clauses = [
+        {sort_field: {op: value}},
+        {sort_field: value, "id": {op: item_id}},
+    ]
+    if direction < 0:
+        clauses.append({sort_field: None})
+    return {"$or": clauses}
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    direction: int = -1,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    skip: int = 0
+) -> Page:
+    """
+    One page of `collection` matching `query`, in (sort_field, id) order
+
+    Args:
+        collection: Motor collection
+        query: Filter; may already use $or (the keyset condition is ANDed on)
+        sort_field: Field to sort on; documents are expected to carry an `id`.
+            Time fields in SORTED_TIME_FIELDS are sorted by their sort key
+            (which is left out of the returned items)
+        direction: 1 ascending, -1 descending
+        limit: Page size
+        cursor: next_cursor of the previous page, or None for the first page
+        projection: Must keep id
+        skip: Offset for page-number links without a cursor (costs a scan of
+            the skipped documents; cursors don't)
+
+    Returns:
+        Page with next_cursor set when more documents follow
+    """
+    key = sort_field
+    if sort_field in SORTED_TIME_FIELDS.get(collection.name, ()):
+        key = sort_key(sort_field)
+        if projection and any(value for name, value in projection.items() if name != "_id"):
+            projection = {**projection, key: 1}
+
+    if cursor:
+        keyset = keyset_filter(key, direction, *decode_cursor(cursor))
+        query = {"$and": [query, keyset]} if query else keyset
+
+    # One extra document tells whether another page follows
+    items = await collection.find(query, projection).sort(
+        [(key, direction), ("id", direction)]
+    ).skip(skip).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last.get(key), last.get("id"))
+    if key != sort_field:
+        for item in items:
+            item.pop(key, None)
+    return Page(items=items, next_cursor=next_cursor)
+
+
+def page_response(page: Page, response, paginated: bool):
+    """
+    Envelope for callers that asked for pages (passed `limit` or `cursor`);
+    the bare list for existing callers, with the next cursor in the
+    X-Next-Cursor header so a cut-off list is no longer silent
+    """
+    if paginated:
+        return page.envelope()
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
+
+
+async def backfill_sort_keys(db) -> None:
+    """Write the sort keys of documents where one is missing or stale (idempotent)"""
+    for collection_name, field_names in SORTED_TIME_FIELDS.items():
+        projection = {"_id": 1}
+        for field_name in field_names:
+            projection[field_name] = 1
+            projection[sort_key(field_name)] = 1
+
+        operations = []
+        updated = 0
+        async for doc in db[collection_name].find({}, projection):
+            stale = {
+                sort_key(field_name): as_sort_time(doc.get(field_name))
+                for field_name in field_names
+                if sort_key(field_name) not in doc
+                or doc[sort_key(field_name)] != as_sort_time(doc.get(field_name))
+            }
+            if stale:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": stale}))
+            if len(operations) >= SORT_KEY_BATCH_SIZE:
+                await db[collection_name].bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        if operations:
+            await db[collection_name].bulk_write(operations, ordered=False)
+            updated += len(operations)
+        if updated:
+            print(f"[PAGINATION] Backfilled sort keys of {updated} documents in {collection_name}")
+
+
+async def ensure_pagination_indexes(db) -> None:
+    """Backfill sort keys, then create the compound indexes in PAGINATION_INDEXES"""
+    try:
+        await backfill_sort_keys(db)
+    except Exception as e:
+        print(f"[PAGINATION] WARNING: could not backfill sort keys: {e}")
+    for collection_name, indexes in PAGINATION_INDEXES.items():
+        for keys in indexes:
+            try:
+                await db[collection_name].create_index(keys)
+            except Exception as e:
+                print(f"[PAGINATION] WARNING: could not create index {keys} on {collection_name}: {e}")
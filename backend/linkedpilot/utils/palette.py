@@ -0,0 +1,275 @@
+"""
+Palette Engine
+Dominant-color extraction from a 5-bit-per-channel color histogram, shared by
+overlay color selection and brand DNA
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+# Pixels sampled per side before histogramming
+SAMPLE_SIZE = 96
+
+# Bits kept per channel - 32,768 histogram bins
+HISTOGRAM_BITS = 5
+
+PALETTE_CACHE_SIZE = 256
+
+PALETTE_METHODS = ("kmeans", "median_cut")
+
+_palette_cache: "OrderedDict[Tuple[str, int, str], List[Tuple[int, int, int]]]" = OrderedDict()
+# Palettes are extracted from worker threads; the LRU bookkeeping isn't thread-safe on its own
+_palette_cache_lock = threading.Lock()
+
+
+def _sample_pixels(image: Image.Image) -> np.ndarray:
+    """Uniform SAMPLE_SIZE x SAMPLE_SIZE pixel sample as an (N, 3) uint8 array"""
+    if image.width > SAMPLE_SIZE or image.height > SAMPLE_SIZE:
+        # Nearest sampling only touches the sampled pixels, unlike a filtered resize
+        image = image.resize(
+            (min(image.width, SAMPLE_SIZE), min(image.height, SAMPLE_SIZE)),
+            Image.Resampling.NEAREST
+        )
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return np.asarray(image, dtype=np.uint8).reshape(-1, 3)
+
+
+def color_histogram(pixels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize pixels into a 5-bit-per-channel histogram
+
+    Returns:
+        (colors, weights): mean color of every occupied bin, channel-major with
+        shape (3, M), and its pixel count, shape (M,)
+    """
+    shift = 8 - HISTOGRAM_BITS
+    channels = pixels.astype(np.int64)
+    bins = (
+        ((channels[:, 0] >> shift) << (2 * HISTOGRAM_BITS))
+        | ((channels[:, 1] >> shift) << HISTOGRAM_BITS)
+        | (channels[:, 2] >> shift)
+    )
+    n_bins = 1 << (3 * HISTOGRAM_BITS)
+    counts = np.bincount(bins, minlength=n_bins)
+    occupied = np.flatnonzero(counts)
+    weights = counts[occupied].astype(np.float32)
+
+    colors = np.empty((3, len(occupied)), dtype=np.float32)
+    for channel in range(3):
+        colors[channel] = np.bincount(bins, weights=channels[:, channel], minlength=n_bins)[occupied]
+    colors /= weights
+    return colors, weights
+
+
+def _nearest_centroids(colors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Index of the nearest centroid for every bin
+
+    Squared distances are expanded as |c|^2 - 2 c.x (|x|^2 is the same for every
+    centroid and drops out), so no (k, M, 3) difference tensor is built; the
+    running minimum is updated in place one centroid at a time.
+    """
+    distances = centroids @ colors
+    distances *= -2
+    distances += (centroids * centroids).sum(axis=1)[:, None]
+
+    labels = np.zeros(colors.shape[1], dtype=np.intp)
+    best = distances[0]
+    for index in range(1, len(centroids)):
+        closer = distances[index] < best
+        labels[closer] = index
+        np.minimum(best, distances[index], out=best)
+    return labels
+
+
+def median_cut(colors: np.ndarray, weights: np.ndarray, n_colors: int) -> np.ndarray:
+    """
+    Weighted median cut over histogram bins
+
+    Repeatedly splits the box with the widest channel range (scaled by its
+    population) at the weighted median of that channel. Medians come from a
+    per-level histogram of the box, so no sorting is needed.
+
+    Returns:
+        Weighted mean color of each box, shape (k, 3) with k <= n_colors
+    """
+    n_levels = 1 << HISTOGRAM_BITS
+    # A bin's mean color always lies inside the bin, so this recovers its level
+    levels = (colors // (1 << (8 - HISTOGRAM_BITS))).astype(np.intp)
+
+    # Each box: (member indices, per-channel level ranges, total weight)
+    def make_box(members: np.ndarray):
+        # take() keeps the gathered rows contiguous, which keeps the reductions fast
+        box_levels = levels.take(members, axis=1)
+        return members, box_levels.max(axis=1) - box_levels.min(axis=1), weights[members].sum()
+
+    boxes = [make_box(np.arange(colors.shape[1]))]
+
+    while len(boxes) < n_colors:
+        spreads = [ranges.max() * total for _, ranges, total in boxes]
+        best_box = int(np.argmax(spreads))
+        if spreads[best_box] <= 0:
+            break
+
+        members, ranges, total = boxes.pop(best_box)
+        channel = int(np.argmax(ranges))
+        member_levels = levels[channel, members]
+        cumulative = np.cumsum(np.bincount(member_levels, weights=weights[members], minlength=n_levels))
+        # Split at the median level, keeping at least one level on each side
+        low, high = member_levels.min(), member_levels.max()
+        split_level = min(max(int(np.searchsorted(cumulative, total / 2)), low), high - 1)
+        left = member_levels <= split_level
+        boxes.extend([make_box(members[left]), make_box(members[~left])])
+
+    return np.array([
+        (colors.take(members, axis=1) @ weights[members]) / total
+        for members, _, total in boxes
+    ], dtype=np.float32)
+
+
+def minibatch_kmeans(
+    colors: np.ndarray,
+    weights: np.ndarray,
+    centroids: np.ndarray,
+    batch_size: int = 1024,
+    max_iter: int = 10,
+    seed: int = 42
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mini-batch k-means over histogram bins, each bin weighted by its pixel count
+
+    Each step draws batch_size bins in proportion to their weight and moves
+    every centroid toward its batch mean by its share of the weight seen so
+    far. Histograms with no more than batch_size occupied bins use every bin
+    each step, which is plain weighted Lloyd's.
+
+    Returns:
+        (centroids, cluster_weights) with weights from a final full assignment
+    """
+    centroids = centroids.astype(np.float32)
+    k = len(centroids)
+    n_bins = colors.shape[1]
+    seen = np.zeros(k)
+
+    rng = np.random.default_rng(seed)
+    if n_bins > batch_size:
+        cumulative = np.cumsum(weights, dtype=np.float64)
+
+    for _ in range(max_iter):
+        if n_bins > batch_size:
+            picks = np.searchsorted(cumulative, rng.random(batch_size) * cumulative[-1], side='right')
+            batch = colors.take(np.minimum(picks, n_bins - 1), axis=1)
+            batch_weights = np.ones(batch_size, dtype=np.float32)
+        else:
+            batch, batch_weights = colors, weights
+            seen[:] = 0
+
+        labels = _nearest_centroids(batch, centroids)
+        cluster_weights = np.bincount(labels, weights=batch_weights, minlength=k)
+        seen += cluster_weights
+
+        occupied = cluster_weights > 0
+        rates = np.zeros(k)
+        rates[occupied] = cluster_weights[occupied] / seen[occupied]
+        shift = np.zeros((k, 3))
+        for channel in range(3):
+            sums = np.bincount(labels, weights=batch[channel] * batch_weights, minlength=k)
+            shift[occupied, channel] = sums[occupied] / cluster_weights[occupied] - centroids[occupied, channel]
+        shift *= rates[:, None]
+        centroids += shift.astype(np.float32)
+
+        if np.abs(shift).max() < 0.5:
+            break
+
+    labels = _nearest_centroids(colors, centroids)
+    return centroids, np.bincount(labels, weights=weights, minlength=k)
+
+
+def _compute_palette(pixels: np.ndarray, n_colors: int, method: str) -> List[Tuple[int, int, int]]:
+    colors, weights = color_histogram(pixels)
+    centroids = median_cut(colors, weights, n_colors)
+
+    if method == "kmeans":
+        # Median cut gives a deterministic starting point for k-means
+        centroids, cluster_weights = minibatch_kmeans(colors, weights, centroids)
+    else:
+        labels = _nearest_centroids(colors, centroids)
+        cluster_weights = np.bincount(labels, weights=weights, minlength=len(centroids))
+
+    # Most dominant color first
+    order = np.argsort(-cluster_weights, kind='stable')
+    return [
+        tuple(int(round(float(c))) for c in centroids[i])
+        for i in order
+        if cluster_weights[i] > 0
+    ]
+
+
+def _cached_palette(key: Tuple[str, int, str], pixels_factory) -> List[Tuple[int, int, int]]:
+    with _palette_cache_lock:
+        palette = _palette_cache.get(key)
+        if palette is not None:
+            _palette_cache.move_to_end(key)
+            return list(palette)
+
+    # Computed outside the lock so other images aren't held up
+    palette = _compute_palette(pixels_factory(), key[1], key[2])
+    with _palette_cache_lock:
+        _palette_cache[key] = palette
+        _palette_cache.move_to_end(key)
+        if len(_palette_cache) > PALETTE_CACHE_SIZE:
+            _palette_cache.popitem(last=False)
+    return list(palette)
+
+
+def extract_palette(image: Image.Image, n_colors: int = 5, method: str = "kmeans") -> List[Tuple[int, int, int]]:
+    """
+    Extract the dominant colors of an image
+
+    Args:
+        image: PIL Image
+        n_colors: Maximum number of colors to return
+        method: "kmeans" (mini-batch k-means seeded by median cut) or "median_cut"
+
+    Returns:
+        List of RGB tuples, most dominant first (memoized by image content)
+    """
+    if method not in PALETTE_METHODS:
+        raise ValueError(f"Unknown palette method: {method}")
+
+    pixels = _sample_pixels(image)
+    digest = hashlib.blake2b(pixels.tobytes(), digest_size=16).hexdigest()
+    return _cached_palette((digest, n_colors, method), lambda: pixels)
+
+
+def palette_from_bytes(image_data: bytes, n_colors: int = 5, method: str = "kmeans") -> List[Tuple[int, int, int]]:
+    """
+    Extract the dominant colors of an encoded image
+
+    Memoized by a hash of the encoded bytes, so repeat lookups skip decoding.
+    """
+    if method not in PALETTE_METHODS:
+        raise ValueError(f"Unknown palette method: {method}")
+
+    digest = hashlib.blake2b(image_data, digest_size=16).hexdigest()
+
+    def decode() -> np.ndarray:
+        image = Image.open(io.BytesIO(image_data))
+        # JPEG can decode at a fraction of full size
+        image.draft('RGB', (SAMPLE_SIZE * 2, SAMPLE_SIZE * 2))
+        return _sample_pixels(image)
+
+    return _cached_palette((digest, n_colors, method), decode)
+
+
+def rgb_to_hex(color: Tuple[int, int, int]) -> str:
+    """Format an RGB tuple as an uppercase hex color"""
+    return '#{:02X}{:02X}{:02X}'.format(*color)
@@ -0,0 +1,251 @@
+"""
+Singleflight
+Request coalescing for expensive idempotent endpoints: concurrent duplicates
+(double-mounts, double-clicks, client retries) wait on the first call instead
+of repeating its crawl/LLM/image spend, and a short result TTL covers
+immediate retries. Optionally a Mongo lease extends this across workers
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+
+
+# Cross-worker leases are off unless enabled (single-worker deployments don't need them)
+MONGO_LEASES_ENABLED = os.environ.get("SINGLEFLIGHT_MONGO_LEASES", "").lower() in ("1", "true", "yes")
+
+LEASE_COLLECTION = "singleflight_leases"
+
+# How often a worker waiting on another worker's lease checks for its result
+LEASE_POLL_INTERVAL = 0.25
+
+# Finished results kept per flight for the result TTL
+MAX_RESULTS = 256
+
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+_mongo_client = None
+_lease_index_ready = False
+
+
+def request_key(value: Any, exclude: Iterable[str] = ()) -> str:
+    """
+    Normalized key for a request payload
+
+    Pydantic models, dicts and lists are compared by content (key order and
+    surrounding whitespace in strings don't matter); top-level fields named
+    in `exclude` (session IDs and the like) are ignored.
+    """
+    def normalize(item):
+        if isinstance(item, str):
+            return item.strip()
+        if isinstance(item, dict):
+            return {k: normalize(v) for k, v in item.items()}
+        if isinstance(item, list):
+            return [normalize(v) for v in item]
+        return item
+
+    data = jsonable_encoder(value)
+    if isinstance(data, dict):
+        excluded = set(exclude)
+        data = {k: v for k, v in data.items() if k not in excluded}
+    canonical = json.dumps(normalize(data), sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _lease_collection():
+    global _mongo_client
+    if _mongo_client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        _mongo_client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return _mongo_client[os.environ['DB_NAME']][LEASE_COLLECTION]
+
+
+class SingleFlight:
+    """
+    Deduplicates in-flight calls by key
+
+    Usage:
+        flight = SingleFlight("brand-discover", result_ttl=10)
+        result = await flight.do(key, lambda: expensive(request))
+
+    Exceptions reach every caller waiting on the failed call and are never
+    cached; Response objects (error responses) are shared with concurrent
+    callers but not kept for the TTL.
+    """
+
+    def __init__(self, name: str, result_ttl: float = 10.0, lease_ttl: float = 120.0, cross_worker: bool = True):
+        self.name = name
+        self.result_ttl = result_ttl
+        self.lease_ttl = lease_ttl
+        self.cross_worker = cross_worker
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._results: Dict[str, Tuple[float, Any]] = {}
+
+    def _cached(self, key: str) -> Tuple[bool, Any]:
+        entry = self._results.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= time.monotonic():
+            self._results.pop(key, None)
+            return False, None
+        return True, entry[1]
+
+    def _remember(self, key: str, result: Any) -> None:
+        if self.result_ttl <= 0 or isinstance(result, Response):
+            return
+        now = time.monotonic()
+        if len(self._results) >= MAX_RESULTS:
+            for stale in [k for k, (expires, _) in self._results.items() if expires <= now]:
+                del self._results[stale]
+            while len(self._results) >= MAX_RESULTS:
+                # Dicts keep insertion order: drop the oldest
+                del self._results[next(iter(self._results))]
+        self._results[key] = (now + self.result_ttl, result)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of fn(), shared with every concurrent (and, for the TTL, later) call with this key"""
+        hit, result = self._cached(key)
+        if hit:
+            print(f"[SINGLEFLIGHT] {self.name}: reusing result from the last {self.result_ttl:.0f}s")
+            return result
+
+        task = self._inflight.get(key)
+        if task is None:
+            # A task of its own, so the shared work survives the first caller being cancelled
+            task = asyncio.ensure_future(self._run(key, fn))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._finish, key))
+        else:
+            print(f"[SINGLEFLIGHT] {self.name}: waiting on an identical in-flight request")
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is None:
+            self._remember(key, task.result())
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not (self.cross_worker and MONGO_LEASES_ENABLED):
+            return await fn()
+
+        try:
+            collection = _lease_collection()
+            await self._ensure_index(collection)
+        except Exception as e:
+            print(f"[SINGLEFLIGHT] {self.name}: leases unavailable ({e}), coalescing in-process only")
+            return await fn()
+
+        lease_id = f"{self.name}:{key}"
+        deadline = time.monotonic() + self.lease_ttl
+        while True:
+            acquired, stored = await self._acquire(collection, lease_id)
+            if acquired:
+                break
+            if stored is not None:
+                print(f"[SINGLEFLIGHT] {self.name}: reusing another worker's result")
+                return stored["result"]
+            if time.monotonic() >= deadline:
+                # The holder is taking longer than its lease; stop waiting and do the work
+                break
+            await asyncio.sleep(LEASE_POLL_INTERVAL)
+
+        try:
+            result = await fn()
+        except BaseException:
+            await self._release(collection, lease_id)
+            raise
+        await self._publish(collection, lease_id, result)
+        return result
+
+    async def _ensure_index(self, collection) -> None:
+        global _lease_index_ready
+        if not _lease_index_ready:
+            # Mongo removes expired leases and results on its own
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            _lease_index_ready = True
+
+    async def _acquire(self, collection, lease_id: str) -> Tuple[bool, Optional[dict]]:
+        """(True, None) when this worker holds the lease; (False, doc) when a finished result is stored"""
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.utcnow()
+        lease = {"owner": WORKER_ID, "done": False, "expires_at": now + timedelta(seconds=self.lease_ttl)}
+        try:
+            # Matches only a missing or expired lease; a live one makes the upsert collide on _id
+            await collection.update_one(
+                {"_id": lease_id, "expires_at": {"$lt": now}},
+                {"$set": lease},
+                upsert=True
+            )
+            return True, None
+        except DuplicateKeyError:
+            pass
+
+        doc = await collection.find_one({"_id": lease_id})
+        if doc and doc.get("done") and doc["expires_at"] > now:
+            return False, doc
+        return False, None
+
+    async def _publish(self, collection, lease_id: str, result: Any) -> None:
+        try:
+            if self.result_ttl > 0 and not isinstance(result, Response):
+                await collection.update_one(
+                    {"_id": lease_id, "owner": WORKER_ID},
+                    {"$set": {
+                        "done": True,
+                        "result": jsonable_encoder(result),
+                        "expires_at": datetime.utcnow() + timedelta(seconds=self.result_ttl)
+                    }}
+                )
+            else:
+                await self._release(collection, lease_id)
+        except Exception as e:
+            print(f"[SINGLEFLIGHT] {self.name}: could not publish result: {e}")
+
+    async def _release(self, collection, lease_id: str) -> None:
+        try:
+            await collection.delete_one({"_id": lease_id, "owner": WORKER_ID})
+        except Exception as e:
+            print(f"[SINGLEFLIGHT] {self.name}: could not release lease: {e}")
+
+
+def coalesce(
+    name: str,
+    key: Optional[Callable[..., str]] = None,
+    result_ttl: float = 10.0,
+    lease_ttl: float = 120.0,
+    cross_worker: bool = True
+):
+    """
+    Route decorator: coalesce identical concurrent requests to an endpoint
+
+    Place it under the router decorator. `key` receives the endpoint's
+    keyword arguments; by default every argument is part of the key.
+    """
+    def decorator(endpoint):
+        flight = SingleFlight(name, result_ttl=result_ttl, lease_ttl=lease_ttl, cross_worker=cross_worker)
+
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            flight_key = key(**kwargs) if key else request_key(kwargs)
+            return await flight.do(flight_key, lambda: endpoint(**kwargs))
+
+        # Resolved annotations: FastAPI would otherwise look up postponed ones
+        # (from __future__ import annotations) in this module's globals
+        wrapper.__signature__ = inspect.signature(endpoint, eval_str=True)
+        wrapper.flight = flight
+        return wrapper
+
+    return decorator
@@ -0,0 +1,165 @@
+"""
+List Summaries
+Projections and builders for the summary view of list endpoints: Mongo
+returns only the fields a list row renders plus a short excerpt, and embedded
+(base64) images are replaced by a thumbnail URL, so image payloads never leave
+the database for a list
+"""
+
+import asyncio
+import base64
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+from ..models.campaign import AIGeneratedPostSummary
+from ..models.draft import DraftSummary
+from ..models.post import PostSummary
+from ..models.scheduled_post import ScheduledPostSummary
+
+
+# Characters of post text kept in a summary
+SUMMARY_EXCERPT_CHARS = 200
+
+# What the projection leaves of an embedded image URL
+DATA_URL_MARKER = "data:"
+
+# Stored brand images have WebP derivatives (see /api/brand/images/{filename})
+BRAND_IMAGE_PREFIX = "/api/brand/images/"
+
+
+def excerpt_expr(field: str) -> Dict[str, Any]:
+    """Projection expression: the first SUMMARY_EXCERPT_CHARS characters of a string field"""
+    return {"$substrCP": [{"$ifNull": [field, ""]}, 0, SUMMARY_EXCERPT_CHARS]}
+
+
+def image_ref_expr(url: Any) -> Dict[str, Any]:
+    """Projection expression: an image URL, or just DATA_URL_MARKER for embedded images"""
+    return {"$let": {
+        "vars": {"url": {"$ifNull": [url, ""]}},
+        "in": {"$cond": [
+            {"$eq": [{"$substrCP": ["$$url", 0, len(DATA_URL_MARKER)]}, DATA_URL_MARKER]},
+            DATA_URL_MARKER,
+            "$$url"
+        ]}
+    }}
+
+
+def first_asset_url_expr() -> Dict[str, Any]:
+    return {"$arrayElemAt": [{"$ifNull": ["$assets.url", []]}, 0]}
+
+
+DRAFT_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "org_id": 1, "campaign_id": 1, "mode": 1, "status": 1,
+    "created_at": 1, "updated_at": 1,
+    "title": "$content.title",
+    "excerpt": excerpt_expr("$content.body"),
+    "image_ref": image_ref_expr(first_asset_url_expr()),
+    "asset_count": {"$size": {"$ifNull": ["$assets", []]}},
+}
+
+AI_POST_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "campaign_id": 1, "org_id": 1, "status": 1,
+    "content_pillar": 1, "content_type": 1, "profile_type": 1, "author_name": 1,
+    "scheduled_for": 1, "posted_at": 1, "created_at": 1, "updated_at": 1,
+    "excerpt": excerpt_expr("$content"),
+    "image_ref": image_ref_expr("$image_url"),
+}
+
+SCHEDULED_POST_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "draft_id": 1, "org_id": 1, "publish_time": 1, "timezone": 1,
+    "status": 1, "platform_url": 1, "error_message": 1,
+}
+
+POST_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "org_id": 1, "posted_at": 1, "platform_url": 1, "source": 1,
+    "impressions": 1, "reactions": 1, "comments": 1, "shares": 1, "clicks": 1,
+    "excerpt": excerpt_expr("$content"),
+}
+
+
+def thumbnail_url(image_ref: Optional[str], embedded_url: str, version: Any = None) -> Optional[str]:
+    """
+    Thumbnail for a summary row
+
+    Args:
+        image_ref: Value of an image_ref_expr projection
+        embedded_url: Endpoint serving the thumbnail of an embedded image
+        version: Changes when the image may have (e.g. updated_at), for caching
+    """
+    if not image_ref:
+        return None
+    if image_ref == DATA_URL_MARKER:
+        return f"{embedded_url}?v={quote(str(version))}" if version else embedded_url
+    if image_ref.startswith(BRAND_IMAGE_PREFIX):
+        return f"{image_ref}?size=thumb"
+    return image_ref
+
+
+def draft_summary(doc: Dict[str, Any]) -> DraftSummary:
+    return DraftSummary(
+        **doc,
+        thumbnail_url=thumbnail_url(doc.get("image_ref"), f"/api/drafts/{doc['id']}/thumbnail", doc.get("updated_at"))
+    )
+
+
+def ai_post_summary(doc: Dict[str, Any]) -> AIGeneratedPostSummary:
+    return AIGeneratedPostSummary(
+        **doc,
+        thumbnail_url=thumbnail_url(doc.get("image_ref"), f"/api/ai-content/posts/{doc['id']}/thumbnail", doc.get("updated_at"))
+    )
+
+
+def scheduled_post_summary(doc: Dict[str, Any], draft: Optional[DraftSummary]) -> ScheduledPostSummary:
+    if draft is None:
+        return ScheduledPostSummary(**doc)
+    return ScheduledPostSummary(
+        **doc,
+        mode=draft.mode,
+        title=draft.title,
+        excerpt=draft.excerpt,
+        thumbnail_url=draft.thumbnail_url
+    )
+
+
+def post_summary(doc: Dict[str, Any]) -> PostSummary:
+    return PostSummary(**doc)
+
+
+def _decode_data_url(data_url: str) -> bytes:
+    _, payload = data_url.split(",", 1)
+    return base64.b64decode(payload)
+
+
+async def data_url_thumbnail(image_url: Optional[str], size: str, request) -> Response:
+    """
+    Response with a WebP derivative of an embedded image (ETag, 304 on If-None-Match);
+    plain URLs are redirected to
+    """
+    from .derivatives import THUMBNAIL_SIZES, get_data_derivative
+
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"Invalid size. Use one of: {', '.join(THUMBNAIL_SIZES)}")
+    if not image_url:
+        raise HTTPException(status_code=404, detail="No image")
+    if not image_url.startswith(DATA_URL_MARKER):
+        return RedirectResponse(image_url)
+
+    try:
+        image_data = await asyncio.to_thread(_decode_data_url, image_url)
+        path, etag = await get_data_derivative(image_data, size)
+    except Exception as e:
+        print(f"[SUMMARIES] Could not render thumbnail: {e}")
+        raise HTTPException(status_code=422, detail="Embedded image could not be decoded")
+
+    # Summary rows put the owner's updated_at in the URL, so a day is safe
+    headers = {
+        'Cache-Control': 'private, max-age=86400',
+        'ETag': etag
+    }
+    if_none_match = request.headers.get('if-none-match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type='image/webp', headers=headers)
@@ -1,175 +1,275 @@
 """
 Tesseract OCR-based text extraction for precise text coordinates
+
+The image is normalized (orientation, grayscale, contrast) and downscaled to an
+OCR-sized working copy, the page segmentation modes run concurrently in worker
+processes, and results are memoized by image hash with boxes mapped back to the
+original coordinates.
 """
 import pytesseract
-from PIL import Image
+from PIL import Image, ImageOps
 import io
 import base64
-import json
-from typing import List, Dict, Any
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+from .compute_pool import get_process_pool, run_in_compute_pool
+
+
+# Page segmentation modes, in order of preference
+TESSERACT_CONFIGS = [
+    r'--oem 3 --psm 11',  # Sparse text - best for text overlays
+    r'--oem 3 --psm 6',   # Single uniform block - fallback
+    r'--oem 3 --psm 12',  # Sparse text with OSD - another option
+]
+
+# Longest edge of the OCR working copy. Overlay text on social images is large,
+# so this keeps glyphs well above Tesseract's preferred x-height while cutting
+# the pixels it has to segment; smaller images are never upscaled.
+OCR_MAX_EDGE = 1600
+
+OCR_CACHE_SIZE = 128
+
+_ocr_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+# OCR runs on compute-pool threads; the LRU bookkeeping isn't thread-safe on its own
+_ocr_cache_lock = threading.Lock()
+
+
+def _prepare_image(img: Image.Image) -> Tuple[Image.Image, float, float]:
+    """
+    Normalize and downscale an image for OCR
+
+    Returns:
+        (working image in mode 'L', x scale, y scale) where the scales map
+        working-image coordinates back to the original
+    """
+    img = ImageOps.exif_transpose(img)
+    width, height = img.size
+
+    gray = img.convert('L')
+    longest = max(width, height)
+    if longest > OCR_MAX_EDGE:
+        factor = OCR_MAX_EDGE / longest
+        gray = gray.resize(
+            (max(1, round(width * factor)), max(1, round(height * factor))),
+            Image.Resampling.LANCZOS,
+            reducing_gap=2.0
+        )
+    gray = ImageOps.autocontrast(gray, cutoff=1)
+
+    return gray, width / gray.width, height / gray.height
+
+
+def _run_psm(pixels: bytes, size: Tuple[int, int], config: str) -> Dict[str, list]:
+    """Run one Tesseract pass on a grayscale image (executes in a worker process)"""
+    img = Image.frombytes('L', size, pixels)
+    try:
+        return pytesseract.image_to_data(img, config=config, output_type=pytesseract.Output.DICT)
+    except Exception as e:
+        # pytesseract's exceptions don't unpickle, which would break the pool
+        raise RuntimeError(str(e)) from None
+
+
+def _has_text(data: Optional[Dict[str, list]]) -> bool:
+    return bool(data) and any(text.strip() for text in data['text'] if text)
+
+
+def _run_configs(img: Image.Image) -> Optional[Dict[str, list]]:
+    """
+    Run every PSM config concurrently and return the preferred result
+
+    Results are taken in config order: a later config only wins once every
+    earlier one has finished without text, which matches running them one by
+    one but costs only the slowest pass instead of the sum. Once a config wins,
+    passes still queued are cancelled; passes already running in a worker
+    cannot be interrupted, so they finish there and their results are dropped.
+    """
+    pixels = img.tobytes()
+    try:
+        pool = get_process_pool()
+        futures = [pool.submit(_run_psm, pixels, img.size, config) for config in TESSERACT_CONFIGS]
+    except Exception as e:
+        print(f"[TESSERACT] Worker pool unavailable, running in-process: {e}")
+        futures = None
+
+    fallback = None
+    for index, config in enumerate(TESSERACT_CONFIGS):
+        try:
+            if futures is not None:
+                data = futures[index].result()
+            else:
+                data = _run_psm(pixels, img.size, config)
+        except Exception as e:
+            print(f"[TESSERACT] Config {config} failed: {e}")
+            continue
+
+        if _has_text(data):
+            print(f"[TESSERACT] Successfully extracted text using config: {config}")
+            if futures is not None:
+                # Only drops passes that haven't started yet
+                for future in futures[index + 1:]:
+                    future.cancel()
+            return data
+        if fallback is None:
+            fallback = data
+
+    return fallback
+
+
+def _make_element(
+    words: List[str],
+    bbox: Dict[str, int],
+    total_conf: float,
+    scale_x: float,
+    scale_y: float,
+    img_width: int,
+    img_height: int
+) -> Dict[str, Any]:
+    """Build one text element, mapping the working-image box back to the original"""
+    x = round(bbox['x'] * scale_x)
+    y = round(bbox['y'] * scale_y)
+    width = round(bbox['width'] * scale_x)
+    height = round(bbox['height'] * scale_y)
+
+    avg_conf = total_conf / len(words) if words else 0
+    # Calculate font size from height (approximate)
+    font_size = max(12, min(200, int(height * 0.8)))
+
+    return {
+        'text': ' '.join(words),
+        'bbox': {
+            'x': x,
+            'y': y,
+            'width': width,
+            'height': height
+        },
+        'bbox_percent': {
+            'x_percent': (x / img_width) * 100,
+            'y_percent': (y / img_height) * 100,
+            'width_percent': (width / img_width) * 100,
+            'height_percent': (height / img_height) * 100
+        },
+        'confidence': avg_conf / 100.0 if avg_conf > 0 else 0.8,
+        'font_size': font_size,
+        'line_height': 1.2,
+        'font_weight': 400,
+        'text_align': 'left',
+        'color': '#000000',  # Default, will need color detection separately
+        'letter_spacing': 0,
+        'shadow_enabled': False,
+        'background_color': 'transparent',
+        'is_baked_in': True
+    }
+
+
+def _group_lines(
+    data: Dict[str, list],
+    scale_x: float,
+    scale_y: float,
+    img_width: int,
+    img_height: int
+) -> List[Dict[str, Any]]:
+    """Group word-level detections into one element per line"""
+    extracted_elements = []
+    current_text = []
+    current_bbox = None
+    current_line = None
+    current_conf = 0
+
+    for i in range(len(data['text'])):
+        text = data['text'][i].strip()
+        conf = int(float(data['conf'][i]))
+
+        # Skip empty text and very low confidence detections
+        if not text or conf < 20 or data['level'][i] != 5:
+            continue
+
+        left = data['left'][i]
+        top = data['top'][i]
+        width = data['width'][i]
+        height = data['height'][i]
+        line_num = data['line_num'][i]
+
+        if current_line != line_num:
+            if current_text and current_bbox:
+                extracted_elements.append(_make_element(
+                    current_text, current_bbox, current_conf, scale_x, scale_y, img_width, img_height
+                ))
+
+            # Start new line
+            current_text = [text]
+            current_bbox = {'x': left, 'y': top, 'width': width, 'height': height}
+            current_line = line_num
+            current_conf = conf
+        else:
+            # Same line, append word and expand bbox
+            current_text.append(text)
+            current_conf += conf
+            right = left + width
+            bottom = top + height
+            current_bbox['width'] = max(current_bbox['x'] + current_bbox['width'], right) - current_bbox['x']
+            current_bbox['height'] = max(current_bbox['y'] + current_bbox['height'], bottom) - current_bbox['y']
+
+    # Add the last line if exists
+    if current_text and current_bbox:
+        extracted_elements.append(_make_element(
+            current_text, current_bbox, current_conf, scale_x, scale_y, img_width, img_height
+        ))
+
+    return extracted_elements
 
 
 def extract_text_with_tesseract(image_base64: str) -> List[Dict[str, Any]]:
     """
     Extract text from image using Tesseract OCR with exact bounding box coordinates.
-    
+
     Args:
         image_base64: Base64-encoded image string
-        
+
     Returns:
-        List of text elements with bounding boxes and properties
+        List of text elements with bounding boxes (in original image
+        coordinates) and properties
     """
     try:
-        # Decode base64 image
         image_bytes = base64.b64decode(image_base64)
+        cache_key = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+
+        with _ocr_cache_lock:
+            cached = _ocr_cache.get(cache_key)
+            if cached is not None:
+                _ocr_cache.move_to_end(cache_key)
+        if cached is not None:
+            print(f"[TESSERACT] Cache hit ({len(cached)} text elements)")
+            return copy.deepcopy(cached)
+
         img = Image.open(io.BytesIO(image_bytes))
-        img_width, img_height = img.size
-        
-        # Use Tesseract to get detailed text data with bounding boxes
-        # Use PSM 11 (Sparse text) for better detection of text overlays on images
-        # Use OEM 3 (Default, based on what is available)
-        # Try multiple PSM modes for better detection
-        tesseract_configs = [
-            r'--oem 3 --psm 11',  # Sparse text - best for text overlays
-            r'--oem 3 --psm 6',   # Single uniform block - fallback
-            r'--oem 3 --psm 12',  # Sparse text with OSD - another option
-        ]
-        
-        data = None
-        for config in tesseract_configs:
-            try:
-                data = pytesseract.image_to_data(img, config=config, output_type=pytesseract.Output.DICT)
-                # Check if we got any text
-                if any(text.strip() for text in data['text'] if text):
-                    print(f"[TESSERACT] Successfully extracted text using config: {config}")
-                    break
-            except Exception as e:
-                print(f"[TESSERACT] Config {config} failed: {e}")
-                continue
-        
+        ocr_image, scale_x, scale_y = _prepare_image(img)
+        img_width = round(ocr_image.width * scale_x)
+        img_height = round(ocr_image.height * scale_y)
+
+        data = _run_configs(ocr_image)
         if not data:
-            print("[TESSERACT] All configs failed, trying default PSM 11")
-            try:
-                tesseract_config = r'--oem 3 --psm 11'
-                data = pytesseract.image_to_data(img, config=tesseract_config, output_type=pytesseract.Output.DICT)
-            except Exception as e:
-                print(f"[TESSERACT] Default config also failed: {e}")
-                return []
-        
-        extracted_elements = []
-        current_text = []
-        current_bbox = None
-        current_line = None
-        current_conf = 0
-        
-        # Group words into text blocks (lines)
-        for i in range(len(data['text'])):
-            text = data['text'][i].strip()
-            conf = int(data['conf'][i])
-            
-            # Skip empty text and very low confidence detections (lowered threshold for better detection)
-            if not text or conf < 20:
-                continue
-            
-            left = data['left'][i]
-            top = data['top'][i]
-            width = data['width'][i]
-            height = data['height'][i]
-            level = data['level'][i]
-            line_num = data['line_num'][i]
-            
-            # Start a new text block if this is a new line or word
-            if level == 5:  # Word level
-                if current_line != line_num:
-                    # Save previous line if exists
-                    if current_text and current_bbox:
-                        text_content = ' '.join(current_text)
-                        avg_conf = current_conf / len(current_text) if current_text else 0
-                        # Calculate font size from height (approximate)
-                        font_size = max(12, min(200, int(current_bbox['height'] * 0.8)))
-                        extracted_elements.append({
-                            'text': text_content,
-                            'bbox': {
-                                'x': current_bbox['x'],
-                                'y': current_bbox['y'],
-                                'width': current_bbox['width'],
-                                'height': current_bbox['height']
-                            },
-                            'bbox_percent': {
-                                'x_percent': (current_bbox['x'] / img_width) * 100,
-                                'y_percent': (current_bbox['y'] / img_height) * 100,
-                                'width_percent': (current_bbox['width'] / img_width) * 100,
-                                'height_percent': (current_bbox['height'] / img_height) * 100
-                            },
-                            'confidence': avg_conf / 100.0 if avg_conf > 0 else 0.8,
-                            'font_size': font_size,
-                            'line_height': 1.2,
-                            'font_weight': 400,
-                            'text_align': 'left',
-                            'color': '#000000',  # Default, will need color detection separately
-                            'letter_spacing': 0,
-                            'shadow_enabled': False,
-                            'background_color': 'transparent',
-                            'is_baked_in': True
-                        })
-                    
-                    # Start new line
-                    current_text = [text]
-                    current_bbox = {
-                        'x': left,
-                        'y': top,
-                        'width': width,
-                        'height': height
-                    }
-                    current_line = line_num
-                    current_conf = conf
-                else:
-                    # Same line, append word and expand bbox
-                    current_text.append(text)
-                    current_conf += conf
-                    # Expand bounding box to include this word
-                    right = left + width
-                    bottom = top + height
-                    current_bbox['width'] = max(current_bbox['x'] + current_bbox['width'], right) - current_bbox['x']
-                    current_bbox['height'] = max(current_bbox['y'] + current_bbox['height'], bottom) - current_bbox['y']
-        
-        # Add the last line if exists
-        if current_text and current_bbox:
-            text_content = ' '.join(current_text)
-            avg_conf = current_conf / len(current_text) if current_text else 0
-            font_size = max(12, min(200, int(current_bbox['height'] * 0.8)))
-            extracted_elements.append({
-                'text': text_content,
-                'bbox': {
-                    'x': current_bbox['x'],
-                    'y': current_bbox['y'],
-                    'width': current_bbox['width'],
-                    'height': current_bbox['height']
-                },
-                'bbox_percent': {
-                    'x_percent': (current_bbox['x'] / img_width) * 100,
-                    'y_percent': (current_bbox['y'] / img_height) * 100,
-                    'width_percent': (current_bbox['width'] / img_width) * 100,
-                    'height_percent': (current_bbox['height'] / img_height) * 100
-                },
-                'confidence': avg_conf / 100.0 if avg_conf > 0 else 0.8,
-                'font_size': font_size,
-                'line_height': 1.2,
-                'font_weight': 400,
-                'text_align': 'left',
-                'color': '#000000',
-                'letter_spacing': 0,
-                'shadow_enabled': False,
-                'background_color': 'transparent',
-                'is_baked_in': True
-            })
-        
+            print("[TESSERACT] All configs failed")
+            return []
+
+        extracted_elements = _group_lines(data, scale_x, scale_y, img_width, img_height)
+
         print(f"[TESSERACT] Extracted {len(extracted_elements)} text elements")
         if len(extracted_elements) == 0:
             print("[TESSERACT] WARNING: No text elements found. This might be normal if image has no text.")
-        
+
+        entry = copy.deepcopy(extracted_elements)
+        with _ocr_cache_lock:
+            _ocr_cache[cache_key] = entry
+            _ocr_cache.move_to_end(cache_key)
+            if len(_ocr_cache) > OCR_CACHE_SIZE:
+                _ocr_cache.popitem(last=False)
+
         return extracted_elements
-        
+
     except Exception as e:
         print(f"[TESSERACT] Error extracting text: {e}")
         import traceback
@@ -178,7 +278,6 @@ def extract_text_with_tesseract(image_base64: str) -> List[Dict[str, Any]]:
         return []
 
 
-
-
-
-
+async def extract_text_with_tesseract_async(image_base64: str) -> List[Dict[str, Any]]:
+    """extract_text_with_tesseract without blocking the event loop"""
+    return await run_in_compute_pool(extract_text_with_tesseract, image_base64)
@@ -0,0 +1,98 @@
+"""
+Upload Ingestion
+Copies an uploaded file to disk in chunks while hashing it and sniffing its
+type, so uploads are never held in memory whole and can be size-capped and
+deduplicated by content
+"""
+
+import hashlib
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Leading bytes kept for type sniffing
+SNIFF_BYTES = 16
+
+# (signature, MIME type); WebP is RIFF....WEBP and checked separately
+FILE_SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF8', 'image/gif'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+)
+
+# ZIP containers named by extension (the signature alone doesn't say which)
+ZIP_TYPES = {
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    size: int
+    content_hash: str
+    mime_type: Optional[str]
+
+
+def sniff_mime_type(head: bytes, filename: str = "") -> Optional[str]:
+    """MIME type from a file's leading bytes, or None when unrecognized"""
+    for signature, mime_type in FILE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head.startswith(b'PK\x03\x04'):
+        return ZIP_TYPES.get(Path(filename).suffix.lower(), 'application/zip')
+    return None
+
+
+async def stream_upload(upload: UploadFile, directory: Path, max_bytes: int) -> StoredUpload:
+    """
+    Copy an upload into a temporary file in `directory`, chunk by chunk
+
+    Raises:
+        HTTPException 413 when the upload exceeds max_bytes (nothing is kept)
+
+    Returns:
+        StoredUpload; the caller moves `path` to its final name or deletes it
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File too large (limit {max_bytes // (1024 * 1024)} MB)")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    temp_path = directory / f".{uuid.uuid4().hex}.part"
+    digest = hashlib.blake2b(digest_size=16)
+    head = b""
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, 'wb') as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File too large (limit {max_bytes // (1024 * 1024)} MB)")
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+    return StoredUpload(
+        path=temp_path,
+        size=size,
+        content_hash=digest.hexdigest(),
+        mime_type=sniff_mime_type(head, upload.filename or "")
+    )
@@ -73,11 +73,33 @@ async def lifespan(app: FastAPI):
     scheduler_thread = threading.Thread(target=start_scheduler_background, daemon=True)
     scheduler_thread.start()
     
+    # Populate the local Google Fonts store so overlay renders never wait on font downloads
+    from linkedpilot.utils.font_store import prefetch_google_fonts
+    font_prefetch_task = asyncio.create_task(prefetch_google_fonts())
+    
+    # Compound indexes behind the keyset-paginated list endpoints
+    from linkedpilot.utils.pagination import ensure_pagination_indexes
+    index_task = asyncio.create_task(ensure_pagination_indexes(db))
+    from linkedpilot.routes.calendar import ensure_calendar_indexes
+    calendar_index_task = asyncio.create_task(ensure_calendar_indexes(db))
+    
+    # Keep the admin metrics rollups reconciled with the source collections
+    from linkedpilot.utils.metrics import run_metrics_reconciliation
+    metrics_task = asyncio.create_task(run_metrics_reconciliation(db))
+    
     print("[OK] Server startup complete - Scheduler initializing in background...")
     
     yield  # App runs here
     
     # Shutdown
+    font_prefetch_task.cancel()
+    index_task.cancel()
+    calendar_index_task.cancel()
+    metrics_task.cancel()
+    from linkedpilot.utils.compute_pool import shutdown_compute_pool
+    shutdown_compute_pool()
+    from linkedpilot.utils.http_cache import close_shared_session
+    await close_shared_session()
     from linkedpilot.scheduler_service import stop_scheduler
     try:
         stop_scheduler()
@@ -232,7 +254,10 @@ async def signup(user_create: UserCreate):
     user_dict['linkedin_connected'] = False
     user_dict['onboarding_completed'] = False
     
-    await db.users.insert_one(user_dict)
+    from linkedpilot.utils.pagination import with_sort_keys
+    await db.users.insert_one(with_sort_keys("users", user_dict))
+    from linkedpilot.utils.metrics import record_signup
+    await record_signup(db, user_dict['subscription_tier'])
     
     # Create access token
     access_token = create_access_token(data={"user_id": user.id})
@@ -344,6 +369,7 @@ from linkedpilot.routes import (
     brand_router,
 )
 from linkedpilot.routes.ai_content import router as ai_content_router
+from linkedpilot.routes.calendar import router as calendar_router
 
 # Import Canva router
 from linkedpilot.routes.canva import router as canva_router
@@ -373,6 +399,7 @@ api_router.include_router(settings_router)
 api_router.include_router(brand_router)
 api_router.include_router(canva_router)
 api_router.include_router(ai_content_router)
+api_router.include_router(calendar_router)
 api_router.include_router(scheduler_router)
 api_router.include_router(user_prefs_router)
 api_router.include_router(org_materials_router)
@@ -0,0 +1,94 @@
+"""
+Calendar date parsing against a real MongoDB
+
+The calendar feed reads stored times through the _to_date aggregation
+expression; these checks run it on the server, since the parsing happens
+in $dateFromString. Skipped unless MONGO_URL points at a reachable server.
+"""
+import os
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+pymongo = pytest.importorskip("pymongo")
+
+MONGO_URL = os.environ.get("MONGO_URL")
+if not MONGO_URL:
+    pytest.skip("MONGO_URL is not set", allow_module_level=True)
+
+_client = pymongo.MongoClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+try:
+    _client.admin.command("ping")
+except pymongo.errors.PyMongoError as e:
+    _client.close()
+    pytest.skip(f"MongoDB is not reachable: {e}", allow_module_level=True)
+
+# The routes package reads these at import time
+os.environ.setdefault("DB_NAME", "calendar_dates_test")
+if not os.environ.get("ENCRYPTION_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+
+from linkedpilot.routes.calendar import _to_date  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def collection():
+    db_name = f"calendar_dates_test_{uuid.uuid4().hex[:8]}"
+    try:
+        yield _client[db_name]["times"]
+    finally:
+        _client.drop_database(db_name)
+        _client.close()
+
+
+CASES = [
+    ("date", datetime(2024, 3, 1, 10, 0, 0, 123000), datetime(2024, 3, 1, 10, 0, 0, 123000)),
+    ("naive", "2024-03-01T10:00:00", datetime(2024, 3, 1, 10, 0, 0)),
+    ("naive_fraction", "2024-03-01T10:00:00.123456", datetime(2024, 3, 1, 10, 0, 0, 123000)),
+    ("zulu", "2024-03-01T10:00:00.500Z", datetime(2024, 3, 1, 10, 0, 0, 500000)),
+    ("utc_offset", "2024-03-01T10:00:00+00:00", datetime(2024, 3, 1, 10, 0, 0)),
+    ("positive_offset", "2024-03-01T10:00:00+02:00", datetime(2024, 3, 1, 8, 0, 0)),
+    ("negative_offset", "2024-03-01T22:30:00.250-05:00", datetime(2024, 3, 2, 3, 30, 0, 250000)),
+    ("garbage", "not a date", None),
+    ("null", None, None),
+]
+
+
+def test_to_date_parses_stored_times(collection):
+    collection.insert_many([{"case": name, "t": value} for name, value, _ in CASES])
+    collection.insert_one({"case": "missing"})
+
+    parsed = {
+        doc["case"]: doc["d"]
+        for doc in collection.aggregate([{"$project": {"_id": 0, "case": 1, "d": _to_date("$t")}}])
+    }
+
+    for name, _, expected in CASES:
+        assert parsed[name] == expected, name
+    assert parsed["missing"] is None
+
+
+def test_to_date_orders_mixed_offsets(collection):
+    collection.delete_many({})
+    collection.insert_many([
+        {"id": "a", "t": "2024-03-01T09:30:00"},
+        {"id": "b", "t": "2024-03-01T11:00:00+02:00"},
+        {"id": "c", "t": datetime(2024, 3, 1, 9, 45)},
+        {"id": "d", "t": "2024-03-01T05:00:00-05:00"},
+    ])
+
+    ordered = [
+        doc["id"]
+        for doc in collection.aggregate([
+            {"$set": {"time": _to_date("$t")}},
+            {"$sort": {"time": 1}},
+        ])
+    ]
+
+    assert ordered == ["b", "a", "c", "d"]
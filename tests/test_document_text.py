@@ -0,0 +1,73 @@
+"""
+Word paragraph extraction matches python-docx
+
+_docx_paragraphs streams word/document.xml instead of loading the document
+with python-docx; its paragraph texts must stay identical, including tabs and
+line breaks inside runs.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+docx = pytest.importorskip("docx")
+pytest.importorskip("lxml")
+
+from docx.enum.text import WD_BREAK  # noqa: E402
+from docx.oxml import OxmlElement  # noqa: E402
+from docx.oxml.ns import qn  # noqa: E402
+
+from linkedpilot.utils.document_text import _docx_paragraphs  # noqa: E402
+
+
+def _build_document(path: Path) -> None:
+    document = docx.Document()
+
+    paragraph = document.add_paragraph()
+    run = paragraph.add_run("Name:")
+    run.add_tab()
+    run.add_text("Acme")
+
+    paragraph = document.add_paragraph()
+    run = paragraph.add_run("line1")
+    run.add_break()
+    run.add_text("line2")
+
+    paragraph = document.add_paragraph("before page break")
+    paragraph.runs[0].add_break(WD_BREAK.PAGE)
+    paragraph.add_run("after")
+
+    # Soft carriage return, non-breaking hyphen and a hyperlinked run
+    paragraph = document.add_paragraph()
+    run = paragraph.add_run("soft")
+    run._r.append(OxmlElement("w:cr"))
+    run.add_text("return")
+    run._r.append(OxmlElement("w:noBreakHyphen"))
+    run.add_text("ok")
+    hyperlink = OxmlElement("w:hyperlink")
+    hyperlink.set(qn("r:id"), "rId99")
+    link_run = OxmlElement("w:r")
+    link_text = OxmlElement("w:t")
+    link_text.text = " linked"
+    link_run.append(link_text)
+    link_run.append(OxmlElement("w:tab"))
+    hyperlink.append(link_run)
+    paragraph._p.append(hyperlink)
+
+    document.add_paragraph("")
+    document.add_table(rows=1, cols=1).cell(0, 0).text = "in a table"
+    document.add_paragraph("last")
+    document.save(path)
+
+
+def test_paragraphs_match_python_docx(tmp_path):
+    path = tmp_path / "sample.docx"
+    _build_document(path)
+
+    expected = [paragraph.text for paragraph in docx.Document(path).paragraphs]
+    assert "Name:\tAcme" in expected
+    assert "line1\nline2" in expected
+
+    assert list(_docx_paragraphs(str(path))) == expected
@@ -0,0 +1,90 @@
+"""
+Multi-ratio export endpoint
+
+POST /drafts/export-ratios crops the base image per aspect ratio, re-fits the
+overlay elements and returns every ratio encoded; requests that can't be
+rendered are rejected with 422.
+"""
+import base64
+import io
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+# The routes package reads these at import time; nothing here touches the database
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "export_ratios_test")
+if not os.environ.get("ENCRYPTION_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from linkedpilot.routes.drafts import router  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return TestClient(app)
+
+
+def _image_data_url(width: int = 600, height: int = 400) -> str:
+    image = Image.new("RGB", (width, height), (30, 60, 120))
+    for x in range(0, width, 40):
+        image.paste((220, 180, 40), (x, height // 3, x + 20, height // 3 + 20))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+HEADLINE = {
+    "text": "Ship faster with fewer meetings",
+    "role": "headline",
+    "box": {"x": 10, "y": 10, "width": 80, "height": 20, "use_percentage": True},
+    "typography": {"font_name": "Poppins", "font_size": 40, "font_weight": 700},
+    "effects": {"shadow_enabled": True, "shadow_offset_x": 2.6, "shadow_offset_y": 1.4, "opacity": 100},
+    "color": "#FFFFFF",
+    "text_align": "center",
+    "panel_style": "solid",
+}
+
+
+def test_exports_every_ratio_at_its_aspect(client):
+    response = client.post("/api/drafts/export-ratios", json={
+        "image_url": _image_data_url(),
+        "elements": [HEADLINE],
+        "ratios": ["1:1", "4:5", "1.91:1"],
+        "output_format": "PNG",
+    })
+    assert response.status_code == 200, response.text
+    exports = response.json()["exports"]
+    assert list(exports) == ["1:1", "4:5", "1.91:1"]
+
+    for ratio_str, export in exports.items():
+        assert export["url"].startswith("data:image/png;base64,")
+        image = Image.open(io.BytesIO(base64.b64decode(export["image_base64"])))
+        width, height = (float(part) for part in ratio_str.split(":"))
+        assert image.width / image.height == pytest.approx(width / height, rel=0.02)
+
+
+@pytest.mark.parametrize("payload", [
+    {"ratios": ["wide"]},
+    {"ratios": []},
+    {"output_format": "GIF"},
+    {"elements": [{"text": "no box"}]},
+    {"elements": [{**HEADLINE, "role": "banner"}]},
+])
+def test_rejects_bad_requests(client, payload):
+    response = client.post("/api/drafts/export-ratios", json={"image_url": _image_data_url(), **payload})
+    assert response.status_code == 422
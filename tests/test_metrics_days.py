@@ -0,0 +1,66 @@
+"""
+Metrics day buckets against a real MongoDB
+
+The reconciliation job groups source documents by _day_expr; these checks
+run it on the server, since string times are parsed in $dateFromString.
+Skipped unless MONGO_URL points at a reachable server.
+"""
+import os
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+pymongo = pytest.importorskip("pymongo")
+
+MONGO_URL = os.environ.get("MONGO_URL")
+if not MONGO_URL:
+    pytest.skip("MONGO_URL is not set", allow_module_level=True)
+
+_client = pymongo.MongoClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+try:
+    _client.admin.command("ping")
+except pymongo.errors.PyMongoError as e:
+    _client.close()
+    pytest.skip(f"MongoDB is not reachable: {e}", allow_module_level=True)
+
+from linkedpilot.utils.metrics import _day_expr  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def collection():
+    db_name = f"metrics_days_test_{uuid.uuid4().hex[:8]}"
+    try:
+        yield _client[db_name]["times"]
+    finally:
+        _client.drop_database(db_name)
+        _client.close()
+
+
+CASES = [
+    ("date", datetime(2024, 3, 1, 23, 30), "2024-03-01"),
+    ("naive", "2024-03-01T23:30:00", "2024-03-01"),
+    ("zulu", "2024-03-01T23:30:00.500Z", "2024-03-01"),
+    ("positive_offset", "2024-03-02T01:00:00+02:00", "2024-03-01"),
+    ("negative_offset", "2024-03-01T22:30:00.250-05:00", "2024-03-02"),
+    ("garbage", "not a date", None),
+    ("null", None, None),
+]
+
+
+def test_day_expr_buckets_by_utc_day(collection):
+    collection.insert_many([{"case": name, "t": value} for name, value, _ in CASES])
+    collection.insert_one({"case": "missing"})
+
+    days = {
+        doc["case"]: doc["day"]
+        for doc in collection.aggregate([{"$project": {"_id": 0, "case": 1, "day": _day_expr("$t")}}])
+    }
+
+    for name, _, expected in CASES:
+        assert days[name] == expected, name
+    assert days["missing"] is None
@@ -0,0 +1,61 @@
+"""
+OCR result cache under concurrent lookups
+
+extract_text_with_tesseract runs on compute-pool threads, so its LRU is hit
+from several threads at once. Tesseract itself is replaced by a stub that
+labels each image, which keeps the check independent of the binary.
+"""
+import base64
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+pytest.importorskip("pytesseract")
+
+from linkedpilot.utils import tesseract_extractor  # noqa: E402
+
+
+def _image_base64(shade: int) -> str:
+    buffer = io.BytesIO()
+    Image.new("L", (8, 8), shade).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+@pytest.fixture
+def stub_ocr(monkeypatch):
+    def run_configs(img):
+        return {"shade": img.getpixel((0, 0))}
+
+    def group_lines(data, scale_x, scale_y, img_width, img_height):
+        return [{"text": f"shade-{data['shade']}"}]
+
+    monkeypatch.setattr(tesseract_extractor, "_run_configs", run_configs)
+    monkeypatch.setattr(tesseract_extractor, "_group_lines", group_lines)
+    monkeypatch.setattr(tesseract_extractor, "OCR_CACHE_SIZE", 4)
+    monkeypatch.setattr(tesseract_extractor, "_ocr_cache", type(tesseract_extractor._ocr_cache)())
+
+
+def test_concurrent_lookups_keep_results(stub_ocr):
+    # More distinct images than cache slots, so hits, inserts and evictions interleave
+    shades = list(range(0, 240, 20))
+    images = {shade: _image_base64(shade) for shade in shades}
+    jobs = [shades[i % len(shades)] for i in range(3000)]
+
+    # Switch threads as often as possible so unguarded cache updates would interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda shade: tesseract_extractor.extract_text_with_tesseract(images[shade]), jobs))
+    finally:
+        sys.setswitchinterval(interval)
+
+    for shade, result in zip(jobs, results):
+        assert result == [{"text": f"shade-{shade}"}]
+    assert len(tesseract_extractor._ocr_cache) <= tesseract_extractor.OCR_CACHE_SIZE